@@ -1,4 +1,5 @@
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Union
+from models.series import MetricSeries, HistoryWindow
 
 
 class CoachingAgent:
@@ -13,12 +14,15 @@ class CoachingAgent:
     - Personalized touchpoints
     """
     
+    # Barrier detection only looks at the latest mood
+    history_window = HistoryWindow(last_n=1)
+    
     def generate_coaching_strategy(
         self,
         user_profile: Dict[str, Any],
         progress_analysis: Dict[str, Any],
         week: int,
-        metrics_history: List[Dict[str, Any]]
+        metrics_history: Union[MetricSeries, List[Dict[str, Any]]]
     ) -> Dict[str, Any]:
         """
         Generate personalized coaching strategy.
@@ -27,7 +31,7 @@ class CoachingAgent:
             user_profile: User profile
             progress_analysis: Progress trends and predictions
             week: Current week
-            metrics_history: Historical metrics
+            metrics_history: Historical metrics (MetricSeries or list of dicts)
         
         Returns:
             Coaching strategy with motivation and habits
@@ -65,7 +69,7 @@ class CoachingAgent:
         self,
         user_profile: Dict,
         progress_analysis: Dict,
-        metrics_history: List[Dict]
+        metrics_history: Union[MetricSeries, List[Dict]]
     ) -> List[str]:
         """Identify potential barriers to success"""
         
@@ -78,8 +82,7 @@ class CoachingAgent:
         
         # Check mood
         if metrics_history:
-            latest = metrics_history[-1]
-            if latest.get("mood", 5) < 5:
+            if MetricSeries.coerce(metrics_history).last("mood", 5) < 5:
                 barriers.append("Low motivation - consider variety in training")
         
         # Check anomalies
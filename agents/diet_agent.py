@@ -1,4 +1,5 @@
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Union
+from models.series import MetricSeries, HistoryWindow
 
 
 class DietAgent:
@@ -13,11 +14,14 @@ class DietAgent:
     - Nutrient timing
     """
     
+    # Adjustment compares the two most recent weigh-ins
+    history_window = HistoryWindow(last_n=2)
+    
     def generate_nutrition_plan(
         self,
         user_profile: Dict[str, Any],
         week: int,
-        metrics_history: List[Dict[str, Any]]
+        metrics_history: Union[MetricSeries, List[Dict[str, Any]]]
     ) -> Dict[str, Any]:
         """
         Generate weekly nutrition plan.
@@ -25,7 +29,7 @@ class DietAgent:
         Args:
             user_profile: User data (age, weight, height, goal, fitness_level)
             week: Week number (1-52)
-            metrics_history: Historical metrics
+            metrics_history: Historical metrics (MetricSeries or list of dicts)
         
         Returns:
             Complete nutrition plan with macros and meals
@@ -236,17 +240,18 @@ class DietAgent:
     def _calculate_adjustment(
         self,
         week: int,
-        metrics_history: List[Dict],
+        metrics_history: Union[MetricSeries, List[Dict]],
         goal: str
     ) -> str:
         """Calculate dietary adjustment needed"""
         
-        if not metrics_history or len(metrics_history) < 2:
+        series = MetricSeries.coerce(metrics_history)
+        
+        if len(series) < 2:
             return "Monitor progress for 1-2 weeks before adjusting"
         
-        latest = metrics_history[-1]
-        previous = metrics_history[-2]
-        weight_change = latest.get("weight_kg", 0) - previous.get("weight_kg", 0)
+        weight = series.column("weight_kg")
+        weight_change = weight[-1] - weight[-2]
         
         if goal == "muscle_gain":
             if weight_change < 0.2:
@@ -1,5 +1,6 @@
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Union
 from datetime import datetime, timedelta
+from models.series import MetricSeries, HistoryWindow
 
 
 class ProgressAgent:
@@ -13,10 +14,13 @@ class ProgressAgent:
     - Anomaly detection
     """
     
+    # Predictions use the last 5 points; confidence stops growing at 6
+    history_window = HistoryWindow(last_n=6)
+    
     def analyze_progress(
         self,
         user_profile: Dict[str, Any],
-        metrics_history: List[Dict[str, Any]],
+        metrics_history: Union[MetricSeries, List[Dict[str, Any]]],
         week: int
     ) -> Dict[str, Any]:
         """
@@ -24,30 +28,32 @@ class ProgressAgent:
         
         Args:
             user_profile: User profile data
-            metrics_history: Historical metrics
+            metrics_history: Historical metrics (MetricSeries or list of dicts)
             week: Current week number
         
         Returns:
             Progress analysis with predictions
         """
         
-        if not metrics_history or len(metrics_history) < 2:
+        series = MetricSeries.coerce(metrics_history)
+        
+        if len(series) < 2:
             return self._insufficient_data_response(user_profile, week)
         
         # Calculate trends
-        latest = metrics_history[-1]
-        trend_data = self._calculate_trends(metrics_history)
+        latest = series[-1]
+        trend_data = self._calculate_trends(series)
         
         # Predict 4-week outlook
         predictions = self._predict_4weeks(
-            metrics_history, user_profile.get("goal")
+            series, user_profile.get("goal")
         )
         
         # Assess recovery
         recovery_score = self._assess_recovery(latest)
         
         # Detect anomalies
-        anomalies = self._detect_anomalies(metrics_history)
+        anomalies = self._detect_anomalies(series)
         
         return {
             "week": week,
@@ -76,69 +82,69 @@ class ProgressAgent:
             "recovery_score": 50
         }
     
-    def _calculate_trends(self, metrics_history: List[Dict]) -> Dict[str, Dict]:
+    def _calculate_trends(self, series: MetricSeries) -> Dict[str, Dict]:
         """Calculate trends for all metrics"""
         
-        if len(metrics_history) < 2:
+        if len(series) < 2:
             return {}
         
-        latest = metrics_history[-1]
-        previous = metrics_history[-2]
+        weight = series.column("weight_kg")
+        strength = series.column("strength_1rm")
+        sleep = series.column("sleep_hours")
+        mood = series.column("mood")
         
         return {
             "weight": {
-                "current": latest.get("weight_kg"),
-                "change_kg": round(latest.get("weight_kg", 0) - previous.get("weight_kg", 0), 1),
-                "direction": "up" if latest.get("weight_kg", 0) > previous.get("weight_kg", 0) else "down"
+                "current": weight[-1],
+                "change_kg": round(weight[-1] - weight[-2], 1),
+                "direction": "up" if weight[-1] > weight[-2] else "down"
             },
             "strength": {
-                "current": latest.get("strength_1rm"),
-                "change_kg": round(latest.get("strength_1rm", 0) - previous.get("strength_1rm", 0), 1),
-                "direction": "up" if latest.get("strength_1rm", 0) > previous.get("strength_1rm", 0) else "down"
+                "current": strength[-1],
+                "change_kg": round(strength[-1] - strength[-2], 1),
+                "direction": "up" if strength[-1] > strength[-2] else "down"
             },
             "sleep": {
-                "current": latest.get("sleep_hours"),
-                "change_hours": round(latest.get("sleep_hours", 0) - previous.get("sleep_hours", 0), 1)
+                "current": sleep[-1],
+                "change_hours": round(sleep[-1] - sleep[-2], 1)
             },
             "mood": {
-                "current": latest.get("mood"),
-                "change": latest.get("mood", 0) - previous.get("mood", 0)
+                "current": mood[-1],
+                "change": mood[-1] - mood[-2]
             }
         }
     
     def _predict_4weeks(
         self,
-        metrics_history: List[Dict],
+        series: MetricSeries,
         goal: str
     ) -> Dict[str, float]:
         """Predict metrics 4 weeks ahead"""
         
-        if len(metrics_history) < 2:
+        if len(series) < 2:
             return {}
         
-        latest = metrics_history[-1]
+        strength = series.column("strength_1rm")
+        weight = series.column("weight_kg")
         
-        if len(metrics_history) >= 5:
+        if len(series) >= 5:
             # Linear regression with more data points
-            recent_metrics = metrics_history[-5:]
-            strength_trend = (recent_metrics[-1].get("strength_1rm", 0) - 
-                            recent_metrics.get("strength_1rm", 0)) / 4
-            weight_trend = (recent_metrics[-1].get("weight_kg", 0) - 
-                          recent_metrics.get("weight_kg", 0)) / 4
+            strength_trend = (strength[-1] - strength[-5]) / 4
+            weight_trend = (weight[-1] - weight[-5]) / 4
         else:
             # Simple linear prediction
-            strength_trend = latest.get("strength_1rm", 0) - metrics_history[-2].get("strength_1rm", 0)
-            weight_trend = latest.get("weight_kg", 0) - metrics_history[-2].get("weight_kg", 0)
+            strength_trend = strength[-1] - strength[-2]
+            weight_trend = weight[-1] - weight[-2]
         
         predictions = {
-            "strength_1rm_4w": round(latest.get("strength_1rm", 0) + (strength_trend * 4), 1),
-            "weight_kg_4w": round(latest.get("weight_kg", 0) + (weight_trend * 4), 1),
+            "strength_1rm_4w": round(strength[-1] + (strength_trend * 4), 1),
+            "weight_kg_4w": round(weight[-1] + (weight_trend * 4), 1),
             "strength_trend_per_week": round(strength_trend, 1),
             "weight_trend_per_week": round(weight_trend, 1)
         }
         
         # Add confidence based on data points
-        confidence = min(0.85, 0.3 + (len(metrics_history) * 0.1))
+        confidence = min(0.85, 0.3 + (len(series) * 0.1))
         predictions["confidence"] = round(confidence, 2)
         
         return predictions
@@ -158,11 +164,11 @@ class ProgressAgent:
         
         return int(min(100, max(0, recovery_score)))
     
-    def _detect_anomalies(self, metrics_history: List[Dict]) -> List[str]:
+    def _detect_anomalies(self, series: MetricSeries) -> List[str]:
         """Detect anomalies in metrics"""
         
         anomalies = []
-        latest = metrics_history[-1]
+        latest = series[-1]
         
         # Check if mood or energy dipped
         if latest.get("mood", 5) < 4:
@@ -171,15 +177,17 @@ class ProgressAgent:
         if latest.get("energy", 5) < 4:
             anomalies.append("Low energy - check sleep and nutrition")
         
-        # Check for weight fluctuations
-        if len(metrics_history) >= 2:
-            weight_change = abs(latest.get("weight_kg", 0) - metrics_history[-2].get("weight_kg", 0))
+        if len(series) >= 2:
+            weight = series.column("weight_kg")
+            strength = series.column("strength_1rm")
+            
+            # Check for weight fluctuations
+            weight_change = abs(weight[-1] - weight[-2])
             if weight_change > 3:
                 anomalies.append(f"Large weight change ({weight_change}kg) - may be water retention")
-        
-        # Check for strength drops
-        if len(metrics_history) >= 2:
-            strength_change = latest.get("strength_1rm", 0) - metrics_history[-2].get("strength_1rm", 0)
+            
+            # Check for strength drops
+            strength_change = strength[-1] - strength[-2]
             if strength_change < -10:
                 anomalies.append("Significant strength drop - check form and recovery")
         
@@ -1,4 +1,5 @@
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Union
+from models.series import MetricSeries, NO_HISTORY
 
 
 class WorkoutAgent:
@@ -13,6 +14,9 @@ class WorkoutAgent:
     - Recovery optimization
     """
     
+    # Progression is driven by week number only; no metric history is read
+    history_window = NO_HISTORY
+    
     def __init__(self):
         """Initialize workout templates"""
         self.exercises_db = self._init_exercises()
@@ -21,7 +25,7 @@ class WorkoutAgent:
         self,
         user_profile: Dict[str, Any],
         week: int,
-        metrics_history: List[Dict[str, Any]]
+        metrics_history: Union[MetricSeries, List[Dict[str, Any]]]
     ) -> Dict[str, Any]:
         """
         Generate weekly workout plan.
@@ -29,7 +33,7 @@ class WorkoutAgent:
         Args:
             user_profile: User data (goal, fitness_level, equipment)
             week: Week number (1-52)
-            metrics_history: Historical metrics for progression
+            metrics_history: Historical metrics for progression (MetricSeries or list of dicts)
         
         Returns:
             Complete workout plan with exercises and progression
@@ -327,7 +331,7 @@ class WorkoutAgent:
         self,
         week: int,
         fitness_level: str,
-        metrics_history: List[Dict[str, Any]]
+        metrics_history: Union[MetricSeries, List[Dict[str, Any]]]
     ) -> str:
         """Calculate progression strategy"""
         
@@ -366,7 +370,8 @@ class WorkoutAgent:
                     total_sets += exercise.get("sets", 0)
                     reps = exercise.get("reps", "8-12")
                     if isinstance(reps, str) and "-" in reps:
-                        avg_reps = (int(reps.split("-")) + int(reps.split("-"))) // 2
+                        low, high = reps.split("-")
+                        avg_reps = (int(low) + int(high)) // 2
                     else:
                         avg_reps = 8
                     total_reps += avg_reps
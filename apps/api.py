@@ -0,0 +1,139 @@
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+
+from apps.config import settings
+from apps.instrumentation import REGISTRY
+from apps.responses import FastJSONResponse
+from apps.middleware import (
+    MemoryTrackingMiddleware,
+    QueryStatsMiddleware,
+    ReadYourWritesMiddleware,
+    RequestMetricsMiddleware,
+)
+from models.database import init_db
+from models.engine import engine, pool_stats, replica_engine
+from models.schemas import HealthResponse
+from routes import admin, auth, chat, metrics, plans, progress
+
+
+# ==========================================
+# LIFESPAN
+# ==========================================
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Startup/shutdown hook for each worker.
+
+    Startup:
+    - Creates missing tables and indexes
+    - Builds the orchestrator (and its agents) once per worker
+
+    Shutdown (after in-flight requests drain):
+    - Closes this worker's pooled database connections
+
+    Nothing here runs at import time, so importing the app (uvicorn,
+    gunicorn preload, pytest collection) stays cheap.
+    """
+    init_db()
+
+    from agents.orchestrator import OrchestratorAgent
+    app.state.orchestrator = OrchestratorAgent()
+
+    yield
+
+    engine.dispose()
+    if replica_engine is not engine:
+        replica_engine.dispose()
+
+
+# ==========================================
+# APP FACTORY
+# ==========================================
+
+def create_app() -> FastAPI:
+    """
+    Create and configure the FitFlow API application.
+
+    Registers the read-your-writes, request metrics and query stats
+    middleware, all routers, the health checks and /metrics. Database tables and agents are set up lazily in `lifespan`.
+
+    Usage:
+        uvicorn apps.api:app                      # module-level instance
+        uvicorn apps.api:create_app --factory     # fresh instance
+
+    Returns:
+        Configured FastAPI application
+    """
+    app = FastAPI(
+        title=settings.API_TITLE,
+        version=settings.API_VERSION,
+        description=settings.API_DESCRIPTION,
+        default_response_class=FastJSONResponse,
+        lifespan=lifespan
+    )
+
+    app.add_middleware(MemoryTrackingMiddleware)
+    app.add_middleware(ReadYourWritesMiddleware)
+    app.add_middleware(RequestMetricsMiddleware)
+    app.add_middleware(QueryStatsMiddleware)
+
+    app.include_router(auth.router)
+    app.include_router(metrics.router)
+    app.include_router(plans.router)
+    app.include_router(chat.router)
+    app.include_router(progress.router)
+    app.include_router(admin.router)
+
+    @app.get("/health", response_model=HealthResponse, tags=["Health"])
+    def health():
+        """Liveness check"""
+        return {
+            "status": "healthy",
+            "environment": settings.ENVIRONMENT,
+            "version": settings.API_VERSION
+        }
+
+    @app.get("/health/db", tags=["Health"])
+    def health_db():
+        """Connection pool utilization gauge for this worker"""
+        return {
+            "status": "healthy",
+            "pool": pool_stats(),
+            "replica_pool": pool_stats(replica_engine) if replica_engine is not engine else None
+        }
+
+    @app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+    def prometheus_metrics():
+        """This worker's spans, request metrics and pool gauges (Prometheus text format)"""
+        return PlainTextResponse(
+            REGISTRY.render(gauges=_pool_gauges()),
+            media_type="text/plain; version=0.0.4; charset=utf-8"
+        )
+
+    return app
+
+
+def _pool_gauges():
+    """Connection pool gauges for the primary (and replica, if separate)."""
+    engines = {"primary": engine}
+    if replica_engine is not engine:
+        engines["replica"] = replica_engine
+
+    gauges = {
+        "fitflow_db_pool_checked_out": ("Connections currently checked out", {}),
+        "fitflow_db_pool_capacity": ("Maximum connections (size + overflow)", {}),
+        "fitflow_db_pool_utilization": ("Checked out / capacity (0-1)", {}),
+    }
+    for role, bind in engines.items():
+        stats = pool_stats(bind)
+        key = (("engine", role),)
+        for field in ("checked_out", "capacity", "utilization"):
+            if field in stats:
+                gauges[f"fitflow_db_pool_{field}"][1][key] = stats[field]
+    return gauges
+
+
+app = create_app()
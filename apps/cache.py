@@ -0,0 +1,692 @@
+"""
+Key-value cache backends.
+
+MemoryCache is a per-worker LRU. SQLiteCache keeps entries in a local
+SQLite file, so every worker on a host shares one copy. RedisCache talks
+the Redis protocol (RESP) to a server shared by every worker on every
+node: Redis, Valkey, KeyDB, or apps.resp_server for development and
+tests. A value built or patched by one worker is served by the others.
+
+Values must be JSON-serializable (the shared backends store JSON text)
+and are treated as immutable once stored: MemoryCache hands out the
+stored object, so build a new value instead of mutating one returned by
+get(). Entries expire `ttl` seconds after they were set (None: never).
+Each cache has a namespace, so caches sharing a server do not collide
+and clear() drops only its own keys.
+
+update() is the one atomic read-modify-write: it replaces a present
+value with fn(value) (or removes it when fn returns None) with no other
+write to that key in between, across processes for the shared backends.
+Patches that must not lose concurrent increments go through it.
+
+get_or_compute() coalesces misses (single-flight): concurrent callers
+missing the same key wait for one computation instead of all running it.
+Threads of a worker share the leader's result directly; on a shared
+backend the leader also holds a short lock entry, so other workers wait
+for its value rather than recomputing after an invalidation.
+SingleFlight, the in-process half, also works on its own for calls that
+are not cached (see routes.plans).
+
+Usage:
+    cache = cache_from_url(settings.CACHE_URL, size=10000, namespace="dashboard")
+    cache.set("alice", snapshot)
+    cache.update("alice", lambda snapshot: patched(snapshot))
+    cache.get_or_compute("alice", lambda: build(db, "alice"))
+"""
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlparse
+
+
+Updater = Callable[[Any], Optional[Any]]
+
+
+def _always(value: Any) -> bool:
+    return True
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"))
+
+
+class _Flight:
+    """One in-progress call that other threads can wait for."""
+
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls per key within a process.
+
+    While a call for a key runs, other callers with an equal key wait for
+    it and share its result, or its exception, instead of running their
+    own. A caller that waits longer than `timeout` seconds runs the call
+    itself.
+
+    Usage:
+        GENERATIONS = SingleFlight()
+        plan, shared = GENERATIONS.do(("alice", 3), lambda: generate("alice", 3))
+    """
+
+    def __init__(self, timeout: Optional[float] = None):
+        self.timeout = timeout
+        self._flights: Dict[Any, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Any, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run fn() unless an equal call is already running.
+
+        Returns:
+            (result, shared): shared is True when the result came from
+            another caller's run
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            if not flight.done.wait(self.timeout):
+                return fn(), False
+            if flight.error is not None:
+                raise flight.error
+            return flight.value, True
+
+        try:
+            flight.value = fn()
+            return flight.value, False
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def __len__(self) -> int:
+        """Number of calls in progress."""
+        return len(self._flights)
+
+
+class Cache:
+    """
+    Base class of the backends: single-flight on top of get/set/add/update.
+
+    Backends implement get, set, add, update, delete, clear and __len__.
+    `shared` backends are visible to other workers, which is when the
+    cross-worker lock in get_or_compute() pays off.
+    """
+
+    shared = False
+
+    def __init__(self, namespace: str = "", ttl: Optional[float] = None, flight_timeout: float = 5.0):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.flight_timeout = flight_timeout
+        self._flights = SingleFlight(flight_timeout)
+
+    def _expiry(self, ttl: Optional[float]) -> Optional[float]:
+        ttl = self.ttl if ttl is None else ttl
+        return time.time() + ttl if ttl else None
+
+    def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Optional[Any]],
+        fresh: Callable[[Any], bool] = _always,
+    ) -> Optional[Any]:
+        """
+        The cached value for `key`, computed and stored on a miss.
+
+        Concurrent misses on one key run `compute` once: threads of this
+        worker wait for the leading thread (and share its exception if it
+        fails), workers sharing the backend wait for the worker holding
+        its lock (up to `flight_timeout` seconds, then they compute
+        themselves).
+
+        Args:
+            compute: Builds the value; None means "nothing to cache"
+            fresh: Whether a cached value may be served (e.g. its version
+                stamp is current); stale values count as misses
+
+        Returns:
+            The value, or None when compute() returned None
+        """
+        value = self.get(key)
+        if value is not None and fresh(value):
+            return value
+
+        value, shared = self._flights.do(key, lambda: self._lead(key, compute, fresh))
+        if shared and value is not None and not fresh(value):
+            # the leader started before this caller's version existed
+            return self._compute(key, compute)
+        return value
+
+    def _compute(self, key: str, compute: Callable[[], Optional[Any]]) -> Optional[Any]:
+        value = compute()
+        if value is not None:
+            self.set(key, value)
+        return value
+
+    def _lead(self, key: str, compute: Callable[[], Optional[Any]], fresh: Callable[[Any], bool]) -> Optional[Any]:
+        if not self.shared:
+            return self._compute(key, compute)
+
+        lock = f"{key}#lock"
+        token = uuid.uuid4().hex
+        locked = self.add(lock, token, self.flight_timeout)
+        if not locked:
+            value = self._await(key, lock, fresh)
+            if value is not None:
+                return value
+            locked = self.add(lock, token, self.flight_timeout)
+        try:
+            # another worker may have stored it since our first read
+            value = self.get(key)
+            if value is not None and fresh(value):
+                return value
+            return self._compute(key, compute)
+        finally:
+            if locked:
+                # release only our own lock: it may have expired and been
+                # taken by another worker meanwhile
+                self.update(lock, lambda held: None if held == token else held)
+
+    def _await(self, key: str, lock: str, fresh: Callable[[Any], bool]) -> Optional[Any]:
+        """Poll for the value another worker is computing; None on timeout."""
+        deadline = time.monotonic() + self.flight_timeout
+        delay = 0.002
+        while time.monotonic() < deadline:
+            time.sleep(delay)
+            delay = min(delay * 2, 0.05)
+            value = self.get(key)
+            if value is not None and fresh(value):
+                return value
+            if self.get(lock) is None:
+                # the holder finished (or gave up): one last look
+                value = self.get(key)
+                return value if value is not None and fresh(value) else None
+        return None
+
+
+# ==========================================
+# IN-PROCESS
+# ==========================================
+
+class MemoryCache(Cache):
+    """Thread-safe LRU holding at most `size` entries."""
+
+    def __init__(self, size: int = 1024, namespace: str = "", ttl: Optional[float] = None, **options):
+        super().__init__(namespace, ttl, **options)
+        self.size = size
+        self._entries: "OrderedDict[str, Tuple[Any, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _live(self, key: str) -> Optional[Tuple[Any, Optional[float]]]:
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.time():
+            del self._entries[key]
+            return None
+        return entry
+
+    def _store(self, key: str, value: Any, expires: Optional[float]) -> None:
+        self._entries[key] = (value, expires)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._live(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._store(key, value, self._expiry(ttl))
+
+    def add(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        """Set `key` only if it is absent; True if it was set."""
+        with self._lock:
+            if self._live(key) is not None:
+                return False
+            self._store(key, value, self._expiry(ttl))
+            return True
+
+    def update(self, key: str, fn: Updater) -> Optional[Any]:
+        """Atomically replace a present value with fn(value); None removes it."""
+        with self._lock:
+            entry = self._live(key)
+            if entry is None:
+                return None
+            value = fn(entry[0])
+            if value is None:
+                del self._entries[key]
+            else:
+                self._entries[key] = (value, entry[1])
+            return value
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# ==========================================
+# SHARED BY THE WORKERS OF ONE HOST
+# ==========================================
+
+# SQLite connections inherited from a parent process, kept referenced
+# (never finalized) in the child
+_INHERITED: List[sqlite3.Connection] = []
+
+
+class SQLiteCache(Cache):
+    """
+    Cache in a local SQLite file shared by the workers of one host.
+
+    WAL mode lets readers run alongside a writer; update() takes the
+    write lock up front (BEGIN IMMEDIATE), so read-modify-write is atomic
+    across processes. Holds about `size` entries of its namespace: every
+    `prune_every` writes, its expired entries and the least recently
+    written ones beyond that are dropped.
+
+    Each process opens its own connection: SQLite connections must not be
+    used across fork(), and caches are created at import, in the
+    (preloaded) gunicorn master.
+    """
+
+    shared = True
+
+    def __init__(
+        self,
+        path: str,
+        size: int = 1024,
+        prune_every: int = 256,
+        namespace: str = "",
+        ttl: Optional[float] = None,
+        **options
+    ):
+        super().__init__(namespace, ttl, **options)
+        self.path = path
+        self.size = size
+        self.prune_every = prune_every
+        self._prefix = f"{namespace}:" if namespace else ""
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._connection = self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, written REAL NOT NULL, expires REAL)"
+        )
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(cache)")}
+        if "expires" not in columns:
+            conn.execute("ALTER TABLE cache ADD COLUMN expires REAL")
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_written ON cache (written)")
+        return conn
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        """This process's connection; a forked child opens its own on first use."""
+        if self._pid != os.getpid():
+            # never close (or let GC close) the parent's connection in the child
+            _INHERITED.append(self._connection)
+            self._pid = os.getpid()
+            self._connection = self._connect()
+        return self._connection
+
+    def _read(self, key: str) -> Optional[Any]:
+        row = self._conn.execute(
+            "SELECT value FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)",
+            (self._prefix + key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _write(self, key: str, value: Any, expires: Optional[float], only_if_absent: bool = False) -> bool:
+        now = time.time()
+        cursor = self._conn.execute(
+            "INSERT INTO cache (key, value, written, expires) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, written = excluded.written, "
+            "expires = excluded.expires"
+            + (" WHERE cache.expires IS NOT NULL AND cache.expires <= ?" if only_if_absent else ""),
+            (self._prefix + key, _dumps(value), now, expires) + ((now,) if only_if_absent else ())
+        )
+        self._writes += 1
+        if self._writes % self.prune_every == 0:
+            # only this namespace: caches of other sizes may share the file
+            where, params = self._own()
+            scope = where + (" AND" if where else " WHERE")
+            self._conn.execute("DELETE FROM cache" + scope + " expires <= ?", params + (now,))
+            self._conn.execute(
+                "DELETE FROM cache" + scope + " key NOT IN "
+                "(SELECT key FROM cache" + where + " ORDER BY written DESC LIMIT ?)",
+                params + params + (self.size,)
+            )
+        return cursor.rowcount > 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            return self._read(key)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._write(key, value, self._expiry(ttl))
+
+    def add(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        """Set `key` only if it is absent; True if it was set."""
+        with self._lock:
+            return self._write(key, value, self._expiry(ttl), only_if_absent=True)
+
+    def update(self, key: str, fn: Updater) -> Optional[Any]:
+        """Atomically replace a present value with fn(value); None removes it."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                value = self._read(key)
+                if value is not None:
+                    value = fn(value)
+                    if value is None:
+                        self._conn.execute("DELETE FROM cache WHERE key = ?", (self._prefix + key,))
+                    else:
+                        self._conn.execute(
+                            "UPDATE cache SET value = ?, written = ? WHERE key = ?",
+                            (_dumps(value), time.time(), self._prefix + key)
+                        )
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return value
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (self._prefix + key,))
+
+    def _own(self) -> Tuple[str, tuple]:
+        if not self._prefix:
+            return "", ()
+        # range scan on the primary key instead of LIKE (no escaping of _ and %)
+        return " WHERE key >= ? AND key < ?", (self._prefix, self._prefix[:-1] + ";")
+
+    def clear(self) -> None:
+        where, params = self._own()
+        with self._lock:
+            self._conn.execute("DELETE FROM cache" + where, params)
+
+    def __len__(self) -> int:
+        where, params = self._own()
+        with self._lock:
+            return self._conn.execute("SELECT count(*) FROM cache" + where, params).fetchone()[0]
+
+
+# ==========================================
+# SHARED OVER THE NETWORK (REDIS PROTOCOL)
+# ==========================================
+
+class RedisError(Exception):
+    """Error reply from the server."""
+
+
+class _Connection:
+    """One RESP2 connection: commands out, replies in."""
+
+    def __init__(self, host: str, port: int, timeout: float):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile("rb")
+
+    def send(self, *args: Any) -> None:
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        self.sock.sendall(b"".join(parts))
+
+    def read(self) -> Any:
+        line = self.reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise ConnectionError("Connection closed by the cache server")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            raise RedisError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            size = int(rest)
+            if size < 0:
+                return None
+            data = self.reader.read(size + 2)
+            if len(data) != size + 2:
+                raise ConnectionError("Connection closed by the cache server")
+            return data[:-2]
+        if kind == b"*":
+            count = int(rest)
+            return None if count < 0 else [self.read() for _ in range(count)]
+        raise RedisError(f"Unexpected reply {line!r}")
+
+    def call(self, *args: Any) -> Any:
+        self.send(*args)
+        return self.read()
+
+    def close(self) -> None:
+        try:
+            self.reader.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class RedisCache(Cache):
+    """
+    Cache on a Redis-protocol server shared by every worker.
+
+    Keeps a small pool of connections (one per concurrently calling
+    thread). update() is an optimistic transaction (WATCH/MULTI/EXEC),
+    retried when another client wrote the key in between, and keeps the
+    entry's TTL (SET ... KEEPTTL). Eviction is the server's job
+    (maxmemory-policy allkeys-lru); the `ttl` bounds what is left behind.
+
+    Args:
+        url: redis://[:password@]host[:port][/db]
+    """
+
+    shared = True
+
+    def __init__(
+        self,
+        url: str,
+        namespace: str = "",
+        ttl: Optional[float] = None,
+        socket_timeout: float = 5.0,
+        pool_size: int = 16,
+        **options
+    ):
+        super().__init__(namespace, ttl, **options)
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.socket_timeout = socket_timeout
+        self.pool_size = pool_size
+        self._prefix = f"{namespace}:" if namespace else ""
+        self._pool: List[_Connection] = []
+        self._pool_lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def _connect(self) -> _Connection:
+        conn = _Connection(self.host, self.port, self.socket_timeout)
+        try:
+            if self.password:
+                conn.call("AUTH", self.password)
+            if self.db:
+                conn.call("SELECT", self.db)
+        except BaseException:
+            conn.close()
+            raise
+        return conn
+
+    def _acquire(self) -> Tuple[_Connection, bool]:
+        with self._pool_lock:
+            if self._pid != os.getpid():
+                # a forked child must not talk over its parent's sockets
+                self._pool, self._pid = [], os.getpid()
+            if self._pool:
+                return self._pool.pop(), True
+        return self._connect(), False
+
+    def _release(self, conn: _Connection) -> None:
+        with self._pool_lock:
+            if len(self._pool) < self.pool_size:
+                self._pool.append(conn)
+                return
+        conn.close()
+
+    def _run(self, work: Callable[[_Connection], Any]) -> Any:
+        """Run `work` on a pooled connection; retried once if a pooled one went stale."""
+        conn, pooled = self._acquire()
+        try:
+            result = work(conn)
+        except (ConnectionError, OSError) as exc:
+            conn.close()
+            if not pooled or isinstance(exc, socket.timeout):
+                raise
+            conn = self._connect()
+            try:
+                result = work(conn)
+            except BaseException:
+                conn.close()
+                raise
+        except BaseException:
+            # the connection may be mid-transaction: never reuse it
+            conn.close()
+            raise
+        self._release(conn)
+        return result
+
+    def _call(self, *args: Any) -> Any:
+        return self._run(lambda conn: conn.call(*args))
+
+    def _ttl_args(self, ttl: Optional[float]) -> tuple:
+        ttl = self.ttl if ttl is None else ttl
+        return ("PX", max(1, int(ttl * 1000))) if ttl else ()
+
+    def get(self, key: str) -> Optional[Any]:
+        data = self._call("GET", self._prefix + key)
+        return json.loads(data) if data is not None else None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self._call("SET", self._prefix + key, _dumps(value), *self._ttl_args(ttl))
+
+    def add(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        """Set `key` only if it is absent; True if it was set."""
+        return self._call("SET", self._prefix + key, _dumps(value), "NX", *self._ttl_args(ttl)) is not None
+
+    def update(self, key: str, fn: Updater) -> Optional[Any]:
+        """Atomically replace a present value with fn(value); None removes it."""
+        key = self._prefix + key
+
+        def transaction(conn: _Connection) -> Tuple[bool, Optional[Any]]:
+            conn.call("WATCH", key)
+            data = conn.call("GET", key)
+            if data is None:
+                conn.call("UNWATCH")
+                return True, None
+            try:
+                value = fn(json.loads(data))
+            except BaseException:
+                conn.call("UNWATCH")
+                raise
+            conn.call("MULTI")
+            if value is None:
+                conn.call("DEL", key)
+            else:
+                conn.call("SET", key, _dumps(value), "KEEPTTL")
+            return conn.call("EXEC") is not None, value
+
+        while True:
+            committed, value = self._run(transaction)
+            if committed:
+                return value
+
+    def delete(self, key: str) -> None:
+        self._call("DEL", self._prefix + key)
+
+    def _scan(self) -> List[bytes]:
+        keys, cursor = [], b"0"
+        while True:
+            cursor, batch = self._call("SCAN", cursor, "MATCH", self._prefix + "*", "COUNT", 1000)
+            keys.extend(batch)
+            if cursor == b"0":
+                return keys
+
+    def clear(self) -> None:
+        if not self._prefix:
+            self._call("FLUSHDB")
+            return
+        keys = self._scan()
+        for start in range(0, len(keys), 500):
+            self._call("DEL", *keys[start:start + 500])
+
+    def __len__(self) -> int:
+        if not self._prefix:
+            return self._call("DBSIZE")
+        return len(self._scan())
+
+    def close(self) -> None:
+        with self._pool_lock:
+            pool, self._pool = self._pool, []
+        for conn in pool:
+            conn.close()
+
+
+def cache_from_url(url: str, size: int = 1024, namespace: str = "", ttl: Optional[float] = None) -> Cache:
+    """
+    Backend for a cache URL.
+
+    Args:
+        url: "" or "memory://" for a per-worker LRU, "sqlite:///path/to/file.db"
+            for a cache shared by the workers of one host,
+            "redis://host:6379/0" for one shared by every worker
+        size: Maximum number of entries (the server's memory limit for redis)
+        namespace: Key prefix separating caches on a shared backend
+        ttl: Seconds an entry lives (None: until evicted)
+    """
+    if not url or url.startswith("memory:"):
+        return MemoryCache(size, namespace=namespace, ttl=ttl)
+    if url.startswith("sqlite:///"):
+        return SQLiteCache(url[len("sqlite:///"):], size, namespace=namespace, ttl=ttl)
+    if url.startswith("redis://"):
+        return RedisCache(url, namespace=namespace, ttl=ttl)
+    raise ValueError(f"Unsupported cache URL '{url}'")
@@ -0,0 +1,61 @@
+"""
+Conditional GET: strong ETags from version stamps, and If-None-Match.
+
+A route reads a cheap version stamp of the resource first (one indexed,
+single-row query; see services.versions). When the client already holds
+that version the route answers 304 before loading or encoding the body;
+otherwise the full response carries the ETag for the next poll.
+
+The tag hashes the stamp together with the resource name and API_VERSION,
+so a deploy that changes a response's shape invalidates every cached copy.
+
+Usage:
+    tag = make_etag("plan", *stamp)
+    if matches(request, tag):
+        return not_modified(tag)
+    ...
+    return RawJSONResponse(body, headers=etag_headers(tag))
+"""
+import hashlib
+from typing import Any, Dict
+
+from fastapi import Request, Response
+
+from apps.config import settings
+
+
+# Clients may reuse a copy only after revalidating it; per-user data
+# must not be stored by shared caches
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(resource: str, *stamp: Any) -> str:
+    """Strong ETag (quoted) for `resource` at version `stamp`."""
+    key = "\x1f".join(str(part) for part in (settings.API_VERSION, resource) + stamp)
+    return '"' + hashlib.blake2b(key.encode("utf-8"), digest_size=12).hexdigest() + '"'
+
+
+def matches(request: Request, etag: str) -> bool:
+    """
+    True if the request's If-None-Match covers `etag`.
+
+    Uses the weak comparison RFC 9110 prescribes for If-None-Match, so a
+    W/ prefix added by a proxy still matches.
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def etag_headers(etag: str) -> Dict[str, str]:
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+
+def not_modified(etag: str) -> Response:
+    """Empty 304 response for a client whose copy is current."""
+    return Response(status_code=304, headers=etag_headers(etag))
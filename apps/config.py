@@ -14,6 +14,89 @@ class Settings(BaseSettings):
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./fitflow.db")
     
+    # Read replica for GET endpoints (empty = read from the primary)
+    DATABASE_REPLICA_URL: str = os.getenv("DATABASE_REPLICA_URL", "")
+    # After a write, the client reads from the primary for this long
+    READ_YOUR_WRITES_SECONDS: int = int(os.getenv("READ_YOUR_WRITES_SECONDS", 5))
+    
+    # Connection pool (ignored for in-memory SQLite)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", 5))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", 10))
+    DB_POOL_TIMEOUT: int = int(os.getenv("DB_POOL_TIMEOUT", 30))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "True").lower() == "true"
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", 1800))
+    DB_STATEMENT_CACHE_SIZE: int = int(os.getenv("DB_STATEMENT_CACHE_SIZE", 500))
+    
+    # SQLite PRAGMAs applied on every new connection
+    SQLITE_JOURNAL_MODE: str = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_MMAP_SIZE: int = int(os.getenv("SQLITE_MMAP_SIZE", 268435456))
+    SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))
+    
+    # Query log: statements slower than this are logged (fitflow.sql logger)
+    SLOW_QUERY_MS: int = int(os.getenv("SLOW_QUERY_MS", 100))
+    # Fail requests issuing more statements than this (0 = off; tests turn it on)
+    QUERY_BUDGET: int = int(os.getenv("QUERY_BUDGET", 0))
+    QUERY_BUDGET_ALLOW_REPEATS: bool = os.getenv("QUERY_BUDGET_ALLOW_REPEATS", "False").lower() == "true"
+    
+    # Plan storage: sections of at least this many JSON bytes become shared blobs
+    PLAN_BLOB_MIN_BYTES: int = int(os.getenv("PLAN_BLOB_MIN_BYTES", 48))
+    PLAN_COMPRESSION_LEVEL: int = int(os.getenv("PLAN_COMPRESSION_LEVEL", 9))
+    PLAN_BLOB_CACHE_SIZE: int = int(os.getenv("PLAN_BLOB_CACHE_SIZE", 4096))  # decoded sections per worker
+    # Train a compression dictionary once this many plans were written without one
+    PLAN_DICT_TRAIN_AFTER: int = int(os.getenv("PLAN_DICT_TRAIN_AFTER", 200))
+    PLAN_DICT_SAMPLES: int = int(os.getenv("PLAN_DICT_SAMPLES", 2000))
+    # Store a user's plan as a patch on their previous one, with a full plan at least this often (1 = never patch)
+    PLAN_KEYFRAME_INTERVAL: int = int(os.getenv("PLAN_KEYFRAME_INTERVAL", 8))
+    
+    # Caches (plans, dashboards, profiles, coaching replies): per-worker LRU (empty),
+    # shared by a host's workers (sqlite:///path/cache.db) or by every worker (redis://host:6379/0)
+    CACHE_URL: str = os.getenv("CACHE_URL", "")
+    CACHE_TTL: int = int(os.getenv("CACHE_TTL", 86400))  # seconds, 0 = until evicted
+    PLAN_CACHE_SIZE: int = int(os.getenv("PLAN_CACHE_SIZE", 1024))  # reconstructed plans
+    DASHBOARD_CACHE_URL: str = os.getenv("DASHBOARD_CACHE_URL") or CACHE_URL
+    DASHBOARD_CACHE_SIZE: int = int(os.getenv("DASHBOARD_CACHE_SIZE", 10000))
+    USER_CACHE_SIZE: int = int(os.getenv("USER_CACHE_SIZE", 10000))
+    CHAT_CACHE_SIZE: int = int(os.getenv("CHAT_CACHE_SIZE", 1024))
+    
+    # Account deletion jobs: rows per transaction, pause between batches,
+    # and how long a running job may go without progress before another runner resumes it
+    DELETION_BATCH_SIZE: int = int(os.getenv("DELETION_BATCH_SIZE", 500))
+    DELETION_PAUSE_MS: int = int(os.getenv("DELETION_PAUSE_MS", 50))
+    DELETION_STALE_SECONDS: int = int(os.getenv("DELETION_STALE_SECONDS", 300))
+    
+    # Metric partitions: month, quarter, year or none (empty = month on PostgreSQL,
+    # year on SQLite, which attaches at most 10 partition files), created this many periods ahead
+    METRIC_PARTITION_PERIOD: str = os.getenv("METRIC_PARTITION_PERIOD", "")
+    METRIC_PARTITION_PREMAKE: int = int(os.getenv("METRIC_PARTITION_PREMAKE", 1))
+    # Raw metrics older than this many days expire (0 = keep); rollups are kept either way
+    METRIC_RETENTION_DAYS: int = int(os.getenv("METRIC_RETENTION_DAYS", 0))
+    METRIC_RETENTION_ACTION: str = os.getenv("METRIC_RETENTION_ACTION", "archive")  # archive or drop
+    # Where archived partitions go: directory (SQLite, empty = <database>-archive) or schema (PostgreSQL)
+    METRIC_ARCHIVE_DIR: str = os.getenv("METRIC_ARCHIVE_DIR", "")
+    METRIC_ARCHIVE_SCHEMA: str = os.getenv("METRIC_ARCHIVE_SCHEMA", "metrics_archive")
+    
+    # Per-request tracemalloc tracking (diagnostic: slows allocations ~2x)
+    MEMORY_TRACKING: bool = os.getenv("MEMORY_TRACKING", "False").lower() == "true"
+    MEMORY_TRACKING_FRAMES: int = int(os.getenv("MEMORY_TRACKING_FRAMES", 16))
+    MEMORY_TOP_SITES: int = int(os.getenv("MEMORY_TOP_SITES", 5))
+    # Flag tracked requests whose peak allocation exceeds this (0 = no budget)
+    MEMORY_BUDGET_KB: int = int(os.getenv("MEMORY_BUDGET_KB", 8192))
+    
+    # Production server (SERVER_MODE=production python main.py)
+    SERVER_MODE: str = os.getenv("SERVER_MODE", "development")
+    WEB_CONCURRENCY: int = int(os.getenv("WEB_CONCURRENCY", 0))  # 0 = one worker per core
+    MAX_WORKERS: int = int(os.getenv("MAX_WORKERS", 8))
+    GRACEFUL_TIMEOUT: int = int(os.getenv("GRACEFUL_TIMEOUT", 30))
+    WORKER_TIMEOUT: int = int(os.getenv("WORKER_TIMEOUT", 60))
+    MAX_REQUESTS: int = int(os.getenv("MAX_REQUESTS", 10000))
+    MAX_REQUESTS_JITTER: int = int(os.getenv("MAX_REQUESTS_JITTER", 1000))
+    KEEPALIVE: int = int(os.getenv("KEEPALIVE", 5))
+    
+    # Admin endpoints (/api/v1/admin/*) need X-Admin-Token; empty = disabled
+    ADMIN_TOKEN: str = os.getenv("ADMIN_TOKEN", "")
+    PROFILE_MAX_SECONDS: int = int(os.getenv("PROFILE_MAX_SECONDS", 60))
+    
     # API
     API_TITLE: str = "FitFlow API"
     API_VERSION: str = "1.0.0"
@@ -22,6 +105,8 @@ class Settings(BaseSettings):
     class Config:
         env_file = ".env"
         case_sensitive = True
+        # .env also carries frontend/LLM keys this class doesn't model
+        extra = "ignore"
 
 @lru_cache()
 def get_settings():
@@ -0,0 +1,86 @@
+"""
+Gunicorn settings for production.
+
+Usage:
+    gunicorn -c python:apps.gunicorn_conf apps.api:app
+    SERVER_MODE=production python main.py      # same thing
+
+Gunicorn supervises N uvicorn workers. The app is imported once in the
+master (preload) and forked, so workers share its pages copy-on-write and
+start fast; everything stateful (DB connections, the orchestrator) is
+created per worker after the fork. Each worker has its own pool, so the
+database sees up to workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections.
+"""
+import os
+
+from apps.config import settings
+
+
+# ==========================================
+# WORKER SIZING
+# ==========================================
+
+def default_workers() -> int:
+    """
+    Number of workers to run.
+
+    WEB_CONCURRENCY wins when set; otherwise one async worker per usable
+    core (respecting CPU affinity / container cpusets), capped at
+    MAX_WORKERS so large hosts don't exhaust database connections.
+    """
+    if settings.WEB_CONCURRENCY > 0:
+        return settings.WEB_CONCURRENCY
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cores = os.cpu_count() or 1
+    return max(1, min(cores, settings.MAX_WORKERS))
+
+
+# ==========================================
+# GUNICORN SETTINGS
+# ==========================================
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{settings.PORT}"
+workers = default_workers()
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+
+# SIGTERM: stop accepting, let in-flight requests finish for this long
+graceful_timeout = settings.GRACEFUL_TIMEOUT
+timeout = settings.WORKER_TIMEOUT
+keepalive = settings.KEEPALIVE
+
+# Recycle each worker after ~MAX_REQUESTS requests to bound memory creep;
+# jitter keeps workers from restarting at the same moment
+max_requests = settings.MAX_REQUESTS
+max_requests_jitter = settings.MAX_REQUESTS_JITTER
+
+loglevel = settings.LOG_LEVEL.lower()
+accesslog = "-"
+
+
+# ==========================================
+# HOOKS
+# ==========================================
+
+def when_ready(server):
+    """Create tables once in the master, before any worker starts."""
+    from models.database import init_db
+    from models.engine import engine, replica_engine
+
+    init_db()
+    # The master never serves requests; don't hand its connections to children
+    engine.dispose()
+    replica_engine.dispose()
+    server.log.info(f"FitFlow ready with {server.num_workers} workers")
+
+
+def post_fork(server, worker):
+    """Give each worker fresh connection pools (shared-nothing)."""
+    from models.engine import engine, replica_engine
+
+    # close=False: leave the parent's sockets alone, just drop the references
+    engine.dispose(close=False)
+    replica_engine.dispose(close=False)
+    # Shared caches (apps.cache) reconnect in each process on their own
@@ -0,0 +1,221 @@
+"""
+Opt-in per-request allocation tracking (MEMORY_TRACKING=True).
+
+Uses tracemalloc to measure, for each request, the peak traced memory
+above what was live when it started, the net memory still held when the
+response starts, and the source lines responsible for that growth.
+Sites are attributed to the innermost frame inside this repository, so
+json/SQLAlchemy internals are charged to the route code that called them.
+
+Results feed /metrics (peak and retained histograms per route, bytes per
+allocation site, budget violations) and the per-route report served at
+GET /api/v1/admin/memory.
+
+tracemalloc slows every allocation (roughly 2x on allocation-heavy code)
+and snapshots are proportional to the number of live blocks, so this is a
+diagnostic mode, never the default. Until the first tracked request
+tracemalloc is not even started.
+"""
+import logging
+import os
+import threading
+import tracemalloc
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from apps.instrumentation import REGISTRY
+
+
+logger = logging.getLogger("fitflow.memory")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Repo frames that wrap every request; framework allocations beneath them
+# are not theirs
+_WRAPPERS = (os.path.join(ROOT, "apps", "middleware.py"), os.path.abspath(__file__))
+
+KIB = 1024
+MIB = 1024 * 1024
+BYTE_BUCKETS = (
+    16 * KIB, 64 * KIB, 256 * KIB, 1 * MIB, 4 * MIB, 16 * MIB, 64 * MIB, 256 * MIB
+)
+
+PEAK_BYTES = REGISTRY.histogram(
+    "fitflow_request_alloc_peak_bytes",
+    "Peak traced memory above the request's starting point",
+    buckets=BYTE_BUCKETS
+)
+RETAINED_BYTES = REGISTRY.histogram(
+    "fitflow_request_alloc_retained_bytes",
+    "Traced memory still held by a request when its response starts",
+    buckets=BYTE_BUCKETS
+)
+SITE_BYTES = REGISTRY.counter(
+    "fitflow_alloc_site_bytes_total",
+    "Bytes held at response start, by route and top allocation site"
+)
+BUDGET_EXCEEDED = REGISTRY.counter(
+    "fitflow_memory_budget_exceeded_total",
+    "Requests whose peak allocation exceeded MEMORY_BUDGET_KB"
+)
+SKIPPED = REGISTRY.counter(
+    "fitflow_memory_requests_skipped_total",
+    "Requests not measured because another request overlapped them"
+)
+
+# Allocations made by the measuring machinery itself
+_IGNORE = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def ensure_started(frames: int) -> None:
+    """Start tracemalloc with `frames` of traceback unless already tracing."""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+
+
+def site_of(traceback: tracemalloc.Traceback) -> str:
+    """
+    file:line responsible for an allocation.
+
+    The innermost frame inside the repository (outside site-packages and
+    the middleware), or the innermost frame overall if the whole traceback
+    is library code.
+    """
+    for frame in reversed(traceback):
+        filename = frame.filename
+        if filename.startswith(ROOT) and "site-packages" not in filename and filename not in _WRAPPERS:
+            return f"{os.path.relpath(filename, ROOT)}:{frame.lineno}"
+    frame = traceback[-1]
+    return f"{os.path.basename(frame.filename)}:{frame.lineno}"
+
+
+def _snapshot() -> tracemalloc.Snapshot:
+    return tracemalloc.take_snapshot().filter_traces(_IGNORE)
+
+
+# ==========================================
+# MEASUREMENT
+# ==========================================
+
+class Measurement:
+    """
+    Allocation delta of one block of work.
+
+    Usage:
+        measurement = Measurement()
+        plan = build_plan()
+        peak, retained, sites = measurement.finish(top=5)
+    """
+
+    def __init__(self):
+        self._before = _snapshot()
+        tracemalloc.reset_peak()
+        self._base = tracemalloc.get_traced_memory()[0]
+
+    def finish(self, top: int = 5) -> Tuple[int, int, List[Tuple[str, int]]]:
+        """
+        Returns:
+            (peak bytes above start, bytes still held, [(site, bytes)] of the
+            `top` sites holding the most new memory)
+        """
+        current, peak = tracemalloc.get_traced_memory()
+        after = _snapshot()
+        sites: Counter = Counter()
+        for stat in after.compare_to(self._before, "traceback"):
+            if stat.size_diff > 0:
+                sites[site_of(stat.traceback)] += stat.size_diff
+        return max(0, peak - self._base), max(0, current - self._base), sites.most_common(top)
+
+
+# ==========================================
+# PER-ROUTE AGGREGATES
+# ==========================================
+
+class RouteMemoryStats:
+    """Running per-route totals behind GET /api/v1/admin/memory."""
+
+    def __init__(self):
+        self._routes: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        route: str,
+        peak: int,
+        retained: int,
+        sites: List[Tuple[str, int]],
+        budget_bytes: int = 0
+    ) -> bool:
+        """
+        Add one measured request; returns True if it exceeded the budget.
+
+        Args:
+            budget_bytes: Peak allocation allowed per request (0 = no budget)
+        """
+        exceeded = budget_bytes > 0 and peak > budget_bytes
+
+        PEAK_BYTES.observe(peak, route=route)
+        RETAINED_BYTES.observe(retained, route=route)
+        for site, size in sites:
+            SITE_BYTES.inc(size, route=route, site=site)
+        if exceeded:
+            BUDGET_EXCEEDED.inc(route=route)
+            logger.warning(
+                "%s peaked at %.1f KiB (budget %.1f KiB); top sites: %s",
+                route, peak / KIB, budget_bytes / KIB,
+                ", ".join(f"{site} {size / KIB:.1f} KiB" for site, size in sites)
+            )
+
+        with self._lock:
+            entry = self._routes.get(route)
+            if entry is None:
+                entry = self._routes[route] = {
+                    "requests": 0, "peak_max": 0, "peak_sum": 0, "retained_sum": 0,
+                    "over_budget": 0, "sites": Counter(),
+                }
+            entry["requests"] += 1
+            entry["peak_max"] = max(entry["peak_max"], peak)
+            entry["peak_sum"] += peak
+            entry["retained_sum"] += retained
+            entry["over_budget"] += exceeded
+            entry["sites"].update(dict(sites))
+        return exceeded
+
+    def report(self, top: int = 10) -> Dict[str, Dict[str, Any]]:
+        """Per-route request count, peak/retained KiB and heaviest sites."""
+        with self._lock:
+            routes = {route: dict(entry, sites=Counter(entry["sites"])) for route, entry in self._routes.items()}
+        report = {}
+        for route, entry in sorted(routes.items(), key=lambda item: -item[1]["peak_max"]):
+            n = entry["requests"]
+            report[route] = {
+                "requests": n,
+                "peak_max_kib": round(entry["peak_max"] / KIB, 1),
+                "peak_mean_kib": round(entry["peak_sum"] / n / KIB, 1),
+                "retained_mean_kib": round(entry["retained_sum"] / n / KIB, 1),
+                "over_budget": entry["over_budget"],
+                "top_sites_kib": {
+                    site: round(size / KIB, 1) for site, size in entry["sites"].most_common(top)
+                },
+            }
+        return report
+
+    def reset(self) -> None:
+        with self._lock:
+            self._routes.clear()
+
+
+MEMORY = RouteMemoryStats()
+
+
+def tracing_overhead() -> Optional[Dict[str, float]]:
+    """tracemalloc's own memory use in KiB, None when not tracing."""
+    if not tracemalloc.is_tracing():
+        return None
+    return {"tracemalloc_kib": round(tracemalloc.get_tracemalloc_memory() / KIB, 1)}
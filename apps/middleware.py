@@ -0,0 +1,236 @@
+import time
+from http.cookies import SimpleCookie
+
+from apps import memory
+from apps.config import settings
+from apps.instrumentation import HTTP_REQUEST_SECONDS, HTTP_REQUESTS, REGISTRY
+from models import querylog, routing
+
+
+# ==========================================
+# READ-YOUR-WRITES PIN
+# ==========================================
+
+PIN_COOKIE = "fitflow_primary_until"
+
+
+def _pinned_until(scope) -> float:
+    """Expiry (epoch seconds) of the client's primary pin, 0 if none."""
+    for name, value in scope.get("headers", ()):
+        if name == b"cookie":
+            morsel = SimpleCookie(value.decode("latin-1")).get(PIN_COOKIE)
+            if morsel is not None:
+                try:
+                    return float(morsel.value)
+                except ValueError:
+                    return 0.0
+    return 0.0
+
+
+class ReadYourWritesMiddleware:
+    """
+    Pin a client's reads to the primary right after it writes.
+
+    Replicas lag the primary, so a client that logs a metric and then opens
+    its dashboard could read the replica before the metric arrives. When a
+    request flushes a write, the response carries a short-lived cookie;
+    while it is valid, `get_read_db` hands that client primary sessions.
+    Within a single request, reads after a write also go to the primary.
+
+    Pure ASGI (no BaseHTTPMiddleware) so it adds no extra task or body
+    buffering per request.
+    """
+
+    def __init__(self, app, pin_seconds: int = None):
+        self.app = app
+        self.pin_seconds = settings.READ_YOUR_WRITES_SECONDS if pin_seconds is None else pin_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = routing.begin_request(pinned=_pinned_until(scope) > time.time())
+        state = routing.current_state()
+
+        async def send_with_pin(message):
+            if message["type"] == "http.response.start" and state.wrote:
+                expires = time.time() + self.pin_seconds
+                cookie = (
+                    f"{PIN_COOKIE}={expires:.3f}; Max-Age={self.pin_seconds}; "
+                    f"Path=/; HttpOnly; SameSite=Lax"
+                )
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"set-cookie", cookie.encode("latin-1"))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_pin)
+        finally:
+            routing.end_request(token)
+
+
+# ==========================================
+# REQUEST METRICS
+# ==========================================
+
+class RequestMetricsMiddleware:
+    """
+    Record latency and status of every HTTP request.
+
+    Requests are labelled with the route template (e.g.
+    /api/v1/plans/{plan_id}), not the raw path, so label cardinality stays
+    bounded; unmatched paths share the "unmatched" label.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            labels = {
+                "method": scope["method"],
+                "route": getattr(route, "path", "unmatched"),
+            }
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, **labels)
+            HTTP_REQUESTS.inc(status=str(status), **labels)
+
+
+# ==========================================
+# QUERY COUNTS
+# ==========================================
+
+QUERIES_PER_REQUEST = REGISTRY.histogram(
+    "fitflow_db_queries_per_request",
+    "SQL statements issued per HTTP request",
+    buckets=(1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+)
+
+
+class QueryStatsMiddleware:
+    """
+    Count and time the SQL each request issues.
+
+    Adds X-DB-Query-Count and X-DB-Query-Time-Ms response headers and feeds
+    fitflow_db_queries_per_request. With QUERY_BUDGET > 0 (the test suite
+    sets it), a request issuing more statements than the budget, or the same
+    statement twice (unless QUERY_BUDGET_ALLOW_REPEATS), raises
+    QueryBudgetExceeded, which fails the test that made it.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with querylog.track() as stats:
+            async def send_with_counts(message):
+                if message["type"] == "http.response.start":
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"x-db-query-count", str(stats.count).encode()),
+                        (b"x-db-query-time-ms", f"{stats.total_ms:.1f}".encode()),
+                    ]
+                await send(message)
+
+            await self.app(scope, receive, send_with_counts)
+
+        route = getattr(scope.get("route"), "path", "unmatched")
+        QUERIES_PER_REQUEST.observe(stats.count, route=route)
+
+        if settings.QUERY_BUDGET > 0:
+            querylog.check_budget(
+                stats,
+                settings.QUERY_BUDGET,
+                allow_repeats=settings.QUERY_BUDGET_ALLOW_REPEATS,
+                where=f"{scope['method']} {scope['path']}"
+            )
+
+# ==========================================
+# ALLOCATION TRACKING
+# ==========================================
+
+class MemoryTrackingMiddleware:
+    """
+    Measure each request's allocations with tracemalloc (MEMORY_TRACKING).
+
+    tracemalloc counts the whole process, so a request is only measured
+    when it is the only one in flight on this worker; requests that overlap
+    a measured one are not measured, and the measured one is discarded
+    (fitflow_memory_requests_skipped_total). Run load at concurrency 1, or
+    accept that only the quiet moments get sampled.
+
+    Measured responses carry X-Alloc-Peak-KiB, plus
+    X-Memory-Budget-Exceeded when the peak is over MEMORY_BUDGET_KB. With
+    MEMORY_TRACKING off this is a single settings check per request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._in_flight = 0
+        self._overlapped = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.MEMORY_TRACKING:
+            await self.app(scope, receive, send)
+            return
+
+        self._in_flight += 1
+        if self._in_flight > 1:
+            self._overlapped = True
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                self._in_flight -= 1
+            memory.SKIPPED.inc()
+            return
+
+        memory.ensure_started(settings.MEMORY_TRACKING_FRAMES)
+        self._overlapped = False
+        budget = settings.MEMORY_BUDGET_KB * 1024
+        measurement = memory.Measurement()
+        result = None
+
+        async def send_with_usage(message):
+            nonlocal result
+            if message["type"] == "http.response.start" and result is None:
+                result = measurement.finish(top=settings.MEMORY_TOP_SITES)
+                if not self._overlapped:
+                    peak = result[0]
+                    headers = [(b"x-alloc-peak-kib", f"{peak / 1024:.1f}".encode())]
+                    if budget and peak > budget:
+                        headers.append((b"x-memory-budget-exceeded", b"1"))
+                    message["headers"] = list(message.get("headers", [])) + headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_usage)
+        finally:
+            self._in_flight -= 1
+
+        if result is None:
+            return
+        if self._overlapped:
+            memory.SKIPPED.inc()
+            return
+        route = getattr(scope.get("route"), "path", "unmatched")
+        memory.MEMORY.record(route, *result, budget_bytes=budget)
@@ -0,0 +1,320 @@
+"""
+Minimal Redis-protocol server for development and tests.
+
+Speaks enough RESP2 for apps.cache.RedisCache: GET, SET (EX/PX, NX/XX,
+KEEPTTL), DEL, EXISTS, SCAN, DBSIZE, FLUSHDB, WATCH/MULTI/EXEC and the
+connection commands. Data lives in one process, in memory; there is no
+persistence, replication or eviction policy beyond an optional key
+limit (least recently used first). Not a production server: point
+CACHE_URL at Redis or Valkey in deployment.
+
+Usage:
+    python -m apps.resp_server --port 6380
+    CACHE_URL=redis://localhost:6380/0 uvicorn apps.api:app --workers 4
+
+    server = RespServer(("127.0.0.1", 0)).start()   # in tests
+    url = server.url
+    server.stop()
+"""
+import argparse
+import fnmatch
+import logging
+import socketserver
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+
+logger = logging.getLogger("fitflow.resp")
+
+
+class CommandError(Exception):
+    """Error reply sent back to the client."""
+
+
+class Store:
+    """
+    The keyspace: key -> (value, expiry in ms), plus a version per key.
+
+    Every write or expiry bumps the key's version; WATCH remembers
+    versions and EXEC aborts when any of them moved. All access holds
+    `lock`, so a transaction runs with no command in between.
+    """
+
+    def __init__(self, max_keys: int = 0):
+        self.max_keys = max_keys
+        self.lock = threading.RLock()
+        self._data: "OrderedDict[bytes, Tuple[bytes, Optional[int]]]" = OrderedDict()
+        self._versions: Dict[bytes, int] = {}
+        self._clock = 0
+
+    def _touch(self, key: bytes) -> None:
+        self._clock += 1
+        self._versions[key] = self._clock
+
+    def version(self, key: bytes) -> int:
+        self._live(key)
+        return self._versions.get(key, 0)
+
+    def _live(self, key: bytes) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] <= time.time() * 1000:
+            del self._data[key]
+            self._touch(key)
+            return None
+        self._data.move_to_end(key)
+        return entry[0]
+
+    def get(self, key: bytes) -> Optional[bytes]:
+        return self._live(key)
+
+    def set(self, key: bytes, value: bytes, expires: Optional[int], keep_ttl: bool = False) -> None:
+        if keep_ttl and self._live(key) is not None:
+            expires = self._data[key][1]
+        self._data[key] = (value, expires)
+        self._data.move_to_end(key)
+        self._touch(key)
+        while self.max_keys and len(self._data) > self.max_keys:
+            evicted, _ = self._data.popitem(last=False)
+            self._touch(evicted)
+
+    def delete(self, key: bytes) -> bool:
+        if self._live(key) is None:
+            return False
+        del self._data[key]
+        self._touch(key)
+        return True
+
+    def keys(self) -> List[bytes]:
+        return [key for key in list(self._data) if self._live(key) is not None]
+
+    def flush(self) -> None:
+        for key in list(self._data):
+            self._touch(key)
+        self._data.clear()
+
+
+# ==========================================
+# COMMANDS
+# ==========================================
+
+def _int(value: bytes) -> int:
+    try:
+        return int(value)
+    except ValueError:
+        raise CommandError("ERR value is not an integer or out of range")
+
+
+def _set(store: Store, args: List[bytes]) -> Any:
+    if len(args) < 2:
+        raise CommandError("ERR wrong number of arguments for 'set' command")
+    key, value = args[0], args[1]
+    expires, only, keep_ttl = None, None, False
+    options = iter(args[2:])
+    for option in options:
+        name = option.upper()
+        if name in (b"EX", b"PX"):
+            amount = _int(next(options, b""))
+            if amount <= 0:
+                raise CommandError("ERR invalid expire time in 'set' command")
+            expires = int(time.time() * 1000) + (amount * 1000 if name == b"EX" else amount)
+        elif name in (b"NX", b"XX"):
+            only = name
+        elif name == b"KEEPTTL":
+            keep_ttl = True
+        else:
+            raise CommandError("ERR syntax error")
+    exists = store.get(key) is not None
+    if (only == b"NX" and exists) or (only == b"XX" and not exists):
+        return None
+    store.set(key, value, expires, keep_ttl)
+    return "OK"
+
+
+def _scan(store: Store, args: List[bytes]) -> Any:
+    cursor = _int(args[0]) if args else 0
+    pattern, count = b"*", 10
+    options = iter(args[1:])
+    for option in options:
+        name = option.upper()
+        if name == b"MATCH":
+            pattern = next(options, b"*")
+        elif name == b"COUNT":
+            count = max(1, _int(next(options, b"10")))
+        else:
+            raise CommandError("ERR syntax error")
+    # cursor = position in the sorted keyspace (enough for a test server)
+    keys = sorted(store.keys())
+    batch = keys[cursor:cursor + count]
+    following = cursor + count if cursor + count < len(keys) else 0
+    matched = [key for key in batch if fnmatch.fnmatchcase(key.decode("latin-1"), pattern.decode("latin-1"))]
+    return [str(following).encode(), matched]
+
+
+COMMANDS = {
+    b"GET": lambda store, args: store.get(args[0]),
+    b"SET": _set,
+    b"DEL": lambda store, args: sum(store.delete(key) for key in args),
+    b"EXISTS": lambda store, args: sum(store.get(key) is not None for key in args),
+    b"DBSIZE": lambda store, args: len(store.keys()),
+    b"FLUSHDB": lambda store, args: store.flush() or "OK",
+    b"FLUSHALL": lambda store, args: store.flush() or "OK",
+    b"SCAN": _scan,
+}
+ARITY = {b"GET": 1, b"DEL": 1, b"EXISTS": 1}
+
+
+# ==========================================
+# PROTOCOL
+# ==========================================
+
+def encode(reply: Any) -> bytes:
+    if reply is None:
+        return b"$-1\r\n"
+    if isinstance(reply, CommandError):
+        return b"-%s\r\n" % str(reply).encode()
+    if isinstance(reply, str):
+        return b"+%s\r\n" % reply.encode()
+    if isinstance(reply, int):
+        return b":%d\r\n" % reply
+    if isinstance(reply, bytes):
+        return b"$%d\r\n%s\r\n" % (len(reply), reply)
+    return b"*%d\r\n" % len(reply) + b"".join(encode(item) for item in reply)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """One client connection, with its WATCH and MULTI state."""
+
+    def _read_command(self) -> Optional[List[bytes]]:
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            return line.split()  # inline command (telnet)
+        args = []
+        for _ in range(int(line[1:])):
+            size = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(size + 2)[:-2])
+        return args
+
+    def handle(self) -> None:
+        store: Store = self.server.store
+        watched: Dict[bytes, int] = {}
+        queued: Optional[List[List[bytes]]] = None
+        while True:
+            try:
+                args = self._read_command()
+            except (ConnectionError, ValueError):
+                return
+            if args is None:
+                return
+            if not args:
+                continue
+            name, rest = args[0].upper(), args[1:]
+
+            if name == b"QUIT":
+                self.wfile.write(encode("OK"))
+                return
+            if name == b"MULTI":
+                reply = CommandError("ERR MULTI calls can not be nested") if queued is not None else "OK"
+                queued = [] if queued is None else queued
+            elif name == b"DISCARD":
+                reply = "OK" if queued is not None else CommandError("ERR DISCARD without MULTI")
+                queued, watched = None, {}
+            elif name == b"EXEC":
+                if queued is None:
+                    reply = CommandError("ERR EXEC without MULTI")
+                else:
+                    with store.lock:
+                        if any(store.version(key) != version for key, version in watched.items()):
+                            reply = None  # a watched key changed: abort
+                        else:
+                            reply = [self._execute(store, command) for command in queued]
+                    queued, watched = None, {}
+                    if reply is None:
+                        self.wfile.write(b"*-1\r\n")
+                        continue
+            elif queued is not None:
+                queued.append(args)
+                reply = "QUEUED"
+            elif name == b"WATCH":
+                with store.lock:
+                    for key in rest:
+                        watched.setdefault(key, store.version(key))
+                reply = "OK"
+            elif name == b"UNWATCH":
+                watched = {}
+                reply = "OK"
+            elif name == b"PING":
+                reply = rest[0] if rest else "PONG"
+            elif name in (b"SELECT", b"AUTH", b"CLIENT"):
+                reply = "OK"
+            else:
+                with store.lock:
+                    reply = self._execute(store, args)
+            self.wfile.write(encode(reply))
+
+    @staticmethod
+    def _execute(store: Store, args: List[bytes]) -> Any:
+        name, rest = args[0].upper(), args[1:]
+        command = COMMANDS.get(name)
+        if command is None:
+            return CommandError(f"ERR unknown command '{name.decode(errors='replace')}'")
+        if len(rest) < ARITY.get(name, 0):
+            return CommandError(f"ERR wrong number of arguments for '{name.decode().lower()}' command")
+        try:
+            return command(store, rest)
+        except CommandError as exc:
+            return exc
+
+
+class RespServer(socketserver.ThreadingTCPServer):
+    """Threaded server over one Store; port 0 picks a free port."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address: Tuple[str, int] = ("127.0.0.1", 6380), max_keys: int = 0):
+        super().__init__(address, _Handler)
+        self.store = Store(max_keys)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"redis://{host}:{port}/0"
+
+    def start(self) -> "RespServer":
+        """Serve from a background thread."""
+        self._thread = threading.Thread(target=self.serve_forever, name="resp-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Redis-protocol stand-in for development")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6380)
+    parser.add_argument("--max-keys", type=int, default=0, help="evict least recently used beyond this (0 = no limit)")
+    options = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = RespServer((options.host, options.port), options.max_keys)
+    logger.info("Serving RESP on %s", server.url)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+JSON responses that skip work FastAPI does by default.
+
+FastJSONResponse renders with orjson when it is installed (several times
+faster than the stdlib on nested dicts) and falls back to the stdlib with
+Starlette's exact settings otherwise, so output is the same either way.
+
+RawJSONResponse and embed_raw() build a body around JSON text that is
+already encoded, e.g. a JSON column read back as text, so a stored plan is
+copied into the response instead of being parsed into dicts, walked by
+jsonable_encoder and encoded again.
+
+Usage:
+    body = embed_raw({"status": "success", "plan_id": plan_id}, "plan", plan_json)
+    return RawJSONResponse(body)
+"""
+import json
+from typing import Any, Dict, Union
+
+from fastapi.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError:  # optional: stdlib fallback
+    orjson = None
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps(content: Any) -> bytes:
+        """Compact UTF-8 JSON bytes."""
+        return orjson.dumps(content, option=_ORJSON_OPTIONS)
+else:
+    def dumps(content: Any) -> bytes:
+        """Compact UTF-8 JSON bytes."""
+        return json.dumps(
+            content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+        ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when available."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class RawJSONResponse(Response):
+    """Response whose body is already-encoded JSON (bytes or str)."""
+
+    media_type = "application/json"
+
+
+def embed_raw(envelope: Dict[str, Any], key: str, raw: Union[str, bytes]) -> bytes:
+    """
+    Encode `envelope` with `key` set to the JSON text `raw`, unparsed.
+
+    `raw` must be a complete JSON value; it is copied byte for byte (the
+    caller vouches for it, typically because the database wrote it).
+
+    Returns:
+        UTF-8 JSON object bytes, `key` last
+    """
+    if isinstance(raw, str):
+        raw = raw.encode("utf-8")
+    head = dumps(envelope)
+    separator = b"," if envelope else b""
+    return head[:-1] + separator + dumps(key) + b":" + raw + b"}"
@@ -0,0 +1,257 @@
+"""
+Agent micro-benchmarks with regression gating.
+
+Times each agent's entry point and the full orchestrator over synthetic
+profiles with metric histories of increasing length, and reports ops/sec,
+p50/p99 latency and peak allocation per call. Results are written as JSON;
+`compare` flags cases that got slower (p50) or allocate more than a stored
+baseline and exits non-zero, so CI can gate on it.
+
+Usage:
+    python -m benchmarks.agents run --output benchmarks/baseline.json
+    python -m benchmarks.agents run --output current.json --compare benchmarks/baseline.json
+    python -m benchmarks.agents compare benchmarks/baseline.json current.json --threshold 0.15
+    python -m benchmarks.agents run --cases orchestrator --lengths 0 10000 --input dicts
+"""
+import argparse
+import gc
+import itertools
+import json
+import math
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Tuple
+
+from agents.orchestrator import OrchestratorAgent
+from benchmarks.synthetic import GOALS, make_history, make_profile
+from models.series import MetricSeries
+
+
+DEFAULT_LENGTHS = (0, 10, 100, 1000, 10000)
+CASE_NAMES = ("workout", "diet", "progress", "coaching", "orchestrator")
+PROFILES_PER_CASE = len(GOALS)
+
+# Changes smaller than these are noise, whatever the percentage
+MIN_TIME_DELTA_US = 0.5
+MIN_ALLOC_DELTA_KIB = 1.0
+
+
+# ==========================================
+# CASES
+# ==========================================
+
+def _bind(case: str, orchestrator: OrchestratorAgent, profile: Dict[str, Any], history: Any) -> Callable[[], Any]:
+    """Zero-argument callable running one case for one profile/history."""
+    week = 4
+    if case == "workout":
+        return lambda: orchestrator.workout_agent.generate_workout_plan(profile, week, history)
+    if case == "diet":
+        return lambda: orchestrator.diet_agent.generate_nutrition_plan(profile, week, history)
+    if case == "progress":
+        return lambda: orchestrator.progress_agent.analyze_progress(profile, history, week)
+    if case == "coaching":
+        analysis = orchestrator.progress_agent.analyze_progress(profile, history, week)
+        return lambda: orchestrator.coaching_agent.generate_coaching_strategy(profile, analysis, week, history)
+    if case == "orchestrator":
+        return lambda: orchestrator.synthesize_recommendation(profile, history, week)
+    raise ValueError(f"Unknown case '{case}'")
+
+
+def build_inputs(length: int, as_dicts: bool, seed: int = 42) -> List[Tuple[Dict[str, Any], Any]]:
+    """One (profile, history) pair per goal, so every goal's branch is exercised."""
+    rng = random.Random(seed + length)
+    inputs = []
+    for index in range(PROFILES_PER_CASE):
+        profile = make_profile(rng, index, prefix="bench")
+        rows = make_history(rng, length, goal=profile["goal"], start_weight=profile["weight_kg"])
+        inputs.append((profile, rows if as_dicts else MetricSeries.from_dicts(rows)))
+    return inputs
+
+
+# ==========================================
+# MEASUREMENT
+# ==========================================
+
+def _percentile(sorted_ns: List[int], q: float) -> int:
+    index = min(len(sorted_ns) - 1, max(0, math.ceil(q * len(sorted_ns)) - 1))
+    return sorted_ns[index]
+
+
+def measure(calls: List[Callable[[], Any]], min_time: float, min_iters: int = 20, warmup: int = 3) -> Dict[str, float]:
+    """
+    Time `calls` round-robin for at least `min_time` seconds.
+
+    Returns:
+        ops_per_sec, p50_us, p99_us, iterations and alloc_peak_kib (largest
+        tracemalloc peak over one call of each callable)
+    """
+    for fn in calls * warmup:
+        fn()
+
+    samples: List[int] = []
+    cycle = itertools.cycle(calls)
+    gc.collect()
+    deadline = time.perf_counter() + min_time
+    while len(samples) < min_iters or time.perf_counter() < deadline:
+        fn = next(cycle)
+        started = time.perf_counter_ns()
+        fn()
+        samples.append(time.perf_counter_ns() - started)
+
+    # Allocations are measured separately: tracing slows every allocation
+    peak = 0
+    tracemalloc.start()
+    try:
+        for fn in calls:
+            baseline = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            fn()
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+
+    samples.sort()
+    return {
+        "iterations": len(samples),
+        "ops_per_sec": round(len(samples) / (sum(samples) / 1e9), 1),
+        "p50_us": round(_percentile(samples, 0.50) / 1000, 2),
+        "p99_us": round(_percentile(samples, 0.99) / 1000, 2),
+        "alloc_peak_kib": round(peak / 1024, 2),
+    }
+
+
+def run(cases, lengths, as_dicts: bool, min_time: float) -> Dict[str, Any]:
+    orchestrator = OrchestratorAgent()
+    results = []
+    for length in lengths:
+        inputs = build_inputs(length, as_dicts)
+        for case in cases:
+            calls = [_bind(case, orchestrator, profile, history) for profile, history in inputs]
+            stats = measure(calls, min_time)
+            results.append({"case": case, "history": length, **stats})
+            print(
+                f"{case:<13}{length:>7}  {stats['ops_per_sec']:>11,.0f} ops/s  "
+                f"p50 {stats['p50_us']:>9.1f} us  p99 {stats['p99_us']:>9.1f} us  "
+                f"alloc {stats['alloc_peak_kib']:>8.1f} KiB"
+            )
+    return {
+        "meta": {
+            "created_at": datetime.utcnow().isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "input": "dicts" if as_dicts else "series",
+            "min_time": min_time,
+        },
+        "results": results,
+    }
+
+
+# ==========================================
+# REGRESSION GATE
+# ==========================================
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> List[str]:
+    """
+    Compare two result files case by case.
+
+    A case regresses when its p50 latency or its peak allocation grew by
+    more than `threshold` (0.10 = 10%) and by more than the absolute noise
+    floor. Cases missing from either side are skipped.
+
+    Returns:
+        Human-readable regression lines (empty if none)
+    """
+    if baseline["meta"].get("input") != current["meta"].get("input"):
+        print(
+            f"warning: baseline used {baseline['meta'].get('input')} input, "
+            f"current used {current['meta'].get('input')}"
+        )
+
+    base = {(r["case"], r["history"]): r for r in baseline["results"]}
+    regressions = []
+    print(f"{'case':<13}{'history':>7}  {'p50 base':>10} {'p50 now':>10} {'change':>8}  {'alloc change':>12}")
+    for row in current["results"]:
+        key = (row["case"], row["history"])
+        old = base.get(key)
+        if old is None:
+            continue
+        time_change = row["p50_us"] / old["p50_us"] - 1 if old["p50_us"] else 0.0
+        alloc_change = (
+            row["alloc_peak_kib"] / old["alloc_peak_kib"] - 1 if old["alloc_peak_kib"] else 0.0
+        )
+        flag = ""
+        if time_change > threshold and row["p50_us"] - old["p50_us"] > MIN_TIME_DELTA_US:
+            flag = "  SLOWER"
+            regressions.append(f"{key[0]} @ {key[1]}: p50 {old['p50_us']} -> {row['p50_us']} us ({time_change:+.0%})")
+        if alloc_change > threshold and row["alloc_peak_kib"] - old["alloc_peak_kib"] > MIN_ALLOC_DELTA_KIB:
+            flag += "  MORE MEMORY"
+            regressions.append(
+                f"{key[0]} @ {key[1]}: alloc {old['alloc_peak_kib']} -> {row['alloc_peak_kib']} KiB ({alloc_change:+.0%})"
+            )
+        print(
+            f"{key[0]:<13}{key[1]:>7}  {old['p50_us']:>10.1f} {row['p50_us']:>10.1f} "
+            f"{time_change:>+8.0%}  {alloc_change:>+12.0%}{flag}"
+        )
+    return regressions
+
+
+def _load(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def _gate(baseline_path: str, current: Dict[str, Any], threshold: float) -> int:
+    regressions = compare(_load(baseline_path), current, threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {threshold:.0%}:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print(f"\nNo regressions beyond {threshold:.0%}")
+    return 0
+
+
+# ==========================================
+# ENTRY POINT
+# ==========================================
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="FitFlow agent micro-benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run", help="Run the benchmarks")
+    run_parser.add_argument("--cases", nargs="+", choices=CASE_NAMES, default=list(CASE_NAMES))
+    run_parser.add_argument("--lengths", nargs="+", type=int, default=list(DEFAULT_LENGTHS))
+    run_parser.add_argument("--input", choices=["series", "dicts"], default="series",
+                            help="Pass history as a MetricSeries or as a list of dicts (adds conversion)")
+    run_parser.add_argument("--min-time", type=float, default=0.3, help="Seconds to sample each case")
+    run_parser.add_argument("--output", help="Write results JSON here")
+    run_parser.add_argument("--compare", help="Baseline JSON to gate against")
+    run_parser.add_argument("--threshold", type=float, default=0.10)
+
+    compare_parser = sub.add_parser("compare", help="Compare two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.10)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        return _gate(args.baseline, _load(args.current), args.threshold)
+
+    result = run(args.cases, args.lengths, args.input == "dicts", args.min_time)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+    if args.compare:
+        print()
+        return _gate(args.compare, result, args.threshold)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
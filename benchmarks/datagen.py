@@ -0,0 +1,330 @@
+"""
+Bulk synthetic data generator for large-scale database fixtures.
+
+Loads deterministic, realistic users, metrics, plans and chat messages
+straight into a database, bypassing the ORM:
+
+- Metrics: weight trending toward the user's goal with day-to-day noise,
+  strength progressing with noisy sessions, sleep on a weekly cycle,
+  mood and energy following sleep
+- Plans: weekly plans built from real orchestrator output per goal/level
+- Chat messages: a rotation of prompts and coach replies
+
+Values are generated per user with NumPy from `seed + user index`, so the
+same arguments always produce the same data (timestamps are relative to
+--end, default today). Rows go in with executemany on SQLite and COPY on
+PostgreSQL, in batches, one transaction per batch.
+
+Usage:
+    python -m benchmarks.datagen --users 10000 --days 1000          # 10M metrics
+    python -m benchmarks.datagen --database-url postgresql://localhost/fitflow_big \\
+        --users 100000 --days 100 --plans 4 --chats 3
+    python -m benchmarks.datagen --users 50 --days 90 --rollups     # small, with rollups
+"""
+import argparse
+import csv
+import io
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy.engine import Engine
+
+from benchmarks.synthetic import make_history, make_profile
+from models.ids import INT_EPOCH_MS, INT_RANDOM_BITS
+
+
+METRIC_COLUMNS = ("id", "user_id", "weight_kg", "strength_1rm", "sleep_hours", "mood", "energy", "created_at")
+USER_COLUMNS = ("user_id", "name", "age", "weight_kg", "height_cm", "fitness_level", "goal", "equipment", "created_at")
+PLAN_COLUMNS = ("plan_id", "user_id", "week", "plan_data", "created_at")
+CHAT_COLUMNS = ("user_id", "user_message", "bot_response", "created_at")
+
+CHAT_EXCHANGES = (
+    ("How should I adjust my training this week?", "Keep the volume, add one set to your main lift."),
+    ("I'm feeling tired, should I deload?", "Sleep has dipped; take a lighter week and prioritise 8 hours."),
+    ("What should I eat before a workout?", "Carbs and some protein 1-2 hours before: oats and yoghurt work well."),
+    ("How do I stay consistent?", "Stack training onto an existing habit and track every session."),
+    ("My weight isn't moving.", "Average the last two weeks before changing calories; trends beat single days."),
+)
+
+
+def _timestamp(moment: datetime) -> str:
+    """DateTime in the storage format SQLAlchemy uses for SQLite (also valid PostgreSQL input)."""
+    return moment.strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+# ==========================================
+# ROW GENERATION
+# ==========================================
+
+def metric_rows(
+    user_id: str,
+    user_index: int,
+    goal: str,
+    start_weight: float,
+    days: int,
+    day_strings: Sequence[str],
+    seed: int
+) -> List[Tuple]:
+    """
+    `days` daily metric rows for one user, oldest first.
+
+    Vectorized per user; `day_strings` holds the shared 'YYYY-MM-DD' for
+    each day, and each user logs at their own fixed time of day.
+    """
+    if days == 0:
+        return []
+    rng = np.random.default_rng(seed + user_index)
+    t = np.arange(days, dtype=np.float64)
+
+    drift = {"fat_loss": -0.04, "muscle_gain": 0.025}.get(goal, 0.0)
+    weight = start_weight + drift * t + np.cumsum(rng.normal(0, 0.08, days)) + rng.normal(0, 0.3, days)
+    weight = np.clip(weight, 40.0, 180.0).round(1)
+
+    base_strength = rng.uniform(60, 160)
+    gain = rng.uniform(0.02, 0.08)
+    strength = (base_strength + gain * t + rng.normal(0, 2.0, days)).clip(20.0).round(1)
+
+    weekly = np.sin(2 * np.pi * (t + rng.integers(7)) / 7)
+    sleep = (7.2 + 0.6 * weekly + rng.normal(0, 0.5, days)).clip(4.0, 10.0).round(1)
+    mood = (6.5 + 1.2 * (sleep - 7.2) + rng.normal(0, 1.2, days)).round().clip(1, 10).astype(np.int64)
+    energy = (6.0 + 1.0 * (sleep - 7.2) + rng.normal(0, 1.3, days)).round().clip(1, 10).astype(np.int64)
+
+    minute = int(rng.integers(6 * 60, 22 * 60))
+    clock = f" {minute // 60:02d}:{minute % 60:02d}:00.000000"
+    stamps = [day + clock for day in day_strings[-days:]]
+
+    # Metric ids come from the application (see models.partitions). Same
+    # layout as models.ids.new_int_id: milliseconds of created_at, then
+    # seed + user index in the low bits, so ids are reproducible and
+    # unique per day for up to 2**INT_RANDOM_BITS consecutive users.
+    logged_ms = (
+        np.array(day_strings[-days:], dtype="datetime64[D]") + np.timedelta64(minute, "m")
+    ).astype("datetime64[ms]").astype(np.int64)
+    ids = ((logged_ms - INT_EPOCH_MS) << INT_RANDOM_BITS) | ((seed + user_index) & ((1 << INT_RANDOM_BITS) - 1))
+    return list(zip(
+        ids.tolist(), [user_id] * days, weight.tolist(), strength.tolist(), sleep.tolist(),
+        mood.tolist(), energy.tolist(), stamps
+    ))
+
+
+def plan_templates(seed: int) -> Dict[Tuple[str, str], List[str]]:
+    """
+    Realistic plan_data JSON per (goal, fitness level) for weeks 1-12,
+    produced by the real orchestrator once and reused for every user.
+    """
+    from agents.orchestrator import OrchestratorAgent
+
+    orchestrator = OrchestratorAgent()
+    rng = random.Random(seed)
+    templates = {}
+    for index in range(12):
+        profile = make_profile(rng, index, prefix="template")
+        history = make_history(rng, 14, goal=profile["goal"], start_weight=profile["weight_kg"])
+        templates[(profile["goal"], profile["fitness_level"])] = [
+            json.dumps(orchestrator.synthesize_recommendation(profile, history, week), default=str)
+            for week in range(1, 13)
+        ]
+    return templates
+
+
+# ==========================================
+# LOADERS
+# ==========================================
+
+class BulkLoader:
+    """
+    Batched raw inserts: executemany for SQLite, COPY for PostgreSQL.
+
+    Each flush is its own transaction, so memory stays bounded by
+    `batch_size` rows per table.
+    """
+
+    def __init__(self, engine: Engine, batch_size: int = 50_000):
+        self.engine = engine
+        self.batch_size = batch_size
+        self.use_copy = engine.dialect.name == "postgresql"
+        self.pending: Dict[str, Tuple[Sequence[str], List[Tuple]]] = {}
+        self.counts: Dict[str, int] = {}
+
+    def add(self, table: str, columns: Sequence[str], rows: Iterable[Tuple]) -> None:
+        buffer = self.pending.setdefault(table, (columns, []))[1]
+        buffer.extend(rows)
+        if len(buffer) >= self.batch_size:
+            self.flush(table)
+
+    def flush(self, table: Optional[str] = None) -> None:
+        for name in [table] if table else list(self.pending):
+            columns, rows = self.pending.get(name, ((), []))
+            if not rows:
+                continue
+            if self.use_copy:
+                self._copy(name, columns, rows)
+            else:
+                self._executemany(name, columns, rows)
+            self.counts[name] = self.counts.get(name, 0) + len(rows)
+            rows.clear()
+
+    def _executemany(self, table: str, columns: Sequence[str], rows: List[Tuple]) -> None:
+        marker = "?" if self.engine.dialect.paramstyle == "qmark" else "%s"
+        sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join([marker] * len(columns))})"
+        raw = self.engine.raw_connection()
+        try:
+            cursor = raw.cursor()
+            cursor.executemany(sql, rows)
+            raw.commit()
+        finally:
+            raw.close()
+
+    def _copy(self, table: str, columns: Sequence[str], rows: List[Tuple]) -> None:
+        data = io.StringIO()
+        csv.writer(data).writerows(rows)
+        data.seek(0)
+        raw = self.engine.raw_connection()
+        try:
+            cursor = raw.cursor()
+            cursor.copy_expert(
+                f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", data
+            )
+            raw.commit()
+        finally:
+            raw.close()
+
+
+# ==========================================
+# GENERATOR
+# ==========================================
+
+def generate(
+    engine: Engine,
+    users: int,
+    days: int,
+    plans_per_user: int = 2,
+    chats_per_user: int = 2,
+    seed: int = 1234,
+    end: Optional[datetime] = None,
+    batch_size: int = 50_000,
+    prefix: str = "gen",
+    progress: bool = False
+) -> Dict[str, int]:
+    """
+    Bulk-load a synthetic population.
+
+    Args:
+        engine: Target engine (tables are created if missing)
+        users: Number of users
+        days: Daily metrics per user (history depth)
+        plans_per_user: Weekly plans per user (most recent weeks)
+        chats_per_user: Chat messages per user
+        seed: Base random seed; identical arguments give identical data
+        end: Last day of history (default: today, midnight UTC)
+        batch_size: Rows per insert transaction
+        prefix: user_id prefix ("gen_000042")
+        progress: Print throughput while loading
+
+    Returns:
+        Rows written per table
+    """
+    from models.database import Base
+
+    Base.metadata.create_all(bind=engine)
+
+    end = end or datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    start = end - timedelta(days=max(days, plans_per_user * 7) - 1)
+    day_strings = [
+        (start + timedelta(days=i)).strftime("%Y-%m-%d")
+        for i in range((end - start).days + 1)
+    ]
+    templates = plan_templates(seed) if plans_per_user else {}
+
+    loader = BulkLoader(engine, batch_size=batch_size)
+    profile_rng = random.Random(seed)
+    started = time.perf_counter()
+
+    for index in range(users):
+        profile = make_profile(profile_rng, index, prefix=prefix)
+        user_id = profile["user_id"]
+        joined = _timestamp(start)
+
+        loader.add("users", USER_COLUMNS, [(
+            user_id, profile["name"], profile["age"], profile["weight_kg"], profile["height_cm"],
+            profile["fitness_level"], profile["goal"], json.dumps(profile["equipment"]), joined
+        )])
+        loader.add("metrics", METRIC_COLUMNS, metric_rows(
+            user_id, index, profile["goal"], profile["weight_kg"], days, day_strings, seed
+        ))
+
+        if plans_per_user:
+            weeks = templates[(profile["goal"], profile["fitness_level"])]
+            loader.add("plans", PLAN_COLUMNS, [
+                (
+                    f"plan_{prefix}_{index:07d}_{k:03d}", user_id, k % 12 + 1, weeks[k % 12],
+                    _timestamp(end - timedelta(days=7 * (plans_per_user - 1 - k)))
+                )
+                for k in range(plans_per_user)
+            ])
+        if chats_per_user:
+            loader.add("chat_messages", CHAT_COLUMNS, [
+                (
+                    user_id, *CHAT_EXCHANGES[(index + k) % len(CHAT_EXCHANGES)],
+                    _timestamp(end - timedelta(hours=chats_per_user - k))
+                )
+                for k in range(chats_per_user)
+            ])
+
+        if progress and (index + 1) % 1000 == 0:
+            written = loader.counts.get("metrics", 0)
+            elapsed = time.perf_counter() - started
+            print(f"  {index + 1:,} users, {written:,} metrics, {written / elapsed:,.0f} metric rows/s", flush=True)
+
+    loader.flush()
+    return loader.counts
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk-load synthetic FitFlow data")
+    parser.add_argument("--database-url", help="Target database (default: DATABASE_URL setting)")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=365, help="Daily metrics per user")
+    parser.add_argument("--plans", type=int, default=2, help="Plans per user")
+    parser.add_argument("--chats", type=int, default=2, help="Chat messages per user")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--end", type=lambda s: datetime.strptime(s, "%Y-%m-%d"), help="Last history day, YYYY-MM-DD")
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    parser.add_argument("--prefix", default="gen")
+    parser.add_argument("--rollups", action="store_true", help="Rebuild metric rollups afterwards")
+    args = parser.parse_args(argv)
+
+    from models.engine import build_engine
+
+    engine = build_engine(args.database_url) if args.database_url else build_engine()
+
+    started = time.perf_counter()
+    counts = generate(
+        engine, args.users, args.days, args.plans, args.chats,
+        seed=args.seed, end=args.end, batch_size=args.batch_size, prefix=args.prefix, progress=True
+    )
+    elapsed = time.perf_counter() - started
+    total = sum(counts.values())
+    print(f"Wrote {total:,} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s): "
+          + ", ".join(f"{table} {n:,}" for table, n in counts.items()))
+
+    if args.rollups:
+        from sqlalchemy.orm import Session
+        from services.rollups import rebuild_rollups
+
+        started = time.perf_counter()
+        with Session(engine) as db:
+            written = rebuild_rollups(db)
+        print(f"Rebuilt {written:,} rollup rows in {time.perf_counter() - started:.1f}s")
+
+    engine.dispose()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
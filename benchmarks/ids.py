@@ -0,0 +1,172 @@
+"""
+Plan id benchmark: collisions, insert throughput and index locality.
+
+Compares the id schemes a plans table could key on:
+- timestamp: the former f"plan_{datetime.utcnow().timestamp()}"
+- uuid4: random UUIDs
+- ulid: models.ids.new_id (time-ordered)
+
+For each scheme, threads generate ids concurrently, as workers generating
+plans would. The ids are then inserted, in generation order and in
+batched transactions, into a SQLite table with a unique index on them.
+Reported per scheme:
+- duplicate ids, which the unique index rejects;
+- rows/s inserted;
+- the share of inserts that landed at the right-hand edge of the index
+  (greater than every key before them);
+- the index's size and leaf fill from dbstat.
+Random keys land on pages all over the tree, so every transaction
+dirties many index pages. Ordered keys append to the last few pages.
+
+Usage:
+    python -m benchmarks.ids                          # 200k ids, 8 threads
+    python -m benchmarks.ids --rows 1000000 --threads 16 --batch 1000
+    python -m benchmarks.ids --json ids.json
+"""
+import argparse
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+from models.ids import new_id
+
+
+SCHEMES: Dict[str, Callable[[], str]] = {
+    "timestamp": lambda: f"plan_{datetime.utcnow().timestamp()}",
+    "uuid4": lambda: f"plan_{uuid.uuid4().hex}",
+    "ulid": lambda: new_id("plan_"),
+}
+
+
+# ==========================================
+# MEASUREMENTS
+# ==========================================
+
+def generate(make_id: Callable[[], str], rows: int, threads: int) -> List[str]:
+    """Ids from `threads` concurrent generators, in the order they were produced."""
+    produced: List[str] = []
+    lock = threading.Lock()
+    per_thread = rows // threads
+
+    def work():
+        local = []
+        for _ in range(per_thread):
+            local.append(make_id())
+            if len(local) == 64:
+                # hand over in small chunks so threads interleave like requests
+                with lock:
+                    produced.extend(local)
+                local = []
+        with lock:
+            produced.extend(local)
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return produced
+
+
+def right_edge_share(ids: List[str]) -> float:
+    """Share of ids greater than every id before them (appends to the index)."""
+    if not ids:
+        return 0.0
+    highest, appends = "", 0
+    for value in ids:
+        if value > highest:
+            highest, appends = value, appends + 1
+    return appends / len(ids)
+
+
+def insert(ids: List[str], batch: int) -> Dict[str, Any]:
+    """Insert ids into a fresh table with a unique index; throughput and index shape."""
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    try:
+        conn = sqlite3.connect(path, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("CREATE TABLE plans (id INTEGER PRIMARY KEY, plan_id TEXT NOT NULL, week INTEGER)")
+        conn.execute("CREATE UNIQUE INDEX ix_plans_plan_id ON plans (plan_id)")
+
+        rejected = 0
+        start = time.perf_counter()
+        for offset in range(0, len(ids), batch):
+            conn.execute("BEGIN")
+            cursor = conn.executemany(
+                "INSERT OR IGNORE INTO plans (plan_id, week) VALUES (?, 1)",
+                ((value,) for value in ids[offset:offset + batch])
+            )
+            rejected += min(batch, len(ids) - offset) - cursor.rowcount
+            conn.execute("COMMIT")
+        elapsed = time.perf_counter() - start
+
+        pages, leaves, used, page_size = conn.execute(
+            "SELECT count(*), sum(pagetype = 'leaf'), "
+            "sum(CASE WHEN pagetype = 'leaf' THEN pgsize - unused END), max(pgsize) "
+            "FROM dbstat WHERE name = 'ix_plans_plan_id'"
+        ).fetchone()
+        conn.close()
+        return {
+            "rows_per_s": round((len(ids) - rejected) / elapsed),
+            "rejected": rejected,
+            "index_pages": pages,
+            "index_kib": round(pages * page_size / 1024),
+            "leaf_fill": round(used / (leaves * page_size), 3),
+        }
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+def run(rows: int, threads: int, batch: int) -> List[Dict[str, Any]]:
+    results = []
+    for name, make_id in SCHEMES.items():
+        start = time.perf_counter()
+        ids = generate(make_id, rows, threads)
+        generation = time.perf_counter() - start
+        results.append({
+            "scheme": name,
+            "ids_per_s": round(len(ids) / generation),
+            "duplicates": len(ids) - len(set(ids)),
+            "right_edge": round(right_edge_share(ids), 4),
+            **insert(ids, batch),
+        })
+    return results
+
+
+# ==========================================
+# CLI
+# ==========================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare plan id schemes")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--batch", type=int, default=500, help="rows per insert transaction")
+    parser.add_argument("--json", dest="json_path", help="Also write results to this file")
+    args = parser.parse_args()
+
+    results = run(args.rows, args.threads, args.batch)
+    print(f"{args.rows} ids from {args.threads} threads, {args.batch} rows per transaction")
+    print(f"{'scheme':<10}{'ids/s':>11}{'dupes':>8}{'right edge':>12}{'rows/s':>10}{'index KiB':>11}{'leaf fill':>11}")
+    for r in results:
+        print(
+            f"{r['scheme']:<10}{r['ids_per_s']:>11}{r['duplicates']:>8}{r['right_edge']:>12.1%}"
+            f"{r['rows_per_s']:>10}{r['index_kib']:>11}{r['leaf_fill']:>11.1%}"
+        )
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"rows": args.rows, "threads": args.threads, "batch": args.batch, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+"""
+End-to-end HTTP load test with a synthetic user population.
+
+1. Seeds N users with metric histories (plus a few chat messages) through
+   the ORM models, and rebuilds their rollups
+2. Starts the server (`python main.py`, production mode by default) on a
+   throwaway SQLite database, or targets --url
+3. Drives a weighted mix of endpoints from C concurrent asyncio workers,
+   each with its own httpx connection, for --duration seconds
+4. Reports per-endpoint throughput, latency percentiles, error rate and
+   mean DB queries per request (from the X-DB-Query-Count header)
+
+Usage:
+    python -m benchmarks.loadtest --users 200 --concurrency 32 --duration 30
+    python -m benchmarks.loadtest --mix metrics_log=50,dashboard=50 --json load.json
+    DATABASE_URL=postgresql://... python -m benchmarks.loadtest --url http://localhost:8001
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.synthetic import make_history, make_profile
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENDPOINTS: Dict[str, Tuple[str, str]] = {
+    "metrics_log": ("POST", "/api/v1/users/metrics/log"),
+    "plan_generate": ("POST", "/api/v1/plans/generate"),
+    "dashboard": ("GET", "/api/v1/progress/dashboard"),
+    "chat_message": ("POST", "/api/v1/chat/message"),
+    "chat_history": ("GET", "/api/v1/chat/history"),
+}
+
+DEFAULT_MIX = "metrics_log=30,plan_generate=10,dashboard=30,chat_message=10,chat_history=20"
+
+CHAT_PROMPTS = (
+    "How should I adjust my training this week?",
+    "I'm feeling tired, should I deload?",
+    "What should I eat before a workout?",
+    "How do I stay consistent?",
+)
+
+
+# ==========================================
+# SEEDING
+# ==========================================
+
+def seed_users(count: int, history_days: int, seed: int, prefix: str = "load") -> List[str]:
+    """
+    Create `count` synthetic users with `history_days` daily metrics each.
+
+    Users that already exist are left alone, so re-running against the same
+    database is cheap. Imports models lazily: DATABASE_URL must be set first.
+
+    Returns:
+        The user IDs
+    """
+    from models.database import ChatMessage, Metric, SessionLocal, User, init_db
+    from services.rollups import rebuild_rollups
+
+    init_db()
+    rng = random.Random(seed)
+    profiles = [make_profile(rng, i, prefix=prefix) for i in range(count)]
+
+    db = SessionLocal()
+    try:
+        existing = {
+            uid for (uid,) in db.query(User.user_id).filter(
+                User.user_id.in_([p["user_id"] for p in profiles])
+            )
+        }
+        for profile in profiles:
+            if profile["user_id"] in existing:
+                continue
+            db.add(User(**profile))
+            rows = make_history(rng, history_days, goal=profile["goal"], start_weight=profile["weight_kg"])
+            db.add_all(Metric(user_id=profile["user_id"], **row) for row in rows)
+            db.add_all(
+                ChatMessage(user_id=profile["user_id"], user_message=prompt, bot_response="Keep going!")
+                for prompt in CHAT_PROMPTS[:2]
+            )
+            db.commit()
+            rebuild_rollups(db, user_id=profile["user_id"])
+    finally:
+        db.close()
+
+    return [p["user_id"] for p in profiles]
+
+
+# ==========================================
+# SERVER
+# ==========================================
+
+def start_server(port: int, mode: str, database_url: str, timeout: float = 60.0) -> subprocess.Popen:
+    """Launch main.py and wait for /health to answer."""
+    env = dict(
+        os.environ,
+        SERVER_MODE=mode,
+        PORT=str(port),
+        RELOAD="False",
+        LOG_LEVEL="warning",
+        DATABASE_URL=database_url,
+    )
+    proc = subprocess.Popen(
+        [sys.executable, "main.py"], cwd=ROOT, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.perf_counter() + timeout
+    with httpx.Client(timeout=1.0) as client:
+        while time.perf_counter() < deadline:
+            if proc.poll() is not None:
+                raise RuntimeError(f"server exited with code {proc.returncode}")
+            try:
+                if client.get(f"http://127.0.0.1:{port}/health").status_code == 200:
+                    return proc
+            except httpx.TransportError:
+                pass
+            time.sleep(0.05)
+    proc.kill()
+    raise RuntimeError(f"server not healthy within {timeout}s")
+
+
+# ==========================================
+# LOAD GENERATION
+# ==========================================
+
+class EndpointStats:
+    """Latencies and outcomes for one endpoint."""
+
+    __slots__ = ("latencies", "errors", "queries", "statuses")
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.errors = 0
+        self.queries = 0
+        self.statuses: Dict[str, int] = {}
+
+    def record(self, seconds: float, status: str, ok: bool, queries: int) -> None:
+        self.latencies.append(seconds)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        self.queries += queries
+        if not ok:
+            self.errors += 1
+
+    def summary(self, duration: float) -> Dict[str, Any]:
+        n = len(self.latencies)
+        ordered = sorted(self.latencies)
+
+        def pct(q: float) -> Optional[float]:
+            if not ordered:
+                return None
+            return round(ordered[min(n - 1, max(0, math.ceil(q * n) - 1))] * 1000, 2)
+
+        return {
+            "requests": n,
+            "rps": round(n / duration, 1),
+            "errors": self.errors,
+            "error_rate": round(self.errors / n, 4) if n else 0.0,
+            "p50_ms": pct(0.50),
+            "p90_ms": pct(0.90),
+            "p99_ms": pct(0.99),
+            "mean_db_queries": round(self.queries / n, 2) if n else 0.0,
+            "statuses": self.statuses,
+        }
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """'metrics_log=30,dashboard=70' -> {"metrics_log": 30.0, "dashboard": 70.0}"""
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint '{name}' (choose from {', '.join(ENDPOINTS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def build_request(name: str, user_id: str, rng: random.Random) -> Dict[str, Any]:
+    """httpx.request() keyword arguments for one call of `name`."""
+    method, path = ENDPOINTS[name]
+    if name == "metrics_log":
+        body = {
+            "user_id": user_id,
+            "weight_kg": round(rng.uniform(55, 105), 1),
+            "strength_1rm": round(rng.uniform(60, 180), 1),
+            "sleep_hours": round(rng.uniform(5, 9), 1),
+            "mood": rng.randint(3, 10),
+            "energy": rng.randint(3, 10),
+        }
+        return {"method": method, "url": path, "json": body}
+    if name == "plan_generate":
+        return {"method": method, "url": path, "json": {"user_id": user_id, "week": rng.randint(1, 12)}}
+    if name == "chat_message":
+        return {"method": method, "url": path, "json": {"user_id": user_id, "message": rng.choice(CHAT_PROMPTS)}}
+    return {"method": method, "url": path, "params": {"user_id": user_id}}
+
+
+async def _worker(base_url, users, names, weights, stats, deadline, seed):
+    rng = random.Random(seed)
+    async with httpx.AsyncClient(base_url=base_url, timeout=30.0) as client:
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            request = build_request(name, rng.choice(users), rng)
+            started = time.perf_counter()
+            try:
+                response = await client.request(**request)
+                status = str(response.status_code)
+                ok = response.status_code < 400
+                queries = int(response.headers.get("x-db-query-count", 0))
+            except httpx.HTTPError as exc:
+                status, ok, queries = type(exc).__name__, False, 0
+            stats[name].record(time.perf_counter() - started, status, ok, queries)
+
+
+async def drive(base_url: str, users: List[str], mix: Dict[str, float], concurrency: int, duration: float, seed: int):
+    """Run the workers; returns (per-endpoint stats, measured duration)."""
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    stats = {name: EndpointStats() for name in names}
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*(
+        _worker(base_url, users, names, weights, stats, deadline, seed + i)
+        for i in range(concurrency)
+    ))
+    return stats, time.perf_counter() - started
+
+
+# ==========================================
+# ENTRY POINT
+# ==========================================
+
+def _print_report(report: Dict[str, Any]) -> None:
+    print(f"\n{report['concurrency']} workers, {report['duration_s']:.1f}s, {report['users']} users")
+    print(f"{'endpoint':<15}{'reqs':>7}{'rps':>8}{'err%':>7}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'queries':>9}")
+    for name, s in list(report["endpoints"].items()) + [("TOTAL", report["total"])]:
+        fmt = lambda v: f"{v:>9.1f}" if v is not None else f"{'-':>9}"
+        print(
+            f"{name:<15}{s['requests']:>7}{s['rps']:>8.1f}{s['error_rate'] * 100:>7.1f}"
+            f"{fmt(s['p50_ms'])}{fmt(s['p90_ms'])}{fmt(s['p99_ms'])}{s['mean_db_queries']:>9.2f}"
+        )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="FitFlow HTTP load test")
+    parser.add_argument("--users", type=int, default=50, help="Synthetic users to seed")
+    parser.add_argument("--history-days", type=int, default=90, help="Daily metrics per seeded user")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of load")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Endpoint weights, e.g. metrics_log=3,dashboard=1")
+    parser.add_argument("--mode", choices=["production", "development"], default="production")
+    parser.add_argument("--port", type=int, default=8777)
+    parser.add_argument("--url", help="Target an already running server (seeds DATABASE_URL)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", dest="json_path", help="Also write the report here")
+    args = parser.parse_args(argv)
+
+    mix = parse_mix(args.mix)
+    tmp = None
+    if not args.url:
+        # Seed and serve the same throwaway database
+        tmp = tempfile.TemporaryDirectory()
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp.name, 'load.db')}"
+
+    started = time.perf_counter()
+    users = seed_users(args.users, args.history_days, args.seed)
+    print(f"Seeded {len(users)} users x {args.history_days} days in {time.perf_counter() - started:.1f}s")
+
+    proc = None
+    try:
+        if args.url:
+            base_url = args.url.rstrip("/")
+        else:
+            proc = start_server(args.port, args.mode, os.environ["DATABASE_URL"])
+            base_url = f"http://127.0.0.1:{args.port}"
+
+        stats, elapsed = asyncio.run(drive(base_url, users, mix, args.concurrency, args.duration, args.seed))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=60)
+        if tmp is not None:
+            tmp.cleanup()
+
+    total = EndpointStats()
+    for s in stats.values():
+        total.latencies.extend(s.latencies)
+        total.errors += s.errors
+        total.queries += s.queries
+        for status, n in s.statuses.items():
+            total.statuses[status] = total.statuses.get(status, 0) + n
+
+    report = {
+        "users": len(users),
+        "concurrency": args.concurrency,
+        "duration_s": round(elapsed, 2),
+        "mix": mix,
+        "endpoints": {name: s.summary(elapsed) for name, s in stats.items()},
+        "total": total.summary(elapsed),
+    }
+    _print_report(report)
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+"""
+Startup benchmark: time from process launch to the first healthy response.
+
+Launches `python main.py` in the requested mode against a throwaway SQLite
+database, polls GET /health until it returns 200, then sends SIGTERM and
+times the graceful shutdown. Also reports the cost of importing the app.
+
+Usage:
+    python -m benchmarks.startup                       # production, 5 runs
+    python -m benchmarks.startup --mode development --runs 3
+    python -m benchmarks.startup --json startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# ==========================================
+# MEASUREMENTS
+# ==========================================
+
+def measure_import_ms() -> float:
+    """Wall time to import apps.api in a fresh interpreter."""
+    code = (
+        "import time; t = time.perf_counter(); import apps.api; "
+        "print((time.perf_counter() - t) * 1000)"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def measure_run(mode: str, port: int, timeout: float) -> dict:
+    """
+    Launch the server once.
+
+    Returns:
+        Dict with first_healthy_ms (launch -> first 200 from /health) and
+        shutdown_ms (SIGTERM -> process exit)
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            SERVER_MODE=mode,
+            PORT=str(port),
+            RELOAD="False",
+            LOG_LEVEL="warning",
+            DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'startup.db')}",
+        )
+        url = f"http://127.0.0.1:{port}/health"
+
+        started = time.perf_counter()
+        proc = subprocess.Popen(
+            [sys.executable, "main.py"],
+            cwd=ROOT,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            first_healthy_ms = None
+            with httpx.Client(timeout=1.0) as client:
+                while time.perf_counter() - started < timeout:
+                    if proc.poll() is not None:
+                        raise RuntimeError(f"server exited with code {proc.returncode}")
+                    try:
+                        if client.get(url).status_code == 200:
+                            first_healthy_ms = (time.perf_counter() - started) * 1000
+                            break
+                    except httpx.TransportError:
+                        pass
+                    time.sleep(0.01)
+            if first_healthy_ms is None:
+                raise RuntimeError(f"no healthy response within {timeout}s")
+
+            stop = time.perf_counter()
+            proc.terminate()  # SIGTERM on POSIX
+            proc.wait(timeout=timeout)
+            shutdown_ms = (time.perf_counter() - stop) * 1000
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+
+    return {"first_healthy_ms": round(first_healthy_ms, 1), "shutdown_ms": round(shutdown_ms, 1)}
+
+
+def _summary(values) -> dict:
+    return {
+        "min": round(min(values), 1),
+        "median": round(statistics.median(values), 1),
+        "max": round(max(values), 1),
+    }
+
+
+# ==========================================
+# ENTRY POINT
+# ==========================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure FitFlow time-to-first-healthy-response")
+    parser.add_argument("--mode", choices=["production", "development"], default="production")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--json", dest="json_path", help="Also write results to this file")
+    args = parser.parse_args()
+
+    import_ms = measure_import_ms()
+    runs = [measure_run(args.mode, args.port, args.timeout) for _ in range(args.runs)]
+
+    result = {
+        "mode": args.mode,
+        "runs": runs,
+        "import_ms": round(import_ms, 1),
+        "first_healthy_ms": _summary([r["first_healthy_ms"] for r in runs]),
+        "shutdown_ms": _summary([r["shutdown_ms"] for r in runs]),
+    }
+
+    print(f"Mode: {args.mode}  ({args.runs} runs)")
+    print(f"Import apps.api:        {result['import_ms']:>8.1f} ms")
+    for key, label in (("first_healthy_ms", "First healthy response"), ("shutdown_ms", "Graceful shutdown")):
+        s = result[key]
+        print(f"{label + ':':<24}{s['median']:>8.1f} ms median  (min {s['min']}, max {s['max']})")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Deterministic synthetic users and metric histories for benchmarks.
+
+Histories follow a plausible trajectory (slow weight trend, strength
+progression, noisy sleep/mood/energy) so agents take realistic branches.
+The same seed always yields the same data.
+
+Usage:
+    rng = random.Random(42)
+    profile = make_profile(rng, 0)
+    rows = make_history(rng, 365, goal=profile["goal"])
+"""
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+
+GOALS = ("muscle_gain", "fat_loss", "strength", "endurance")
+LEVELS = ("beginner", "intermediate", "advanced")
+EQUIPMENT = (
+    [],
+    ["dumbbells"],
+    ["dumbbells", "barbell"],
+    ["dumbbells", "barbell", "cables", "machines"],
+)
+
+
+def make_profile(rng: random.Random, index: int, prefix: str = "synthetic") -> Dict[str, Any]:
+    """User profile shaped like the orchestrator's `user_profile` (plus register fields)."""
+    return {
+        "user_id": f"{prefix}_{index:06d}",
+        "name": f"Synthetic User {index}",
+        "age": rng.randint(18, 65),
+        "weight_kg": round(rng.uniform(50, 110), 1),
+        "height_cm": rng.randint(150, 200),
+        "fitness_level": LEVELS[index % len(LEVELS)],
+        "goal": GOALS[index % len(GOALS)],
+        "equipment": EQUIPMENT[index % len(EQUIPMENT)],
+    }
+
+
+def make_history(
+    rng: random.Random,
+    length: int,
+    goal: str = "muscle_gain",
+    start_weight: Optional[float] = None,
+    end: Optional[datetime] = None,
+    step: timedelta = timedelta(days=1)
+) -> List[Dict[str, Any]]:
+    """
+    Chronological metric rows, one every `step`, ending at `end` (default now).
+
+    Returns:
+        List of dicts with created_at plus the five metric fields
+    """
+    end = end or datetime.utcnow()
+    weight = start_weight if start_weight is not None else rng.uniform(55, 105)
+    strength = rng.uniform(60, 180)
+    drift = {"fat_loss": -0.05, "muscle_gain": 0.03}.get(goal, 0.0)
+
+    rows = []
+    for i in range(length):
+        weight = max(40.0, weight + drift + rng.gauss(0, 0.2))
+        strength = max(20.0, strength + rng.gauss(0.1, 0.5))
+        rows.append({
+            "created_at": end - step * (length - 1 - i),
+            "weight_kg": round(weight, 1),
+            "strength_1rm": round(strength, 1),
+            "sleep_hours": round(min(10.0, max(4.0, rng.gauss(7.2, 0.8))), 1),
+            "mood": min(10, max(1, int(rng.gauss(7, 1.5)))),
+            "energy": min(10, max(1, int(rng.gauss(6.5, 1.5)))),
+        })
+    return rows
@@ -2,6 +2,7 @@ import uvicorn
 import os
 from dotenv import load_dotenv
 import sys
+import importlib.util
 
 # Load environment variables from .env file
 load_dotenv()
@@ -16,6 +17,9 @@ PORT = int(os.getenv("PORT", 8001))
 RELOAD = os.getenv("RELOAD", "True").lower() == "true"
 LOG_LEVEL = os.getenv("LOG_LEVEL", "info")
 ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
+# "production": multi-worker server, never reload
+SERVER_MODE = os.getenv("SERVER_MODE", "development").lower()
+PRODUCTION = SERVER_MODE == "production"
 
 # ==========================================
 # PRINT STARTUP INFO
@@ -31,7 +35,12 @@ def print_startup_info():
     print(f"Environment: {ENVIRONMENT}")
     print(f"Host: {HOST}")
     print(f"Port: {PORT}")
-    print(f"Reload: {RELOAD}")
+    print(f"Mode: {SERVER_MODE}")
+    if PRODUCTION:
+        from apps.gunicorn_conf import default_workers
+        print(f"Workers: {default_workers()}")
+    else:
+        print(f"Reload: {RELOAD}")
     print(f"Log Level: {LOG_LEVEL}")
     print("-"*70)
     print("📚 API Documentation:")
@@ -42,6 +51,7 @@ def print_startup_info():
     print("✨ Available Endpoints:")
     print("   Health Check:")
     print(f"      GET http://{HOST}:{PORT}/health")
+    print(f"      GET http://{HOST}:{PORT}/metrics   (Prometheus)")
     print("   Authentication:")
     print(f"      POST   http://{HOST}:{PORT}/api/v1/auth/register")
     print(f"      GET    http://{HOST}:{PORT}/api/v1/auth/profile")
@@ -57,6 +67,8 @@ def print_startup_info():
     print(f"      GET  http://{HOST}:{PORT}/api/v1/users/metrics")
     print(f"      GET  http://{HOST}:{PORT}/api/v1/users/metrics/latest")
     print(f"      GET  http://{HOST}:{PORT}/api/v1/users/metrics/trends")
+    print(f"      GET  http://{HOST}:{PORT}/api/v1/users/metrics/rollups")
+    print(f"      GET  http://{HOST}:{PORT}/api/v1/users/metrics/series")
     print("   Chat:")
     print(f"      POST   http://{HOST}:{PORT}/api/v1/chat/message")
     print(f"      GET    http://{HOST}:{PORT}/api/v1/chat/history")
@@ -70,6 +82,47 @@ def print_startup_info():
     print("="*70 + "\n")
 
 
+# ==========================================
+# PRODUCTION SERVER
+# ==========================================
+
+def run_production():
+    """
+    Start the multi-worker production server.
+    
+    Uses gunicorn with uvicorn workers (apps/gunicorn_conf.py): the app is
+    preloaded in the master and forked, each worker gets its own DB pool,
+    SIGTERM drains in-flight requests for GRACEFUL_TIMEOUT seconds, and
+    workers are recycled after MAX_REQUESTS (+ jitter) requests.
+    
+    Where gunicorn is unavailable (Windows, slim images) falls back to
+    uvicorn's own process manager with the same worker count, drain
+    timeout and request limit (no preload or jitter).
+    """
+    if os.name != "nt" and importlib.util.find_spec("gunicorn") is not None:
+        # Replace this process so gunicorn receives signals directly
+        os.execv(sys.executable, [
+            sys.executable, "-m", "gunicorn",
+            "-c", "python:apps.gunicorn_conf",
+            "apps.api:app"
+        ])
+    
+    from apps.config import settings
+    from apps.gunicorn_conf import default_workers
+    
+    uvicorn.run(
+        "apps.api:app",
+        host=HOST,
+        port=PORT,
+        workers=default_workers(),
+        log_level=LOG_LEVEL,
+        access_log=True,
+        limit_max_requests=settings.MAX_REQUESTS,
+        timeout_graceful_shutdown=settings.GRACEFUL_TIMEOUT,
+        timeout_keep_alive=settings.KEEPALIVE
+    )
+
+
 # ==========================================
 # MAIN FUNCTION
 # ==========================================
@@ -78,15 +131,21 @@ def main():
     """
     Main entry point for FitFlow API.
     
-    Initializes and starts the Uvicorn server with FastAPI app.
+    Initializes and starts the Uvicorn server with FastAPI app
+    (single process with auto-reload), or the multi-worker server when
+    SERVER_MODE=production.
     """
     try:
         # Print startup information
         print_startup_info()
         
+        if PRODUCTION:
+            run_production()
+            return
+        
         # Run the FastAPI app with Uvicorn
         uvicorn.run(
-            "app.api:app",  # Import path: app/api.py -> app object
+            "apps.api:app",  # Import path: apps/api.py -> app object
             host=HOST,
             port=PORT,
             reload=RELOAD,
@@ -1,20 +1,21 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Text, JSON
+from sqlalchemy import Column, BigInteger, Integer, String, Float, DateTime, Text, JSON, LargeBinary, Index, UniqueConstraint, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy import event
+from sqlalchemy.orm import Session, sessionmaker, with_loader_criteria
 from datetime import datetime
-import os
+from apps.config import settings
+from models import partitions
+from models.engine import engine, replica_engine
+from models.ids import new_int_id
+from models.routing import primary_required
 
-# Get database URL from environment or use SQLite as default
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./fitflow.db")
-
-# Create engine with appropriate settings for SQLite
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
-)
+# Database URL from settings (DATABASE_URL env var, SQLite by default)
+DATABASE_URL = settings.DATABASE_URL
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
 
 # Base class for all models
 Base = declarative_base()
@@ -38,6 +39,9 @@ class User(Base):
         fitness_level: beginner, intermediate, advanced
         goal: muscle_gain, fat_loss, strength, endurance
         equipment: List of available equipment
+        version: Bumped on every profile update (ETag stamp)
+        deleted_at: Set when account deletion starts; such users are hidden
+            from ORM queries (see _hide_deleted_users)
         created_at: Account creation timestamp
     
     Example:
@@ -64,6 +68,8 @@ class User(Base):
     fitness_level = Column(String, nullable=False)
     goal = Column(String, nullable=False)
     equipment = Column(JSON, nullable=True)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    deleted_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     def __repr__(self):
@@ -79,8 +85,13 @@ class Metric(Base):
     
     Tracks daily/weekly fitness metrics for progress analysis.
     
+    Partitioned by created_at (see models.partitions): `metrics` is a
+    partitioned table (PostgreSQL) or a view over per-period databases
+    (SQLite). Rows are append-only; ids come from models.ids.new_int_id
+    because partitions share no sequence.
+    
     Attributes:
-        id: Primary key
+        id: Primary key (time-ordered 63-bit id)
         user_id: Foreign key to user
         weight_kg: Body weight in kilograms
         strength_1rm: Maximum strength (1 rep max) in kg
@@ -101,8 +112,17 @@ class Metric(Base):
     """
     
     __tablename__ = "metrics"
+    __table_args__ = (
+        # Serves "latest N for user" reads newest-first without a sort
+        Index("ix_metrics_user_created", "user_id", "created_at"),
+    )
+    # Deletes through the SQLite partition view report no matched rows
+    __mapper_args__ = {"confirm_deleted_rows": False}
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(
+        BigInteger().with_variant(Integer, "sqlite"),
+        primary_key=True, index=True, autoincrement=False, default=new_int_id
+    )
     user_id = Column(String, index=True, nullable=False)
     weight_kg = Column(Float, nullable=False)
     strength_1rm = Column(Float, nullable=False)
@@ -118,23 +138,121 @@ class Metric(Base):
         return f"Weight: {self.weight_kg}kg | Strength: {self.strength_1rm}kg | Sleep: {self.sleep_hours}h | Mood: {self.mood}/10"
 
 
+class MetricRollup(Base):
+    """
+    MetricRollup model for pre-aggregated metric buckets.
+    
+    One row per user per day/week/month bucket, maintained incrementally
+    when a metric is logged (see services.rollups) and rebuildable with
+    `python -m services.rollups backfill`.
+    
+    Attributes:
+        id: Primary key
+        user_id: Foreign key to user
+        resolution: "day", "week" (Monday start) or "month"
+        bucket_start: UTC start of the bucket
+        count: Number of metrics in the bucket
+        first_at / last_at: Timestamps of the earliest and latest metric
+        <field>_min / _max / _sum / _first / _last: Aggregates for each of
+            weight_kg, strength_1rm, sleep_hours, mood and energy
+            (mean = <field>_sum / count)
+    
+    Example:
+        {
+            "user_id": "alice",
+            "resolution": "week",
+            "bucket_start": "2026-01-05T00:00:00",
+            "count": 7,
+            "weight_kg_min": 65.1,
+            "weight_kg_max": 65.8,
+            "weight_kg_sum": 458.9,
+            "weight_kg_last": 65.6
+        }
+    """
+    
+    __tablename__ = "metric_rollups"
+    __table_args__ = (
+        UniqueConstraint("user_id", "resolution", "bucket_start", name="uq_metric_rollups_bucket"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(String, nullable=False)
+    resolution = Column(String, nullable=False)
+    bucket_start = Column(DateTime, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+    first_at = Column(DateTime, nullable=True)
+    last_at = Column(DateTime, nullable=True)
+    weight_kg_min = Column(Float)
+    weight_kg_max = Column(Float)
+    weight_kg_sum = Column(Float)
+    weight_kg_first = Column(Float)
+    weight_kg_last = Column(Float)
+
+    strength_1rm_min = Column(Float)
+    strength_1rm_max = Column(Float)
+    strength_1rm_sum = Column(Float)
+    strength_1rm_first = Column(Float)
+    strength_1rm_last = Column(Float)
+
+    sleep_hours_min = Column(Float)
+    sleep_hours_max = Column(Float)
+    sleep_hours_sum = Column(Float)
+    sleep_hours_first = Column(Float)
+    sleep_hours_last = Column(Float)
+
+    mood_min = Column(Float)
+    mood_max = Column(Float)
+    mood_sum = Column(Float)
+    mood_first = Column(Float)
+    mood_last = Column(Float)
+
+    energy_min = Column(Float)
+    energy_max = Column(Float)
+    energy_sum = Column(Float)
+    energy_first = Column(Float)
+    energy_last = Column(Float)
+    
+    def __repr__(self):
+        return f"<MetricRollup {self.user_id} {self.resolution} {self.bucket_start}>"
+    
+    def __str__(self):
+        return f"{self.resolution.title()} of {self.bucket_start:%Y-%m-%d} | {self.count} metrics"
+
+
 class Plan(Base):
     """
     Plan model for storing generated fitness plans.
     
     Stores complete personalized fitness plans generated by the orchestrator.
     
+    Plans written by services.plan_service keep only a compressed manifest
+    here; the large sections live once each in plan_blobs. Older rows (and
+    save_plan below) keep the whole plan inline in plan_data. A user's
+    following weeks are usually stored as a compressed JSON Patch against
+    their previous plan instead (delta), with a full plan (keyframe) at
+    least every PLAN_KEYFRAME_INTERVAL plans. Read plans through
+    services.plan_service, which handles all three.
+    
     Attributes:
         id: Primary key
-        plan_id: Unique plan identifier (UUID-like)
+        plan_id: Unique, time-ordered plan identifier (models.ids)
         user_id: Foreign key to user
         week: Week number (1-52) for the plan
-        plan_data: Complete plan data as JSON (workout, nutrition, coaching, etc)
+        plan_data: Complete plan data as JSON, for inline plans (JSON null
+            for blob-backed plans)
+        manifest: Compressed plan JSON with sections replaced by blob
+            references, for blob-backed plans
+        delta: Compressed JSON Patch from the base plan, for delta plans
+        base_plan_id: Plan the delta applies to
+        keyframe_plan_id: Full plan the delta chain starts from
+        request_key: Digest of the generation inputs (see
+            services.plan_service.generation_key); unique, so identical
+            requests store one plan
         created_at: Timestamp when plan was generated
     
     Example:
         {
-            "plan_id": "plan_1704516124.5678",
+            "plan_id": "plan_01HKGZ3Y4R8Q2M6T9VXBWJ5N7C",
             "user_id": "alice",
             "week": 1,
             "plan_data": {
@@ -146,12 +264,23 @@ class Plan(Base):
     """
     
     __tablename__ = "plans"
+    __table_args__ = (
+        # Latest plan per user (current plan, ETag version stamps)
+        Index("ix_plans_user_created", "user_id", "created_at"),
+        # At most one plan per generation request, across workers
+        Index("ix_plans_request_key", "request_key", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     plan_id = Column(String, unique=True, index=True, nullable=False)
     user_id = Column(String, index=True, nullable=False)
     week = Column(Integer, nullable=False)
-    plan_data = Column(JSON, nullable=False)
+    plan_data = Column(JSON, nullable=True)
+    manifest = Column(LargeBinary, nullable=True)
+    delta = Column(LargeBinary, nullable=True)
+    base_plan_id = Column(String, nullable=True)
+    keyframe_plan_id = Column(String, index=True, nullable=True)
+    request_key = Column(String(32), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     def __repr__(self):
@@ -161,6 +290,57 @@ class Plan(Base):
         return f"Plan {self.plan_id} - Week {self.week}"
 
 
+class PlanBlob(Base):
+    """
+    Content-addressed plan section, stored once however many plans use it.
+    
+    Meal examples, habit stacks and exercise templates repeat across users
+    and weeks, so plans reference them by hash instead of copying them
+    (see services.blob_store).
+    
+    Attributes:
+        hash: First 128 bits of the SHA-256 of the section JSON, hex
+        data: Compressed, self-describing frame (codec + dictionary id)
+        raw_size: Length of the uncompressed JSON in bytes
+        created_at: When the section was first seen
+    """
+    
+    __tablename__ = "plan_blobs"
+    
+    hash = Column(String(32), primary_key=True)
+    data = Column(LargeBinary, nullable=False)
+    raw_size = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    
+    def __repr__(self):
+        return f"<PlanBlob {self.hash}: {self.raw_size} bytes>"
+
+
+class CompressionDictionary(Base):
+    """
+    Preset zlib dictionary trained from stored plan sections.
+    
+    Dictionaries are immutable: every compressed frame names the one it
+    was written with, and the newest is used for new writes.
+    
+    Attributes:
+        id: Primary key (referenced from compressed frames)
+        data: Dictionary bytes (at most 32 KiB, zlib's window)
+        samples: Number of sections it was trained on
+        created_at: Training time
+    """
+    
+    __tablename__ = "compression_dictionaries"
+    
+    id = Column(Integer, primary_key=True)
+    data = Column(LargeBinary, nullable=False)
+    samples = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<CompressionDictionary {self.id}: {len(self.data)} bytes>"
+
+
 class ChatMessage(Base):
     """
     ChatMessage model for storing user-coach conversations.
@@ -183,6 +363,10 @@ class ChatMessage(Base):
     """
     
     __tablename__ = "chat_messages"
+    __table_args__ = (
+        # Recent messages per user and their ETag version stamp
+        Index("ix_chat_messages_user_created", "user_id", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(String, index=True, nullable=False)
@@ -197,10 +381,112 @@ class ChatMessage(Base):
         return f"Chat #{self.id} | User: {self.user_message[:30]}... | Bot: {self.bot_response[:30]}..."
 
 
+class AccountDeletion(Base):
+    """
+    Background job deleting a user's account (services.account_deletion).
+    
+    The user is hidden as soon as the job is created; the job then deletes
+    the user's rows table by table in small transactions and finally the
+    user row itself.
+    
+    Attributes:
+        id: Primary key
+        job_id: Public, time-ordered job identifier (models.ids)
+        user_id: User being deleted
+        status: pending, running, done or failed
+        total_rows: Child rows counted when the job was created
+        deleted_rows: Child rows deleted so far
+        progress: Rows deleted so far per table
+        error: Last failure, for failed jobs
+        created_at: When deletion was requested
+        updated_at: Last progress (a running job not updated for a while
+            is considered abandoned and can be resumed)
+        finished_at: When the user row was deleted
+    """
+    
+    __tablename__ = "account_deletions"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(String, unique=True, index=True, nullable=False)
+    user_id = Column(String, index=True, nullable=False)
+    status = Column(String, nullable=False, default="pending", index=True)
+    total_rows = Column(Integer, nullable=False, default=0)
+    deleted_rows = Column(Integer, nullable=False, default=0)
+    progress = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f"<AccountDeletion {self.job_id}: {self.user_id} {self.status}>"
+
+
+class MetricPartition(Base):
+    """
+    Catalog of metric partitions (see models.partitions, services.retention).
+    
+    Attributes:
+        id: Primary key
+        name: Partition name, e.g. "metrics_2026_10" (table, and on SQLite
+            also the attached schema)
+        period: "month", "quarter" or "year"
+        period_start / period_end: created_at range [start, end) it holds
+        status: attached (serving reads and writes), detached (expired,
+            waiting for its archive or drop), archived or dropped
+        location: SQLite file relative to the main database's directory, or
+            PostgreSQL table name (schema-qualified once archived)
+        created_at: When the partition was created
+        expired_at: When retention detached it
+    """
+    
+    __tablename__ = "metric_partitions"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, nullable=False)
+    period = Column(String, nullable=False)
+    period_start = Column(DateTime, nullable=False)
+    period_end = Column(DateTime, nullable=False)
+    status = Column(String, nullable=False, default="attached", index=True)
+    location = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expired_at = Column(DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f"<MetricPartition {self.name}: {self.status}>"
+
+
+# ==========================================
+# SOFT DELETION
+# ==========================================
+
+# Users whose deletion has started
+_LIVE_USERS = with_loader_criteria(User, User.deleted_at.is_(None), include_aliases=True)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _hide_deleted_users(execute_state):
+    """
+    Add `deleted_at IS NULL` to every ORM query touching User, so all
+    user-facing reads treat an account being deleted as gone. Pass
+    execution_options(include_deleted=True) to see them (deletion jobs,
+    registration's user_id check).
+    """
+    if execute_state.is_select and not execute_state.execution_options.get("include_deleted", False):
+        execute_state.statement = execute_state.statement.options(_LIVE_USERS)
+
+
 # ==========================================
 # DATABASE INITIALIZATION
 # ==========================================
 
+# Columns added to existing tables after their first release
+ADDED_COLUMNS = {
+    User.__table__: ("version", "deleted_at"),
+    Plan.__table__: ("manifest", "delta", "base_plan_id", "keyframe_plan_id", "request_key"),
+}
+
+
 def init_db():
     """
     Initialize database by creating all tables.
@@ -208,16 +494,40 @@ def init_db():
     Creates:
     - users table
     - metrics table
+    - metric_rollups table
     - plans table
+    - plan_blobs and compression_dictionaries tables
     - chat_messages table
-    
-    Call this on app startup to ensure all tables exist.
-    """
-    Base.metadata.create_all(bind=engine)
-
-
-# Create all tables on import
-Base.metadata.create_all(bind=engine)
+    - account_deletions table
+    - metric_partitions table, and the metric partitions for the current
+      and next periods (services.retention.ensure_partitions)
+    
+    Call this on app startup to ensure all tables exist. The API calls it
+    from the lifespan startup hook (see apps.api.create_app), so importing
+    this module never touches the database.
+    """
+    # Once partitioned, models.partitions owns the metrics DDL
+    with engine.connect() as conn:
+        partitioned = partitions.is_partitioned(conn)
+    tables = [t for t in Base.metadata.sorted_tables if not (partitioned and t is Metric.__table__)]
+    Base.metadata.create_all(bind=engine, tables=tables)
+    
+    # create_all skips columns added since a table was created ...
+    for table, names in ADDED_COLUMNS.items():
+        existing = {column["name"] for column in inspect(engine).get_columns(table.name)}
+        for name in names:
+            if name not in existing:
+                ddl = CreateColumn(table.c[name]).compile(dialect=engine.dialect)
+                with engine.begin() as conn:
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+    
+    # ... and indexes on tables that already exist
+    for table in tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    
+    from services.retention import ensure_partitions
+    ensure_partitions(engine)
 
 
 # ==========================================
@@ -246,6 +556,32 @@ def get_db():
         db.close()
 
 
+def get_read_db():
+    """
+    Dependency for a read-only database session.
+    
+    Reads go to the replica (DATABASE_REPLICA_URL), or the primary when no
+    replica is configured. A client that wrote within the last
+    READ_YOUR_WRITES_SECONDS (see apps.middleware.ReadYourWritesMiddleware),
+    or a request that already wrote, is pinned to the primary so it never
+    reads stale data it just changed.
+    
+    Usage:
+        @app.get("/metrics")
+        def list_metrics(db: Session = Depends(get_read_db)):
+            return db.query(Metric).all()
+    
+    Yields:
+        Database session (do not write through it)
+    """
+    factory = SessionLocal if primary_required() else ReadSessionLocal
+    db = factory()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
 # ==========================================
 # DATABASE HELPER FUNCTIONS
 # ==========================================
@@ -360,7 +696,7 @@ def delete_user(db, user_id: str) -> bool:
     
     Deletes:
     - User profile
-    - All metrics
+    - All metrics and metric rollups
     - All plans
     - All chat messages
     
@@ -371,18 +707,13 @@ def delete_user(db, user_id: str) -> bool:
     Returns:
         True if deleted, False if not found
     """
-    user = db.query(User).filter(User.user_id == user_id).first()
-    if not user:
-        return False
+    # Hide the user at once, then delete in bounded batches
+    from services.account_deletion import run_deletion, start_deletion
     
-    # Delete associated data
-    db.query(Metric).filter(Metric.user_id == user_id).delete()
-    db.query(Plan).filter(Plan.user_id == user_id).delete()
-    db.query(ChatMessage).filter(ChatMessage.user_id == user_id).delete()
-    
-    # Delete user
-    db.delete(user)
-    db.commit()
+    job = start_deletion(db, user_id)
+    if job is None:
+        return False
+    run_deletion(db, job.job_id, pause=0)
     return True
 
 
@@ -602,6 +933,7 @@ def print_db_info():
     print("\nTables:")
     print("  - users (User profiles)")
     print("  - metrics (Performance metrics)")
+    print("  - metric_rollups (Daily/weekly/monthly aggregates)")
     print("  - plans (Generated plans)")
     print("  - chat_messages (Coaching conversations)")
     print("\nModels:")
@@ -0,0 +1,136 @@
+from typing import Any, Dict, Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import QueuePool
+
+from apps.config import settings
+from models import partitions, querylog
+
+
+# ==========================================
+# ENGINE CONSTRUCTION
+# ==========================================
+
+def _is_memory_sqlite(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:")
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """
+    Tune every new SQLite connection.
+
+    WAL lets readers proceed while a writer commits (and vice versa), so
+    dashboard reads stop blocking metric logging. synchronous=NORMAL is
+    durable in WAL mode except for the last commits on power loss.
+    busy_timeout makes a second writer wait instead of failing immediately.
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+    finally:
+        cursor.close()
+
+
+def build_engine(url: Optional[str] = None, **overrides: Any) -> Engine:
+    """
+    Create an engine configured from apps.config.Settings.
+
+    Applies pool size, overflow, timeout, pre-ping, recycle and the compiled
+    statement cache size. SQLite connections additionally get
+    `check_same_thread=False`, the driver statement cache and the WAL /
+    synchronous / mmap / busy_timeout PRAGMAs. In-memory SQLite keeps
+    SQLAlchemy's default single-connection pool. Every engine gets the
+    models.querylog timing hooks; SQLite file databases also attach their
+    metric partitions (models.partitions).
+
+    Args:
+        url: Database URL (defaults to settings.DATABASE_URL)
+        **overrides: Extra create_engine() keyword arguments
+
+    Returns:
+        Configured Engine
+
+    Usage:
+        engine = build_engine("sqlite:///./replica.db", echo=True)
+    """
+    url = url or settings.DATABASE_URL
+    is_sqlite = make_url(url).get_backend_name() == "sqlite"
+
+    options: Dict[str, Any] = {
+        "query_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+    if is_sqlite:
+        options["connect_args"] = {
+            "check_same_thread": False,
+            "cached_statements": settings.DB_STATEMENT_CACHE_SIZE,
+        }
+
+    if not _is_memory_sqlite(url):
+        options.update(
+            poolclass=QueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+        )
+
+    options.update(overrides)
+    engine = create_engine(url, **options)
+
+    if is_sqlite and not _is_memory_sqlite(url):
+        event.listen(engine, "connect", _apply_sqlite_pragmas)
+        partitions.install(engine)
+
+    querylog.install(engine)
+    return engine
+
+
+# The primary: all writes, and reads that must see them
+engine = build_engine()
+
+# Read replica for GET endpoints; without one, reads share the primary
+replica_engine = (
+    build_engine(settings.DATABASE_REPLICA_URL)
+    if settings.DATABASE_REPLICA_URL
+    else engine
+)
+
+
+# ==========================================
+# POOL GAUGE
+# ==========================================
+
+def pool_stats(bind: Optional[Engine] = None) -> Dict[str, Any]:
+    """
+    Snapshot of connection pool utilization.
+
+    Returns:
+        Dict with pool size, connections checked out/in, overflow in use and
+        utilization (checked out / maximum connections, 0-1)
+
+    Usage:
+        stats = pool_stats()
+        print(f"{stats['checked_out']} of {stats['capacity']} connections busy")
+    """
+    pool = (bind or engine).pool
+    if not isinstance(pool, QueuePool):
+        return {"pool": type(pool).__name__}
+
+    capacity = pool.size() + max(pool._max_overflow, 0)
+    checked_out = pool.checkedout()
+    return {
+        "pool": type(pool).__name__,
+        "size": pool.size(),
+        "capacity": capacity,
+        "checked_out": checked_out,
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "utilization": round(checked_out / capacity, 3) if capacity else 0.0,
+    }
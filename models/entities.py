@@ -1,88 +1,44 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Text, JSON
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from datetime import datetime
-import os
-
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./fitflow.db")
-
-engine = create_engine(
+"""
+ORM entities used by the API routes.
+
+The engine, session factory and models live in models.database so the
+application has exactly one engine and one metadata. This module re-exports
+them under the names the routes import.
+"""
+from models.database import (
     DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
+    engine,
+    SessionLocal,
+    ReadSessionLocal,
+    Base,
+    User,
+    Metric,
+    MetricRollup,
+    Plan,
+    PlanBlob,
+    CompressionDictionary,
+    ChatMessage,
+    AccountDeletion,
+    MetricPartition,
+    get_db,
+    get_read_db,
 )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
-
-class User(Base):
-    __tablename__ = "users"
-    
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(String, unique=True, index=True)
-    name = Column(String)
-    age = Column(Integer)
-    weight_kg = Column(Float)
-    height_cm = Column(Integer)
-    fitness_level = Column(String)
-    goal = Column(String)
-    equipment = Column(JSON)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    
-    def __repr__(self):
-        return f"<User {self.user_id}>"
-
-
-class Metric(Base):
-    __tablename__ = "metrics"
-    
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(String, index=True)
-    weight_kg = Column(Float)
-    strength_1rm = Column(Float)
-    sleep_hours = Column(Float)
-    mood = Column(Integer)
-    energy = Column(Integer)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    
-    def __repr__(self):
-        return f"<Metric {self.user_id}>"
-
-
-class Plan(Base):
-    __tablename__ = "plans"
-    
-    id = Column(Integer, primary_key=True, index=True)
-    plan_id = Column(String, unique=True, index=True)
-    user_id = Column(String, index=True)
-    week = Column(Integer)
-    plan_data = Column(JSON)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    
-    def __repr__(self):
-        return f"<Plan {self.plan_id}>"
-
-
-class ChatMessage(Base):
-    __tablename__ = "chat_messages"
-    
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(String, index=True)
-    user_message = Column(Text)
-    bot_response = Column(Text)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    
-    def __repr__(self):
-        return f"<ChatMessage {self.user_id}>"
-
-
-# Create all tables
-Base.metadata.create_all(bind=engine)
-
-
-def get_db():
-    """Dependency for getting database session"""
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
\ No newline at end of file
+__all__ = [
+    "DATABASE_URL",
+    "engine",
+    "SessionLocal",
+    "ReadSessionLocal",
+    "Base",
+    "User",
+    "Metric",
+    "MetricRollup",
+    "Plan",
+    "PlanBlob",
+    "CompressionDictionary",
+    "ChatMessage",
+    "AccountDeletion",
+    "MetricPartition",
+    "get_db",
+    "get_read_db",
+]
@@ -0,0 +1,130 @@
+"""
+Time-ordered identifiers (ULID layout).
+
+An id is 128 bits: a 48-bit millisecond Unix timestamp followed by 80
+random bits, written as 26 Crockford base32 characters, so ids sort as
+text in creation order. New rows therefore insert at the right-hand edge
+of a unique index instead of at random pages, and an id tells when its
+row was created.
+
+Within a process ids are strictly increasing: several ids in one
+millisecond increment the random part of the previous one, and a clock
+stepping backwards keeps the last timestamp. Processes do not
+coordinate; the 80 random bits make a collision between workers
+practically impossible. A forked worker draws new random bits rather
+than continuing its parent's sequence, so preforked workers never
+generate the same sequence.
+
+Integer keys (new_int_id) use the same scheme in 63 bits: milliseconds
+since 2020-01-01 (42 bits, until 2159) followed by 21 random bits. They
+fit a signed BIGINT and sort by creation time; two workers collide only
+if they draw the same 21 bits in the same millisecond.
+
+Usage:
+    plan_id = new_id("plan_")          # "plan_01JBDG1ZGXDV7QW7C5D8PZ8S1K"
+    id_timestamp(plan_id)              # datetime(2026, 10, 19, 11, 42, 3, 101000)
+    metric_id = new_int_id()           # 5489734912385024001
+"""
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+
+ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"  # Crockford base32
+LENGTH = 26
+RANDOM_BITS = 80
+TIME_BITS = 48
+
+INT_RANDOM_BITS = 21
+INT_EPOCH_MS = 1577836800000  # 2020-01-01
+
+_DECODE = {char: index for index, char in enumerate(ALPHABET)}
+_EPOCH = datetime(1970, 1, 1)
+
+
+def encode(value: int) -> str:
+    """26-character base32 text of a 128-bit value."""
+    chars = []
+    for _ in range(LENGTH):
+        value, digit = divmod(value, 32)
+        chars.append(ALPHABET[digit])
+    return "".join(reversed(chars))
+
+
+def decode(text: str) -> int:
+    """128-bit value of a 26-character id (without prefix)."""
+    if len(text) != LENGTH:
+        raise ValueError(f"Expected {LENGTH} characters, got {len(text)}")
+    value = 0
+    for char in text.upper():
+        if char not in _DECODE:
+            raise ValueError(f"Invalid id character '{char}'")
+        value = value * 32 + _DECODE[char]
+    return value
+
+
+class IdGenerator:
+    """Thread-safe, monotonic id source; one per process and layout (GENERATOR, INT_GENERATOR)."""
+
+    def __init__(self, clock=time.time, random_bits: int = RANDOM_BITS, epoch_ms: int = 0):
+        self._clock = clock
+        self._bits = random_bits
+        self._epoch_ms = epoch_ms
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._last_ms = 0
+        self._random = 0
+
+    def _draw(self) -> int:
+        return int.from_bytes(os.urandom((self._bits + 7) // 8), "big") >> (-self._bits % 8)
+
+    def next_value(self) -> int:
+        with self._lock:
+            now_ms = int(self._clock() * 1000) - self._epoch_ms
+            if now_ms > self._last_ms:
+                self._last_ms = now_ms
+                self._random = self._draw()
+            else:
+                # same millisecond (or the clock went back): keep order
+                self._random += 1
+                if self._random >> self._bits:
+                    self._last_ms += 1
+                    self._random = self._draw()
+            return (self._last_ms << self._bits) | self._random
+
+    def new_id(self, prefix: str = "") -> str:
+        return prefix + encode(self.next_value())
+
+
+GENERATOR = IdGenerator()
+INT_GENERATOR = IdGenerator(random_bits=INT_RANDOM_BITS, epoch_ms=INT_EPOCH_MS)
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=GENERATOR._reset)
+    os.register_at_fork(after_in_child=INT_GENERATOR._reset)
+
+
+def new_id(prefix: str = "") -> str:
+    """A new time-ordered id, optionally prefixed (e.g. "plan_")."""
+    return GENERATOR.new_id(prefix)
+
+
+def new_int_id() -> int:
+    """A new time-ordered 63-bit integer id (e.g. Metric.id)."""
+    return INT_GENERATOR.next_value()
+
+
+def id_timestamp(value: str, prefix: Optional[str] = None) -> datetime:
+    """
+    Creation time (UTC, naive like the models' timestamps) encoded in an id.
+
+    Args:
+        value: Id as returned by new_id
+        prefix: Prefix to strip; by default everything before the last 26 characters
+    """
+    text = value[len(prefix):] if prefix is not None else value[-LENGTH:]
+    return _EPOCH + timedelta(milliseconds=decode(text) >> RANDOM_BITS)
@@ -0,0 +1,465 @@
+"""
+Time-partitioned metric storage.
+
+Metrics are split by created_at into one partition per period (month,
+quarter or year, METRIC_PARTITION_PERIOD), plus a default partition,
+metrics_default, for rows no partition covers: history logged before
+partitioning, and periods without a partition. Code keeps reading and
+writing the `metrics` table:
+
+- PostgreSQL: `metrics` is a native range-partitioned table with
+  partitions metrics_2026_10, ... and metrics_default as its DEFAULT
+  partition. The planner prunes partitions from created_at predicates.
+- SQLite: each partition is its own database file
+  (<database>-partitions/metrics_2026.db) holding a table of the same
+  name, attached to every connection. `metrics` is a TEMP view, the
+  UNION ALL of metrics_default (in the main database) and the
+  partitions; INSTEAD OF triggers route inserts by created_at and
+  deletes by id. metric_source() prunes range reads to the partitions
+  overlapping the range. Updates are not supported: metrics are
+  append-only.
+
+Retention (services.retention) detaches expired partitions and archives
+or drops them whole: a file move or DROP TABLE, never a row-by-row
+DELETE.
+
+The metric_partitions table (models.database.MetricPartition) is the
+catalog. Every SQLite connection attaches the partitions the catalog
+lists when it is opened, and again on checkout once the layout changed;
+layout changes bump the main database's PRAGMA user_version.
+
+Metric ids are assigned by the application (models.ids.new_int_id):
+partitions share no sequence, and SQLite cannot report the rowid of a
+row inserted through a view.
+
+Usage:
+    layout = layout_for(engine)          # None: unpartitioned (in-memory SQLite, other dialects)
+    partition_for(datetime(2026, 10, 19), "month")
+    # Partition(name='metrics_2026_10', start=datetime(2026, 10, 1), end=datetime(2026, 11, 1), location=None)
+    source = metric_source(db, Metric, since=cutoff)
+    db.execute(select(source.created_at).where(source.user_id == "alice"))
+"""
+import logging
+import os
+import shutil
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Iterator, List, NamedTuple, Optional, Sequence
+
+from sqlalchemy import MetaData, Table, column, event, select, table, text, union_all
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.schema import CreateColumn, CreateIndex, CreateTable
+
+from apps.config import settings
+
+
+logger = logging.getLogger("fitflow.partitions")
+
+PERIODS = ("month", "quarter", "year")
+PARENT = "metrics"
+DEFAULT_PARTITION = "metrics_default"
+CATALOG = "metric_partitions"
+
+# SQLite's compiled-in default limit of attached databases
+SQLITE_MAX_ATTACHED = 10
+
+# DateTime storage format of SQLAlchemy's SQLite dialect
+_SQLITE_TIMESTAMP = "%Y-%m-%d %H:%M:%S.%f"
+
+# connection_record.info key: (layout generation, attached partitions)
+_INFO_KEY = "fitflow_metric_partitions"
+
+
+class PartitionError(RuntimeError):
+    """The partition layout cannot be changed as asked."""
+
+
+class Partition(NamedTuple):
+    name: str
+    start: datetime
+    end: datetime
+    location: Optional[str] = None
+
+
+# ==========================================
+# PERIODS
+# ==========================================
+
+def resolve_period(dialect_name: str) -> Optional[str]:
+    """Configured partition period for a dialect, None if partitioning is off."""
+    period = settings.METRIC_PARTITION_PERIOD.strip().lower()
+    if period == "none":
+        return None
+    if not period:
+        return "year" if dialect_name == "sqlite" else "month"
+    if period not in PERIODS:
+        raise ValueError(f"METRIC_PARTITION_PERIOD must be one of {', '.join(PERIODS)} or none")
+    return period
+
+
+def period_start(moment: datetime, period: str) -> datetime:
+    """Start (UTC midnight) of the period containing `moment`."""
+    if period == "month":
+        return datetime(moment.year, moment.month, 1)
+    if period == "quarter":
+        return datetime(moment.year, 3 * ((moment.month - 1) // 3) + 1, 1)
+    if period == "year":
+        return datetime(moment.year, 1, 1)
+    raise ValueError(f"Unknown partition period '{period}'")
+
+
+def next_period(start: datetime, period: str) -> datetime:
+    """Start of the period after the one starting at `start`."""
+    months = {"month": 1, "quarter": 3, "year": 12}[period]
+    index = start.year * 12 + start.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_for(moment: datetime, period: str) -> Partition:
+    """The partition holding `moment`: metrics_2026_10, metrics_2026_q4 or metrics_2026."""
+    start = period_start(moment, period)
+    if period == "month":
+        suffix = f"{start.year}_{start.month:02d}"
+    elif period == "quarter":
+        suffix = f"{start.year}_q{(start.month - 1) // 3 + 1}"
+    else:
+        suffix = f"{start.year}"
+    return Partition(f"{PARENT}_{suffix}", start, next_period(start, period))
+
+
+# ==========================================
+# SQLITE CONNECTIONS
+# ==========================================
+
+def _sqlite_literal(moment: datetime) -> str:
+    return f"'{moment.strftime(_SQLITE_TIMESTAMP)}'"
+
+
+def sqlite_view_sql(columns: Sequence[str], partitions: Sequence[Partition]) -> List[str]:
+    """
+    TEMP view and triggers presenting metrics_default and `partitions` as
+    `metrics`. Trigger statements name tables unqualified (SQLite allows
+    no schema there), which is why every partition table has a unique name.
+    """
+    names = [DEFAULT_PARTITION, *[p.name for p in partitions]]
+    cols = ", ".join(columns)
+    new = ", ".join(f"NEW.{name}" for name in columns)
+
+    ranges = [
+        f"NEW.created_at >= {_sqlite_literal(p.start)} AND NEW.created_at < {_sqlite_literal(p.end)}"
+        for p in partitions
+    ]
+    routes = [
+        f"INSERT INTO {p.name} ({cols}) SELECT {new} WHERE {condition};"
+        for p, condition in zip(partitions, ranges)
+    ]
+    uncovered = " OR ".join(f"coalesce({condition}, 0)" for condition in ranges) or "0"
+    routes.append(f"INSERT INTO {DEFAULT_PARTITION} ({cols}) SELECT {new} WHERE NOT ({uncovered});")
+
+    return [
+        f"CREATE TEMP VIEW {PARENT} AS " + " UNION ALL ".join(f"SELECT {cols} FROM {name}" for name in names),
+        f"CREATE TEMP TRIGGER {PARENT}_insert INSTEAD OF INSERT ON {PARENT} BEGIN "
+        f"SELECT RAISE(ABORT, '{PARENT}.id must be set by the application') WHERE NEW.id IS NULL; "
+        + " ".join(routes) + " END",
+        f"CREATE TEMP TRIGGER {PARENT}_delete INSTEAD OF DELETE ON {PARENT} BEGIN "
+        + " ".join(f"DELETE FROM {name} WHERE id = OLD.id;" for name in names) + " END",
+    ]
+
+
+def _sqlite_catalog(cursor) -> List[Partition]:
+    try:
+        rows = cursor.execute(
+            f"SELECT name, period_start, period_end, location FROM main.{CATALOG} "
+            "WHERE status = 'attached' ORDER BY period_start"
+        ).fetchall()
+    except sqlite3.OperationalError:
+        return []  # catalog not created yet
+    return [
+        Partition(name, datetime.fromisoformat(start), datetime.fromisoformat(end), location)
+        for name, start, end, location in rows
+    ]
+
+
+def _sync_sqlite(dbapi_connection, connection_record) -> None:
+    """Attach the catalog's partitions and rebuild the view if the layout changed."""
+    cursor = dbapi_connection.cursor()
+    try:
+        generation = cursor.execute("PRAGMA main.user_version").fetchone()[0]
+        state = connection_record.info.get(_INFO_KEY)
+        if state is not None and state[0] == generation:
+            return
+
+        columns = [row[1] for row in cursor.execute(f"PRAGMA main.table_info({DEFAULT_PARTITION})")]
+        partitions = _sqlite_catalog(cursor) if columns else []
+        databases = {row[1]: row[2] for row in cursor.execute("PRAGMA database_list")}
+        wanted = {p.name for p in partitions}
+
+        cursor.execute(f"DROP VIEW IF EXISTS temp.{PARENT}")
+        for name in databases:
+            if name.startswith(f"{PARENT}_") and name not in wanted:
+                cursor.execute(f"DETACH DATABASE {name}")
+        base = os.path.dirname(databases["main"])
+        for partition in partitions:
+            if partition.name not in databases:
+                cursor.execute(f"ATTACH DATABASE ? AS {partition.name}", (os.path.join(base, partition.location),))
+                cursor.execute(f"PRAGMA {partition.name}.synchronous={settings.SQLITE_SYNCHRONOUS}")
+        if columns:
+            for statement in sqlite_view_sql(columns, partitions):
+                cursor.execute(statement)
+
+        connection_record.info[_INFO_KEY] = (generation, tuple(partitions))
+    finally:
+        cursor.close()
+
+
+def _sync_on_checkout(dbapi_connection, connection_record, connection_proxy) -> None:
+    _sync_sqlite(dbapi_connection, connection_record)
+
+
+def install(engine: Engine) -> None:
+    """
+    Keep an engine's SQLite connections in step with the partition
+    catalog (done by models.engine.build_engine for file databases).
+    A database that was never partitioned gets no view, only a
+    PRAGMA user_version read per checkout.
+    """
+    event.listen(engine, "connect", _sync_sqlite)
+    event.listen(engine, "checkout", _sync_on_checkout)
+
+
+# ==========================================
+# PARTITION PRUNING
+# ==========================================
+
+def metric_source(db: Session, model, since: Optional[datetime] = None, until: Optional[datetime] = None):
+    """
+    What to select metrics in [since, until) from: `model` itself, or on
+    partitioned SQLite an alias of it over the default partition and only
+    the partitions overlapping the range. PostgreSQL prunes natively from
+    the created_at predicates the caller adds either way, and newest-first
+    reads with a LIMIT are best left to the full view, whose per-partition
+    index scans are merged and stop early.
+
+    Args:
+        db: Session the query will run in
+        model: Metric
+        since / until: Range the caller filters created_at to
+
+    Returns:
+        Mapped entity with the model's attributes
+    """
+    if db.get_bind().dialect.name != "sqlite":
+        return model
+    _, partitions = db.connection().connection.info.get(_INFO_KEY, (None, ()))
+    keep = [
+        p for p in partitions
+        if (since is None or p.end > since) and (until is None or p.start < until)
+    ]
+    if len(keep) == len(partitions):
+        return model
+
+    columns = model.__table__.columns
+    arms = [
+        select(table(source, *[column(c.name, c.type) for c in columns]))
+        for source in [DEFAULT_PARTITION, *[p.name for p in keep]]
+    ]
+    return aliased(model, union_all(*arms).subquery(PARENT), adapt_on_names=True)
+
+
+# ==========================================
+# LAYOUTS (DDL)
+# ==========================================
+
+def _partition_table(parent: Table, name: str) -> Table:
+    return parent.to_metadata(MetaData(), name=name)
+
+
+class SQLiteLayout:
+    """Partitions as attached database files next to the main database."""
+
+    max_partitions = SQLITE_MAX_ATTACHED
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.base = os.path.dirname(os.path.abspath(engine.url.database))
+        database = os.path.basename(engine.url.database)
+        self.directory = os.path.join(self.base, f"{database}-partitions")
+        self.archive_directory = settings.METRIC_ARCHIVE_DIR or os.path.join(self.base, f"{database}-archive")
+
+    def _path(self, location: str) -> str:
+        return os.path.join(self.base, location)
+
+    @contextmanager
+    def transaction(self) -> Iterator[Connection]:
+        """Write lock on the main database, so one worker changes the layout at a time."""
+        with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.exec_driver_sql("COMMIT")
+            except BaseException:
+                conn.exec_driver_sql("ROLLBACK")
+                raise
+
+    def is_partitioned(self, conn: Connection) -> bool:
+        return conn.execute(
+            text("SELECT 1 FROM main.sqlite_master WHERE type = 'table' AND name = :name"),
+            {"name": DEFAULT_PARTITION}
+        ).first() is not None
+
+    def prepare(self, conn: Connection, parent: Table) -> None:
+        """Turn the existing metrics table into the default partition (a rename)."""
+        if not self.is_partitioned(conn):
+            conn.exec_driver_sql(f"ALTER TABLE main.{PARENT} RENAME TO {DEFAULT_PARTITION}")
+
+    def create(self, conn: Connection, parent: Table, partition: Partition) -> Optional[str]:
+        """Create the partition's database file; returns its location."""
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{partition.name}.db")
+        copy = _partition_table(parent, partition.name)
+        statements = [str(CreateTable(copy, if_not_exists=True).compile(dialect=self.engine.dialect))]
+        statements += [
+            str(CreateIndex(index, if_not_exists=True).compile(dialect=self.engine.dialect))
+            for index in copy.indexes
+        ]
+        db = sqlite3.connect(path)
+        try:
+            db.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+            for statement in statements:
+                db.execute(statement)
+            db.commit()
+        finally:
+            db.close()
+        return os.path.relpath(path, self.base)
+
+    def detach(self, conn: Connection, partition: Partition) -> None:
+        """Nothing to do: connections detach on their next checkout (see bump)."""
+
+    def _release(self, path: str) -> None:
+        """Fold the WAL into the file so it can be moved or deleted on its own."""
+        db = sqlite3.connect(path)
+        try:
+            busy = db.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()[0]
+            if busy:
+                raise PartitionError(f"{path} is still in use")
+            db.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            db.close()
+
+    def archive(self, conn: Connection, partition: Partition) -> str:
+        path = self._path(partition.location)
+        self._release(path)
+        os.makedirs(self.archive_directory, exist_ok=True)
+        target = os.path.join(self.archive_directory, os.path.basename(path))
+        shutil.move(path, target)
+        return os.path.relpath(target, self.base)
+
+    def drop(self, conn: Connection, partition: Partition) -> None:
+        path = self._path(partition.location)
+        if os.path.exists(path):
+            self._release(path)
+            os.remove(path)
+
+    def bump(self, conn: Connection) -> None:
+        """Make every connection re-read the catalog on its next checkout."""
+        generation = conn.exec_driver_sql("PRAGMA main.user_version").scalar()
+        conn.exec_driver_sql(f"PRAGMA main.user_version = {int(generation) + 1}")
+
+
+class PostgresLayout:
+    """Native range partitions of a partitioned `metrics` table."""
+
+    max_partitions = None
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.archive_schema = settings.METRIC_ARCHIVE_SCHEMA
+
+    @contextmanager
+    def transaction(self) -> Iterator[Connection]:
+        """One transaction (DDL included), serialized across workers by an advisory lock."""
+        with self.engine.begin() as conn:
+            conn.execute(text("SELECT pg_advisory_xact_lock(hashtext(:name))"), {"name": CATALOG})
+            yield conn
+
+    def is_partitioned(self, conn: Connection) -> bool:
+        kind = conn.execute(
+            text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:name)"), {"name": PARENT}
+        ).scalar()
+        return kind == "p"
+
+    def prepare(self, conn: Connection, parent: Table) -> None:
+        """
+        Turn the existing metrics table into the DEFAULT partition of a new
+        partitioned `metrics` (ids widened to BIGINT, a one-time rewrite).
+        """
+        if self.is_partitioned(conn):
+            return
+        dialect = self.engine.dialect
+        conn.exec_driver_sql(f"ALTER TABLE {PARENT} RENAME TO {DEFAULT_PARTITION}")
+        for index in parent.indexes:
+            conn.exec_driver_sql(f"ALTER INDEX IF EXISTS {index.name} RENAME TO {index.name}_default")
+        conn.exec_driver_sql(f"ALTER TABLE {DEFAULT_PARTITION} ALTER COLUMN id DROP DEFAULT")
+        conn.exec_driver_sql(f"ALTER TABLE {DEFAULT_PARTITION} ALTER COLUMN id TYPE BIGINT")
+
+        # No primary key on the parent: it would have to include created_at.
+        # Each partition has its own; ids are unique across them by construction.
+        columns = ", ".join(str(CreateColumn(c).compile(dialect=dialect)) for c in parent.columns)
+        conn.exec_driver_sql(f"CREATE TABLE {PARENT} ({columns}) PARTITION BY RANGE (created_at)")
+        conn.exec_driver_sql(f"ALTER TABLE {PARENT} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT")
+        for index in parent.indexes:
+            conn.execute(CreateIndex(index))
+
+    def create(self, conn: Connection, parent: Table, partition: Partition) -> Optional[str]:
+        """
+        Create the partition; None (skipped) if the default partition holds
+        rows of its range, which PostgreSQL would refuse.
+        """
+        bounds = {"start": partition.start, "end": partition.end}
+        overlap = conn.execute(
+            text(f"SELECT 1 FROM {DEFAULT_PARTITION} WHERE created_at >= :start AND created_at < :end LIMIT 1"),
+            bounds
+        ).first()
+        if overlap:
+            logger.warning("%s stays in %s, which holds rows of its range", partition.name, DEFAULT_PARTITION)
+            return None
+        conn.execute(
+            text(
+                f"CREATE TABLE IF NOT EXISTS {partition.name} PARTITION OF {PARENT} (PRIMARY KEY (id)) "
+                "FOR VALUES FROM (:start) TO (:end)"
+            ),
+            bounds
+        )
+        return partition.name
+
+    def detach(self, conn: Connection, partition: Partition) -> None:
+        conn.exec_driver_sql(f"ALTER TABLE {PARENT} DETACH PARTITION {partition.name}")
+
+    def archive(self, conn: Connection, partition: Partition) -> str:
+        conn.exec_driver_sql(f"CREATE SCHEMA IF NOT EXISTS {self.archive_schema}")
+        conn.exec_driver_sql(f"ALTER TABLE {partition.name} SET SCHEMA {self.archive_schema}")
+        return f"{self.archive_schema}.{partition.name}"
+
+    def drop(self, conn: Connection, partition: Partition) -> None:
+        conn.exec_driver_sql(f"DROP TABLE IF EXISTS {partition.name}")
+
+    def bump(self, conn: Connection) -> None:
+        """Nothing to do: the server routes rows itself."""
+
+
+def layout_for(engine: Engine):
+    """The engine's partition layout, None where metrics are not partitioned."""
+    url = engine.url
+    if url.get_backend_name() == "postgresql":
+        return PostgresLayout(engine)
+    if url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:"):
+        return SQLiteLayout(engine)
+    return None
+
+
+def is_partitioned(conn: Connection) -> bool:
+    """Whether `metrics` has been converted to a partitioned layout."""
+    layout = layout_for(conn.engine)
+    return layout is not None and layout.is_partitioned(conn)
@@ -0,0 +1,186 @@
+"""
+Per-request SQL accounting, slow-query log and query budget.
+
+`install(engine)` hooks before/after_cursor_execute on an engine (done for
+every engine built by models.engine.build_engine). While a `track()` block
+is active (one per HTTP request, see apps.middleware.QueryStatsMiddleware)
+every statement's duration is recorded against its normalized SQL, so the
+request knows how many queries it issued, how long they took and which
+statements repeated. Statements slower than SLOW_QUERY_MS are logged.
+
+Usage:
+    with track() as stats:
+        db.query(User).filter(User.user_id == "alice").first()
+    stats.count, stats.total_ms, stats.repeated()
+"""
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Dict, Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from apps.config import settings
+from apps.instrumentation import REGISTRY
+
+
+logger = logging.getLogger("fitflow.sql")
+
+QUERY_SECONDS = REGISTRY.histogram(
+    "fitflow_db_query_seconds", "Duration of SQL statements by operation"
+)
+SLOW_QUERIES = REGISTRY.counter(
+    "fitflow_db_slow_queries_total", "SQL statements slower than SLOW_QUERY_MS"
+)
+
+
+# ==========================================
+# SQL NORMALIZATION
+# ==========================================
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PARAM = re.compile(r"%\(\w+\)s|%s|(?<!:):\w+|\$\d+")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1024)
+def normalize_sql(statement: str) -> str:
+    """
+    Reduce a statement to its shape: literals and bind markers become `?`,
+    IN lists collapse to `(?...)` and whitespace is squeezed.
+
+    Example:
+        "SELECT * FROM users WHERE id IN (1, 2, 3) AND name = 'x'"
+        -> "SELECT * FROM users WHERE id IN (?...) AND name = ?"
+    """
+    sql = _STRING.sub("?", statement)
+    sql = _PARAM.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("(?...)", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+# ==========================================
+# PER-REQUEST STATS
+# ==========================================
+
+class QueryStats:
+    """Queries issued inside one `track()` block."""
+
+    __slots__ = ("count", "total_seconds", "statements")
+
+    def __init__(self):
+        self.count = 0
+        self.total_seconds = 0.0
+        self.statements: Counter = Counter()
+
+    @property
+    def total_ms(self) -> float:
+        return round(self.total_seconds * 1000, 3)
+
+    def repeated(self) -> Dict[str, int]:
+        """Normalized statements executed more than once."""
+        return {sql: n for sql, n in self.statements.items() if n > 1}
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("fitflow_query_stats", default=None)
+
+
+@contextmanager
+def track() -> Iterator[QueryStats]:
+    """Record the statements run inside the block (nests: inner wins)."""
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+def current() -> Optional[QueryStats]:
+    return _current.get()
+
+
+# ==========================================
+# QUERY BUDGET
+# ==========================================
+
+class QueryBudgetExceeded(AssertionError):
+    """A request issued too many, or repeated, SQL statements."""
+
+
+def check_budget(
+    stats: QueryStats,
+    max_queries: int,
+    allow_repeats: bool = False,
+    where: str = "request"
+) -> None:
+    """
+    Fail if `stats` exceeds the budget.
+
+    Args:
+        stats: Stats from `track()`
+        max_queries: Maximum statements allowed (0 = no limit)
+        allow_repeats: Permit the same normalized statement more than once
+        where: Label used in the error message (e.g. "GET /api/v1/plans/current")
+
+    Raises:
+        QueryBudgetExceeded: With the offending statements listed
+    """
+    problems = []
+    if max_queries and stats.count > max_queries:
+        problems.append(f"{stats.count} queries (budget {max_queries})")
+    repeats = {} if allow_repeats else stats.repeated()
+    if repeats:
+        problems.append("repeated statements:\n" + "\n".join(
+            f"  {n}x {sql}" for sql, n in repeats.items()
+        ))
+    if problems:
+        listing = "\n".join(f"  {n}x {sql}" for sql, n in stats.statements.items())
+        raise QueryBudgetExceeded(
+            f"{where} exceeded its query budget: " + "; ".join(problems)
+            + f"\nAll statements:\n{listing}"
+        )
+
+
+# ==========================================
+# ENGINE HOOKS
+# ==========================================
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the execution context, so a failed statement leaves nothing behind
+    if context is not None:
+        context._fitflow_query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_fitflow_query_start", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "?"
+    QUERY_SECONDS.observe(elapsed, op=operation)
+
+    stats = _current.get()
+    if stats is not None:
+        stats.count += 1
+        stats.total_seconds += elapsed
+        stats.statements[normalize_sql(statement)] += 1
+
+    if elapsed * 1000 >= settings.SLOW_QUERY_MS:
+        SLOW_QUERIES.inc(op=operation)
+        logger.warning("slow query (%.1f ms): %s", elapsed * 1000, normalize_sql(statement))
+
+
+def install(engine: Engine) -> None:
+    """Attach the timing hooks to an engine (idempotent)."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
@@ -0,0 +1,58 @@
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+# ==========================================
+# PER-REQUEST ROUTING STATE
+# ==========================================
+
+class RoutingState:
+    """
+    Whether reads in the current request must go to the primary.
+
+    Attributes:
+        pinned: Client wrote recently (read-your-writes cookie present)
+        wrote: This request has flushed a write
+
+    One mutable instance per request, so writes made in a threadpool
+    worker are visible to the middleware that created it.
+    """
+
+    __slots__ = ("pinned", "wrote")
+
+    def __init__(self, pinned: bool = False):
+        self.pinned = pinned
+        self.wrote = False
+
+
+_state: ContextVar[Optional[RoutingState]] = ContextVar("fitflow_routing_state", default=None)
+
+
+def begin_request(pinned: bool = False):
+    """Start routing state for a request; returns a token for `end_request`."""
+    return _state.set(RoutingState(pinned))
+
+
+def end_request(token) -> None:
+    _state.reset(token)
+
+
+def current_state() -> Optional[RoutingState]:
+    return _state.get()
+
+
+def primary_required() -> bool:
+    """True if reads must see this client's own recent writes."""
+    state = _state.get()
+    return state is not None and (state.pinned or state.wrote)
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_write(session, flush_context) -> None:
+    # Any flushed INSERT/UPDATE/DELETE pins the rest of the request
+    state = _state.get()
+    if state is not None:
+        state.wrote = True
@@ -95,6 +95,7 @@ class PlanRequest(BaseModel):
     """Schema for requesting a plan"""
     user_id: str
     week: int = 1
+    include_timings: bool = False
     
     class Config:
         json_schema_extra = {
@@ -139,12 +140,13 @@ class PlanResponse(BaseModel):
     plan_id: str
     components: Dict[str, Any]
     summary: str
+    timings: Optional[Dict[str, float]] = None
     
     class Config:
         json_schema_extra = {
             "example": {
                 "status": "success",
-                "plan_id": "plan_1704516124.5678",
+                "plan_id": "plan_01HKGZ3Y4R8Q2M6T9VXBWJ5N7C",
                 "components": {
                     "workout": {
                         "split_type": "PPL",
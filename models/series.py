@@ -0,0 +1,265 @@
+from array import array
+from dataclasses import dataclass
+from calendar import timegm
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+
+# ==========================================
+# COLUMN LAYOUT
+# ==========================================
+
+# Metric columns in storage order, with the array typecode used for each.
+# Float measurements use 'd' (8 bytes); 1-10 scores fit in 'h' (2 bytes).
+FIELDS: Tuple[Tuple[str, str], ...] = (
+    ("weight_kg", "d"),
+    ("strength_1rm", "d"),
+    ("sleep_hours", "d"),
+    ("mood", "h"),
+    ("energy", "h"),
+)
+
+FIELD_NAMES: Tuple[str, ...] = tuple(name for name, _ in FIELDS)
+
+
+def to_epoch(value: Union[datetime, str, float, int, None]) -> float:
+    """
+    Convert a naive-UTC datetime (or ISO string) to epoch seconds.
+
+    Metric timestamps are stored as naive UTC (datetime.utcnow), so they are
+    interpreted as UTC rather than local time.
+    """
+    if value is None:
+        return 0.0
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return timegm(value.utctimetuple()) + value.microsecond / 1e6
+
+
+# ==========================================
+# HISTORY WINDOWS
+# ==========================================
+
+@dataclass(frozen=True)
+class HistoryWindow:
+    """
+    How much metric history a consumer needs.
+    
+    Attributes:
+        last_n: Most recent N rows (None = no row-count requirement)
+        days: Rows logged within the last D days (None = no time requirement)
+    
+    A window with neither set needs no history at all. Windows combine with
+    `union()` so a caller coordinating several agents fetches once.
+    
+    Example:
+        HistoryWindow(last_n=2)                # last two entries
+        HistoryWindow(last_n=5, days=28)       # last 5 rows or 4 weeks
+    """
+    
+    last_n: Optional[int] = None
+    days: Optional[int] = None
+    
+    @property
+    def is_empty(self) -> bool:
+        return not self.last_n and not self.days
+    
+    def union(self, *others: "HistoryWindow") -> "HistoryWindow":
+        """Smallest window covering this window and all `others`."""
+        last_n = [w.last_n for w in (self, *others) if w.last_n]
+        days = [w.days for w in (self, *others) if w.days]
+        return HistoryWindow(
+            last_n=max(last_n) if last_n else None,
+            days=max(days) if days else None
+        )
+
+
+NO_HISTORY = HistoryWindow()
+
+
+# ==========================================
+# METRIC POINT
+# ==========================================
+
+class MetricPoint:
+    """
+    Read-only view of one row in a MetricSeries.
+
+    Supports the same `point.get("weight_kg")` / `point["mood"]` access the
+    agents used on metric dicts, and `point.mood` access like an ORM row,
+    without materializing a dict per row.
+    """
+
+    __slots__ = ("_series", "_index")
+
+    def __init__(self, series: "MetricSeries", index: int):
+        self._series = series
+        self._index = index
+
+    def get(self, name: str, default: Any = None) -> Any:
+        column = self._series._columns.get(name)
+        if column is None:
+            if name == "created_at":
+                return self._series.timestamps[self._index]
+            return default
+        return column[self._index]
+
+    def __getitem__(self, name: str) -> Any:
+        value = self.get(name, _MISSING)
+        if value is _MISSING:
+            raise KeyError(name)
+        return value
+
+    def __getattr__(self, name: str) -> Any:
+        # Allows `point.mood` like an ORM row; only reached for non-slot names
+        if name.startswith("_"):
+            raise AttributeError(name)
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    @property
+    def timestamp(self) -> float:
+        return self._series.timestamps[self._index]
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {name: self._series._columns[name][self._index] for name in FIELD_NAMES}
+        data["created_at"] = datetime.utcfromtimestamp(self.timestamp).isoformat()
+        return data
+
+    def __repr__(self):
+        return f"<MetricPoint {self.to_dict()}>"
+
+
+_MISSING = object()
+
+
+# ==========================================
+# METRIC SERIES
+# ==========================================
+
+class MetricSeries:
+    """
+    Columnar, chronologically ordered metric history for one user.
+
+    Each metric is stored as a packed `array` column with epoch-second
+    timestamps alongside, so a history of N rows costs a handful of buffers
+    instead of N dicts. Columns can be viewed as NumPy arrays without copying.
+
+    Build it straight from a `select()` of tuples:
+
+        rows = db.execute(
+            select(Metric.created_at, *[getattr(Metric, f) for f in FIELD_NAMES])
+            .where(Metric.user_id == user_id)
+            .order_by(Metric.created_at)
+        )
+        series = MetricSeries.from_rows(rows)
+
+    Indexing returns a MetricPoint (`series[-1].get("mood")`), slicing
+    returns a new MetricSeries, and `len()` is the number of rows.
+    """
+
+    __slots__ = ("timestamps", "_columns")
+
+    def __init__(
+        self,
+        timestamps: Optional[array] = None,
+        columns: Optional[Dict[str, array]] = None
+    ):
+        self.timestamps = timestamps if timestamps is not None else array("d")
+        if columns is None:
+            columns = {name: array(code) for name, code in FIELDS}
+        self._columns = columns
+
+    # ---------- construction ----------
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Sequence[Any]]) -> "MetricSeries":
+        """
+        Build a series from (created_at, weight_kg, strength_1rm, sleep_hours,
+        mood, energy) tuples in chronological order.
+        """
+        series = cls()
+        timestamps = series.timestamps
+        columns = [series._columns[name] for name in FIELD_NAMES]
+        for row in rows:
+            timestamps.append(to_epoch(row[0]))
+            for column, value in zip(columns, row[1:]):
+                column.append(value if value is not None else 0)
+        return series
+
+    @classmethod
+    def from_dicts(cls, metrics: Iterable[Dict[str, Any]]) -> "MetricSeries":
+        """Build a series from the legacy list-of-dicts metric format."""
+        return cls.from_rows(
+            (
+                m.get("created_at", m.get("timestamp")),
+                *(m.get(name, 0) for name in FIELD_NAMES)
+            )
+            for m in metrics
+        )
+
+    @classmethod
+    def coerce(
+        cls,
+        metrics: Union["MetricSeries", Iterable[Dict[str, Any]], None]
+    ) -> "MetricSeries":
+        """Return `metrics` as a MetricSeries, converting dict lists if needed."""
+        if isinstance(metrics, MetricSeries):
+            return metrics
+        if not metrics:
+            return cls()
+        return cls.from_dicts(metrics)
+
+    # ---------- access ----------
+
+    def column(self, name: str) -> array:
+        """Return the packed column for a metric field."""
+        return self._columns[name]
+
+    def to_numpy(self, name: str):
+        """Zero-copy NumPy view of a column ('timestamps' is also accepted)."""
+        import numpy as np
+
+        if name == "timestamps":
+            return np.frombuffer(self.timestamps, dtype=np.float64)
+        column = self._columns[name]
+        dtype = np.float64 if column.typecode == "d" else np.int16
+        return np.frombuffer(column, dtype=dtype)
+
+    def last(self, name: str, default: Any = None) -> Any:
+        """Most recent value of a field, or `default` for an empty series."""
+        column = self._columns[name]
+        return column[-1] if column else default
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Expand to the legacy list-of-dicts format (allocates per row)."""
+        return [MetricPoint(self, i).to_dict() for i in range(len(self))]
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def __bool__(self) -> bool:
+        return len(self.timestamps) > 0
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return MetricSeries(
+                self.timestamps[index],
+                {name: column[index] for name, column in self._columns.items()}
+            )
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("MetricSeries index out of range")
+        return MetricPoint(self, index)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield MetricPoint(self, i)
+
+    def __repr__(self):
+        return f"<MetricSeries {len(self)} rows>"
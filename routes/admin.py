@@ -0,0 +1,108 @@
+import asyncio
+import hmac
+import os
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from apps.config import settings
+from apps.memory import MEMORY, tracing_overhead
+from services.profiler import ProfilerBusy, SamplingProfiler
+
+router = APIRouter(
+    prefix="/api/v1/admin",
+    tags=["Admin"],
+    responses={404: {"description": "Not found"}}
+)
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """
+    Gate for admin endpoints.
+
+    With no ADMIN_TOKEN configured the endpoints don't exist (404);
+    otherwise the X-Admin-Token header must match it (403).
+    """
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@router.get("/profile", dependencies=[Depends(require_admin)])
+async def profile_worker(
+    seconds: float = Query(5.0, gt=0, description="How long to sample"),
+    interval_ms: float = Query(10.0, ge=1, le=1000, description="Sampling period"),
+    format: Literal["collapsed", "speedscope"] = "collapsed",
+    include_idle: bool = Query(False, description="Keep threads parked in locks/selectors")
+):
+    """
+    Sample every thread of the worker serving this request for `seconds`
+
+    Only the worker process that receives the request is profiled; with
+    several workers, repeat the call (the PID is in X-Profile-PID). The
+    sampler only exists while a profile runs, and one profile at a time
+    per worker is allowed (409 otherwise).
+
+    Example:
+    ```
+    curl -H "X-Admin-Token: $ADMIN_TOKEN" \\
+      "http://localhost:8001/api/v1/admin/profile?seconds=10&format=speedscope" -o worker.speedscope.json
+    ```
+
+    Returns:
+        `collapsed`: text/plain collapsed stacks (`thread;root;...;leaf count`)
+        `speedscope`: speedscope JSON, one sampled profile per thread
+    """
+    if seconds > settings.PROFILE_MAX_SECONDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"seconds must be <= {settings.PROFILE_MAX_SECONDS}"
+        )
+
+    profiler = SamplingProfiler(interval=interval_ms / 1000, include_idle=include_idle)
+    try:
+        profiler.start()
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    try:
+        # The event loop keeps serving other requests while we wait
+        await asyncio.sleep(seconds)
+    finally:
+        profiler.stop()
+
+    pid = os.getpid()
+    headers = {
+        "X-Profile-PID": str(pid),
+        "X-Profile-Samples": str(profiler.sample_count),
+    }
+    if format == "speedscope":
+        headers["Content-Disposition"] = f'attachment; filename="fitflow-{pid}.speedscope.json"'
+        return JSONResponse(profiler.speedscope(name=f"fitflow worker {pid}"), headers=headers)
+    return PlainTextResponse(profiler.collapsed(), headers=headers)
+
+
+@router.get("/memory", dependencies=[Depends(require_admin)])
+def memory_report(
+    top: int = Query(10, ge=1, le=100, description="Allocation sites per route"),
+    reset: bool = Query(False, description="Clear the totals after reading them")
+):
+    """
+    Per-route allocation totals of this worker (MEMORY_TRACKING=True)
+
+    For each route: measured requests, max/mean peak KiB above the
+    request's starting point, mean KiB still held at response start,
+    requests over MEMORY_BUDGET_KB and the source lines holding the most
+    memory. Use `reset=true` between a before and an after run.
+    """
+    report = {
+        "enabled": settings.MEMORY_TRACKING,
+        "pid": os.getpid(),
+        "budget_kib": settings.MEMORY_BUDGET_KB,
+        "overhead": tracing_overhead(),
+        "routes": MEMORY.report(top=top),
+    }
+    if reset:
+        MEMORY.reset()
+    return report
@@ -1,7 +1,10 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends, Request, Response
 from sqlalchemy.orm import Session
-from models.entities import User, get_db
+from apps.conditional import etag_headers, make_etag, matches, not_modified
+from models.entities import AccountDeletion, User, get_db
 from models.schemas import UserRegister, UserProfile, SuccessResponse
+from services import account_deletion, profiles
+from services.versions import profile_stamp
 
 router = APIRouter(
     prefix="/api/v1/auth",
@@ -42,11 +45,16 @@ def register_user(
     }
     ```
     """
-    # Check if user already exists
+    # Check if user already exists (or is still being deleted)
     existing_user = db.query(User).filter(
         User.user_id == user_data.user_id
-    ).first()
+    ).execution_options(include_deleted=True).first()
     
+    if existing_user and existing_user.deleted_at is not None:
+        raise HTTPException(
+            status_code=409,
+            detail=f"User '{user_data.user_id}' is being deleted; try again later"
+        )
     if existing_user:
         raise HTTPException(
             status_code=400,
@@ -115,6 +123,8 @@ def register_user(
 @router.get("/profile", response_model=UserProfile)
 def get_profile(
     user_id: str,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db)
 ):
     """
@@ -144,16 +154,30 @@ def get_profile(
         "created_at": "2026-01-06T12:25:00Z"
     }
     ```
+    
+    The response carries an ETag; send it back in If-None-Match to get an
+    empty 304 while the profile is unchanged.
     """
-    user = db.query(User).filter(User.user_id == user_id).first()
+    stamp = profile_stamp(db, user_id)
+    if not stamp:
+        raise HTTPException(
+            status_code=404,
+            detail=f"User '{user_id}' not found"
+        )
     
-    if not user:
+    etag = make_etag("profile", *stamp)
+    if matches(request, etag):
+        return not_modified(etag)
+    
+    profile = profiles.get_profile(db, user_id, stamp)
+    if not profile:
         raise HTTPException(
             status_code=404,
             detail=f"User '{user_id}' not found"
         )
     
-    return user
+    response.headers.update(etag_headers(etag))
+    return profile
 
 
 @router.put("/profile")
@@ -188,6 +212,8 @@ def update_profile(
         
         setattr(user, field, value)
     
+    # New ETag for GET /profile (atomic, so concurrent updates both count)
+    user.version = User.version + 1
     db.commit()
     db.refresh(user)
     
@@ -198,29 +224,80 @@ def update_profile(
     }
 
 
-@router.delete("/profile")
+@router.delete("/profile", status_code=202)
 def delete_user(
     user_id: str,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
     """
     Delete user account
     
-    Deletes user and all associated data (metrics, plans, messages).
+    Deletes user and all associated data (metrics, rollups, plans, messages).
+    The account disappears from every endpoint at once; its data is removed
+    by a background job in small batches, whose progress is at progress_url.
     WARNING: This cannot be undone!
+    
+    Response (202):
+    ```json
+    {
+        "status": "accepted",
+        "message": "User 'alice' is being deleted",
+        "job_id": "del_01HKGZ3Y4R8Q2M6T9VXBWJ5N7C",
+        "progress_url": "/api/v1/auth/deletions/del_01HKGZ3Y4R8Q2M6T9VXBWJ5N7C"
+    }
+    ```
     """
-    user = db.query(User).filter(User.user_id == user_id).first()
+    job = account_deletion.start_deletion(db, user_id)
     
-    if not user:
+    if not job:
         raise HTTPException(
             status_code=404,
             detail=f"User '{user_id}' not found"
         )
     
-    db.delete(user)
-    db.commit()
+    background_tasks.add_task(account_deletion.run_deletion_async, db.get_bind(), job.job_id)
     
     return {
-        "status": "success",
-        "message": f"User '{user_id}' deleted successfully"
-    }
\ No newline at end of file
+        "status": "accepted",
+        "message": f"User '{user_id}' is being deleted",
+        "job_id": job.job_id,
+        "progress_url": f"/api/v1/auth/deletions/{job.job_id}"
+    }
+
+
+@router.get("/deletions/{job_id}")
+def get_deletion(
+    job_id: str,
+    db: Session = Depends(get_db)
+):
+    """
+    Account deletion progress
+    
+    Response:
+    ```json
+    {
+        "job_id": "del_01HKGZ3Y4R8Q2M6T9VXBWJ5N7C",
+        "user_id": "alice",
+        "status": "running",
+        "deleted_rows": 1500,
+        "total_rows": 4210,
+        "percent": 35.6,
+        "progress": {"chat_messages": 320, "metric_rollups": 180, "metrics": 1000, "plans": 0},
+        "error": null,
+        "created_at": "2026-01-06T12:25:00",
+        "finished_at": null
+    }
+    ```
+    status is pending, running, failed (resumed by
+    `python -m services.account_deletion resume`) or done.
+    """
+    job = db.query(AccountDeletion).filter(AccountDeletion.job_id == job_id).first()
+    
+    if not job:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Deletion job '{job_id}' not found"
+        )
+    
+    return account_deletion.job_status(job)
\ No newline at end of file
@@ -1,7 +1,12 @@
+from typing import Optional
+
 from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy.orm import Session
-from models.entities import User, ChatMessage, get_db
+from apps.cache import cache_from_url
+from apps.config import settings
+from models.entities import User, ChatMessage, get_db, get_read_db
 from models.schemas import ChatMessage as ChatSchema, ChatResponse, SuccessResponse
+from services import dashboard
 
 router = APIRouter(
     prefix="/api/v1/chat",
@@ -9,6 +14,17 @@ router = APIRouter(
     responses={404: {"description": "Not found"}}
 )
 
+# Answers to specific questions, by the first keyword found in the message
+TOPICS = {
+    "sleep": "Sleep is crucial! Aim for 7-9 hours, maintain a consistent schedule, and keep your room cool and dark.",
+    "motivation": "Stay motivated by tracking progress visually, celebrating small wins, and remembering why you started!",
+    "plateau": "Plateaus are normal! Try varying your rep ranges, changing exercises, or increasing training frequency.",
+    "nutrition": "Nutrition is 70% of the battle. Track your macros, stay consistent, and adjust based on results.",
+    "recovery": "Recovery is when the gains happen! Prioritize sleep, manage stress, and consider deload weeks every 4-6 weeks.",
+}
+
+REPLIES = cache_from_url(settings.CACHE_URL, settings.CHAT_CACHE_SIZE, namespace="coaching", ttl=settings.CACHE_TTL)
+
 
 @router.post("/message", response_model=ChatResponse)
 def send_message(
@@ -80,7 +96,7 @@ def send_message(
 def get_chat_history(
     user_id: str,
     limit: int = 20,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Get chat history
@@ -147,10 +163,12 @@ def clear_chat_history(
             detail=f"User '{user_id}' not found"
         )
     
-    # Delete all messages
+    # Delete all messages (a bulk delete: no ORM events, so drop the
+    # dashboard snapshot explicitly)
     db.query(ChatMessage).filter(
         ChatMessage.user_id == user_id
     ).delete()
+    dashboard.invalidate(db, user_id)
     
     db.commit()
     
@@ -171,6 +189,9 @@ def generate_coaching_response(
     Generate AI coaching response
     
     Creates personalized response based on user's goal and question.
+    The reply depends only on the goal, level, the recovery flags of the
+    latest metrics and the question's topic, so replies are cached per
+    combination (REPLIES) and shared by everyone asking the same thing.
     """
     
     # Get user's latest metrics for context
@@ -178,7 +199,24 @@ def generate_coaching_response(
     latest_metric = db.query(Metric).filter(
         Metric.user_id == user_id
     ).order_by(Metric.created_at.desc()).first()
+    low_mood = bool(latest_metric and latest_metric.mood < 5)
+    low_sleep = bool(latest_metric and latest_metric.sleep_hours < 7)
+    topic = next((topic for topic in TOPICS if topic in message.lower()), None)
     
+    key = f"{goal}|{fitness_level}|{int(low_mood)}{int(low_sleep)}|{topic}"
+    return REPLIES.get_or_compute(
+        key, lambda: compose_coaching_response(goal, fitness_level, low_mood, low_sleep, topic)
+    )
+
+
+def compose_coaching_response(
+    goal: str,
+    fitness_level: str,
+    low_mood: bool,
+    low_sleep: bool,
+    topic: Optional[str]
+) -> str:
+    """Coaching reply for a goal, level, recovery flags and question topic."""
     goal_advice = {
         "muscle_gain": "Focus on progressive overload, high protein intake (1g per lb bodyweight), and adequate sleep. Consistency is key!",
         "fat_loss": "Create a caloric deficit of 300-500 calories, maintain high protein to preserve muscle, and track your macros closely.",
@@ -195,22 +233,13 @@ def generate_coaching_response(
     base_response = f"Based on your {goal} goal, {goal_advice.get(goal, 'stay consistent with training and nutrition.')} {level_advice.get(fitness_level, '')}"
     
     # Add metric context if available
-    if latest_metric:
-        if latest_metric.mood < 5:
-            base_response += " I notice your mood might be low - make sure you're getting quality sleep and managing stress."
-        if latest_metric.sleep_hours < 7:
-            base_response += " Your sleep seems low - aim for 7-9 hours for optimal recovery and hormone balance."
+    if low_mood:
+        base_response += " I notice your mood might be low - make sure you're getting quality sleep and managing stress."
+    if low_sleep:
+        base_response += " Your sleep seems low - aim for 7-9 hours for optimal recovery and hormone balance."
     
     # Answer specific questions
-    if "sleep" in message.lower():
-        base_response += " Sleep is crucial! Aim for 7-9 hours, maintain a consistent schedule, and keep your room cool and dark."
-    elif "motivation" in message.lower():
-        base_response += " Stay motivated by tracking progress visually, celebrating small wins, and remembering why you started!"
-    elif "plateau" in message.lower():
-        base_response += " Plateaus are normal! Try varying your rep ranges, changing exercises, or increasing training frequency."
-    elif "nutrition" in message.lower():
-        base_response += " Nutrition is 70% of the battle. Track your macros, stay consistent, and adjust based on results."
-    elif "recovery" in message.lower():
-        base_response += " Recovery is when the gains happen! Prioritize sleep, manage stress, and consider deload weeks every 4-6 weeks."
+    if topic:
+        base_response += " " + TOPICS[topic]
     
     return base_response
\ No newline at end of file
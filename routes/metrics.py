@@ -1,7 +1,16 @@
 from fastapi import APIRouter, HTTPException, Depends
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from models.entities import User, Metric, get_db
+from datetime import datetime, timedelta
+from typing import Optional
+from models.entities import User, Metric, get_db, get_read_db
+from models.partitions import metric_source
 from models.schemas import MetricLog, SuccessResponse
+from models.series import FIELD_NAMES, to_epoch
+from services.rollups import apply_metric, read_rollups, rollup_to_dict, RESOLUTION_NAMES
+
+# Upper bound on points returned by /series, whatever the client asks for
+MAX_SERIES_POINTS = 2000
 
 router = APIRouter(
     prefix="/api/v1/users/metrics",
@@ -98,6 +107,10 @@ def log_metrics(
     )
     
     db.add(db_metric)
+    
+    # Keep day/week/month rollups current in the same transaction
+    apply_metric(db, db_metric)
+    
     db.commit()
     
     return {
@@ -110,7 +123,7 @@ def log_metrics(
 def get_metrics(
     user_id: str,
     limit: int = None,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Get all metrics for a user
@@ -189,7 +202,7 @@ def get_metrics(
 @router.get("/latest")
 def get_latest_metrics(
     user_id: str,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Get the most recent metrics for a user
@@ -231,19 +244,22 @@ def get_latest_metrics(
 def get_metric_trends(
     user_id: str,
     days: int = 30,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Get metric trends over time
     
     Analyzes trends in weight, strength, and mood over specified period.
     
+    Reads the pre-aggregated rollup table at the coarsest resolution that
+    still gives enough buckets for the window (daily up to ~5 weeks, weekly
+    up to ~2 years, monthly beyond), so a 1-year window reads ~52 rows.
+    The window is rounded out to whole buckets.
+    
     Query parameters:
     - user_id: The user ID
     - days: Number of days to analyze (default: 30)
     """
-    from datetime import datetime, timedelta
-    
     # Verify user exists
     user = db.query(User).filter(User.user_id == user_id).first()
     if not user:
@@ -252,28 +268,27 @@ def get_metric_trends(
             detail=f"User '{user_id}' not found"
         )
     
-    cutoff_date = datetime.utcnow() - timedelta(days=days)
-    metrics = db.query(Metric).filter(
-        Metric.user_id == user_id,
-        Metric.created_at >= cutoff_date
-    ).order_by(Metric.created_at).all()
+    resolution, buckets = read_rollups(db, user_id, days)
+    metric_count = sum(b.count for b in buckets)
     
-    if len(metrics) < 2:
+    if metric_count < 2:
         raise HTTPException(
             status_code=400,
-            detail=f"Need at least 2 metrics to calculate trends (found {len(metrics)})"
+            detail=f"Need at least 2 metrics to calculate trends (found {metric_count})"
         )
     
     # Calculate trends
-    weight_change = metrics[-1].weight_kg - metrics.weight_kg
-    strength_change = metrics[-1].strength_1rm - metrics.strength_1rm
-    avg_mood = sum(m.mood for m in metrics) / len(metrics)
-    avg_sleep = sum(m.sleep_hours for m in metrics) / len(metrics)
+    first, last = buckets[0], buckets[-1]
+    weight_change = last.weight_kg_last - first.weight_kg_first
+    strength_change = last.strength_1rm_last - first.strength_1rm_first
+    avg_mood = sum(b.mood_sum for b in buckets) / metric_count
+    avg_sleep = sum(b.sleep_hours_sum for b in buckets) / metric_count
     
     return {
         "status": "success",
         "period_days": days,
-        "metric_count": len(metrics),
+        "resolution": resolution,
+        "metric_count": metric_count,
         "trends": {
             "weight_change_kg": round(weight_change, 1),
             "strength_change_kg": round(strength_change, 1),
@@ -281,4 +296,163 @@ def get_metric_trends(
             "avg_sleep_hours": round(avg_sleep, 1),
             "trend_direction": "improving" if strength_change > 0 else "declining"
         }
+    }
+
+
+@router.get("/rollups")
+def get_metric_rollups(
+    user_id: str,
+    days: int = 90,
+    resolution: Optional[str] = None,
+    db: Session = Depends(get_read_db)
+):
+    """
+    Get aggregated metric buckets for charting
+    
+    Returns min, max, mean and last of every metric per bucket. Unless a
+    resolution is given, the coarsest one that fits the window is used.
+    
+    Query parameters:
+    - user_id: The user ID
+    - days: Number of days to cover (default: 90)
+    - resolution: Optional "day", "week" or "month"
+    
+    Example request:
+    ```
+    GET /api/v1/users/metrics/rollups?user_id=alice&days=365
+    ```
+    
+    Response:
+    ```json
+    {
+        "status": "success",
+        "resolution": "week",
+        "count": 52,
+        "buckets": [
+            {
+                "bucket_start": "2025-10-20T00:00:00",
+                "count": 7,
+                "weight_kg": {"min": 65.1, "max": 65.8, "mean": 65.5, "last": 65.6},
+                ...
+            },
+            ...
+        ]
+    }
+    ```
+    """
+    # Verify user exists
+    user = db.query(User).filter(User.user_id == user_id).first()
+    if not user:
+        raise HTTPException(
+            status_code=404,
+            detail=f"User '{user_id}' not found"
+        )
+    
+    if resolution is not None and resolution not in RESOLUTION_NAMES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Resolution must be one of: {', '.join(RESOLUTION_NAMES)}"
+        )
+    
+    resolution, buckets = read_rollups(db, user_id, days, resolution=resolution)
+    
+    return {
+        "status": "success",
+        "period_days": days,
+        "resolution": resolution,
+        "count": len(buckets),
+        "buckets": [rollup_to_dict(b) for b in buckets]
+    }
+
+
+@router.get("/series")
+def get_metric_series(
+    user_id: str,
+    field: str = "strength_1rm",
+    points: int = 200,
+    days: Optional[int] = None,
+    db: Session = Depends(get_read_db)
+):
+    """
+    Get a downsampled metric series for charting
+    
+    Reduces the raw history of one metric to at most `points` points with
+    Largest-Triangle-Three-Buckets, which keeps the visual shape (peaks,
+    dips, trend) of the full series while bounding the payload size.
+    
+    Query parameters:
+    - user_id: The user ID
+    - field: weight_kg, strength_1rm, sleep_hours, mood or energy (default: strength_1rm)
+    - points: Maximum points to return, 3-2000 (default: 200)
+    - days: Only use the last N days (optional, default: full history)
+    
+    Example request:
+    ```
+    GET /api/v1/users/metrics/series?user_id=alice&field=strength_1rm&points=200
+    ```
+    
+    Response:
+    ```json
+    {
+        "status": "success",
+        "field": "strength_1rm",
+        "total_points": 1460,
+        "count": 200,
+        "points": [
+            {"created_at": "2022-01-03T07:30:00", "value": 120.0},
+            ...
+        ]
+    }
+    ```
+    """
+    # NumPy is only needed here; keep it out of app import time
+    import numpy as np
+    from services.downsampling import lttb_indices
+    
+    # Verify user exists
+    user = db.query(User).filter(User.user_id == user_id).first()
+    if not user:
+        raise HTTPException(
+            status_code=404,
+            detail=f"User '{user_id}' not found"
+        )
+    
+    if field not in FIELD_NAMES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Field must be one of: {', '.join(FIELD_NAMES)}"
+        )
+    
+    if points < 3 or points > MAX_SERIES_POINTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Points must be between 3 and {MAX_SERIES_POINTS}"
+        )
+    
+    # A days window only reads the metric partitions it overlaps
+    since = datetime.utcnow() - timedelta(days=days) if days else None
+    source = metric_source(db, Metric, since=since)
+    query = select(source.created_at, getattr(source, field)).where(
+        source.user_id == user_id
+    )
+    if since:
+        query = query.where(source.created_at >= since)
+    rows = db.execute(query.order_by(source.created_at)).all()
+    
+    timestamps = np.fromiter((to_epoch(r[0]) for r in rows), dtype=np.float64, count=len(rows))
+    values = np.fromiter((r[1] for r in rows), dtype=np.float64, count=len(rows))
+    keep = lttb_indices(timestamps, values, points)
+    
+    return {
+        "status": "success",
+        "field": field,
+        "total_points": len(rows),
+        "count": len(keep),
+        "points": [
+            {
+                "created_at": rows[i][0].isoformat(),
+                "value": rows[i][1]
+            }
+            for i in keep.tolist()
+        ]
     }
\ No newline at end of file
@@ -1,7 +1,20 @@
-from fastapi import APIRouter, HTTPException, Depends
+import json
+from fastapi import APIRouter, HTTPException, Depends, Request
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from typing import Optional
 from datetime import datetime
-from models.entities import User, Plan, Metric, get_db
+from apps.cache import SingleFlight
+from apps.conditional import etag_headers, make_etag, matches, not_modified
+from apps.instrumentation import span, timings
+from apps.responses import RawJSONResponse, embed_raw
+from models.entities import User, Plan, get_db, get_read_db
+from models.ids import new_id
+from services.history import fetch_metric_history
+from services.plan_service import (
+    LIVE_PLAN_ROW, PLAN_ROW, generated_plan, generation_key, plan_patch, plan_and_base, reconstruct, store_plan
+)
+from services.versions import current_plan_stamp
 from models.schemas import PlanRequest, PlanResponse, SuccessResponse
 from agents.orchestrator import OrchestratorAgent
 
@@ -11,13 +24,29 @@ router = APIRouter(
     responses={404: {"description": "Not found"}}
 )
 
-orchestrator = OrchestratorAgent()
+# Concurrent generate calls for one user and week (double clicks, client
+# retries) share a single run in this worker
+GENERATIONS = SingleFlight()
+
+
+def get_orchestrator(request: Request) -> OrchestratorAgent:
+    """
+    Dependency returning the worker's shared orchestrator.
+    
+    Built once in the app lifespan (apps.api); created on first use if the
+    app was started without running lifespan.
+    """
+    orchestrator = getattr(request.app.state, "orchestrator", None)
+    if orchestrator is None:
+        orchestrator = request.app.state.orchestrator = OrchestratorAgent()
+    return orchestrator
 
 
 @router.post("/generate", response_model=PlanResponse)
 def generate_plan(
     request: PlanRequest,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    orchestrator: OrchestratorAgent = Depends(get_orchestrator)
 ):
     """
     Generate a personalized fitness plan
@@ -29,7 +58,8 @@ def generate_plan(
     4. Coaching Agent - Motivation strategies and habit stacking
     5. Orchestrator - Synthesizes all recommendations
     
-    Generates complete plan in ~1.2 seconds with 87.5% accuracy.
+    Generates complete plan with 87.5% accuracy; agent time is tens of
+    microseconds (benchmarks/agents.py), the rest is database work.
     
     Example request:
     ```json
@@ -44,9 +74,34 @@ def generate_plan(
     - Nutrition plan (TDEE-based, macro splits, 4 meals/day)
     - Coaching strategy (motivation, habit stacking, barriers)
     - Summary and next steps
+    - timings: per-step milliseconds (only with "include_timings": true)
+    
+    Requests are idempotent: concurrent calls for the same user and week
+    share one run, and a request whose inputs (profile, metric history,
+    week) match a stored plan returns that plan instead of a copy, also
+    when another worker stored it.
     """
+    with timings() as breakdown:
+        response, _ = GENERATIONS.do(
+            (request.user_id, request.week),
+            lambda: _generate_plan(request, db, orchestrator)
+        )
+    
+    response = dict(response)  # shared with the other callers
+    if request.include_timings:
+        response["timings"] = breakdown
+    return response
+
+
+def _generate_plan(
+    request: PlanRequest,
+    db: Session,
+    orchestrator: OrchestratorAgent
+) -> dict:
+    """Body of generate_plan; every step runs in an instrumentation span"""
     # Get user
-    user = db.query(User).filter(User.user_id == request.user_id).first()
+    with span("db.user"):
+        user = db.query(User).filter(User.user_id == request.user_id).first()
     if not user:
         raise HTTPException(
             status_code=404,
@@ -60,22 +115,18 @@ def generate_plan(
             detail="Week must be between 1 and 52"
         )
     
-    # Get user's metrics history
-    metrics_history = db.query(Metric).filter(
-        Metric.user_id == request.user_id
-    ).order_by(Metric.created_at).all()
-    
-    metrics_data = [
-        {
-            "weight_kg": m.weight_kg,
-            "strength_1rm": m.strength_1rm,
-            "sleep_hours": m.sleep_hours,
-            "mood": m.mood,
-            "energy": m.energy,
-            "created_at": m.created_at.isoformat()
-        }
-        for m in metrics_history
-    ]
+    # Get only the recent metrics history the agents declared they need
+    with span("db.history"):
+        metrics_data = fetch_metric_history(
+            db, request.user_id, orchestrator.history_window
+        )
+    
+    # A retry with the same inputs gets the stored plan without a new run
+    request_key = generation_key(request.user_id, request.week, user.version, metrics_data)
+    with span("db.existing_plan"):
+        existing = _stored_response(db, request_key)
+    if existing is not None:
+        return existing
     
     # Build user profile
     user_profile = {
@@ -91,29 +142,49 @@ def generate_plan(
     
     # Generate recommendation using orchestrator
     start_time = datetime.utcnow()
-    recommendation = orchestrator.synthesize_recommendation(
-        user_profile,
-        metrics_data,
-        request.week
-    )
+    with span("orchestrator"):
+        recommendation = orchestrator.synthesize_recommendation(
+            user_profile,
+            metrics_data,
+            request.week
+        )
     generation_time = (datetime.utcnow() - start_time).total_seconds() * 1000
     
-    # Save plan to database
-    plan_id = f"plan_{datetime.utcnow().timestamp()}"
-    db_plan = Plan(
-        plan_id=plan_id,
-        user_id=request.user_id,
-        week=request.week,
-        plan_data=recommendation
-    )
-    
-    db.add(db_plan)
-    db.commit()
+    # Save plan to database: a patch on last week's plan, or shared
+    # sections once plus a small manifest. The request key is unique: if
+    # another worker stored a plan for the same inputs meanwhile, return that.
+    plan_id = new_id("plan_")
+    try:
+        with span("db.insert_plan"):
+            store_plan(db, plan_id, request.user_id, request.week, recommendation, request_key=request_key)
+            db.flush()
+    except IntegrityError:
+        db.rollback()
+        with span("db.existing_plan"):
+            existing = _stored_response(db, request_key)
+        if existing is None:
+            raise
+        return existing
+    with span("db.commit"):
+        db.commit()
     
+    return _plan_response(plan_id, request.week, generation_time, recommendation)
+
+
+def _stored_response(db: Session, request_key: str) -> Optional[dict]:
+    """Response for the plan already stored for a generation key, None if there is none"""
+    existing = generated_plan(db, request_key)
+    if existing is None:
+        return None
+    stored = json.loads(reconstruct(db, existing))
+    return _plan_response(existing.plan_id, existing.week, 0, stored)
+
+
+def _plan_response(plan_id: str, week: int, generation_time: float, recommendation: dict) -> dict:
     return {
         "status": "success",
         "plan_id": plan_id,
-        "week": request.week,
+        "week": week,
         "generation_time_ms": int(generation_time),
         "components": {
             "workout": recommendation["workout_plan"],
@@ -124,10 +195,11 @@ def generate_plan(
     }
 
 
-@router.get("/current")
+@router.get("/current", response_class=RawJSONResponse)
 def get_current_plan(
     user_id: str,
-    db: Session = Depends(get_db)
+    request: Request,
+    db: Session = Depends(get_read_db)
 ):
     """
     Get the current (most recent) plan for a user
@@ -146,8 +218,10 @@ def get_current_plan(
     ```json
     {
         "status": "success",
-        "plan_id": "plan_1704516124.5678",
+        "plan_id": "plan_01HKGZ3Y4R8Q2M6T9VXBWJ5N7C",
+        "user_id": "alice",
         "week": 1,
+        "created_at": "2024-01-06T05:02:04.567800",
         "plan": {
             "workout_plan": {...},
             "nutrition_plan": {...},
@@ -156,7 +230,20 @@ def get_current_plan(
         }
     }
     ```
+    
+    The plan JSON is reassembled from its stored sections or delta chain
+    (or copied as is for inline plans) and never parsed by the route.
+    
+    The response carries an ETag; while the user has no newer plan, a
+    request sending it in If-None-Match gets an empty 304 after a single
+    index lookup.
     """
+    stamp = current_plan_stamp(db, user_id)
+    if stamp:
+        etag = make_etag("plans.current", *stamp)
+        if matches(request, etag):
+            return not_modified(etag)
+    
     # Verify user exists
     user = db.query(User).filter(User.user_id == user_id).first()
     if not user:
@@ -165,10 +252,8 @@ def get_current_plan(
             detail=f"User '{user_id}' not found"
         )
     
-    # Get most recent plan
-    plan = db.query(Plan).filter(
-        Plan.user_id == user_id
-    ).order_by(Plan.created_at.desc()).first()
+    # Get most recent plan (the one just stamped)
+    plan = db.execute(PLAN_ROW.where(Plan.id == stamp[0])).first() if stamp else None
     
     if not plan:
         raise HTTPException(
@@ -176,20 +261,20 @@ def get_current_plan(
             detail=f"No plans found for user '{user_id}'. Generate a plan first."
         )
     
-    return {
+    return RawJSONResponse(embed_raw({
         "status": "success",
         "plan_id": plan.plan_id,
+        "user_id": plan.user_id,
         "week": plan.week,
-        "created_at": plan.created_at.isoformat(),
-        "plan": plan.plan_data
-    }
+        "created_at": plan.created_at.isoformat()
+    }, "plan", reconstruct(db, plan)), headers=etag_headers(etag))
 
 
 @router.get("/history")
 def get_plan_history(
     user_id: str,
     limit: int = 10,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Get plan generation history
@@ -232,17 +317,17 @@ def get_plan_history(
     }
 
 
-@router.get("/{plan_id}")
+@router.get("/{plan_id}", response_class=RawJSONResponse)
 def get_plan_by_id(
     plan_id: str,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Get specific plan by ID
     
-    Retrieves a specific plan with all details.
+    Retrieves a specific plan with all details (stored JSON, not re-encoded).
     """
-    plan = db.query(Plan).filter(Plan.plan_id == plan_id).first()
+    plan = db.execute(LIVE_PLAN_ROW.where(Plan.plan_id == plan_id)).first()
     
     if not plan:
         raise HTTPException(
@@ -250,11 +335,69 @@ def get_plan_by_id(
             detail=f"Plan '{plan_id}' not found"
         )
     
-    return {
+    return RawJSONResponse(embed_raw({
         "status": "success",
         "plan_id": plan.plan_id,
         "user_id": plan.user_id,
         "week": plan.week,
-        "created_at": plan.created_at.isoformat(),
-        "plan": plan.plan_data
-    }
\ No newline at end of file
+        "created_at": plan.created_at.isoformat()
+    }, "plan", reconstruct(db, plan)))
+
+
+@router.get("/{plan_id}/diff", response_class=RawJSONResponse)
+def get_plan_diff(
+    plan_id: str,
+    against: Optional[str] = None,
+    db: Session = Depends(get_read_db)
+):
+    """
+    Get what changed between two plans, as a JSON Patch (RFC 6902)
+    
+    A client holding plan `against` applies the patch to get `plan_id`,
+    fetching a few hundred bytes instead of the whole plan. When the plan
+    is stored as a delta on `against`, the stored patch is returned as is.
+    
+    Query parameters:
+    - against: Plan ID to diff from (default: the user's previous plan)
+    
+    Example request:
+    ```
+    GET /api/v1/plans/plan_01HKGZ3Y4R8Q2M6T9VXBWJ5N7C/diff?against=plan_01HJYB5T0E3K8P1R6ZQ4W9D2MA
+    ```
+    
+    Response:
+    ```json
+    {
+        "status": "success",
+        "plan_id": "plan_01HKGZ3Y4R8Q2M6T9VXBWJ5N7C",
+        "against": "plan_01HJYB5T0E3K8P1R6ZQ4W9D2MA",
+        "week": 2,
+        "against_week": 1,
+        "patch": [
+            {"op": "replace", "path": "/workout_plan/week", "value": 2},
+            ...
+        ]
+    }
+    ```
+    """
+    plan, base = plan_and_base(db, plan_id, against)
+    if not plan:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Plan '{plan_id}' not found"
+        )
+    
+    if not base:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Plan '{against}' not found" if against is not None
+            else f"Plan '{plan_id}' is the user's first plan; pass 'against'"
+        )
+    
+    return RawJSONResponse(embed_raw({
+        "status": "success",
+        "plan_id": plan.plan_id,
+        "against": base.plan_id,
+        "week": plan.week,
+        "against_week": base.week
+    }, "patch", plan_patch(db, plan, base)))
@@ -1,7 +1,13 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
-from models.entities import User, Metric, Plan, ChatMessage, get_db
+from apps.conditional import etag_headers, make_etag, matches, not_modified
+from apps.responses import FastJSONResponse
+from models.entities import User, get_read_db
+from models.series import HistoryWindow
+from services.history import fetch_metric_history
+from services.dashboard import get_dashboard as get_dashboard_snapshot
+from services.versions import dashboard_stamp
 
 router = APIRouter(
     prefix="/api/v1/progress",
@@ -9,11 +15,15 @@ router = APIRouter(
     responses={404: {"description": "Not found"}}
 )
 
+# Metric history each endpoint reads (see services.history)
+PREDICTION_WINDOW = HistoryWindow(last_n=5)
+INSIGHTS_WINDOW = HistoryWindow(last_n=3)
+
 
 @router.get("/predictions")
 def get_predictions(
     user_id: str,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Get 4-week strength predictions
@@ -26,6 +36,9 @@ def get_predictions(
     - 0.60-0.84: Medium confidence (2-4 data points)
     - <0.60: Low confidence (insufficient data)
     
+    Only the 5 most recent entries are read; `data_points` is the number
+    of entries the prediction is based on.
+    
     Query parameters:
     - user_id: The user ID
     
@@ -55,10 +68,8 @@ def get_predictions(
             detail=f"User '{user_id}' not found"
         )
     
-    # Get metrics
-    metrics = db.query(Metric).filter(
-        Metric.user_id == user_id
-    ).order_by(Metric.created_at).all()
+    # Get recent metrics
+    metrics = fetch_metric_history(db, user_id, PREDICTION_WINDOW)
     
     if not metrics:
         raise HTTPException(
@@ -66,17 +77,16 @@ def get_predictions(
             detail=f"No metrics found for user '{user_id}'"
         )
     
-    latest = metrics[-1]
+    strength = metrics.column("strength_1rm")
     
     # Calculate prediction based on available data
     if len(metrics) >= 5:
         # Linear regression with sufficient data
-        recent_metrics = metrics[-5:]
-        strength_trend = (recent_metrics[-1].strength_1rm - recent_metrics.strength_1rm) / 4
+        strength_trend = (strength[-1] - strength[-5]) / 4
         confidence = 0.85
     elif len(metrics) >= 2:
         # Simple linear prediction
-        strength_trend = latest.strength_1rm - metrics[-2].strength_1rm
+        strength_trend = strength[-1] - strength[-2]
         confidence = 0.60 + (len(metrics) * 0.08)
     else:
         # Insufficient data
@@ -84,14 +94,14 @@ def get_predictions(
         confidence = 0.30
     
     # 4-week prediction (assuming 1 week per metric entry)
-    strength_4w = latest.strength_1rm + (strength_trend * 4)
+    strength_4w = strength[-1] + (strength_trend * 4)
     trend_direction = "increasing" if strength_trend > 0 else "declining" if strength_trend < 0 else "stable"
     
     return {
         "status": "success",
         "predictions": {
             "strength_4w": round(strength_4w, 1),
-            "current_strength": latest.strength_1rm,
+            "current_strength": strength[-1],
             "weekly_gain": round(strength_trend, 1),
             "confidence": round(min(confidence, 1.0), 2),
             "trend": trend_direction,
@@ -103,7 +113,8 @@ def get_predictions(
 @router.get("/dashboard")
 def get_dashboard(
     user_id: str,
-    db: Session = Depends(get_db)
+    request: Request,
+    db: Session = Depends(get_read_db)
 ):
     """
     Get complete progress dashboard
@@ -122,83 +133,40 @@ def get_dashboard(
     ```
     GET /api/v1/progress/dashboard?user_id=alice
     ```
+    
+    The response carries an ETag stamped from the profile version and the
+    newest metric, plan and message and their counts; polling with If-None-Match returns
+    an empty 304 after one single-row query until one of them changes.
+    Otherwise the per-user snapshot (services.dashboard) is served if it
+    matches the same stamp, and rebuilt if not.
     """
     # Verify user exists
-    user = db.query(User).filter(User.user_id == user_id).first()
-    if not user:
+    stamp = dashboard_stamp(db, user_id)
+    if not stamp:
         raise HTTPException(
             status_code=404,
             detail=f"User '{user_id}' not found"
         )
     
-    # Get all data
-    metrics = db.query(Metric).filter(
-        Metric.user_id == user_id
-    ).order_by(Metric.created_at).all()
-    
-    plans = db.query(Plan).filter(
-        Plan.user_id == user_id
-    ).order_by(Plan.created_at.desc()).all()
-    
-    chat_history = db.query(ChatMessage).filter(
-        ChatMessage.user_id == user_id
-    ).order_by(ChatMessage.created_at.desc()).limit(5).all()
+    etag = make_etag("progress.dashboard", *stamp, datetime.utcnow().date())
+    if matches(request, etag):
+        return not_modified(etag)
     
-    # Calculate statistics
-    latest_metric = metrics[-1] if metrics else None
-    weight_change = None
-    strength_change = None
-    
-    if len(metrics) >= 2:
-        weight_change = latest_metric.weight_kg - metrics.weight_kg
-        strength_change = latest_metric.strength_1rm - metrics.strength_1rm
+    # Materialized snapshot, rebuilt only when the stamp moved past it
+    dashboard = get_dashboard_snapshot(db, user_id, stamp)
+    if dashboard is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"User '{user_id}' not found"
+        )
     
-    return {
-        "status": "success",
-        "user_profile": {
-            "user_id": user.user_id,
-            "name": user.name,
-            "age": user.age,
-            "weight_kg": user.weight_kg,
-            "height_cm": user.height_cm,
-            "goal": user.goal,
-            "fitness_level": user.fitness_level,
-            "equipment": user.equipment
-        },
-        "statistics": {
-            "total_metrics": len(metrics),
-            "total_plans": len(plans),
-            "total_messages": db.query(ChatMessage).filter(
-                ChatMessage.user_id == user_id
-            ).count(),
-            "days_active": (datetime.utcnow() - user.created_at).days if user.created_at else 0
-        },
-        "latest_metrics": {
-            "weight_kg": latest_metric.weight_kg if latest_metric else None,
-            "strength_1rm": latest_metric.strength_1rm if latest_metric else None,
-            "sleep_hours": latest_metric.sleep_hours if latest_metric else None,
-            "mood": latest_metric.mood if latest_metric else None,
-            "energy": latest_metric.energy if latest_metric else None,
-            "recorded_at": latest_metric.created_at.isoformat() if latest_metric else None
-        },
-        "progress": {
-            "weight_change_kg": round(weight_change, 1) if weight_change else None,
-            "strength_change_kg": round(strength_change, 1) if strength_change else None,
-            "trend": "improving" if strength_change and strength_change > 0 else "declining" if strength_change and strength_change < 0 else "stable"
-        },
-        "latest_plan": {
-            "plan_id": plans.plan_id if plans else None,
-            "week": plans.week if plans else None,
-            "created_at": plans.created_at.isoformat() if plans else None
-        } if plans else None,
-        "recent_chat": len(chat_history)
-    }
+    return FastJSONResponse(dashboard, headers=etag_headers(etag))
 
 
 @router.get("/insights")
 def get_insights(
     user_id: str,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Get AI-generated insights
@@ -213,9 +181,7 @@ def get_insights(
             detail=f"User '{user_id}' not found"
         )
     
-    metrics = db.query(Metric).filter(
-        Metric.user_id == user_id
-    ).order_by(Metric.created_at).all()
+    metrics = fetch_metric_history(db, user_id, INSIGHTS_WINDOW)
     
     insights = []
     
@@ -223,6 +189,8 @@ def get_insights(
         insights.append("Start logging metrics to get personalized insights!")
     else:
         latest = metrics[-1]
+        strength = metrics.column("strength_1rm")
+        weight = metrics.column("weight_kg")
         
         # Sleep insight
         if latest.sleep_hours < 7:
@@ -238,7 +206,7 @@ def get_insights(
         
         # Strength progress
         if len(metrics) >= 2:
-            recent_strength = latest.strength_1rm - metrics[-2].strength_1rm
+            recent_strength = strength[-1] - strength[-2]
             if recent_strength > 5:
                 insights.append(f"💪 Strength Surge: +{recent_strength}kg increase. You're making serious gains!")
             elif recent_strength < -5:
@@ -248,7 +216,7 @@ def get_insights(
         
         # Weight trend
         if len(metrics) >= 3:
-            recent_weight = latest.weight_kg - metrics[-2].weight_kg
+            recent_weight = weight[-1] - weight[-2]
             if user.goal == "muscle_gain" and recent_weight > 0.5:
                 insights.append(f"📈 Weight Gain: Good! You're gaining weight for muscle growth.")
             elif user.goal == "fat_loss" and recent_weight < -0.5:
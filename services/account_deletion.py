@@ -0,0 +1,264 @@
+"""
+Asynchronous, batched account deletion.
+
+Deleting a heavy user's metrics, rollups, plans and chat history in one
+transaction holds the write lock for seconds. Instead:
+
+1. start_deletion() marks the user deleted (deleted_at) and records an
+   AccountDeletion job with the rows to delete, in one short
+   transaction. From then on every ORM read hides the user
+   (models.database._hide_deleted_users), so the account is gone for
+   the API immediately.
+2. A runner deletes the child rows table by table, at most
+   DELETION_BATCH_SIZE per transaction, pausing DELETION_PAUSE_MS
+   between batches so other writers get the lock, and records progress
+   on the job after every batch.
+3. Once no child rows are left it deletes the user row and marks the job
+   done.
+
+The API runs the job in the background of the DELETE request
+(run_deletion_async). Batches are idempotent and jobs are claimed with a
+conditional update, so a job whose worker died (no progress for
+DELETION_STALE_SECONDS) or that failed can be resumed by any runner:
+
+    python -m services.account_deletion resume
+    python -m services.account_deletion status
+
+Plan sections in plan_blobs are content-addressed and shared between
+users, so they are not the user's rows and are left in place.
+"""
+import argparse
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import and_, delete, func, or_, select, update
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.concurrency import run_in_threadpool
+
+from apps.config import settings
+from models import querylog
+from models.entities import AccountDeletion, ChatMessage, Metric, MetricRollup, Plan, SessionLocal, User
+from models.ids import new_id
+from services import dashboard, profiles
+
+
+logger = logging.getLogger("fitflow.deletion")
+
+# Tables holding a user's rows, in deletion order
+CHILD_TABLES = (
+    ("chat_messages", ChatMessage),
+    ("metric_rollups", MetricRollup),
+    ("metrics", Metric),
+    ("plans", Plan),
+)
+
+
+def _count(model, user_id: str):
+    return select(func.count()).select_from(model).where(model.user_id == user_id).scalar_subquery()
+
+
+def start_deletion(db: Session, user_id: str) -> Optional[AccountDeletion]:
+    """
+    Hide a user and create the job deleting their data; commits.
+
+    Returns:
+        The pending job, None if there is no such (live) user
+    """
+    user = db.query(User).filter(User.user_id == user_id).first()
+    if not user:
+        return None
+
+    counts = db.execute(select(*[_count(model, user_id) for _, model in CHILD_TABLES])).one()
+    user.deleted_at = datetime.utcnow()
+    user.version = User.version + 1  # new ETags, stale cache entries
+    job = AccountDeletion(
+        job_id=new_id("del_"),
+        user_id=user_id,
+        status="pending",
+        total_rows=sum(counts),
+        deleted_rows=0,
+        progress={name: 0 for name, _ in CHILD_TABLES}
+    )
+    db.add(job)
+    db.commit()
+    profiles.PROFILES.delete(user_id)
+    dashboard.SNAPSHOTS.delete(dashboard.snapshot_key(user_id))
+    return job
+
+
+def claim(db: Session, job_id: str) -> Optional[AccountDeletion]:
+    """
+    Take a job for this runner: pending, failed, or running without
+    progress for DELETION_STALE_SECONDS (its runner died).
+
+    Returns:
+        The job, None if it is done or another runner holds it
+    """
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=settings.DELETION_STALE_SECONDS)
+    claimed = db.execute(
+        update(AccountDeletion)
+        .where(
+            AccountDeletion.job_id == job_id,
+            or_(
+                AccountDeletion.status.in_(("pending", "failed")),
+                and_(AccountDeletion.status == "running", AccountDeletion.updated_at < stale)
+            )
+        )
+        .values(status="running", error=None, updated_at=now)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    if not claimed:
+        return None
+    return db.execute(select(AccountDeletion).where(AccountDeletion.job_id == job_id)).scalar_one()
+
+
+def delete_batch(db: Session, job: AccountDeletion, batch_size: int) -> bool:
+    """
+    One transaction of a job: up to `batch_size` rows of the first table
+    that still has rows of the user, or else the user row itself.
+
+    Returns:
+        True once the job is done
+    """
+    for name, model in CHILD_TABLES:
+        # Newest first: a delta plan is always deleted before its base
+        ids = db.execute(
+            select(model.id).where(model.user_id == job.user_id).order_by(model.id.desc()).limit(batch_size)
+        ).scalars().all()
+        if ids:
+            db.execute(delete(model).where(model.id.in_(ids)).execution_options(synchronize_session=False))
+            job.progress = dict(job.progress or {}, **{name: (job.progress or {}).get(name, 0) + len(ids)})
+            job.deleted_rows += len(ids)
+            job.updated_at = datetime.utcnow()
+            db.commit()
+            return False
+
+    db.execute(
+        delete(User)
+        .where(User.user_id == job.user_id, User.deleted_at.is_not(None))
+        .execution_options(synchronize_session=False)
+    )
+    dashboard.invalidate(db, job.user_id)  # a bulk delete fires no ORM events
+    job.status = "done"
+    job.updated_at = job.finished_at = datetime.utcnow()
+    db.commit()
+    return True
+
+
+def deletion_steps(db: Session, job_id: str, batch_size: Optional[int] = None) -> Iterator[AccountDeletion]:
+    """
+    Claim a job and run it batch by batch, yielding the job after each
+    batch so the caller decides how to pause. A failure marks the job
+    failed (resumable) and is re-raised.
+    """
+    job = claim(db, job_id)
+    if job is None:
+        return
+    batch_size = batch_size or settings.DELETION_BATCH_SIZE
+    try:
+        while not delete_batch(db, job, batch_size):
+            yield job
+    except Exception as exc:
+        db.rollback()
+        job.status = "failed"
+        job.error = f"{type(exc).__name__}: {exc}"[:1000]
+        job.updated_at = datetime.utcnow()
+        db.commit()
+        raise
+    yield job
+
+
+def run_deletion(db: Session, job_id: str, batch_size: Optional[int] = None, pause: Optional[float] = None) -> None:
+    """Run a job to completion in this thread (CLI, scripts)."""
+    pause = settings.DELETION_PAUSE_MS / 1000 if pause is None else pause
+    for job in deletion_steps(db, job_id, batch_size):
+        if job.status != "done" and pause:
+            time.sleep(pause)
+
+
+async def run_deletion_async(bind, job_id: str) -> None:
+    """
+    Run a job from the event loop: each batch in the threadpool, an
+    asyncio sleep between batches. Used as a background task of the
+    DELETE request, on a session of its own bound to `bind`; its
+    statements are not counted against that request's query budget.
+    """
+    db = sessionmaker(bind=bind, autoflush=False)()
+    steps = deletion_steps(db, job_id)
+    try:
+        with querylog.track():
+            while True:
+                job = await run_in_threadpool(next, steps, None)
+                if job is None or job.status == "done":
+                    return
+                await asyncio.sleep(settings.DELETION_PAUSE_MS / 1000)
+    except Exception:
+        logger.exception("Account deletion %s failed", job_id)
+    finally:
+        await run_in_threadpool(db.close)
+
+
+def job_status(job: AccountDeletion) -> Dict[str, Any]:
+    """Progress report of a job."""
+    return {
+        "job_id": job.job_id,
+        "user_id": job.user_id,
+        "status": job.status,
+        "deleted_rows": job.deleted_rows,
+        "total_rows": job.total_rows,
+        "percent": round(100 * job.deleted_rows / job.total_rows, 1) if job.total_rows else (100.0 if job.status == "done" else 0.0),
+        "progress": job.progress or {},
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+def resumable_jobs(db: Session) -> List[str]:
+    """Ids of jobs a runner may claim: pending, failed or abandoned."""
+    stale = datetime.utcnow() - timedelta(seconds=settings.DELETION_STALE_SECONDS)
+    return db.execute(
+        select(AccountDeletion.job_id).where(or_(
+            AccountDeletion.status.in_(("pending", "failed")),
+            and_(AccountDeletion.status == "running", AccountDeletion.updated_at < stale)
+        )).order_by(AccountDeletion.id)
+    ).scalars().all()
+
+
+def main():
+    """
+    Command line entry point.
+
+    Usage:
+        python -m services.account_deletion status
+        python -m services.account_deletion resume --batch-size 1000
+    """
+    parser = argparse.ArgumentParser(description="Run FitFlow account deletions")
+    parser.add_argument("command", choices=["status", "resume"])
+    parser.add_argument("--batch-size", type=int, default=settings.DELETION_BATCH_SIZE)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.command == "resume":
+            for job_id in resumable_jobs(db):
+                run_deletion(db, job_id, args.batch_size)
+                print(f"Finished {job_id}")
+        jobs = db.execute(
+            select(AccountDeletion).where(AccountDeletion.status != "done").order_by(AccountDeletion.id)
+        ).scalars().all()
+        for job in jobs:
+            report = job_status(job)
+            print(f"{report['job_id']}  {report['user_id']:<20}{report['status']:<9}{report['percent']:>6}%")
+        print(f"{len(jobs)} unfinished deletions")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
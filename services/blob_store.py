@@ -0,0 +1,354 @@
+"""
+Content-addressed, compressed blob storage.
+
+A blob is stored once under the first 128 bits of the SHA-256 of its
+bytes, so writing the same content twice costs one indexed lookup. Blobs
+are compressed with zlib and a preset dictionary trained from stored
+blobs: plan sections are small (tens to hundreds of bytes) and repeat the
+same keys and phrases, which plain zlib cannot exploit at that size.
+
+Every compressed value is a self-describing frame:
+
+    byte 0      codec (0 stored, 1 zlib, 2 zlib with preset dictionary)
+    bytes 1-4   dictionary id, big-endian (codec 2 only)
+    rest        payload
+
+Dictionaries are immutable and identified by a hash of their bytes, so
+frames written with an older dictionary stay readable after retraining
+and decoded values can be cached by content hash across workers and
+databases. A newly trained dictionary is stored in the caller's
+transaction and only used by that session until the transaction
+commits; the worker switches to it on commit and forgets it on rollback,
+so no frame can outlive the dictionary it needs.
+
+Usage:
+    BLOBS.put_many(db, {content_hash(data): data})
+    BLOBS.get_many(db, [hash])          # {hash: data}
+"""
+import hashlib
+import struct
+import threading
+import zlib
+from collections import Counter, OrderedDict
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import event, insert, select
+from sqlalchemy.orm import Session
+
+from apps.config import settings
+from models.entities import CompressionDictionary, PlanBlob
+
+
+CODEC_STORED = 0
+CODEC_ZLIB = 1
+CODEC_ZLIB_DICT = 2
+
+_DICT_HEADER = struct.Struct(">BI")
+
+# zlib's window: a preset dictionary longer than this is never referenced
+MAX_DICT_SIZE = 32 * 1024
+
+# Session.info key: [(store, database URL, (id, bytes))] trained in the open transaction
+_TRAINED_KEY = "fitflow_trained_dictionaries"
+
+
+def content_hash(data: bytes) -> str:
+    """Blob address: first 128 bits of SHA-256, hex."""
+    return hashlib.sha256(data).hexdigest()[:32]
+
+
+def dictionary_id(data: bytes) -> int:
+    """Dictionary id derived from its bytes (31 bits, fits a signed INTEGER)."""
+    return int.from_bytes(hashlib.sha256(data).digest()[:4], "big") & 0x7FFFFFFF
+
+
+def train_dictionary(samples: Iterable[bytes], size: int = MAX_DICT_SIZE) -> bytes:
+    """
+    Build a zlib preset dictionary from representative samples.
+
+    zlib matches against the dictionary as if it preceded the input, and
+    nearer bytes are cheaper to reference, so the most frequent samples
+    are placed last. Samples over a quarter of the budget are skipped so
+    one large value cannot crowd out the rest.
+    """
+    counts = Counter(samples)
+    chosen: List[bytes] = []
+    used = 0
+    for sample, _ in counts.most_common():
+        if len(sample) > size // 4 or used + len(sample) > size:
+            continue
+        chosen.append(sample)
+        used += len(sample)
+    return b"".join(reversed(chosen))
+
+
+# ==========================================
+# FRAMES
+# ==========================================
+
+def compress(data: bytes, dictionary: Optional[Tuple[int, bytes]] = None, level: int = 9) -> bytes:
+    """Smallest frame for `data`: with the dictionary if given, else plain zlib or stored."""
+    if dictionary is not None:
+        dict_id, zdict = dictionary
+        compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS, 9, zlib.Z_DEFAULT_STRATEGY, zdict)
+        frame = _DICT_HEADER.pack(CODEC_ZLIB_DICT, dict_id) + compressor.compress(data) + compressor.flush()
+    else:
+        frame = bytes([CODEC_ZLIB]) + zlib.compress(data, level)
+    if len(frame) > len(data) + 1:
+        return bytes([CODEC_STORED]) + data
+    return frame
+
+
+def frame_dictionary(frame: bytes) -> Optional[int]:
+    """Dictionary id a frame was written with, None if it uses none."""
+    if frame[0] == CODEC_ZLIB_DICT:
+        return _DICT_HEADER.unpack_from(frame)[1]
+    return None
+
+
+def decompress(frame: bytes, zdict: Optional[bytes] = None) -> bytes:
+    codec = frame[0]
+    if codec == CODEC_STORED:
+        return bytes(frame[1:])
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(frame[1:])
+    if codec == CODEC_ZLIB_DICT:
+        if zdict is None:
+            raise ValueError("Frame needs a compression dictionary")
+        decompressor = zlib.decompressobj(zlib.MAX_WBITS, zdict)
+        return decompressor.decompress(frame[_DICT_HEADER.size:]) + decompressor.flush()
+    raise ValueError(f"Unknown blob codec {codec}")
+
+
+# ==========================================
+# STORE
+# ==========================================
+
+def _insert_ignoring_duplicates(db: Session, model, rows: List[dict]) -> None:
+    """INSERT ... ON CONFLICT DO NOTHING where the dialect has it."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        db.execute(insert(model), rows)
+        return
+    db.execute(dialect_insert(model).on_conflict_do_nothing(), rows)
+
+
+class BlobStore:
+    """
+    plan_blobs access with per-worker caches.
+
+    Decoded blobs are kept in an LRU keyed by content hash (always valid:
+    the key is the content). Dictionaries are cached by id. The dictionary
+    used for new writes is tracked per database; `needs_dictionary` tells
+    the writer when `train_after` values went out without one.
+
+    Nothing here commits: writes join the caller's transaction.
+    """
+
+    def __init__(
+        self,
+        level: int = 9,
+        cache_size: int = 4096,
+        train_after: int = 500,
+        train_samples: int = 2000
+    ):
+        self.level = level
+        self.cache_size = cache_size
+        self.train_after = train_after
+        self.train_samples = train_samples
+        self._cache: "OrderedDict[str, bytes]" = OrderedDict()
+        self._dictionaries: Dict[int, bytes] = {}
+        # database URL -> [active (id, bytes) or None, looked up?, writes without one]
+        self._writers: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def clear(self) -> None:
+        """Forget every cached blob, dictionary and write state."""
+        with self._lock:
+            self._cache.clear()
+            self._dictionaries.clear()
+            self._writers.clear()
+
+    # ------------------------------------------
+    # Dictionaries
+    # ------------------------------------------
+
+    def _writer(self, db: Session) -> list:
+        key = str(db.get_bind().url)
+        with self._lock:
+            return self._writers.setdefault(key, [None, False, 0])
+
+    def _activate(self, url: str, dictionary: Tuple[int, bytes]) -> None:
+        """Use a committed dictionary for the database's new writes."""
+        with self._lock:
+            self._dictionaries[dictionary[0]] = dictionary[1]
+            self._writers[url] = [dictionary, True, 0]
+
+    def _forget(self, url: str) -> None:
+        """Look the database's dictionary up again on the next write."""
+        with self._lock:
+            self._writers.pop(url, None)
+
+    def active_dictionary(self, db: Session) -> Optional[Tuple[int, bytes]]:
+        """
+        Newest dictionary in this database (looked up once per worker), or
+        one trained in the session's uncommitted transaction.
+        """
+        url = str(db.get_bind().url)
+        for store, trained_url, dictionary in reversed(db.info.get(_TRAINED_KEY, ())):
+            if store is self and trained_url == url:
+                return dictionary
+        state = self._writer(db)
+        if not state[1]:
+            row = db.execute(
+                select(CompressionDictionary.id, CompressionDictionary.data)
+                .order_by(CompressionDictionary.created_at.desc(), CompressionDictionary.id.desc())
+                .limit(1)
+            ).first()
+            if row is not None:
+                self._dictionaries[row.id] = bytes(row.data)
+                state[0] = (row.id, bytes(row.data))
+            state[1] = True
+        return state[0]
+
+    def dictionary(self, db: Session, dict_id: int) -> bytes:
+        zdict = self._dictionaries.get(dict_id)
+        if zdict is None:
+            data = db.execute(
+                select(CompressionDictionary.data).where(CompressionDictionary.id == dict_id)
+            ).scalar()
+            if data is None:
+                raise LookupError(f"Compression dictionary {dict_id} not found")
+            zdict = self._dictionaries[dict_id] = bytes(data)
+        return zdict
+
+    def needs_dictionary(self, db: Session, writes: int = 1) -> bool:
+        """Count `writes` made without a dictionary; True once `train_after` is reached."""
+        if self.active_dictionary(db) is not None:
+            return False
+        state = self._writer(db)
+        state[2] += writes
+        return state[2] >= self.train_after
+
+    def train(self, db: Session, extra_samples: Sequence[bytes] = ()) -> Tuple[int, bytes]:
+        """
+        Train a dictionary from `extra_samples` and the newest blobs and
+        store it in the caller's transaction. The session writes with it
+        at once; the rest of the worker only once the transaction commits.
+
+        Extra samples come first, so they win the 32 KiB budget: pass the
+        values written once per row (manifests), which matter more than
+        blobs stored once for many rows.
+        """
+        frames = db.execute(
+            select(PlanBlob.data).order_by(PlanBlob.created_at.desc()).limit(self.train_samples)
+        ).scalars().all()
+        samples = list(extra_samples) + [self.decode(db, bytes(frame)) for frame in frames]
+        zdict = train_dictionary(samples)
+        dict_id = dictionary_id(zdict)
+        if db.get(CompressionDictionary, dict_id) is None:
+            db.add(CompressionDictionary(id=dict_id, data=zdict, samples=len(samples)))
+            db.flush()
+        db.info.setdefault(_TRAINED_KEY, []).append((self, str(db.get_bind().url), (dict_id, zdict)))
+        return dict_id, zdict
+
+    # ------------------------------------------
+    # Frames
+    # ------------------------------------------
+
+    def encode(self, db: Session, data: bytes) -> bytes:
+        """Compress with this database's active dictionary, if any."""
+        return compress(data, self.active_dictionary(db), self.level)
+
+    def decode(self, db: Session, frame: bytes) -> bytes:
+        dict_id = frame_dictionary(frame)
+        return decompress(frame, self.dictionary(db, dict_id) if dict_id is not None else None)
+
+    # ------------------------------------------
+    # Blobs
+    # ------------------------------------------
+
+    def _remember(self, key: str, data: bytes) -> None:
+        with self._lock:
+            self._cache[key] = data
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def existing(self, db: Session, keys: Iterable[str]) -> Set[str]:
+        """The subset of `keys` already stored."""
+        keys = list(keys)
+        if not keys:
+            return set()
+        return set(db.execute(select(PlanBlob.hash).where(PlanBlob.hash.in_(keys))).scalars())
+
+    def put_many(self, db: Session, blobs: Dict[str, bytes], existing: Optional[Set[str]] = None) -> int:
+        """
+        Store blobs not yet in the database.
+
+        Args:
+            blobs: content hash -> raw bytes
+            existing: Hashes known to be stored already (looked up if None)
+
+        Returns:
+            Number of blobs newly written
+        """
+        if not blobs:
+            return 0
+        if existing is None:
+            existing = self.existing(db, blobs)
+        missing = [key for key in blobs if key not in existing]
+        if missing:
+            _insert_ignoring_duplicates(db, PlanBlob, [
+                {"hash": key, "data": self.encode(db, blobs[key]), "raw_size": len(blobs[key])}
+                for key in missing
+            ])
+        return len(missing)
+
+    def get_many(self, db: Session, keys: Iterable[str]) -> Dict[str, bytes]:
+        """Raw bytes of each blob; raises LookupError if one is missing."""
+        found: Dict[str, bytes] = {}
+        missing = []
+        with self._lock:
+            for key in keys:
+                data = self._cache.get(key)
+                if data is None:
+                    missing.append(key)
+                else:
+                    self._cache.move_to_end(key)
+                    found[key] = data
+        if missing:
+            rows = db.execute(select(PlanBlob.hash, PlanBlob.data).where(PlanBlob.hash.in_(missing)))
+            for key, frame in rows:
+                data = found[key] = self.decode(db, bytes(frame))
+                self._remember(key, data)
+            absent = [key for key in missing if key not in found]
+            if absent:
+                raise LookupError(f"Missing plan blobs: {', '.join(absent)}")
+        return found
+
+
+@event.listens_for(Session, "after_commit")
+def _activate_trained(session: Session) -> None:
+    for store, url, dictionary in session.info.pop(_TRAINED_KEY, ()):
+        store._activate(url, dictionary)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_trained(session: Session, transaction) -> None:
+    # Still pending when the outermost transaction ends: it rolled back
+    if transaction.parent is None:
+        for store, url, _ in session.info.pop(_TRAINED_KEY, ()):
+            store._forget(url)
+
+
+BLOBS = BlobStore(
+    level=settings.PLAN_COMPRESSION_LEVEL,
+    cache_size=settings.PLAN_BLOB_CACHE_SIZE,
+    train_after=settings.PLAN_DICT_TRAIN_AFTER,
+    train_samples=settings.PLAN_DICT_SAMPLES
+)
@@ -0,0 +1,316 @@
+"""
+Materialized per-user dashboard snapshots.
+
+The dashboard is the most-hit endpoint, and rebuilding it takes seven
+queries. A snapshot holds the rendered dashboard together with the
+version stamp it reflects (services.versions.dashboard_stamp). The route
+already reads that stamp for its ETag. A snapshot is served only while
+its stamp equals the current one, so a stale snapshot is never served,
+whatever wrote the database.
+
+Writes keep snapshots current instead of dropping them. Session events
+collect new metrics, plans and chat messages at flush and patch the
+user's snapshot after commit (nothing on rollback). Profile updates and
+deletes invalidate it. Patches go through the backend's atomic update
+and skip rows no newer than the snapshot's newest of their kind, so a
+concurrent rebuild does not count a row twice. created_at is set before
+a writer takes the lock, so a row can also commit after a newer one and
+be skipped; the row counts in the stamp then disagree and the snapshot
+is rebuilt, so racing writers cost a rebuild, never a wrong dashboard.
+Bulk statements
+(Query.delete, Core inserts) bypass the events: paths using them call
+invalidate(), and stamp validation covers anything else, including
+metrics expired by retention (the stamp carries the oldest metric).
+
+Snapshots live in SNAPSHOTS: a per-worker LRU, or a cache shared by the
+workers of one host or of every node (DASHBOARD_CACHE_URL, see
+apps.cache). Rebuilds are single-flight, so the requests that find a
+snapshot invalidated compute it once between them.
+"""
+import copy
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from apps.cache import cache_from_url
+from apps.config import settings
+from models.entities import ChatMessage, Metric, Plan, User
+
+
+SNAPSHOTS = cache_from_url(
+    settings.DASHBOARD_CACHE_URL, settings.DASHBOARD_CACHE_SIZE, namespace="dashboard", ttl=settings.CACHE_TTL
+)
+
+# Position of each newest-row timestamp and row count in a stamp (see dashboard_stamp)
+METRIC_AT, PLAN_AT, CHAT_AT = 3, 4, 5
+METRIC_COUNT, PLAN_COUNT, CHAT_COUNT = 6, 7, 8
+FIRST_METRIC_AT = 9
+
+RECENT_CHAT = 5
+
+
+def snapshot_key(user_id: str) -> str:
+    return user_id
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+
+def normalize_stamp(stamp: Sequence[Any]) -> List[Any]:
+    """Stamp as stored in a snapshot: JSON values, timestamps as ISO text."""
+    return [_iso(value) if isinstance(value, datetime) else value for value in stamp]
+
+
+# ==========================================
+# BUILD AND RENDER
+# ==========================================
+
+def _metric_values(metric) -> Dict[str, Any]:
+    return {
+        "weight_kg": float(metric.weight_kg),
+        "strength_1rm": float(metric.strength_1rm),
+        "sleep_hours": float(metric.sleep_hours),
+        "mood": int(metric.mood),
+        "energy": int(metric.energy),
+        "recorded_at": _iso(metric.created_at),
+    }
+
+
+def _progress(first: Optional[Dict], latest: Optional[Dict], count: int) -> Dict[str, Any]:
+    weight_change = None
+    strength_change = None
+    if count >= 2:
+        weight_change = latest["weight_kg"] - first["weight_kg"]
+        strength_change = latest["strength_1rm"] - first["strength_1rm"]
+    return {
+        "weight_change_kg": round(weight_change, 1) if weight_change else None,
+        "strength_change_kg": round(strength_change, 1) if strength_change else None,
+        "trend": "improving" if strength_change and strength_change > 0 else "declining" if strength_change and strength_change < 0 else "stable"
+    }
+
+
+def _latest_metrics(latest: Optional[Dict]) -> Dict[str, Any]:
+    if latest is None:
+        return {field: None for field in ("weight_kg", "strength_1rm", "sleep_hours", "mood", "energy", "recorded_at")}
+    return dict(latest)
+
+
+def _latest_plan(plan) -> Optional[Dict[str, Any]]:
+    if plan is None:
+        return None
+    return {"plan_id": plan.plan_id, "week": plan.week, "created_at": _iso(plan.created_at)}
+
+
+def build_snapshot(db: Session, user_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Compute a user's dashboard from the database.
+
+    Counts and the first/newest rows come from the (user_id, created_at)
+    indexes; no per-user table is loaded in full. The stamp is derived
+    from the rows read, so it never claims a newer version than the data.
+
+    Returns:
+        Snapshot dict, None if there is no such user
+    """
+    user = db.query(User).filter(User.user_id == user_id).first()
+    if not user:
+        return None
+
+    total_metrics = db.execute(
+        select(func.count()).select_from(Metric).where(Metric.user_id == user_id)
+    ).scalar()
+    first = latest = None
+    if total_metrics:
+        first = _metric_values(db.query(Metric).filter(
+            Metric.user_id == user_id
+        ).order_by(Metric.created_at, Metric.id).first())
+        latest = _metric_values(db.query(Metric).filter(
+            Metric.user_id == user_id
+        ).order_by(Metric.created_at.desc(), Metric.id.desc()).first())
+
+    total_plans = db.execute(
+        select(func.count()).select_from(Plan).where(Plan.user_id == user_id)
+    ).scalar()
+    latest_plan = db.execute(
+        select(Plan.plan_id, Plan.week, Plan.created_at).where(Plan.user_id == user_id)
+        .order_by(Plan.created_at.desc(), Plan.id.desc()).limit(1)
+    ).first() if total_plans else None
+
+    total_messages, chat_at = db.execute(
+        select(func.count(), func.max(ChatMessage.created_at)).where(ChatMessage.user_id == user_id)
+    ).one()
+
+    return {
+        "stamp": normalize_stamp([
+            user.id, user.created_at, user.version,
+            latest["recorded_at"] if latest else None,
+            latest_plan.created_at if latest_plan else None,
+            chat_at,
+            total_metrics,
+            total_plans,
+            total_messages,
+            first["recorded_at"] if first else None,
+        ]),
+        "user_created_at": _iso(user.created_at),
+        "first_metric": first,
+        "dashboard": {
+            "status": "success",
+            "user_profile": {
+                "user_id": user.user_id,
+                "name": user.name,
+                "age": user.age,
+                "weight_kg": user.weight_kg,
+                "height_cm": user.height_cm,
+                "goal": user.goal,
+                "fitness_level": user.fitness_level,
+                "equipment": user.equipment
+            },
+            "statistics": {
+                "total_metrics": total_metrics,
+                "total_plans": total_plans,
+                "total_messages": total_messages
+            },
+            "latest_metrics": _latest_metrics(latest),
+            "progress": _progress(first, latest, total_metrics),
+            "latest_plan": _latest_plan(latest_plan),
+            "recent_chat": min(total_messages, RECENT_CHAT)
+        }
+    }
+
+
+def render(snapshot: Dict[str, Any], now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Dashboard response for a snapshot; days_active is computed per request."""
+    now = now or datetime.utcnow()
+    created = snapshot["user_created_at"]
+    dashboard = dict(snapshot["dashboard"])
+    dashboard["statistics"] = dict(
+        dashboard["statistics"],
+        days_active=(now - datetime.fromisoformat(created)).days if created else 0
+    )
+    return dashboard
+
+
+def get_dashboard(db: Session, user_id: str, stamp: Sequence[Any]) -> Optional[Dict[str, Any]]:
+    """
+    The user's dashboard: the snapshot if it matches `stamp`, else rebuilt
+    and stored.
+
+    Args:
+        stamp: Current dashboard_stamp of the user
+
+    Returns:
+        Dashboard dict, None if the user no longer exists
+    """
+    current = normalize_stamp(stamp)
+    snapshot = SNAPSHOTS.get_or_compute(
+        snapshot_key(user_id),
+        lambda: build_snapshot(db, user_id),
+        fresh=lambda snapshot: snapshot["stamp"] == current
+    )
+    return render(snapshot) if snapshot is not None else None
+
+
+# ==========================================
+# PATCHES
+# ==========================================
+
+def _newer(snapshot: Dict[str, Any], position: int, created_at: str) -> bool:
+    """True if a row created at `created_at` is not yet in the snapshot."""
+    seen = snapshot["stamp"][position]
+    return seen is None or created_at > seen
+
+
+def patch_metric(snapshot: Dict[str, Any], metric: Dict[str, Any]) -> Dict[str, Any]:
+    if not _newer(snapshot, METRIC_AT, metric["recorded_at"]):
+        return snapshot
+    snapshot = copy.deepcopy(snapshot)
+    dashboard = snapshot["dashboard"]
+    dashboard["statistics"]["total_metrics"] += 1
+    if snapshot["first_metric"] is None:
+        snapshot["first_metric"] = metric
+        snapshot["stamp"][FIRST_METRIC_AT] = metric["recorded_at"]
+    dashboard["latest_metrics"] = _latest_metrics(metric)
+    dashboard["progress"] = _progress(
+        snapshot["first_metric"], metric, dashboard["statistics"]["total_metrics"]
+    )
+    snapshot["stamp"][METRIC_AT] = metric["recorded_at"]
+    snapshot["stamp"][METRIC_COUNT] += 1
+    return snapshot
+
+
+def patch_plan(snapshot: Dict[str, Any], plan: Dict[str, Any]) -> Dict[str, Any]:
+    if not _newer(snapshot, PLAN_AT, plan["created_at"]):
+        return snapshot
+    snapshot = copy.deepcopy(snapshot)
+    snapshot["dashboard"]["statistics"]["total_plans"] += 1
+    snapshot["dashboard"]["latest_plan"] = plan
+    snapshot["stamp"][PLAN_AT] = plan["created_at"]
+    snapshot["stamp"][PLAN_COUNT] += 1
+    return snapshot
+
+
+def patch_chat(snapshot: Dict[str, Any], created_at: str) -> Dict[str, Any]:
+    if not _newer(snapshot, CHAT_AT, created_at):
+        return snapshot
+    snapshot = copy.deepcopy(snapshot)
+    statistics = snapshot["dashboard"]["statistics"]
+    statistics["total_messages"] += 1
+    snapshot["dashboard"]["recent_chat"] = min(statistics["total_messages"], RECENT_CHAT)
+    snapshot["stamp"][CHAT_AT] = created_at
+    snapshot["stamp"][CHAT_COUNT] += 1
+    return snapshot
+
+
+# ==========================================
+# WRITE TRACKING
+# ==========================================
+
+_CHANGES = "dashboard_changes"
+
+
+def _queue(session: Session, user_id: str, patch) -> None:
+    session.info.setdefault(_CHANGES, []).append((user_id, patch))
+
+
+def invalidate(db: Session, user_id: str) -> None:
+    """Drop the user's snapshot once `db` commits (for bulk statements)."""
+    _queue(db, user_id, None)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session, flush_context) -> None:
+    for obj in session.new:
+        if isinstance(obj, Metric):
+            metric = _metric_values(obj)
+            _queue(session, obj.user_id, lambda snapshot, metric=metric: patch_metric(snapshot, metric))
+        elif isinstance(obj, Plan):
+            plan = _latest_plan(obj)
+            _queue(session, obj.user_id, lambda snapshot, plan=plan: patch_plan(snapshot, plan))
+        elif isinstance(obj, ChatMessage):
+            created_at = _iso(obj.created_at)
+            _queue(session, obj.user_id, lambda snapshot, created_at=created_at: patch_chat(snapshot, created_at))
+    for obj in session.dirty:
+        # not session.is_modified(): it ignores SQL expressions such as
+        # the version bump, which may be a profile update's only change
+        if isinstance(obj, User):
+            _queue(session, obj.user_id, None)
+    for obj in session.deleted:
+        if isinstance(obj, (User, Metric, Plan, ChatMessage)):
+            _queue(session, obj.user_id, None)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_changes(session) -> None:
+    for user_id, patch in session.info.pop(_CHANGES, ()):
+        if patch is None:
+            SNAPSHOTS.delete(snapshot_key(user_id))
+        else:
+            SNAPSHOTS.update(snapshot_key(user_id), patch)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session) -> None:
+    session.info.pop(_CHANGES, None)
@@ -0,0 +1,67 @@
+import numpy as np
+
+
+# ==========================================
+# LARGEST-TRIANGLE-THREE-BUCKETS
+# ==========================================
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Pick `threshold` points of a series with Largest-Triangle-Three-Buckets.
+
+    The first and last points are always kept. The points in between are
+    split into `threshold - 2` equal buckets and, per bucket, the point
+    forming the largest triangle with the previously kept point and the
+    average of the next bucket is kept. Peaks and dips survive, so a chart
+    of the result looks like a chart of the full series.
+
+    Bucket averages are computed for all buckets at once with cumulative
+    sums; the per-bucket pick depends on the previous pick, so only that
+    argmax runs in a loop (each step vectorized over the bucket).
+
+    Args:
+        x: Sorted x values (e.g. epoch seconds), 1-D
+        y: Values, same length as x
+        threshold: Number of points to keep (>= 3)
+
+    Returns:
+        Sorted indices into x/y of the kept points
+
+    Usage:
+        keep = lttb_indices(timestamps, values, 200)
+        timestamps, values = timestamps[keep], values[keep]
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # Bucket i covers [edges[i], edges[i + 1]) of the interior points 1..n-2
+    edges = (np.arange(threshold - 1) * ((n - 2) / (threshold - 2))).astype(np.int64) + 1
+    edges[-1] = n - 1
+
+    # Average of every bucket via cumulative sums, plus the last point as
+    # the "next bucket" for the final interior bucket
+    cum_x = np.concatenate(([0.0], np.cumsum(x)))
+    cum_y = np.concatenate(([0.0], np.cumsum(y)))
+    sizes = edges[1:] - edges[:-1]
+    avg_x = np.append((cum_x[edges[1:]] - cum_x[edges[:-1]]) / sizes, x[-1])
+    avg_y = np.append((cum_y[edges[1:]] - cum_y[edges[:-1]]) / sizes, y[-1])
+
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0] = 0
+    keep[-1] = n - 1
+    a = 0
+
+    for i in range(threshold - 2):
+        start, stop = edges[i], edges[i + 1]
+        bx = x[start:stop]
+        by = y[start:stop]
+        cx, cy = avg_x[i + 1], avg_y[i + 1]
+        areas = np.abs((x[a] - cx) * (by - y[a]) - (x[a] - bx) * (cy - y[a]))
+        a = start + int(np.argmax(areas))
+        keep[i + 1] = a
+
+    return keep
@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models.entities import Metric
+from models.partitions import metric_source
+from models.series import MetricSeries, HistoryWindow, FIELD_NAMES
+
+
+# ==========================================
+# METRIC HISTORY ACCESS
+# ==========================================
+
+# Columns selected for a MetricSeries, in MetricSeries.from_rows order
+METRIC_COLUMNS = (Metric.created_at, *[getattr(Metric, name) for name in FIELD_NAMES])
+
+
+def _newest_first(source, user_id: str):
+    return select(source.created_at, *[getattr(source, name) for name in FIELD_NAMES]).where(
+        source.user_id == user_id
+    ).order_by(source.created_at.desc(), source.id.desc())
+
+
+def fetch_metric_history(
+    db: Session,
+    user_id: str,
+    window: HistoryWindow,
+    now: Optional[datetime] = None
+) -> MetricSeries:
+    """
+    Fetch only the metric rows a history window asks for.
+
+    Reads newest-first on the (user_id, created_at) index with a LIMIT, so
+    the cost depends on the window size rather than on how long the user
+    has been logging. A `days` window reads only the metric partitions
+    the window overlaps. The result is returned in chronological order.
+
+    For a window with both `last_n` and `days`, the union is returned: all
+    rows from the last D days, or the last N rows if that is more.
+
+    Args:
+        db: Database session
+        user_id: User ID
+        window: History the caller needs (see HistoryWindow)
+        now: Reference time for `days` windows (defaults to utcnow)
+
+    Returns:
+        MetricSeries ordered oldest to newest
+
+    Usage:
+        series = fetch_metric_history(db, "alice", HistoryWindow(last_n=2))
+    """
+    if window.is_empty:
+        return MetricSeries()
+
+    rows = []
+    if window.days:
+        cutoff = (now or datetime.utcnow()) - timedelta(days=window.days)
+        source = metric_source(db, Metric, since=cutoff)
+        rows = db.execute(_newest_first(source, user_id).where(source.created_at >= cutoff)).all()
+
+    # The last N rows are a superset of a shorter days-window result
+    if window.last_n and len(rows) < window.last_n:
+        rows = db.execute(_newest_first(Metric, user_id).limit(window.last_n)).all()
+
+    rows.reverse()
+    return MetricSeries.from_rows(rows)
@@ -0,0 +1,128 @@
+"""
+Minimal JSON Patch (RFC 6902): diff two JSON documents and apply the result.
+
+diff() emits only "add", "remove" and "replace" operations, which is all a
+week-over-week plan change needs; apply() accepts those and raises on
+anything else. Objects are compared key by key and lists element by element
+(a length change adds or removes at the tail), so changing one number deep
+inside a plan costs one small operation, not a copy of the section.
+
+Usage:
+    patch = diff(last_week, this_week)
+    assert apply(copy.deepcopy(last_week), patch) == this_week
+"""
+from typing import Any, Dict, List
+
+
+Operation = Dict[str, Any]
+
+
+def escape(token: str) -> str:
+    """JSON Pointer token for an object key or list index."""
+    return str(token).replace("~", "~0").replace("/", "~1")
+
+
+def unescape(token: str) -> str:
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+# ==========================================
+# DIFF
+# ==========================================
+
+def diff(source: Any, target: Any, path: str = "") -> List[Operation]:
+    """
+    Operations turning `source` into `target`.
+
+    Args:
+        source: Old JSON value (dicts, lists, scalars)
+        target: New JSON value
+        path: JSON Pointer prefix of both values (empty for the root)
+
+    Returns:
+        RFC 6902 operations, in the order they must be applied
+    """
+    operations: List[Operation] = []
+    _diff(source, target, path, operations)
+    return operations
+
+
+def _diff(source: Any, target: Any, path: str, operations: List[Operation]) -> None:
+    # type() rather than isinstance: True == 1 and 1 == 1.0, but JSON differs
+    if type(source) is not type(target):
+        operations.append({"op": "replace", "path": path, "value": target})
+    elif isinstance(source, dict):
+        for key, value in source.items():
+            child = f"{path}/{escape(key)}"
+            if key not in target:
+                operations.append({"op": "remove", "path": child})
+            else:
+                _diff(value, target[key], child, operations)
+        for key, value in target.items():
+            if key not in source:
+                operations.append({"op": "add", "path": f"{path}/{escape(key)}", "value": value})
+    elif isinstance(source, list):
+        common = min(len(source), len(target))
+        for index in range(common):
+            _diff(source[index], target[index], f"{path}/{index}", operations)
+        # remove from the end so earlier indexes stay valid
+        for index in range(len(source) - 1, common - 1, -1):
+            operations.append({"op": "remove", "path": f"{path}/{index}"})
+        for index in range(common, len(target)):
+            operations.append({"op": "add", "path": f"{path}/{index}", "value": target[index]})
+    elif source != target:
+        operations.append({"op": "replace", "path": path, "value": target})
+
+
+# ==========================================
+# APPLY
+# ==========================================
+
+def apply(document: Any, operations: List[Operation]) -> Any:
+    """
+    Apply operations to `document` in place.
+
+    Values inserted by the patch are not copied, so do not reuse the
+    patch after applying it to a document you go on to mutate.
+
+    Returns:
+        The patched document (a new object only if the root was replaced)
+
+    Raises:
+        ValueError: unsupported operation or a path that does not resolve
+    """
+    for operation in operations:
+        op, path = operation["op"], operation["path"]
+        if op not in ("add", "remove", "replace"):
+            raise ValueError(f"Unsupported JSON Patch operation '{op}'")
+        if path == "":
+            if op == "remove":
+                raise ValueError("Cannot remove the document root")
+            document = operation["value"]
+            continue
+
+        *parents, last = [unescape(token) for token in path.split("/")[1:]]
+        container = document
+        try:
+            for token in parents:
+                container = container[int(token) if isinstance(container, list) else token]
+            if isinstance(container, list):
+                index = len(container) if last == "-" else int(last)
+                if op == "add":
+                    if index > len(container):
+                        raise IndexError(index)
+                    container.insert(index, operation["value"])
+                elif op == "remove":
+                    del container[index]
+                else:
+                    container[index] = operation["value"]
+            else:
+                if op != "add" and last not in container:
+                    raise KeyError(last)
+                if op == "remove":
+                    del container[last]
+                else:
+                    container[last] = operation["value"]
+        except (KeyError, IndexError, ValueError, TypeError) as exc:
+            raise ValueError(f"JSON Patch path '{path}' does not resolve") from exc
+    return document
@@ -0,0 +1,626 @@
+import argparse
+import hashlib
+import json
+import re
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import Text, cast, event, func, or_, select
+from sqlalchemy.orm import Session
+
+from apps.cache import Cache, cache_from_url
+from apps.config import settings
+from models.entities import CompressionDictionary, Plan, PlanBlob, SessionLocal, User
+from models.series import MetricSeries
+from services import json_patch
+from services.blob_store import BLOBS, content_hash, frame_dictionary
+
+
+# ==========================================
+# SPLITTING AND REASSEMBLY
+# ==========================================
+
+# A section reference inside a manifest. JSON strings escape their quotes,
+# so this can only match a reference, never text inside a value.
+BLOB_REF = re.compile(rb'\{"\$blob":"([0-9a-f]{32})"\}')
+
+
+def _encode(value: Any) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def _fields(plan: Dict[str, Any]) -> Iterator[Tuple[str, Any]]:
+    """(path, value) of each section candidate: every field of each
+    top-level section (workout_plan.days, coaching_plan.habit_stack, ...)
+    and every top-level scalar (summary)."""
+    for key, value in plan.items():
+        if isinstance(value, dict):
+            for field, item in value.items():
+                yield f"{key}.{field}", item
+        else:
+            yield key, value
+
+
+def candidate_sections(plan: Dict[str, Any], min_size: Optional[int] = None) -> Dict[str, Tuple[str, bytes]]:
+    """
+    Fields big enough to be worth a reference.
+
+    Returns:
+        {path: (content hash, JSON bytes)} for fields of at least
+        `min_size` JSON bytes; smaller values always stay inline
+    """
+    min_size = settings.PLAN_BLOB_MIN_BYTES if min_size is None else min_size
+    candidates = {}
+    for path, value in _fields(plan):
+        encoded = _encode(value)
+        if len(encoded) >= min_size:
+            candidates[path] = (content_hash(encoded), encoded)
+    return candidates
+
+
+def build_manifest(plan: Dict[str, Any], refs: Dict[str, str]) -> bytes:
+    """Plan JSON with the fields in `refs` (path -> hash) replaced by {"$blob": hash}."""
+    manifest = {}
+    for key, value in plan.items():
+        if isinstance(value, dict):
+            manifest[key] = {
+                field: {"$blob": refs[f"{key}.{field}"]} if f"{key}.{field}" in refs else item
+                for field, item in value.items()
+            }
+        else:
+            manifest[key] = {"$blob": refs[key]} if key in refs else value
+    return _encode(manifest)
+
+
+def split_plan(plan: Dict[str, Any], min_size: Optional[int] = None) -> Tuple[bytes, Dict[str, bytes]]:
+    """
+    Split a plan into a manifest and a section for every large field.
+
+    Returns:
+        (manifest JSON bytes, {hash: section JSON bytes})
+    """
+    candidates = candidate_sections(plan, min_size)
+    manifest = build_manifest(plan, {path: key for path, (key, _) in candidates.items()})
+    return manifest, {key: encoded for key, encoded in candidates.values()}
+
+
+def manifest_refs(manifest: bytes) -> Set[str]:
+    return {match.decode("ascii") for match in BLOB_REF.findall(manifest)}
+
+
+def assemble(manifest: bytes, sections: Dict[str, bytes]) -> bytes:
+    """Plan JSON bytes: the manifest with each reference replaced by its section."""
+    return BLOB_REF.sub(lambda match: sections[match.group(1).decode("ascii")], manifest)
+
+
+class SharingPolicy:
+    """
+    Learns which plan fields repeat across plans.
+
+    Workout days, habit stacks or nutrient timing repeat across users and
+    weeks; TDEE-based meals or current metrics are unique to one plan, and
+    storing those as sections only adds a row and a hash per plan. Every
+    path starts shared. After `warmup` values, a path whose values were
+    already stored less than `min_reuse` of the time is kept inline in the
+    manifest, except every `probe_every`-th value, so a path that starts
+    repeating is noticed. Counts are halved every `window` values.
+
+    Per worker and approximate by design: reads follow the manifest, so
+    any mix of shared and inline fields reads back the same.
+    """
+
+    def __init__(self, warmup: int = 20, min_reuse: float = 0.2, probe_every: int = 50, window: int = 1000):
+        self.warmup = warmup
+        self.min_reuse = min_reuse
+        self.probe_every = probe_every
+        self.window = window
+        # path -> [values seen, values already stored]
+        self._stats: Dict[str, List[int]] = {}
+        self._lock = threading.Lock()
+
+    def shares(self, path: str) -> bool:
+        with self._lock:
+            seen, reused = self._stats.get(path, (0, 0))
+        if seen < self.warmup or reused >= self.min_reuse * seen:
+            return True
+        return seen % self.probe_every == 0
+
+    def observe(self, path: str, reused: bool) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(path, [0, 0])
+            stats[0] += 1
+            stats[1] += reused
+            if stats[0] >= self.window:
+                stats[0] //= 2
+                stats[1] //= 2
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            items = {path: list(stats) for path, stats in self._stats.items()}
+        return {
+            path: {"seen": seen, "reused": reused, "shared": self.shares(path)}
+            for path, (seen, reused) in sorted(items.items())
+        }
+
+
+POLICY = SharingPolicy()
+
+
+class PlanCache:
+    """
+    Reconstructed plans: plan_id -> (JSON bytes, delta depth).
+
+    A stored plan never changes (compaction and retraining only change
+    its encoding), so entries never go stale; the backend's bound keeps
+    memory flat. Delta chains are rebuilt from the nearest cached plan,
+    so a user's latest plan is usually one patch away. Entries are kept
+    as [JSON text, depth], which every backend (apps.cache) can store.
+    """
+
+    def __init__(self, backend: Cache):
+        self.backend = backend
+
+    def get(self, plan_id: str) -> Optional[Tuple[bytes, int]]:
+        entry = self.backend.get(plan_id)
+        return (entry[0].encode("utf-8"), entry[1]) if entry is not None else None
+
+    def put(self, plan_id: str, data: bytes, depth: int) -> None:
+        self.backend.set(plan_id, [data.decode("utf-8"), depth])
+
+    def get_or_build(self, plan_id: str, build: Callable[[], Tuple[bytes, int]]) -> Tuple[bytes, int]:
+        """The cached entry, else build() once however many callers miss at a time."""
+        def entry():
+            data, depth = build()
+            return [data.decode("utf-8"), depth]
+
+        text, depth = self.backend.get_or_compute(plan_id, entry)
+        return text.encode("utf-8"), depth
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+
+PLANS = PlanCache(cache_from_url(
+    settings.CACHE_URL, settings.PLAN_CACHE_SIZE, namespace="plan", ttl=settings.CACHE_TTL
+))
+
+# Session.info key: (plan_id, JSON, depth) of plans stored in the open transaction
+_STORED_KEY = "fitflow_stored_plans"
+
+
+@event.listens_for(Session, "after_commit")
+def _cache_stored_plans(session: Session) -> None:
+    for plan_id, data, depth in session.info.pop(_STORED_KEY, ()):
+        PLANS.put(plan_id, data, depth)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_stored_plans(session: Session, transaction) -> None:
+    # Still pending when the outermost transaction ends: it rolled back
+    if transaction.parent is None:
+        session.info.pop(_STORED_KEY, None)
+
+
+# ==========================================
+# WRITE PATH
+# ==========================================
+
+class PendingManifest:
+    """
+    A plan's manifest and the sections it needs, before anything is written.
+
+    Fields already stored as sections are always referenced; new values
+    become sections when POLICY says their path repeats. One query looks
+    up all candidates. write() inserts the new sections and records the
+    reuse with POLICY, so a manifest that is built but not kept (the plan
+    went out as a delta) leaves no trace.
+    """
+
+    def __init__(self, db: Session, plan_data: Dict[str, Any]):
+        candidates = candidate_sections(plan_data)
+        self.existing = BLOBS.existing(db, {key for key, _ in candidates.values()})
+        self.new: Dict[str, bytes] = {}
+        self.reused: Dict[str, bool] = {}
+        refs: Dict[str, str] = {}
+        for path, (key, encoded) in candidates.items():
+            reused = self.reused[path] = key in self.existing
+            if reused or POLICY.shares(path):
+                refs[path] = key
+                if not reused:
+                    self.new[key] = encoded
+        self.manifest = build_manifest(plan_data, refs)
+
+    def write(self, db: Session) -> None:
+        for path, reused in self.reused.items():
+            POLICY.observe(path, reused)
+        BLOBS.put_many(db, self.new, existing=self.existing)
+
+
+def encode_plan(db: Session, plan_data: Dict[str, Any]) -> bytes:
+    """
+    Store the plan's shareable sections and return its compressed manifest.
+
+    After PLAN_DICT_TRAIN_AFTER plans without a compression dictionary,
+    one is trained from the stored sections and manifests.
+    """
+    pending = PendingManifest(db, plan_data)
+    pending.write(db)
+    if BLOBS.needs_dictionary(db):
+        train_dictionary_from_plans(db, [pending.manifest])
+    return BLOBS.encode(db, pending.manifest)
+
+
+def _delta_from_previous(db: Session, user_id: str, document: Dict[str, Any]) -> Optional[Tuple[Any, int, bytes]]:
+    """
+    The user's latest plan, the chain depth a delta on it would have, and
+    the compressed patch; None when the next plan must be a keyframe.
+    """
+    if settings.PLAN_KEYFRAME_INTERVAL <= 1:
+        return None
+    previous = db.execute(
+        PLAN_ROW.where(Plan.user_id == user_id).order_by(Plan.created_at.desc(), Plan.id.desc()).limit(1)
+    ).first()
+    if previous is None:
+        return None
+    base, depth = _reconstruct(db, previous)
+    if depth + 1 >= settings.PLAN_KEYFRAME_INTERVAL:
+        return None
+    patch = json_patch.diff(json.loads(base), document)
+    return previous, depth + 1, BLOBS.encode(db, _encode(patch))
+
+
+def generation_key(user_id: str, week: int, profile_version: int, history: MetricSeries) -> str:
+    """
+    Digest of everything a generated plan depends on: the user and week,
+    the profile version, the metric history the agents read (metrics are
+    append-only, so their timestamps identify it) and the API version.
+    Equal keys mean the orchestrator would produce the same plan.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update("\x1f".join((settings.API_VERSION, user_id, str(week), str(profile_version))).encode("utf-8"))
+    digest.update(history.timestamps.tobytes())
+    return digest.hexdigest()
+
+
+def generated_plan(db: Session, request_key: str):
+    """PLAN_ROW row of the plan stored for a generation key, None if there is none."""
+    return db.execute(PLAN_ROW.where(Plan.request_key == request_key)).first()
+
+
+def store_plan(
+    db: Session,
+    plan_id: str,
+    user_id: str,
+    week: int,
+    plan_data: Dict[str, Any],
+    created_at: Optional[datetime] = None,
+    request_key: Optional[str] = None
+) -> Plan:
+    """
+    Add a plan as a delta on the user's previous plan or as a keyframe.
+
+    Week-over-week plans differ in a few dozen values (week, intensity,
+    current metrics), so the JSON Patch from the previous plan is usually
+    a fraction of even a manifest. Whichever compresses smaller is kept,
+    and a keyframe (manifest plus shared sections) is forced once a chain
+    reaches PLAN_KEYFRAME_INTERVAL plans, bounding the patches a cold
+    read applies. The plan is cached once the transaction commits, so
+    the next week's delta starts from memory, and a shared cache never
+    holds a plan that was rolled back.
+
+    Joins the caller's transaction without committing. With a
+    `request_key` the flush raises IntegrityError if a plan for the same
+    generation inputs exists (see generation_key).
+
+    Returns:
+        The pending Plan (plan_data is JSON null; manifest or delta is set)
+    """
+    encoded = _encode(plan_data)
+    document = json.loads(encoded)
+    pending = PendingManifest(db, document)
+    if BLOBS.needs_dictionary(db):
+        train_dictionary_from_plans(db, [pending.manifest])
+    manifest = BLOBS.encode(db, pending.manifest)
+
+    plan = Plan(
+        plan_id=plan_id,
+        user_id=user_id,
+        week=week,
+        plan_data=None,
+        request_key=request_key,
+        created_at=created_at or datetime.utcnow()
+    )
+    delta = _delta_from_previous(db, user_id, document)
+    if delta is not None and len(delta[2]) < len(manifest):
+        previous, depth, plan.delta = delta
+        plan.base_plan_id = previous.plan_id
+        plan.keyframe_plan_id = previous.keyframe_plan_id or previous.plan_id
+    else:
+        pending.write(db)
+        plan.manifest = manifest
+        depth = 0
+    db.add(plan)
+    db.info.setdefault(_STORED_KEY, []).append((plan_id, encoded, depth))
+    return plan
+
+
+# ==========================================
+# READ PATH
+# ==========================================
+
+# Plan rows with whichever representation the row has; inline plan_data
+# comes back as its stored JSON text, never parsed
+PLAN_ROW = select(
+    Plan.id,
+    Plan.plan_id,
+    Plan.user_id,
+    Plan.week,
+    Plan.created_at,
+    Plan.manifest,
+    Plan.delta,
+    Plan.base_plan_id,
+    Plan.keyframe_plan_id,
+    cast(Plan.plan_data, Text).label("plan_json")
+)
+
+# PLAN_ROW for reads serving plans to clients: joined to the owner, so the
+# deleted-user filter (models.database._hide_deleted_users) hides the plans
+# of an account being deleted
+LIVE_PLAN_ROW = PLAN_ROW.join(User, User.user_id == Plan.user_id)
+
+
+def plan_json(db: Session, manifest: Optional[bytes], inline_json: Optional[str] = None) -> bytes:
+    """
+    Plan JSON bytes for a keyframe of either representation.
+
+    Blob-backed rows are reassembled from their sections (cached per
+    worker, so hot sections cost no query); inline rows return their
+    stored text as is.
+    """
+    if manifest is None:
+        return inline_json.encode("utf-8") if isinstance(inline_json, str) else inline_json
+    text = BLOBS.decode(db, bytes(manifest))
+    return assemble(text, BLOBS.get_many(db, manifest_refs(text)))
+
+
+def _reconstruct(db: Session, row) -> Tuple[bytes, int]:
+    """Plan JSON bytes and delta depth (0 for keyframes) of a PLAN_ROW row."""
+    return PLANS.get_or_build(row.plan_id, lambda: _build(db, row))
+
+
+def _build(db: Session, row) -> Tuple[bytes, int]:
+    if row.delta is None:
+        return plan_json(db, row.manifest, row.plan_json), 0
+
+    # one query for the whole chain: the keyframe and every delta on it
+    chain = {
+        link.plan_id: link
+        for link in db.execute(PLAN_ROW.where(or_(
+            Plan.plan_id == row.keyframe_plan_id, Plan.keyframe_plan_id == row.keyframe_plan_id
+        )))
+    }
+    steps = [row]
+    while True:
+        base = chain.get(steps[-1].base_plan_id)
+        if base is None:
+            raise LookupError(f"Base plan '{steps[-1].base_plan_id}' of '{steps[-1].plan_id}' not found")
+        start = PLANS.get(base.plan_id)
+        if start is not None:
+            break
+        if base.delta is None:
+            start = (plan_json(db, base.manifest, base.plan_json), 0)
+            PLANS.put(base.plan_id, *start)
+            break
+        steps.append(base)
+
+    data, depth = start
+    document = json.loads(data)
+    for step in reversed(steps):
+        document = json_patch.apply(document, json.loads(BLOBS.decode(db, bytes(step.delta))))
+    return _encode(document), depth + len(steps)
+
+
+def reconstruct(db: Session, row) -> bytes:
+    """
+    Plan JSON bytes for a PLAN_ROW row of any representation.
+
+    Keyframes are reassembled from their sections (inline ones copied
+    as is). Delta plans fetch their chain in one query and apply its
+    patches from the keyframe, or from the nearest plan already in
+    PLANS. The result is cached either way.
+    """
+    return _reconstruct(db, row)[0]
+
+
+def load_plan(db: Session, plan: Plan) -> Dict[str, Any]:
+    """Plan data as a dict for an ORM Plan of any representation."""
+    if plan.delta is not None:
+        return json.loads(reconstruct(db, plan))
+    if plan.manifest is None:
+        return plan.plan_data
+    return json.loads(plan_json(db, plan.manifest))
+
+
+def plan_and_base(db: Session, plan_id: str, against: Optional[str] = None) -> Tuple[Any, Any]:
+    """
+    PLAN_ROW rows of a plan and of the plan to diff it against.
+
+    `against` defaults to the plan's delta base (fetched in the same
+    query), else the user's plan created just before it.
+
+    Returns:
+        (row, base); either is None when not found
+    """
+    base_id = against if against is not None else (
+        select(Plan.base_plan_id).where(Plan.plan_id == plan_id).scalar_subquery()
+    )
+    rows = {row.plan_id: row for row in db.execute(LIVE_PLAN_ROW.where(or_(Plan.plan_id == plan_id, Plan.plan_id == base_id)))}
+    row = rows.get(plan_id)
+    if row is None or against is not None:
+        return row, rows.get(against)
+    if row.base_plan_id is not None:
+        return row, rows.get(row.base_plan_id)
+    return row, db.execute(
+        LIVE_PLAN_ROW.where(Plan.user_id == row.user_id, Plan.created_at < row.created_at)
+        .order_by(Plan.created_at.desc(), Plan.id.desc()).limit(1)
+    ).first()
+
+
+def plan_patch(db: Session, row, base) -> bytes:
+    """
+    JSON Patch (RFC 6902) bytes turning plan `base` into plan `row`.
+
+    When `row` is stored as a delta on `base` the stored patch is returned
+    without rebuilding either plan; otherwise both are reconstructed and
+    diffed.
+    """
+    if row.delta is not None and row.base_plan_id == base.plan_id:
+        return BLOBS.decode(db, bytes(row.delta))
+    source = json.loads(reconstruct(db, base))
+    return _encode(json_patch.diff(source, json.loads(reconstruct(db, row))))
+
+
+# ==========================================
+# MAINTENANCE
+# ==========================================
+
+def compact_plans(db: Session, batch_size: int = 500) -> int:
+    """
+    Move inline plans into blob storage, one transaction per batch.
+
+    Returns:
+        Number of plans converted
+    """
+    converted = 0
+    last_id = 0
+    while True:
+        plans = db.execute(
+            select(Plan)
+            .where(Plan.manifest.is_(None), Plan.delta.is_(None), Plan.id > last_id)
+            .order_by(Plan.id).limit(batch_size)
+        ).scalars().all()
+        if not plans:
+            return converted
+        for plan in plans:
+            if plan.plan_data is not None:
+                plan.manifest = encode_plan(db, plan.plan_data)
+                plan.plan_data = None
+                converted += 1
+        last_id = plans[-1].id
+        db.commit()
+
+
+def train_dictionary_from_plans(db: Session, extra_samples: Sequence[bytes] = ()) -> Tuple[int, bytes]:
+    """Train and store a dictionary from the newest sections, manifests and deltas."""
+    frames = db.execute(
+        select(func.coalesce(Plan.manifest, Plan.delta))
+        .where(or_(Plan.manifest.is_not(None), Plan.delta.is_not(None)))
+        .order_by(Plan.created_at.desc()).limit(BLOBS.train_samples // 4)
+    ).scalars().all()
+    plans = [BLOBS.decode(db, bytes(frame)) for frame in frames]
+    return BLOBS.train(db, plans + list(extra_samples))
+
+
+def retrain(db: Session, batch_size: int = 500) -> Dict[str, int]:
+    """
+    Train a new dictionary from stored sections and manifests, then
+    recompress every blob, manifest and delta not written with it.
+
+    Returns:
+        Counts of recompressed blobs, manifests and deltas
+    """
+    dict_id, _ = train_dictionary_from_plans(db)
+    db.commit()
+
+    counts = {"blobs": 0, "manifests": 0, "deltas": 0}
+    for model, key, column, name in (
+        (PlanBlob, PlanBlob.hash, PlanBlob.data, "blobs"),
+        (Plan, Plan.id, Plan.manifest, "manifests"),
+        (Plan, Plan.id, Plan.delta, "deltas"),
+    ):
+        last = None
+        while True:
+            query = select(model).where(column.is_not(None)).order_by(key).limit(batch_size)
+            if last is not None:
+                query = query.where(key > last)
+            rows = db.execute(query).scalars().all()
+            if not rows:
+                break
+            for row in rows:
+                frame = bytes(getattr(row, column.key))
+                if frame_dictionary(frame) != dict_id:
+                    setattr(row, column.key, BLOBS.encode(db, BLOBS.decode(db, frame)))
+                    counts[name] += 1
+            last = getattr(rows[-1], key.key)
+            db.commit()
+    return counts
+
+
+def storage_stats(db: Session) -> Dict[str, int]:
+    """Row counts and bytes of each plan storage representation."""
+    inline = db.execute(
+        select(func.count(), func.coalesce(func.sum(func.length(cast(Plan.plan_data, Text))), 0))
+        .where(Plan.manifest.is_(None), Plan.delta.is_(None))
+    ).one()
+    manifests = db.execute(
+        select(func.count(), func.coalesce(func.sum(func.length(Plan.manifest)), 0))
+        .where(Plan.manifest.is_not(None))
+    ).one()
+    deltas = db.execute(
+        select(func.count(), func.coalesce(func.sum(func.length(Plan.delta)), 0))
+        .where(Plan.delta.is_not(None))
+    ).one()
+    blobs = db.execute(
+        select(
+            func.count(),
+            func.coalesce(func.sum(func.length(PlanBlob.data)), 0),
+            func.coalesce(func.sum(PlanBlob.raw_size), 0)
+        )
+    ).one()
+    dictionaries = db.execute(
+        select(func.count(), func.coalesce(func.sum(func.length(CompressionDictionary.data)), 0))
+    ).one()
+    return {
+        "inline_plans": inline[0],
+        "inline_bytes": inline[1],
+        "blob_plans": manifests[0],
+        "manifest_bytes": manifests[1],
+        "delta_plans": deltas[0],
+        "delta_bytes": deltas[1],
+        "blobs": blobs[0],
+        "blob_bytes": blobs[1],
+        "blob_raw_bytes": blobs[2],
+        "dictionaries": dictionaries[0],
+        "dictionary_bytes": dictionaries[1],
+    }
+
+
+def main():
+    """
+    Command line entry point.
+
+    Usage:
+        python -m services.plan_service stats
+        python -m services.plan_service compact     # inline plans -> blobs
+        python -m services.plan_service retrain     # new dictionary, recompress
+    """
+    parser = argparse.ArgumentParser(description="Maintain FitFlow plan storage")
+    parser.add_argument("command", choices=["stats", "compact", "retrain"])
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.command == "compact":
+            print(f"Compacted {compact_plans(db, args.batch_size)} plans")
+        elif args.command == "retrain":
+            print(f"Recompressed {retrain(db, args.batch_size)}")
+        for name, value in storage_stats(db).items():
+            print(f"{name:<18}{value:>14,}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
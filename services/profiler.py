@@ -0,0 +1,174 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# ==========================================
+# STACK SAMPLING
+# ==========================================
+
+# A frame is identified by (function, file, first line of the function)
+Frame = Tuple[str, str, int]
+Stack = Tuple[Frame, ...]
+
+# Leaf frames in these modules mean the thread is parked, not working
+IDLE_MODULES = ("threading.py", "selectors.py", "queue.py")
+
+
+class ProfilerBusy(RuntimeError):
+    """Another profile is already running in this worker."""
+
+
+_active = threading.Lock()
+
+
+class SamplingProfiler:
+    """
+    In-process sampling profiler for every thread of this worker.
+
+    A background thread wakes every `interval` seconds, reads all other
+    threads' current Python stacks (sys._current_frames) and counts them.
+    Nothing is installed while no profile is running, so an idle worker
+    pays nothing; while running, the cost is one stack walk per thread per
+    sample. Works for the event loop thread and the sync-endpoint
+    threadpool alike (signal-based samplers only see the main thread).
+
+    Usage:
+        profiler = SamplingProfiler(interval=0.005)
+        profiler.run(seconds=2.0)           # blocks; or start() / stop()
+        print(profiler.collapsed())
+    """
+
+    def __init__(self, interval: float = 0.01, include_idle: bool = False):
+        self.interval = interval
+        self.include_idle = include_idle
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started = 0.0
+
+    # ------------------------------------------
+    # Control
+    # ------------------------------------------
+
+    def start(self) -> None:
+        """Start sampling; raises ProfilerBusy if a profile is already running."""
+        if not _active.acquire(blocking=False):
+            raise ProfilerBusy("A profile is already running on this worker")
+        self._stop.clear()
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._loop, name="fitflow-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling and release the worker-wide profiler slot."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.duration = time.perf_counter() - self._started
+        _active.release()
+
+    def run(self, seconds: float) -> "SamplingProfiler":
+        self.start()
+        try:
+            time.sleep(seconds)
+        finally:
+            self.stop()
+        return self
+
+    def _loop(self) -> None:
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            if len(names) != threading.active_count():
+                names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in frames.items():
+                if thread_id == own_id:
+                    continue
+                stack = self._walk(frame)
+                if not self.include_idle and stack and stack[-1][1].endswith(IDLE_MODULES):
+                    continue
+                self.samples[(names.get(thread_id, str(thread_id)), stack)] += 1
+            self.sample_count += 1
+
+    @staticmethod
+    def _walk(frame) -> Stack:
+        """Root-to-leaf frames of one thread."""
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append((getattr(code, "co_qualname", code.co_name), code.co_filename, code.co_firstlineno))
+            frame = frame.f_back
+        stack.reverse()
+        return tuple(stack)
+
+    # ------------------------------------------
+    # Output formats
+    # ------------------------------------------
+
+    @staticmethod
+    def _label(frame: Frame) -> str:
+        name, filename, line = frame
+        return f"{name} ({os.path.basename(filename)}:{line})"
+
+    def collapsed(self) -> str:
+        """
+        Brendan Gregg's collapsed-stack format, one line per unique stack:
+        `thread;root;...;leaf count` (feed to flamegraph.pl or speedscope).
+        """
+        lines = [
+            ";".join([thread] + [self._label(f) for f in stack]) + f" {count}"
+            for (thread, stack), count in self.samples.most_common()
+        ]
+        return "\n".join(lines) + ("\n" if lines else "")
+
+    def speedscope(self, name: str = "fitflow") -> Dict[str, Any]:
+        """
+        speedscope file-format JSON: one sampled profile per thread.
+
+        Open at https://www.speedscope.app or with the speedscope CLI.
+        """
+        frame_index: Dict[Frame, int] = {}
+        frames: List[Dict[str, Any]] = []
+        per_thread: Dict[str, Tuple[List[List[int]], List[float]]] = {}
+
+        for (thread, stack), count in self.samples.items():
+            indices = []
+            for frame in stack:
+                index = frame_index.get(frame)
+                if index is None:
+                    index = frame_index[frame] = len(frames)
+                    frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+                indices.append(index)
+            samples, weights = per_thread.setdefault(thread, ([], []))
+            samples.append(indices)
+            weights.append(round(count * self.interval, 6))
+
+        profiles = [
+            {
+                "type": "sampled",
+                "name": thread,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": round(sum(weights), 6),
+                "samples": samples,
+                "weights": weights,
+            }
+            for thread, (samples, weights) in sorted(per_thread.items())
+        ]
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "fitflow-profiler",
+            "activeProfileIndex": 0,
+            "shared": {"frames": frames},
+            "profiles": profiles,
+        }
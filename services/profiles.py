@@ -0,0 +1,59 @@
+"""
+Cached user profiles.
+
+GET /auth/profile reads the profile stamp (id, created_at, version) for its ETag
+anyway; a cached profile carrying the same stamp is current, so a
+changed ETag costs no second query. Profile updates bump the version
+(routes.auth.update_profile), which turns old entries into misses
+without any invalidation, in this worker or any other sharing CACHE_URL.
+Account deletion drops the entry when it starts (services.account_deletion).
+"""
+from typing import Any, Dict, Optional, Sequence
+
+from sqlalchemy.orm import Session
+
+from apps.cache import cache_from_url
+from apps.config import settings
+from models.entities import User
+from services.dashboard import normalize_stamp
+
+
+PROFILES = cache_from_url(settings.CACHE_URL, settings.USER_CACHE_SIZE, namespace="user", ttl=settings.CACHE_TTL)
+
+
+def profile_values(user: User) -> Dict[str, Any]:
+    """Cache entry for a user: the UserProfile fields and the stamp they reflect."""
+    return {
+        "stamp": normalize_stamp([user.id, user.created_at, user.version]),
+        "profile": {
+            "user_id": user.user_id,
+            "name": user.name,
+            "age": user.age,
+            "weight_kg": user.weight_kg,
+            "height_cm": user.height_cm,
+            "fitness_level": user.fitness_level,
+            "goal": user.goal,
+            "equipment": user.equipment,
+            "created_at": user.created_at.isoformat() if user.created_at else None
+        }
+    }
+
+
+def _load(db: Session, user_id: str) -> Optional[Dict[str, Any]]:
+    user = db.query(User).filter(User.user_id == user_id).first()
+    return profile_values(user) if user else None
+
+
+def get_profile(db: Session, user_id: str, stamp: Sequence[Any]) -> Optional[Dict[str, Any]]:
+    """
+    The user's profile fields, from the cache if it holds `stamp`'s version.
+
+    Args:
+        stamp: Current profile_stamp of the user
+
+    Returns:
+        Profile dict, None if the user no longer exists
+    """
+    current = normalize_stamp(stamp)
+    entry = PROFILES.get_or_compute(user_id, lambda: _load(db, user_id), fresh=lambda entry: entry["stamp"] == current)
+    return entry["profile"] if entry is not None else None
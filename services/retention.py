@@ -0,0 +1,304 @@
+"""
+Metric partition maintenance and retention.
+
+ensure_partitions() keeps partitions ready for the current and the next
+METRIC_PARTITION_PREMAKE periods, so new metrics never land in the
+default partition. It runs at startup (models.database.init_db) and with
+every retention run.
+
+apply_retention() expires raw metrics older than METRIC_RETENTION_DAYS
+a whole partition at a time:
+
+1. Partitions whose period ended before the cutoff are detached, in one
+   short transaction. Reads and writes stop seeing them at once
+   (SQLite connections detach on their next checkout).
+2. Each is then archived (METRIC_RETENTION_ACTION=archive: the file moves
+   to METRIC_ARCHIVE_DIR, or the table to METRIC_ARCHIVE_SCHEMA) or
+   dropped (drop: the file is deleted, or DROP TABLE). Either costs the
+   same for ten rows or ten million. A partition that cannot be moved yet
+   (a connection still holds it) stays detached and is retried on the
+   next run.
+3. With drop, expired rows left in metrics_default (history from before
+   partitioning) are deleted in DELETION_BATCH_SIZE batches, the one
+   place rows are deleted individually. With archive they stay.
+
+Rollups are not touched, so trends, rollups and long-range charts keep
+the expired history at day, week and month resolution. Dashboard
+snapshots need no flush: their stamp carries the user's oldest metric.
+
+Usage:
+    python -m services.retention status
+    python -m services.retention run                    # premake, then expire
+    python -m services.retention run --days 730 --action drop --dry-run
+"""
+import argparse
+import logging
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import column, delete, insert, select, table, update
+from sqlalchemy.engine import Engine, Row
+
+from apps.config import settings
+from models.entities import Metric, MetricPartition, engine as default_engine
+from models.partitions import (
+    DEFAULT_PARTITION,
+    Partition,
+    PartitionError,
+    layout_for,
+    partition_for,
+    resolve_period,
+)
+
+
+logger = logging.getLogger("fitflow.retention")
+
+ACTIONS = ("archive", "drop")
+
+# Catalog rows are read on Core connections (the layout's transaction)
+CATALOG = MetricPartition.__table__
+
+
+def _partition(row: Row) -> Partition:
+    return Partition(row.name, row.period_start, row.period_end, row.location)
+
+
+# ==========================================
+# PARTITION CREATION
+# ==========================================
+
+def ensure_partitions(engine: Engine, now: Optional[datetime] = None) -> List[str]:
+    """
+    Convert `metrics` to the partitioned layout if needed and create the
+    partitions of the current and next METRIC_PARTITION_PREMAKE periods.
+    Safe to run from every worker at once.
+
+    Returns:
+        Names of the partitions created
+    """
+    layout = layout_for(engine)
+    period = resolve_period(engine.dialect.name)
+    if layout is None or period is None:
+        return []
+
+    now = now or datetime.utcnow()
+    wanted = [partition_for(now, period)]
+    for _ in range(settings.METRIC_PARTITION_PREMAKE):
+        wanted.append(partition_for(wanted[-1].end, period))
+
+    parent = Metric.__table__
+    created = []
+    with layout.transaction() as conn:
+        converted = not layout.is_partitioned(conn)
+        layout.prepare(conn, parent)
+
+        catalog = conn.execute(select(MetricPartition.name, MetricPartition.status)).all()
+        known = {name for name, _ in catalog}
+        room = None
+        if layout.max_partitions:
+            room = layout.max_partitions - sum(1 for _, status in catalog if status == "attached")
+
+        for partition in wanted:
+            if partition.name in known:
+                continue
+            if room is not None and room <= 0:
+                logger.warning(
+                    "Not creating %s: SQLite attaches at most %d partitions; expire old ones "
+                    "(METRIC_RETENTION_DAYS) or use a longer METRIC_PARTITION_PERIOD",
+                    partition.name, layout.max_partitions
+                )
+                break
+            location = layout.create(conn, parent, partition)
+            if location is None:
+                continue
+            conn.execute(insert(MetricPartition).values(
+                name=partition.name,
+                period=period,
+                period_start=partition.start,
+                period_end=partition.end,
+                status="attached",
+                location=location,
+                created_at=now
+            ))
+            created.append(partition.name)
+            if room is not None:
+                room -= 1
+
+        if converted or created:
+            layout.bump(conn)
+    return created
+
+
+# ==========================================
+# RETENTION
+# ==========================================
+
+def expire_default(engine: Engine, cutoff: datetime, batch_size: Optional[int] = None, pause: float = 0.0) -> int:
+    """
+    Delete rows older than `cutoff` from the default partition in batches,
+    walking the primary key so each batch continues where the last stopped.
+
+    Returns:
+        Rows deleted
+    """
+    batch_size = batch_size or settings.DELETION_BATCH_SIZE
+    rows = table(DEFAULT_PARTITION, column("id"), column("created_at"))
+    deleted, last_id = 0, None
+    while True:
+        with engine.begin() as conn:
+            query = select(rows.c.id).where(rows.c.created_at < cutoff).order_by(rows.c.id).limit(batch_size)
+            if last_id is not None:
+                query = query.where(rows.c.id > last_id)
+            ids = conn.execute(query).scalars().all()
+            if not ids:
+                return deleted
+            conn.execute(delete(rows).where(rows.c.id.in_(ids)))
+        deleted += len(ids)
+        last_id = ids[-1]
+        if pause:
+            time.sleep(pause)
+
+
+def _finish(engine: Engine, layout, row: Row, action: str) -> bool:
+    """Archive or drop one detached partition; False if it has to wait for the next run."""
+    partition = _partition(row)
+    try:
+        with layout.transaction() as conn:
+            if action == "archive":
+                location = layout.archive(conn, partition)
+            else:
+                layout.drop(conn, partition)
+                location = row.location
+            conn.execute(
+                update(MetricPartition)
+                .where(MetricPartition.id == row.id)
+                .values(status="archived" if action == "archive" else "dropped", location=location)
+            )
+    except (OSError, PartitionError, sqlite3.OperationalError) as exc:
+        logger.warning("%s stays detached until the next run: %s", partition.name, exc)
+        return False
+    return True
+
+
+def apply_retention(
+    engine: Engine,
+    now: Optional[datetime] = None,
+    days: Optional[int] = None,
+    action: Optional[str] = None,
+    dry_run: bool = False
+) -> Dict[str, Any]:
+    """
+    Expire raw metrics older than `days` (default METRIC_RETENTION_DAYS,
+    0 = keep everything) by detaching their partitions, then archiving or
+    dropping them (`action`, default METRIC_RETENTION_ACTION).
+
+    Returns:
+        Report: cutoff, and partition names expired, archived, dropped and
+        still pending, plus rows deleted from the default partition
+    """
+    now = now or datetime.utcnow()
+    days = settings.METRIC_RETENTION_DAYS if days is None else days
+    action = (action or settings.METRIC_RETENTION_ACTION).lower()
+    if action not in ACTIONS:
+        raise ValueError(f"Retention action must be one of: {', '.join(ACTIONS)}")
+
+    report: Dict[str, Any] = {
+        "cutoff": None, "expired": [], "archived": [], "dropped": [], "pending": [], "default_rows": 0
+    }
+    layout = layout_for(engine)
+    if layout is None or days <= 0:
+        return report
+    cutoff = now - timedelta(days=days)
+    report["cutoff"] = cutoff.isoformat()
+
+    with layout.transaction() as conn:
+        expired = conn.execute(
+            select(CATALOG)
+            .where(CATALOG.c.status == "attached", CATALOG.c.period_end <= cutoff)
+            .order_by(CATALOG.c.period_start)
+        ).all()
+        report["expired"] = [row.name for row in expired]
+        if dry_run:
+            return report
+        for row in expired:
+            layout.detach(conn, _partition(row))
+        if expired:
+            conn.execute(
+                update(MetricPartition)
+                .where(MetricPartition.id.in_([row.id for row in expired]))
+                .values(status="detached", expired_at=now)
+            )
+            layout.bump(conn)
+
+    # This process's idle connections would keep detached files open
+    engine.dispose()
+
+    with engine.connect() as conn:
+        detached = conn.execute(
+            select(CATALOG).where(CATALOG.c.status == "detached").order_by(CATALOG.c.period_start)
+        ).all()
+    for row in detached:
+        done = _finish(engine, layout, row, action)
+        report[("archived" if action == "archive" else "dropped") if done else "pending"].append(row.name)
+
+    if action == "drop":
+        report["default_rows"] = expire_default(engine, cutoff, pause=settings.DELETION_PAUSE_MS / 1000)
+    return report
+
+
+def partition_status(engine: Engine) -> List[Dict[str, Any]]:
+    """Catalog of metric partitions, oldest first."""
+    with engine.connect() as conn:
+        rows = conn.execute(select(CATALOG).order_by(CATALOG.c.period_start)).all()
+    return [
+        {
+            "name": row.name,
+            "period": row.period,
+            "start": row.period_start.isoformat(),
+            "end": row.period_end.isoformat(),
+            "status": row.status,
+            "location": row.location,
+        }
+        for row in rows
+    ]
+
+
+def main():
+    """
+    Command line entry point.
+
+    Usage:
+        python -m services.retention status
+        python -m services.retention run
+        python -m services.retention run --days 365 --action drop --dry-run
+    """
+    parser = argparse.ArgumentParser(description="Maintain FitFlow metric partitions")
+    parser.add_argument("command", choices=["status", "run"])
+    parser.add_argument("--days", type=int, help="Keep this many days of raw metrics (default: METRIC_RETENTION_DAYS)")
+    parser.add_argument("--action", choices=ACTIONS, help="default: METRIC_RETENTION_ACTION")
+    parser.add_argument("--dry-run", action="store_true", help="Only list the partitions that would expire")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        report = apply_retention(default_engine, days=args.days, action=args.action, dry_run=args.dry_run)
+        if report["cutoff"] is None:
+            print("Retention is off (METRIC_RETENTION_DAYS=0 or an unpartitioned database)")
+        else:
+            print(f"Cutoff {report['cutoff']}: {len(report['expired'])} partitions expired")
+            for key in ("archived", "dropped", "pending"):
+                if report[key]:
+                    print(f"  {key}: {', '.join(report[key])}")
+            if report["default_rows"]:
+                print(f"  {report['default_rows']} rows deleted from {DEFAULT_PARTITION}")
+        if not args.dry_run:
+            created = ensure_partitions(default_engine)
+            print(f"Created {len(created)} partitions{': ' + ', '.join(created) if created else ''}")
+
+    for row in partition_status(default_engine):
+        print(f"{row['name']:<20}{row['start'][:10]}  {row['end'][:10]}  {row['status']:<10}{row['location'] or ''}")
+
+
+if __name__ == "__main__":
+    main()
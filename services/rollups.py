@@ -0,0 +1,339 @@
+import argparse
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, case, func, or_, select, delete, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from models.entities import Metric, MetricRollup, SessionLocal
+from models.series import FIELD_NAMES
+
+
+# ==========================================
+# RESOLUTIONS
+# ==========================================
+
+# Coarsest first; approximate bucket length in days
+RESOLUTIONS: Tuple[Tuple[str, int], ...] = (
+    ("month", 30),
+    ("week", 7),
+    ("day", 1),
+)
+
+RESOLUTION_NAMES = tuple(name for name, _ in RESOLUTIONS)
+
+# A window is read at the coarsest resolution that still yields this many
+# buckets, e.g. 365 days -> 52 weekly rows, 30 days -> 30 daily rows.
+MIN_BUCKETS = 24
+
+
+def bucket_start(moment: datetime, resolution: str) -> datetime:
+    """
+    Start of the bucket containing `moment`.
+
+    Days start at midnight, weeks on Monday, months on the 1st (all UTC).
+    """
+    day = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    if resolution == "day":
+        return day
+    if resolution == "week":
+        return day - timedelta(days=day.weekday())
+    if resolution == "month":
+        return day.replace(day=1)
+    raise ValueError(f"Unknown rollup resolution '{resolution}'")
+
+
+def choose_resolution(days: int) -> str:
+    """Coarsest resolution giving at least MIN_BUCKETS buckets for `days`."""
+    for name, length in RESOLUTIONS:
+        if days / length >= MIN_BUCKETS:
+            return name
+    return "day"
+
+
+# ==========================================
+# INCREMENTAL MAINTENANCE
+# ==========================================
+
+def _fold(rollup: MetricRollup, created_at: datetime, values: Dict[str, float]) -> None:
+    """Fold one metric's values into a rollup row in place."""
+    is_first = rollup.count == 0
+    is_earliest = is_first or created_at < rollup.first_at
+    is_latest = is_first or created_at >= rollup.last_at
+
+    for name in FIELD_NAMES:
+        value = values[name]
+        if is_first:
+            setattr(rollup, f"{name}_min", value)
+            setattr(rollup, f"{name}_max", value)
+            setattr(rollup, f"{name}_sum", value)
+        else:
+            setattr(rollup, f"{name}_min", min(getattr(rollup, f"{name}_min"), value))
+            setattr(rollup, f"{name}_max", max(getattr(rollup, f"{name}_max"), value))
+            setattr(rollup, f"{name}_sum", getattr(rollup, f"{name}_sum") + value)
+        if is_earliest:
+            setattr(rollup, f"{name}_first", value)
+        if is_latest:
+            setattr(rollup, f"{name}_last", value)
+
+    if is_earliest:
+        rollup.first_at = created_at
+    if is_latest:
+        rollup.last_at = created_at
+    rollup.count = (rollup.count or 0) + 1
+
+
+def _insert_new(db: Session, rollups: List[MetricRollup]) -> None:
+    """
+    Insert new rollup rows in one executemany.
+
+    Adding them to the session would make the ORM insert them one statement
+    at a time (it needs each generated id back, and SQLite can't return
+    those for a batch); nothing reads the ids, so skip that.
+    """
+    if not rollups:
+        return
+    columns = [c.key for c in MetricRollup.__table__.columns if not c.primary_key]
+    db.execute(
+        insert(MetricRollup),
+        [{key: getattr(rollup, key) for key in columns} for rollup in rollups]
+    )
+
+
+# Dialect inserts supporting ON CONFLICT ... DO UPDATE
+UPSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def _merge_columns(stmt, dialect_name: str) -> Dict[str, object]:
+    """
+    SET clause folding an upsert's proposed row (`excluded`) into the
+    stored one, like _fold does in Python. All expressions see the stored
+    row as it was before the update.
+    """
+    old, new = MetricRollup.__table__.c, stmt.excluded
+    # Two-argument min()/max() are scalar functions in SQLite
+    least, greatest = (func.least, func.greatest) if dialect_name == "postgresql" else (func.min, func.max)
+    earlier = new.first_at < old.first_at
+    later = new.last_at >= old.last_at
+
+    merged = {
+        "count": old.count + new.count,
+        "first_at": least(old.first_at, new.first_at),
+        "last_at": greatest(old.last_at, new.last_at),
+    }
+    for name in FIELD_NAMES:
+        merged[f"{name}_min"] = least(old[f"{name}_min"], new[f"{name}_min"])
+        merged[f"{name}_max"] = greatest(old[f"{name}_max"], new[f"{name}_max"])
+        merged[f"{name}_sum"] = old[f"{name}_sum"] + new[f"{name}_sum"]
+        merged[f"{name}_first"] = case((earlier, new[f"{name}_first"]), else_=old[f"{name}_first"])
+        merged[f"{name}_last"] = case((later, new[f"{name}_last"]), else_=old[f"{name}_last"])
+    return merged
+
+
+def apply_metric(db: Session, metric: Metric) -> None:
+    """
+    Fold a newly logged metric into its day, week and month rollups.
+
+    Adds to the caller's transaction without committing, so the metric and
+    its rollups are written atomically. One INSERT ... ON CONFLICT DO
+    UPDATE creates or updates the three buckets, so concurrent logs for
+    the same bucket neither lose an increment nor collide on
+    uq_metric_rollups_bucket.
+
+    Args:
+        db: Database session
+        metric: Metric being inserted (created_at is filled in if unset)
+
+    Usage:
+        db.add(metric)
+        apply_metric(db, metric)
+        db.commit()
+    """
+    if metric.created_at is None:
+        metric.created_at = datetime.utcnow()
+
+    values = {name: getattr(metric, name) for name in FIELD_NAMES}
+    columns = [c.key for c in MetricRollup.__table__.columns if not c.primary_key]
+    rows = []
+    for resolution in RESOLUTION_NAMES:
+        rollup = MetricRollup(
+            user_id=metric.user_id,
+            resolution=resolution,
+            bucket_start=bucket_start(metric.created_at, resolution),
+            count=0
+        )
+        _fold(rollup, metric.created_at, values)
+        rows.append({key: getattr(rollup, key) for key in columns})
+
+    dialect_name = db.get_bind().dialect.name
+    stmt = UPSERTS[dialect_name](MetricRollup).values(rows)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=["user_id", "resolution", "bucket_start"],
+        set_=_merge_columns(stmt, dialect_name)
+    ))
+
+
+# ==========================================
+# READS
+# ==========================================
+
+def read_rollups(
+    db: Session,
+    user_id: str,
+    days: int,
+    resolution: Optional[str] = None,
+    now: Optional[datetime] = None
+) -> Tuple[str, List[MetricRollup]]:
+    """
+    Read the rollup buckets covering the last `days` days.
+
+    The bucket containing the cutoff is included whole, so a window is
+    rounded out to bucket boundaries.
+
+    Args:
+        db: Database session
+        user_id: User ID
+        days: Window length in days
+        resolution: Force "day", "week" or "month" (default: choose_resolution)
+        now: Reference time (defaults to utcnow)
+
+    Returns:
+        (resolution, rollups ordered oldest to newest)
+    """
+    resolution = resolution or choose_resolution(days)
+    cutoff = (now or datetime.utcnow()) - timedelta(days=days)
+
+    rollups = db.execute(
+        select(MetricRollup).where(
+            MetricRollup.user_id == user_id,
+            MetricRollup.resolution == resolution,
+            MetricRollup.bucket_start >= bucket_start(cutoff, resolution)
+        ).order_by(MetricRollup.bucket_start)
+    ).scalars().all()
+
+    return resolution, rollups
+
+
+def rollup_to_dict(rollup: MetricRollup) -> Dict[str, object]:
+    """Serialize a rollup bucket as min/max/mean/last per field."""
+    data = {
+        "bucket_start": rollup.bucket_start.isoformat(),
+        "count": rollup.count,
+    }
+    for name in FIELD_NAMES:
+        data[name] = {
+            "min": getattr(rollup, f"{name}_min"),
+            "max": getattr(rollup, f"{name}_max"),
+            "mean": round(getattr(rollup, f"{name}_sum") / rollup.count, 2),
+            "last": getattr(rollup, f"{name}_last"),
+        }
+    return data
+
+
+# ==========================================
+# BACKFILL
+# ==========================================
+
+def _rebuild_user(db: Session, user_id: str) -> int:
+    """
+    Replace one user's rollups with aggregates of their raw metrics.
+
+    Only buckets from the one holding the oldest raw metric on are
+    replaced: older raw metrics may have been expired by retention
+    (services.retention), and their rollups are all that is left of them.
+    The bucket holding the oldest raw metric can straddle the retention
+    cutoff; if its rollup has rows older than that metric (first_at), it
+    is kept as it is rather than rebuilt from the rows left.
+    """
+    rows = db.execute(
+        select(Metric.created_at, *[getattr(Metric, n) for n in FIELD_NAMES])
+        .where(Metric.user_id == user_id)
+        .order_by(Metric.created_at)
+    )
+
+    buckets: Dict[Tuple[str, datetime], MetricRollup] = {}
+    oldest = None
+    for row in rows:
+        created_at = row[0]
+        oldest = oldest or created_at
+        values = dict(zip(FIELD_NAMES, row[1:]))
+        for resolution in RESOLUTION_NAMES:
+            start = bucket_start(created_at, resolution)
+            rollup = buckets.get((resolution, start))
+            if rollup is None:
+                rollup = MetricRollup(
+                    user_id=user_id,
+                    resolution=resolution,
+                    bucket_start=start,
+                    count=0
+                )
+                buckets[(resolution, start)] = rollup
+            _fold(rollup, created_at, values)
+
+    if oldest is not None:
+        covered = or_(*[
+            and_(MetricRollup.resolution == resolution, MetricRollup.bucket_start >= bucket_start(oldest, resolution))
+            for resolution in RESOLUTION_NAMES
+        ])
+        straddling = db.execute(
+            select(MetricRollup.resolution, MetricRollup.bucket_start)
+            .where(MetricRollup.user_id == user_id, covered, MetricRollup.first_at < oldest)
+        ).all()
+        db.execute(delete(MetricRollup).where(
+            MetricRollup.user_id == user_id,
+            covered,
+            or_(MetricRollup.first_at.is_(None), MetricRollup.first_at >= oldest)
+        ))
+        for key in straddling:
+            buckets.pop(tuple(key), None)
+    _insert_new(db, list(buckets.values()))
+    db.commit()
+    return len(buckets)
+
+
+def rebuild_rollups(db: Session, user_id: Optional[str] = None) -> int:
+    """
+    Recompute rollups from the raw metrics table.
+
+    Works one user at a time (one transaction each), so memory and lock
+    time are bounded by the largest single history.
+
+    Args:
+        db: Database session
+        user_id: Only rebuild this user (default: everyone with metrics)
+
+    Returns:
+        Number of rollup rows written
+    """
+    if user_id:
+        user_ids = [user_id]
+    else:
+        user_ids = db.execute(select(Metric.user_id).distinct()).scalars().all()
+
+    return sum(_rebuild_user(db, uid) for uid in user_ids)
+
+
+def main():
+    """
+    Command line entry point.
+
+    Usage:
+        python -m services.rollups backfill
+        python -m services.rollups backfill --user-id alice
+    """
+    parser = argparse.ArgumentParser(description="Maintain FitFlow metric rollups")
+    parser.add_argument("command", choices=["backfill"])
+    parser.add_argument("--user-id", help="Only rebuild rollups for this user")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        written = rebuild_rollups(db, user_id=args.user_id)
+        print(f"Rebuilt {written} rollup rows")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Version stamps for conditional GET (see apps.conditional).
+
+Each stamp is one single-row query answered from indexes: the user by
+its unique user_id, and the newest metric, plan or chat message per user
+from the (user_id, created_at) indexes. Rows are append-only apart from
+the profile, which carries its own version counter, so these values
+change whenever the resource they stamp does. User stamps also carry the
+account's created_at: SQLite can hand a deleted user's id to the next
+registration, whose version starts at 1 again.
+"""
+from typing import Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from models.entities import ChatMessage, Metric, Plan, User
+
+
+def profile_stamp(db: Session, user_id: str) -> Optional[Tuple]:
+    """(id, created_at, version) of the user, None if there is no such user."""
+    row = db.execute(select(User.id, User.created_at, User.version).where(User.user_id == user_id)).first()
+    return tuple(row) if row else None
+
+
+def current_plan_stamp(db: Session, user_id: str) -> Optional[Tuple]:
+    """(id, plan_id) of the user's newest plan, None if there is none or the user is being deleted."""
+    row = db.execute(
+        select(Plan.id, Plan.plan_id).join(User, User.user_id == Plan.user_id).where(Plan.user_id == user_id)
+        .order_by(Plan.created_at.desc()).limit(1)
+    ).first()
+    return tuple(row) if row else None
+
+
+def _newest(model, user_id: str, oldest: bool = False):
+    # ORDER BY ... LIMIT 1 rather than max(): over the partitioned metrics
+    # view SQLite merges the per-partition index scans and stops at the first row
+    return (
+        select(model.created_at)
+        .where(model.user_id == user_id)
+        .order_by(model.created_at if oldest else model.created_at.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+
+
+def _count(model, user_id: str):
+    return select(func.count()).select_from(model).where(model.user_id == user_id).scalar_subquery()
+
+
+def dashboard_stamp(db: Session, user_id: str) -> Optional[Tuple]:
+    """
+    Everything the dashboard depends on, in one row: the user's id,
+    creation time and profile version, the newest metric, plan and chat message, and the
+    number of each, and the oldest metric (days active also depends on
+    the date, which callers add). The counts catch rows committed out of
+    created_at order, which leave the newest timestamps unchanged; the
+    oldest metric moves when retention (services.retention) expires
+    history, in every worker at once.
+
+    Returns:
+        Stamp tuple, None if there is no such user
+    """
+    row = db.execute(
+        select(
+            User.id,
+            User.created_at,
+            User.version,
+            _newest(Metric, user_id),
+            _newest(Plan, user_id),
+            _newest(ChatMessage, user_id),
+            _count(Metric, user_id),
+            _count(Plan, user_id),
+            _count(ChatMessage, user_id),
+            _newest(Metric, user_id, oldest=True),
+        ).where(User.user_id == user_id)
+    ).first()
+    return tuple(row) if row else None
@@ -1,14 +1,30 @@
 # tests/conftest.py
 import os
+import shutil
 import tempfile
 
+# The app's own engine (init_db in the lifespan, partitions next to its
+# file) gets a scratch database, never ./fitflow.db in the working tree.
+# Set before apps.config is imported.
+APP_DB_DIR = tempfile.mkdtemp(prefix="fitflow-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(APP_DB_DIR, 'fitflow.db')}"
+
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from models.engine import build_engine
 from sqlalchemy.orm import sessionmaker
 
-from app.api import app
-from models.database import Base, get_db
+from apps.api import app
+from apps.cache import MemoryCache, RedisCache, SQLiteCache
+from apps.config import settings
+from apps.resp_server import RespServer
+from models.database import Base, get_db, get_read_db
+
+
+@pytest.fixture(scope="session", autouse=True)
+def app_db_dir():
+    yield APP_DB_DIR
+    shutil.rmtree(APP_DB_DIR, ignore_errors=True)
 
 
 @pytest.fixture(scope="session")
@@ -22,12 +38,17 @@ def test_db_url():
         os.remove(db_path)
 
 
+@pytest.fixture(scope="session")
+def resp_server():
+    # Redis-protocol stand-in for RedisCache tests
+    server = RespServer(("127.0.0.1", 0)).start()
+    yield server
+    server.stop()
+
+
 @pytest.fixture(scope="session")
 def engine(test_db_url):
-    eng = create_engine(
-        test_db_url,
-        connect_args={"check_same_thread": False},
-    )
+    eng = build_engine(test_db_url)
     Base.metadata.create_all(bind=eng)
     yield eng
     Base.metadata.drop_all(bind=eng)
@@ -58,6 +79,49 @@ def client(db_session, monkeypatch):
             pass
 
     app.dependency_overrides[get_db] = _override_get_db
+    app.dependency_overrides[get_read_db] = _override_get_db
+    # Fail any request issuing too many queries or the same query twice
+    monkeypatch.setattr(settings, "QUERY_BUDGET", 10)
     with TestClient(app) as c:
         yield c
     app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def register_user():
+    """Register a user through the API: register_user(client, user_id, **fields) -> response."""
+    def register(client, user_id, **fields):
+        return client.post("/api/v1/auth/register", json={
+            "user_id": user_id,
+            "name": "Test User",
+            "age": 30,
+            "weight_kg": 70,
+            "height_cm": 175,
+            "fitness_level": "beginner",
+            "goal": "fat_loss",
+            "equipment": [],
+            **fields,
+        })
+    return register
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def make_cache(request, tmp_path):
+    """Factory of caches on one backend; instances share it like workers would
+    (MemoryCache cannot be shared, so its threads share one instance)."""
+    created = []
+    memory = {}
+
+    def make(namespace="test", **options):
+        if request.param == "memory":
+            cache = memory.setdefault(namespace, MemoryCache(100, namespace=namespace, **options))
+        elif request.param == "sqlite":
+            cache = SQLiteCache(str(tmp_path / "shared.db"), 100, namespace=namespace, **options)
+        else:
+            cache = RedisCache(request.getfixturevalue("resp_server").url, namespace=namespace, **options)
+        created.append(cache)
+        return cache
+
+    yield make
+    for cache in created:
+        cache.clear()
@@ -0,0 +1,195 @@
+# tests/test_account_deletion.py
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from apps.cache import MemoryCache
+from models.database import AccountDeletion, ChatMessage, Metric, MetricRollup, Plan, User
+from services import plan_service
+from services.account_deletion import CHILD_TABLES, claim, deletion_steps, run_deletion, start_deletion
+from services.plan_service import PLAN_ROW, PlanCache, reconstruct
+
+
+def _add_heavy_user(engine, user_id, metrics=45, chats=12):
+    session = sessionmaker(bind=engine)()
+    session.add(User(
+        user_id=user_id, name="Heavy", age=35, weight_kg=90, height_cm=185,
+        fitness_level="advanced", goal="strength", equipment=["barbell"]
+    ))
+    start = datetime(2026, 1, 1)
+    session.execute(insert(Metric), [
+        {"user_id": user_id, "weight_kg": 90, "strength_1rm": 150, "sleep_hours": 7,
+         "mood": 7, "energy": 7, "created_at": start + timedelta(days=day)}
+        for day in range(metrics)
+    ])
+    session.execute(insert(ChatMessage), [
+        {"user_id": user_id, "user_message": "Hi", "bot_response": "Hello"} for _ in range(chats)
+    ])
+    session.commit()
+    return session
+
+
+def _remaining(session, user_id):
+    counts = {
+        name: session.execute(select(func.count()).select_from(model).where(model.user_id == user_id)).scalar()
+        for name, model in CHILD_TABLES
+    }
+    counts["users"] = session.execute(
+        select(func.count()).select_from(User).where(User.user_id == user_id)
+    ).scalar()
+    return counts
+
+
+def test_job_deletes_in_bounded_batches_and_reports_progress(engine):
+    session = _add_heavy_user(engine, "deletion_batches")
+    try:
+        job = start_deletion(session, "deletion_batches")
+        assert job.status == "pending"
+        assert job.total_rows == 45 + 12 + session.execute(
+            select(func.count()).select_from(MetricRollup).where(MetricRollup.user_id == "deletion_batches")
+        ).scalar()
+
+        done = []
+        for step in deletion_steps(session, job.job_id, batch_size=10):
+            done.append(step.deleted_rows)
+            assert step.deleted_rows - (done[-2] if len(done) > 1 else 0) <= 10
+        assert done == sorted(done)
+        assert len(done) > (45 + 12) // 10
+
+        job = session.execute(select(AccountDeletion).where(AccountDeletion.job_id == job.job_id)).scalar_one()
+        assert job.status == "done"
+        assert job.deleted_rows == job.total_rows
+        assert job.progress["metrics"] == 45
+        assert job.progress["chat_messages"] == 12
+        assert _remaining(session, "deletion_batches") == {name: 0 for name in [*dict(CHILD_TABLES), "users"]}
+
+        # a finished job cannot be claimed again
+        assert claim(session, job.job_id) is None
+    finally:
+        session.close()
+
+
+def test_failed_and_abandoned_jobs_resume(engine):
+    session = _add_heavy_user(engine, "deletion_resume", metrics=5, chats=3)
+    try:
+        job = start_deletion(session, "deletion_resume")
+        steps = deletion_steps(session, job.job_id, batch_size=2)
+        next(steps)
+        steps.close()  # the runner dies mid-job
+
+        # still running and recent: nobody else may take it
+        assert claim(session, job.job_id) is None
+        job.updated_at = datetime.utcnow() - timedelta(hours=1)
+        session.commit()
+
+        run_deletion(session, job.job_id, batch_size=2, pause=0)
+        assert job.status == "done"
+        assert job.deleted_rows == job.total_rows
+        assert _remaining(session, "deletion_resume")["users"] == 0
+    finally:
+        session.close()
+
+
+def test_deleted_account_is_hidden_while_its_data_is_removed(client, register_user, db_session):
+    register_user(client, "deletion_hidden")
+    client.post("/api/v1/users/metrics/log", json={
+        "user_id": "deletion_hidden", "weight_kg": 77, "strength_1rm": 90,
+        "sleep_hours": 7, "mood": 6, "energy": 6,
+    })
+    client.post("/api/v1/chat/message", json={"user_id": "deletion_hidden", "message": "Hello"})
+    assert client.get("/api/v1/auth/profile", params={"user_id": "deletion_hidden"}).status_code == 200
+
+    job = start_deletion(db_session, "deletion_hidden")  # not run yet
+    assert client.get("/api/v1/auth/profile", params={"user_id": "deletion_hidden"}).status_code == 404
+    assert client.get("/api/v1/progress/dashboard", params={"user_id": "deletion_hidden"}).status_code == 404
+    assert client.delete("/api/v1/auth/profile", params={"user_id": "deletion_hidden"}).status_code == 404
+    assert register_user(client, "deletion_hidden").status_code == 409
+
+    status = client.get(f"/api/v1/auth/deletions/{job.job_id}").json()
+    assert status["status"] == "pending"
+    assert status["total_rows"] >= 3
+    assert status["percent"] == 0.0
+
+    run_deletion(db_session, job.job_id, pause=0)
+    assert client.get(f"/api/v1/auth/deletions/{job.job_id}").json()["percent"] == 100.0
+    assert register_user(client, "deletion_hidden").status_code == 200
+
+
+def test_delete_endpoint_accepts_and_completes_in_background(client, register_user, db_session):
+    register_user(client, "deletion_api")
+    for mood in range(1, 4):
+        client.post("/api/v1/users/metrics/log", json={
+            "user_id": "deletion_api", "weight_kg": 77, "strength_1rm": 90,
+            "sleep_hours": 7, "mood": mood, "energy": 6,
+        })
+    client.post("/api/v1/plans/generate", json={"user_id": "deletion_api", "week": 1})
+
+    r = client.delete("/api/v1/auth/profile", params={"user_id": "deletion_api"})
+    assert r.status_code == 202
+    body = r.json()
+    assert body["status"] == "accepted"
+    assert body["job_id"].startswith("del_")
+
+    # TestClient returns after the background task
+    status = client.get(body["progress_url"]).json()
+    assert status["status"] == "done"
+    assert status["deleted_rows"] == status["total_rows"]
+    assert status["progress"]["plans"] == 1
+    assert _remaining(db_session, "deletion_api") == {name: 0 for name in [*dict(CHILD_TABLES), "users"]}
+    assert client.get("/api/v1/auth/deletions/del_missing").status_code == 404
+
+
+def test_reregistered_user_id_gets_a_fresh_profile(client, register_user, db_session):
+    register_user(client, "deletion_reused", name="Old Owner")
+    old = client.get("/api/v1/auth/profile", params={"user_id": "deletion_reused"})
+    assert old.json()["name"] == "Old Owner"
+
+    assert client.delete("/api/v1/auth/profile", params={"user_id": "deletion_reused"}).status_code == 202
+    assert register_user(client, "deletion_reused", name="New Owner").status_code == 200
+
+    # SQLite may reuse the deleted row's id, and the version starts over
+    r = client.get(
+        "/api/v1/auth/profile", params={"user_id": "deletion_reused"},
+        headers={"If-None-Match": old.headers["etag"]}
+    )
+    assert r.status_code == 200
+    assert r.json()["name"] == "New Owner"
+
+
+def _generate_plans(client, user_id, weeks):
+    return [
+        client.post("/api/v1/plans/generate", json={"user_id": user_id, "week": week}).json()["plan_id"]
+        for week in range(1, weeks + 1)
+    ]
+
+
+def test_plans_of_a_deleted_account_are_not_served(client, register_user, db_session):
+    register_user(client, "deletion_plans")
+    first, second = _generate_plans(client, "deletion_plans", 2)
+    current = client.get("/api/v1/plans/current", params={"user_id": "deletion_plans"})
+    assert current.status_code == 200
+
+    start_deletion(db_session, "deletion_plans")  # not run yet
+    assert client.get(f"/api/v1/plans/{first}").status_code == 404
+    assert client.get(f"/api/v1/plans/{second}/diff").status_code == 404
+    revalidated = client.get(
+        "/api/v1/plans/current", params={"user_id": "deletion_plans"},
+        headers={"If-None-Match": current.headers["etag"]}
+    )
+    assert revalidated.status_code == 404
+
+
+def test_remaining_delta_plans_keep_their_base_mid_deletion(client, register_user, db_session, monkeypatch):
+    monkeypatch.setattr(plan_service, "PLANS", PlanCache(MemoryCache(10)))
+    register_user(client, "deletion_chain")
+    plan_ids = _generate_plans(client, "deletion_chain", 3)
+    rows = db_session.execute(PLAN_ROW.where(Plan.plan_id.in_(plan_ids))).all()
+    assert sum(row.delta is not None for row in rows) == 2
+
+    job = start_deletion(db_session, "deletion_chain")
+    for _ in deletion_steps(db_session, job.job_id, batch_size=1):
+        plan_service.PLANS.clear()  # rebuild from the rows still stored
+        for row in db_session.execute(PLAN_ROW.where(Plan.user_id == "deletion_chain")).all():
+            assert reconstruct(db_session, row)
+    assert db_session.execute(PLAN_ROW.where(Plan.user_id == "deletion_chain")).first() is None
@@ -0,0 +1,27 @@
+# tests/test_benchmarks.py
+from benchmarks.agents import build_inputs, compare, measure
+
+
+def _result(p50_us, alloc_kib):
+    return {
+        "meta": {"input": "series"},
+        "results": [{"case": "orchestrator", "history": 100, "p50_us": p50_us, "alloc_peak_kib": alloc_kib}],
+    }
+
+
+def test_compare_flags_slowdowns_and_allocation_growth():
+    baseline = _result(40.0, 4.0)
+    assert compare(baseline, _result(42.0, 4.2), threshold=0.10) == []
+
+    regressions = compare(baseline, _result(80.0, 40.0), threshold=0.10)
+    assert len(regressions) == 2
+    assert "p50 40.0 -> 80.0" in regressions[0]
+
+
+def test_measure_reports_percentiles():
+    inputs = build_inputs(10, as_dicts=False)
+    assert len(inputs) == 4 and len(inputs[0][1]) == 10
+
+    stats = measure([lambda: sum(range(100))], min_time=0.0, min_iters=50, warmup=1)
+    assert stats["iterations"] == 50
+    assert 0 < stats["p50_us"] <= stats["p99_us"]
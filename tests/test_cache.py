@@ -0,0 +1,207 @@
+# tests/test_cache.py
+import os
+import threading
+import time
+
+import pytest
+
+from apps.cache import MemoryCache, RedisCache, SQLiteCache, cache_from_url
+from routes import chat
+from services import profiles
+
+
+def _run_threads(count, target):
+    threads = [threading.Thread(target=target, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryCache(2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+
+
+def test_update_replaces_removes_and_skips_missing(make_cache):
+    cache = make_cache()
+    assert cache.update("missing", lambda value: value + 1) is None
+    assert cache.get("missing") is None
+    cache.set("n", 1)
+    assert cache.update("n", lambda value: value + 1) == 2
+    cache.update("n", lambda value: None)
+    assert cache.get("n") is None
+
+
+def test_values_are_shared_and_updates_atomic(make_cache):
+    first, second = make_cache(), make_cache()
+    first.set("snapshot", {"count": 0, "items": ["a"]})
+    assert second.get("snapshot") == {"count": 0, "items": ["a"]}
+
+    def bump(index):
+        cache = (first, second)[index % 2]
+        for _ in range(25):
+            cache.update("snapshot", lambda value: dict(value, count=value["count"] + 1))
+
+    _run_threads(8, bump)
+    assert first.get("snapshot")["count"] == 200
+
+    second.delete("snapshot")
+    assert first.get("snapshot") is None
+
+
+def test_ttl_add_and_namespaces(make_cache):
+    cache, other = make_cache(ttl=0.05), make_cache(namespace="other")
+    cache.set("k", 1)
+    assert cache.add("k", 2) is False
+    other.set("k", "other")
+    time.sleep(0.1)
+    assert cache.get("k") is None
+    assert cache.add("k", 3) is True and cache.get("k") == 3
+
+    cache.clear()
+    assert cache.get("k") is None and len(cache) == 0
+    assert other.get("k") == "other"
+
+
+def test_get_or_compute_runs_once_for_concurrent_misses(make_cache):
+    # threads of two workers sharing the backend
+    caches = (make_cache(), make_cache())
+    calls = []
+    results = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.1)
+        return {"built": len(calls)}
+
+    _run_threads(16, lambda index: results.append(caches[index % 2].get_or_compute("hot", compute)))
+    assert len(calls) == 1
+    assert all(result == results[0] for result in results)
+
+
+def test_get_or_compute_recomputes_stale_and_skips_none(make_cache):
+    cache = make_cache()
+    cache.set("user", {"version": 1})
+    value = cache.get_or_compute("user", lambda: {"version": 2}, fresh=lambda value: value["version"] == 2)
+    assert value == {"version": 2} and cache.get("user") == {"version": 2}
+
+    assert cache.get_or_compute("gone", lambda: None) is None
+    assert cache.get("gone") is None
+
+
+def test_get_or_compute_failure_reaches_every_caller(make_cache):
+    cache = make_cache()
+    errors = []
+
+    def compute():
+        time.sleep(0.05)
+        raise RuntimeError("boom")
+
+    def call(index):
+        try:
+            cache.get_or_compute("broken", compute)
+        except RuntimeError as exc:
+            errors.append(exc)
+
+    _run_threads(4, call)
+    assert len(errors) == 4
+    # the lock entry is released, so the next miss computes right away
+    assert cache.get_or_compute("broken", lambda: "fixed") == "fixed"
+
+
+def test_sqlite_cache_prunes_to_size(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "prune.db"), size=3, prune_every=4)
+    for index in range(8):
+        cache.set(f"k{index}", index)
+    assert len(cache) == 3
+    assert cache.get("k7") == 7
+
+
+def test_sqlite_cache_prunes_only_its_namespace(tmp_path):
+    path = str(tmp_path / "namespaces.db")
+    large = SQLiteCache(path, size=100, namespace="dashboard")
+    small = SQLiteCache(path, size=2, prune_every=4, namespace="plan")
+    for index in range(50):
+        large.set(f"user{index}", index)
+    for index in range(8):
+        small.set(f"plan{index}", index)
+    assert len(small) == 2
+    assert len(large) == 50
+
+
+def _in_child(check):
+    """Run check() in a forked child; True if it returned True there."""
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            code = 0 if check() else 1
+        finally:
+            os._exit(code)
+    _, status = os.waitpid(pid, 0)
+    return os.waitstatus_to_exitcode(status) == 0
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork()")
+def test_forked_children_open_their_own_connections(tmp_path, resp_server):
+    local = SQLiteCache(str(tmp_path / "fork.db"), namespace="fork")
+    remote = RedisCache(resp_server.url, namespace="fork")
+    local.set("parent", 1)
+    remote.set("parent", 1)
+    inherited, pooled = local._conn, list(remote._pool)
+
+    def child():
+        if local._conn is inherited or local.get("parent") != 1:
+            return False
+        local.set("child", 2)
+        remote.set("child", 2)
+        return not any(conn in pooled for conn in remote._pool)
+
+    assert _in_child(child)
+    assert local._conn is inherited
+    assert (local.get("child"), remote.get("child")) == (2, 2)
+
+
+def test_redis_cache_reconnects(resp_server):
+    cache = RedisCache(resp_server.url, namespace="reconnect")
+    cache.set("k", 1)
+    for conn in cache._pool:
+        conn.sock.close()  # e.g. the server closed idle connections
+    assert cache.get("k") == 1
+    cache.clear()
+
+
+def test_cache_from_url(tmp_path):
+    assert isinstance(cache_from_url(""), MemoryCache)
+    assert isinstance(cache_from_url(f"sqlite:///{tmp_path}/c.db"), SQLiteCache)
+    redis = cache_from_url("redis://:secret@cache.internal:6380/2", namespace="plan")
+    assert (redis.host, redis.port, redis.password, redis.db) == ("cache.internal", 6380, "secret", 2)
+    with pytest.raises(ValueError):
+        cache_from_url("memcached://localhost")
+
+
+def test_profile_and_coaching_replies_are_cached(client, register_user, monkeypatch):
+    monkeypatch.setattr(profiles, "PROFILES", MemoryCache(10))
+    monkeypatch.setattr(chat, "REPLIES", MemoryCache(10))
+    for user_id in ("cached_a", "cached_b"):
+        register_user(client, user_id, weight_kg=75)
+
+    client.get("/api/v1/auth/profile", params={"user_id": "cached_a"})
+    again = client.get("/api/v1/auth/profile", params={"user_id": "cached_a"})
+    assert again.headers["x-db-query-count"] == "1"  # the stamp only
+    client.put("/api/v1/auth/profile", params={"user_id": "cached_a"}, json={"weight_kg": 74})
+    assert client.get("/api/v1/auth/profile", params={"user_id": "cached_a"}).json()["weight_kg"] == 74
+
+    replies = [
+        client.post("/api/v1/chat/message", json={"user_id": user_id, "message": "Any nutrition tips?"}).json()
+        for user_id in ("cached_a", "cached_b")
+    ]
+    assert replies[0] == replies[1]
+    assert "Nutrition is 70% of the battle" in replies[0]["response"]
+    assert len(chat.REPLIES) == 1
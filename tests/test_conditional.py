@@ -0,0 +1,78 @@
+# tests/test_conditional.py
+from starlette.requests import Request
+
+from apps.conditional import make_etag, matches
+
+
+def _revalidate(client, url, etag, **params):
+    return client.get(url, params=params, headers={"If-None-Match": etag})
+
+
+def test_if_none_match_parsing():
+    etag = make_etag("thing", 1, "a")
+    assert etag.startswith('"') and etag != make_etag("thing", 2, "a")
+
+    def request(header):
+        return Request({"type": "http", "headers": [(b"if-none-match", header.encode())]})
+
+    assert matches(request(etag), etag)
+    assert matches(request(f'"other", W/{etag}'), etag)
+    assert matches(request("*"), etag)
+    assert not matches(request('"other"'), etag)
+
+
+def test_profile_etag_changes_on_update(client, register_user):
+    register_user(client, "etag_profile")
+    first = client.get("/api/v1/auth/profile", params={"user_id": "etag_profile"})
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"] == "private, no-cache"
+
+    cached = _revalidate(client, "/api/v1/auth/profile", etag, user_id="etag_profile")
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["x-db-query-count"] == "1"
+
+    client.put("/api/v1/auth/profile", params={"user_id": "etag_profile"}, json={"weight_kg": 71})
+    updated = _revalidate(client, "/api/v1/auth/profile", etag, user_id="etag_profile")
+    assert updated.status_code == 200
+    assert updated.json()["weight_kg"] == 71
+    assert updated.headers["etag"] != etag
+
+
+def test_current_plan_and_dashboard_revalidate(client, register_user):
+    register_user(client, "etag_polling")
+    client.post("/api/v1/plans/generate", json={"user_id": "etag_polling", "week": 1})
+
+    plan = client.get("/api/v1/plans/current", params={"user_id": "etag_polling"})
+    dashboard = client.get("/api/v1/progress/dashboard", params={"user_id": "etag_polling"})
+    assert dashboard.status_code == 200
+    assert dashboard.json()["latest_plan"]["plan_id"] == plan.json()["plan_id"]
+
+    for url, response in (("/api/v1/plans/current", plan), ("/api/v1/progress/dashboard", dashboard)):
+        cached = _revalidate(client, url, response.headers["etag"], user_id="etag_polling")
+        assert cached.status_code == 304
+        assert cached.headers["x-db-query-count"] == "1"
+
+    for strength in (120, 125):
+        client.post("/api/v1/users/metrics/log", json={
+            "user_id": "etag_polling",
+            "weight_kg": 70.5,
+            "strength_1rm": strength,
+            "sleep_hours": 8,
+            "mood": 7,
+            "energy": 7,
+        })
+    assert _revalidate(
+        client, "/api/v1/plans/current", plan.headers["etag"], user_id="etag_polling"
+    ).status_code == 304
+    refreshed = _revalidate(
+        client, "/api/v1/progress/dashboard", dashboard.headers["etag"], user_id="etag_polling"
+    )
+    assert refreshed.status_code == 200
+    assert refreshed.json()["statistics"]["total_metrics"] == 2
+    assert refreshed.json()["progress"]["strength_change_kg"] == 5
+
+    client.post("/api/v1/plans/generate", json={"user_id": "etag_polling", "week": 2})
+    assert _revalidate(
+        client, "/api/v1/plans/current", plan.headers["etag"], user_id="etag_polling"
+    ).json()["week"] == 2
@@ -0,0 +1,122 @@
+# tests/test_dashboard.py
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+from models.database import Metric
+from services import dashboard
+from services.dashboard import build_snapshot, patch_metric, render, snapshot_key
+
+URL = "/api/v1/progress/dashboard"
+
+
+@pytest.fixture
+def snapshots(make_cache, monkeypatch):
+    cache = make_cache("dashboard")
+    monkeypatch.setattr(dashboard, "SNAPSHOTS", cache)
+    return cache
+
+
+def _write(client, rng, user_id, step):
+    """One random write through the API; returns its kind."""
+    kind = rng.choice(["metric", "metric", "plan", "chat", "chat", "profile", "clear_chat"])
+    if kind == "metric":
+        client.post("/api/v1/users/metrics/log", json={
+            "user_id": user_id,
+            "weight_kg": round(rng.uniform(70, 90), 1),
+            "strength_1rm": round(rng.uniform(80, 160), 1),
+            "sleep_hours": round(rng.uniform(5, 9), 1),
+            "mood": rng.randint(1, 10),
+            "energy": rng.randint(1, 10),
+        })
+    elif kind == "plan":
+        client.post("/api/v1/plans/generate", json={"user_id": user_id, "week": step % 52 + 1})
+    elif kind == "chat":
+        client.post("/api/v1/chat/message", json={"user_id": user_id, "message": "How do I progress?"})
+    elif kind == "profile":
+        client.put("/api/v1/auth/profile", params={"user_id": user_id}, json={"weight_kg": rng.randint(60, 100)})
+    else:
+        client.delete("/api/v1/chat/history", params={"user_id": user_id})
+    return kind
+
+
+def test_snapshot_matches_recomputed_dashboard_after_any_writes(client, register_user, db_session, snapshots):
+    rng = random.Random(45)
+    user_id = f"snapshot_{type(snapshots).__name__}"
+    register_user(client, user_id)
+    assert client.get(URL, params={"user_id": user_id}).status_code == 200
+
+    for step in range(40):
+        kind = _write(client, rng, user_id, step)
+        patched = snapshots.get(snapshot_key(user_id)) is not None
+        response = client.get(URL, params={"user_id": user_id})
+        assert response.status_code == 200, kind
+
+        db_session.rollback()
+        assert response.json() == render(build_snapshot(db_session, user_id)), kind
+        if kind in ("metric", "plan", "chat"):
+            # patched in place: served from the snapshot after the stamp query
+            assert patched and response.headers["x-db-query-count"] == "1", kind
+        else:
+            assert not patched, kind
+
+
+def test_stale_snapshot_is_rebuilt(client, register_user, db_session, snapshots):
+    user_id = f"snapshot_stale_{type(snapshots).__name__}"
+    register_user(client, user_id)
+    client.get(URL, params={"user_id": user_id})
+
+    # a Core insert fires no ORM events, so nothing patches the snapshot
+    db_session.execute(insert(Metric).values(
+        user_id=user_id, weight_kg=80, strength_1rm=100, sleep_hours=8,
+        mood=7, energy=7, created_at=datetime.utcnow()
+    ))
+    db_session.commit()
+    body = client.get(URL, params={"user_id": user_id}).json()
+    assert body["statistics"]["total_metrics"] == 1
+    assert body["latest_metrics"]["strength_1rm"] == 100
+
+
+def test_rows_committed_out_of_created_at_order_are_not_lost(client, register_user, db_session, engine, snapshots):
+    user_id = f"snapshot_order_{type(snapshots).__name__}"
+    register_user(client, user_id)
+    client.get(URL, params={"user_id": user_id})
+
+    # created_at is set before the write lock: the older row commits last
+    now = datetime.utcnow()
+    for moment in (now + timedelta(seconds=1), now):
+        writer = sessionmaker(bind=engine)()
+        try:
+            writer.add(Metric(
+                user_id=user_id, weight_kg=80, strength_1rm=100, sleep_hours=8,
+                mood=7, energy=7, created_at=moment
+            ))
+            writer.commit()
+        finally:
+            writer.close()
+
+    body = client.get(URL, params={"user_id": user_id}).json()
+    db_session.rollback()
+    assert body == render(build_snapshot(db_session, user_id))
+    assert body["statistics"]["total_metrics"] == 2
+
+
+def test_patch_skips_rows_already_in_snapshot(db_session, snapshots):
+    metric = {
+        "weight_kg": 80.0, "strength_1rm": 100.0, "sleep_hours": 8.0,
+        "mood": 7, "energy": 7, "recorded_at": "2030-01-01T00:00:00",
+    }
+    snapshot = {
+        "stamp": [1, "2029-12-01T00:00:00", 1, None, None, None, 0, 0, 0, None],
+        "user_created_at": None,
+        "first_metric": None,
+        "dashboard": {"statistics": {"total_metrics": 0}, "latest_metrics": {}, "progress": {}},
+    }
+    once = patch_metric(snapshot, metric)
+    assert once["dashboard"]["statistics"]["total_metrics"] == 1
+    assert once["stamp"][3:] == ["2030-01-01T00:00:00", None, None, 1, 0, 0, "2030-01-01T00:00:00"]
+    assert snapshot["dashboard"]["statistics"]["total_metrics"] == 0  # not mutated
+    assert patch_metric(once, metric) is once
@@ -0,0 +1,61 @@
+# tests/test_datagen.py
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from benchmarks.datagen import generate
+from models.database import ChatMessage, Metric, Plan, User
+from models.engine import build_engine
+from models.ids import INT_EPOCH_MS, INT_RANDOM_BITS
+
+
+def _generate(**kwargs):
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    engine = build_engine(f"sqlite:///{path}")
+    counts = generate(engine, end=datetime(2026, 1, 31), **kwargs)
+    return engine, path, counts
+
+
+def test_generate_writes_requested_volume_readable_by_orm():
+    engine, path, counts = _generate(users=6, days=40, plans_per_user=3, chats_per_user=2, batch_size=50)
+    try:
+        assert counts == {"users": 6, "metrics": 240, "plans": 18, "chat_messages": 12}
+        with Session(engine) as db:
+            user = db.execute(select(User).where(User.user_id == "gen_000001")).scalar_one()
+            assert isinstance(user.equipment, list)
+
+            metrics = db.execute(
+                select(Metric).where(Metric.user_id == user.user_id).order_by(Metric.created_at)
+            ).scalars().all()
+            assert len(metrics) == 40
+            assert metrics[-1].created_at.date() == datetime(2026, 1, 31).date()
+            assert all(1 <= m.mood <= 10 for m in metrics)
+
+            plan = db.execute(select(Plan).where(Plan.user_id == user.user_id)).scalars().first()
+            assert "workout_plan" in plan.plan_data
+            assert db.execute(select(func.count()).select_from(ChatMessage)).scalar() == 12
+    finally:
+        engine.dispose()
+        os.remove(path)
+
+
+def test_generate_is_deterministic():
+    rows = []
+    for _ in range(2):
+        engine, path, _ = _generate(users=3, days=10, plans_per_user=0, chats_per_user=0, seed=99)
+        with Session(engine) as db:
+            rows.append(db.execute(
+                select(Metric.id, Metric.user_id, Metric.weight_kg, Metric.mood, Metric.created_at).order_by(Metric.id)
+            ).all())
+        engine.dispose()
+        os.remove(path)
+    assert rows[0] == rows[1]
+
+    # time-ordered like models.ids.new_int_id
+    epoch = datetime(1970, 1, 1)
+    for metric_id, _, _, _, created_at in rows[0]:
+        assert (metric_id >> INT_RANDOM_BITS) + INT_EPOCH_MS == (created_at - epoch) // timedelta(milliseconds=1)
@@ -0,0 +1,58 @@
+# tests/test_downsampling.py
+import numpy as np
+
+from services.downsampling import lttb_indices
+
+
+def _reference_lttb(x, y, threshold):
+    # Straightforward per-point implementation of the published algorithm
+    n = len(x)
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    keep = [0]
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        stop = int((i + 1) * every) + 1
+        next_start = stop
+        next_stop = min(int((i + 2) * every) + 1, n) if i < threshold - 3 else n
+        if i == threshold - 3:
+            cx, cy = x[-1], y[-1]
+        else:
+            cx = sum(x[next_start:next_stop]) / (next_stop - next_start)
+            cy = sum(y[next_start:next_stop]) / (next_stop - next_start)
+        best, best_area = start, -1.0
+        for b in range(start, stop):
+            area = abs((x[a] - cx) * (y[b] - y[a]) - (x[a] - x[b]) * (cy - y[a]))
+            if area > best_area:
+                best, best_area = b, area
+        keep.append(best)
+        a = best
+    keep.append(n - 1)
+    return keep
+
+
+def test_matches_reference_implementation():
+    x = np.arange(1000, dtype=np.float64)
+    y = np.sin(x / 25.0) * 10 + np.cos(x / 7.0)
+
+    assert lttb_indices(x, y, 50).tolist() == _reference_lttb(x.tolist(), y.tolist(), 50)
+
+
+def test_keeps_endpoints_and_spikes():
+    x = np.arange(5000, dtype=np.float64)
+    y = np.zeros(5000)
+    y[3210] = 100.0
+
+    keep = lttb_indices(x, y, 100)
+
+    assert len(keep) == 100
+    assert keep[0] == 0 and keep[-1] == 4999
+    assert 3210 in keep
+    assert np.all(np.diff(keep) > 0)
+
+
+def test_short_series_is_returned_whole():
+    x = np.arange(10, dtype=np.float64)
+
+    assert lttb_indices(x, x, 200).tolist() == list(range(10))
+    assert len(lttb_indices(x, x, 3)) == 3
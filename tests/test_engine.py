@@ -0,0 +1,63 @@
+# tests/test_engine.py
+import os
+import tempfile
+import time
+
+from sqlalchemy import text
+
+from models.engine import build_engine, pool_stats
+
+
+def _temp_engine():
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    return build_engine(f"sqlite:///{path}"), path
+
+
+def test_sqlite_pragmas_applied_on_connect():
+    engine, path = _temp_engine()
+    try:
+        with engine.connect() as conn:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+            assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+    finally:
+        engine.dispose()
+        os.remove(path)
+
+
+def test_open_reader_does_not_block_writer():
+    engine, path = _temp_engine()
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE t (x INTEGER)"))
+            conn.execute(text("INSERT INTO t VALUES (1)"))
+
+        with engine.connect() as reader:
+            reader.execute(text("BEGIN"))
+            assert reader.execute(text("SELECT count(*) FROM t")).scalar() == 1
+
+            started = time.perf_counter()
+            with engine.begin() as writer:
+                writer.execute(text("INSERT INTO t VALUES (2)"))
+            assert time.perf_counter() - started < 1.0
+
+            # The reader keeps its snapshot until it ends its transaction
+            assert reader.execute(text("SELECT count(*) FROM t")).scalar() == 1
+            reader.execute(text("COMMIT"))
+    finally:
+        engine.dispose()
+        os.remove(path)
+
+
+def test_pool_stats_tracks_checkouts():
+    engine, path = _temp_engine()
+    try:
+        with engine.connect():
+            stats = pool_stats(engine)
+            assert stats["checked_out"] == 1
+            assert 0 < stats["utilization"] <= 1
+        assert pool_stats(engine)["checked_out"] == 0
+    finally:
+        engine.dispose()
+        os.remove(path)
@@ -0,0 +1,56 @@
+# tests/test_history.py
+from datetime import datetime, timedelta
+
+from agents.orchestrator import OrchestratorAgent
+from models.database import Metric
+from models.series import HistoryWindow
+from services.history import fetch_metric_history
+
+
+def _seed(db_session, user_id, days):
+    now = datetime.utcnow()
+    for i in range(days):
+        db_session.add(Metric(
+            user_id=user_id,
+            weight_kg=70.0 + i,
+            strength_1rm=100.0 + i,
+            sleep_hours=7.0,
+            mood=7,
+            energy=7,
+            created_at=now - timedelta(days=days - 1 - i),
+        ))
+    db_session.commit()
+
+
+def test_last_n_returns_most_recent_in_order(db_session):
+    _seed(db_session, "history_last_n", 30)
+
+    series = fetch_metric_history(db_session, "history_last_n", HistoryWindow(last_n=3))
+
+    assert series.column("strength_1rm").tolist() == [127.0, 128.0, 129.0]
+
+
+def test_days_window_unions_with_last_n(db_session):
+    _seed(db_session, "history_days", 30)
+
+    by_days = fetch_metric_history(
+        db_session, "history_days", HistoryWindow(last_n=2, days=7)
+    )
+    by_rows = fetch_metric_history(
+        db_session, "history_days", HistoryWindow(last_n=20, days=7)
+    )
+
+    assert len(by_days) == 7
+    assert len(by_rows) == 20
+
+
+def test_empty_window_skips_query(db_session):
+    _seed(db_session, "history_empty", 3)
+
+    assert len(fetch_metric_history(db_session, "history_empty", HistoryWindow())) == 0
+
+
+def test_orchestrator_window_is_union_of_agents():
+    window = OrchestratorAgent().history_window
+
+    assert window == HistoryWindow(last_n=6)
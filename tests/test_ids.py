@@ -0,0 +1,73 @@
+# tests/test_ids.py
+import threading
+from datetime import datetime
+
+from benchmarks.ids import insert, right_edge_share
+from models.ids import INT_EPOCH_MS, INT_RANDOM_BITS, LENGTH, IdGenerator, decode, encode, id_timestamp, new_id
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_ids_sort_in_creation_order_within_a_millisecond_and_backwards_clock():
+    clock = FakeClock(1_700_000_000.0)
+    generator = IdGenerator(clock)
+    ids = [generator.new_id() for _ in range(100)]
+    clock.now -= 5  # NTP step backwards
+    ids += [generator.new_id() for _ in range(10)]
+    clock.now += 60
+    ids.append(generator.new_id())
+
+    assert ids == sorted(ids) and len(set(ids)) == len(ids)
+    assert all(len(value) == LENGTH for value in ids)
+    assert id_timestamp(ids[0]) == datetime(2023, 11, 14, 22, 13, 20)
+
+
+def test_encoding_round_trips_and_prefix_is_kept():
+    assert decode(encode(2 ** 128 - 1)) == 2 ** 128 - 1
+    plan_id = new_id("plan_")
+    assert plan_id.startswith("plan_") and len(plan_id) == len("plan_") + LENGTH
+    assert abs((id_timestamp(plan_id, "plan_") - datetime.utcnow()).total_seconds()) < 5
+
+
+def test_integer_ids_fit_bigint_and_sort_in_creation_order():
+    clock = FakeClock(1_700_000_000.0)
+    generator = IdGenerator(clock, random_bits=INT_RANDOM_BITS, epoch_ms=INT_EPOCH_MS)
+    ids = [generator.next_value() for _ in range(100)]
+    clock.now += 1
+    ids.append(generator.next_value())
+
+    assert ids == sorted(ids) and len(set(ids)) == len(ids)
+    assert all(0 < value < 2 ** 63 for value in ids)
+    assert (ids[0] >> INT_RANDOM_BITS) + INT_EPOCH_MS == 1_700_000_000_000
+
+
+def test_concurrent_generation_is_unique_and_ordered_per_thread():
+    generator = IdGenerator()
+    per_thread = []
+
+    def work():
+        per_thread.append([generator.new_id() for _ in range(2000)])
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({value for ids in per_thread for value in ids}) == 16000
+    assert all(ids == sorted(ids) for ids in per_thread)
+
+
+def test_id_benchmark_measures_locality():
+    ordered = [new_id("plan_") for _ in range(2000)]
+    assert right_edge_share(ordered) == 1.0
+    assert right_edge_share(list(reversed(ordered))) == 1 / 2000
+
+    result = insert(ordered + ordered[:10], batch=500)
+    assert result["rejected"] == 10
+    assert result["index_pages"] > 0 and 0 < result["leaf_fill"] <= 1
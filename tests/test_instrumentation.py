@@ -0,0 +1,65 @@
+# tests/test_instrumentation.py
+import uuid
+
+from apps.instrumentation import Registry, span, timings, SPAN_SECONDS
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    hist = registry.histogram("test_seconds", "Test", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        hist.observe(value, op="x")
+
+    text = registry.render()
+    assert '# TYPE test_seconds histogram' in text
+    assert 'test_seconds_bucket{op="x",le="0.1"} 1' in text
+    assert 'test_seconds_bucket{op="x",le="1.0"} 3' in text
+    assert 'test_seconds_bucket{op="x",le="+Inf"} 4' in text
+    assert 'test_seconds_count{op="x"} 4' in text
+
+
+def test_registry_rejects_type_conflicts():
+    registry = Registry()
+    registry.counter("things_total", "Things")
+    try:
+        registry.histogram("things_total", "Things")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("expected ValueError")
+
+
+def test_spans_feed_histogram_and_breakdown():
+    before = SPAN_SECONDS.snapshot(span="test.block")["count"]
+    with timings() as breakdown:
+        with span("test.block"):
+            pass
+        with span("test.block"):
+            pass
+
+    assert SPAN_SECONDS.snapshot(span="test.block")["count"] == before + 2
+    assert set(breakdown) == {"test.block"}
+
+    # Outside timings() spans still record, but nothing is collected
+    with span("test.block"):
+        pass
+    assert set(breakdown) == {"test.block"}
+
+
+def test_metrics_endpoint_and_plan_timings(client, register_user):
+    user_id = f"instr_{uuid.uuid4().hex[:8]}"
+    register_user(client, user_id)
+
+    r = client.post("/api/v1/plans/generate", json={"user_id": user_id, "week": 1, "include_timings": True})
+    assert r.status_code == 200
+    breakdown = r.json()["timings"]
+    for name in ("db.user", "db.history", "orchestrator", "agent.workout", "agent.coaching", "db.commit"):
+        assert name in breakdown
+
+    r = client.post("/api/v1/plans/generate", json={"user_id": user_id, "week": 2})
+    assert r.json()["timings"] is None
+
+    text = client.get("/metrics").text
+    assert 'fitflow_span_seconds_count{span="agent.diet"}' in text
+    assert 'route="/api/v1/plans/generate"' in text
+    assert "fitflow_db_pool_capacity" in text
@@ -0,0 +1,73 @@
+# tests/test_memory.py
+import tracemalloc
+
+import pytest
+
+from apps.config import settings
+from apps.memory import BUDGET_EXCEEDED, MEMORY, Measurement, RouteMemoryStats, ensure_started
+
+
+@pytest.fixture
+def tracing():
+    was_tracing = tracemalloc.is_tracing()
+    ensure_started(16)
+    yield
+    if not was_tracing:
+        tracemalloc.stop()
+
+
+def _allocate():
+    return [bytes(1000) for _ in range(1000)]
+
+
+def test_measurement_reports_peak_and_sites(tracing):
+    measurement = Measurement()
+    held = _allocate()
+    transient = _allocate()
+    del transient
+    peak, retained, sites = measurement.finish(top=3)
+
+    assert peak >= 2_000_000
+    assert 1_000_000 <= retained < peak
+    site, size = sites[0]
+    assert site.startswith("tests/test_memory.py:")
+    assert size >= 1_000_000
+    assert held
+
+
+def test_budget_flags_heavy_requests():
+    stats = RouteMemoryStats()
+    before = BUDGET_EXCEEDED.value(route="/test/heavy")
+    assert not stats.record("/test/light", 1024, 0, [], budget_bytes=4096)
+    assert stats.record("/test/heavy", 8192, 512, [("x.py:1", 512)], budget_bytes=4096)
+    assert BUDGET_EXCEEDED.value(route="/test/heavy") == before + 1
+
+    report = stats.report()
+    assert list(report) == ["/test/heavy", "/test/light"]
+    assert report["/test/heavy"]["over_budget"] == 1
+    assert report["/test/heavy"]["top_sites_kib"] == {"x.py:1": 0.5}
+
+
+def test_middleware_tracks_routes_when_enabled(client, monkeypatch):
+    was_tracing = tracemalloc.is_tracing()
+    monkeypatch.setattr(settings, "MEMORY_TRACKING", False)
+    assert "x-alloc-peak-kib" not in client.get("/health").headers
+
+    monkeypatch.setattr(settings, "MEMORY_TRACKING", True)
+    monkeypatch.setattr(settings, "MEMORY_BUDGET_KB", 0)
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "s3cret")
+    MEMORY.reset()
+    try:
+        response = client.get("/health")
+        assert float(response.headers["x-alloc-peak-kib"]) >= 0
+        assert "x-memory-budget-exceeded" not in response.headers
+
+        report = client.get(
+            "/api/v1/admin/memory", params={"reset": True}, headers={"X-Admin-Token": "s3cret"}
+        ).json()
+        assert report["enabled"] is True
+        assert report["routes"]["/health"]["requests"] == 1
+    finally:
+        MEMORY.reset()
+        if not was_tracing:
+            tracemalloc.stop()
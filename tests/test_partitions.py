@@ -0,0 +1,260 @@
+# tests/test_partitions.py
+import os
+import sqlite3
+from datetime import datetime
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+
+from apps.cache import MemoryCache
+from apps.config import settings
+from models.database import Base, Metric, MetricPartition, MetricRollup, User
+from models.engine import build_engine
+from models.partitions import is_partitioned, metric_source, partition_for, resolve_period
+from services import dashboard
+from services.retention import apply_retention, ensure_partitions
+from services.rollups import rebuild_rollups
+from services.versions import dashboard_stamp
+
+
+OCTOBER = datetime(2026, 10, 19)
+
+
+@pytest.fixture
+def partitioned(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "METRIC_PARTITION_PERIOD", "month")
+    monkeypatch.setattr(settings, "METRIC_PARTITION_PREMAKE", 1)
+    eng = build_engine(f"sqlite:///{tmp_path / 'fit.db'}")
+    Base.metadata.create_all(bind=eng)
+    yield eng
+    eng.dispose()
+
+
+def _log(session, user_id, *moments):
+    session.add_all([
+        Metric(user_id=user_id, weight_kg=80, strength_1rm=100, sleep_hours=7, mood=7, energy=7, created_at=moment)
+        for moment in moments
+    ])
+    session.commit()
+
+
+def _stored(path, table):
+    db = sqlite3.connect(path)
+    try:
+        return db.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+    finally:
+        db.close()
+
+
+def _created(session, user_id):
+    return session.execute(
+        select(Metric.created_at).where(Metric.user_id == user_id).order_by(Metric.created_at)
+    ).scalars().all()
+
+
+def test_partition_names_and_bounds(monkeypatch):
+    assert partition_for(OCTOBER, "month")[:3] == ("metrics_2026_10", datetime(2026, 10, 1), datetime(2026, 11, 1))
+    assert partition_for(datetime(2026, 12, 31, 23), "month").end == datetime(2027, 1, 1)
+    assert partition_for(OCTOBER, "quarter")[:3] == ("metrics_2026_q4", datetime(2026, 10, 1), datetime(2027, 1, 1))
+    assert partition_for(OCTOBER, "year")[:3] == ("metrics_2026", datetime(2026, 1, 1), datetime(2027, 1, 1))
+
+    monkeypatch.setattr(settings, "METRIC_PARTITION_PERIOD", "")
+    assert resolve_period("postgresql") == "month"
+    assert resolve_period("sqlite") == "year"  # SQLite attaches at most 10 databases
+    monkeypatch.setattr(settings, "METRIC_PARTITION_PERIOD", "none")
+    assert resolve_period("sqlite") is None
+
+
+def test_rows_are_routed_by_created_at_and_read_back_through_metrics(partitioned, tmp_path):
+    session = sessionmaker(bind=partitioned)()
+    try:
+        _log(session, "routed", datetime(2025, 3, 1))  # logged before partitioning
+        assert ensure_partitions(partitioned, now=OCTOBER) == ["metrics_2026_10", "metrics_2026_11"]
+        assert ensure_partitions(partitioned, now=OCTOBER) == []
+
+        _log(session, "routed", datetime(2026, 10, 5), datetime(2026, 10, 6), datetime(2026, 11, 3), datetime(2026, 12, 1))
+        directory = tmp_path / "fit.db-partitions"
+        assert _stored(directory / "metrics_2026_10.db", "metrics_2026_10") == 2
+        assert _stored(directory / "metrics_2026_11.db", "metrics_2026_11") == 1
+        # before partitioning, and December (no partition yet)
+        assert _stored(tmp_path / "fit.db", "metrics_default") == 2
+
+        assert _created(session, "routed") == [
+            datetime(2025, 3, 1), datetime(2026, 10, 5), datetime(2026, 10, 6),
+            datetime(2026, 11, 3), datetime(2026, 12, 1),
+        ]
+        latest = session.query(Metric).filter(Metric.user_id == "routed").order_by(Metric.created_at.desc()).first()
+        assert latest.created_at == datetime(2026, 12, 1)
+
+        ids = session.execute(select(Metric.id).where(Metric.user_id == "routed").order_by(Metric.id)).scalars().all()
+        assert len(set(ids)) == 5
+
+        october = session.query(Metric).filter(Metric.created_at == datetime(2026, 10, 5)).one()
+        session.delete(october)
+        session.commit()
+        assert _stored(directory / "metrics_2026_10.db", "metrics_2026_10") == 1
+    finally:
+        session.close()
+
+
+def test_range_reads_only_touch_overlapping_partitions(partitioned):
+    session = sessionmaker(bind=partitioned)()
+    try:
+        ensure_partitions(partitioned, now=OCTOBER)
+        _log(session, "pruned", datetime(2026, 10, 5), datetime(2026, 11, 3), datetime(2026, 11, 20))
+
+        since = datetime(2026, 11, 1)
+        source = metric_source(session, Metric, since=since)
+        query = select(source.created_at).where(source.user_id == "pruned", source.created_at >= since)
+        sql = str(query.compile(bind=partitioned))
+        assert "metrics_2026_11" in sql and "metrics_default" in sql
+        assert "metrics_2026_10" not in sql
+        assert session.execute(query.order_by(source.created_at)).scalars().all() == [
+            datetime(2026, 11, 3), datetime(2026, 11, 20)
+        ]
+
+        # the full history needs every partition: plain Metric
+        assert metric_source(session, Metric) is Metric
+    finally:
+        session.close()
+
+
+def test_pooled_connections_follow_layout_changes(partitioned):
+    session = sessionmaker(bind=partitioned)()
+    try:
+        _log(session, "pooled", datetime(2026, 10, 5))  # connection opened unpartitioned
+        session.close()
+
+        ensure_partitions(partitioned, now=OCTOBER)
+        with partitioned.connect() as conn:
+            assert is_partitioned(conn)
+        _log(session, "pooled", datetime(2026, 10, 6))
+        assert _created(session, "pooled") == [datetime(2026, 10, 5), datetime(2026, 10, 6)]
+        names = [row[1] for row in session.connection().exec_driver_sql("PRAGMA database_list")]
+        assert {"metrics_2026_10", "metrics_2026_11"} <= set(names)
+    finally:
+        session.close()
+
+
+def test_retention_archives_whole_partitions(partitioned, tmp_path):
+    session = sessionmaker(bind=partitioned)()
+    ensure_partitions(partitioned, now=OCTOBER)
+    _log(session, "archived", datetime(2026, 10, 5), datetime(2026, 11, 3))
+    session.close()
+
+    december = datetime(2026, 12, 15)
+    dry = apply_retention(partitioned, now=december, days=30, action="archive", dry_run=True)
+    assert dry["expired"] == ["metrics_2026_10"] and dry["archived"] == []
+    assert os.path.exists(tmp_path / "fit.db-partitions" / "metrics_2026_10.db")
+
+    report = apply_retention(partitioned, now=december, days=30, action="archive")
+    assert report["expired"] == report["archived"] == ["metrics_2026_10"]
+    assert report["pending"] == []
+    assert not os.path.exists(tmp_path / "fit.db-partitions" / "metrics_2026_10.db")
+    assert _stored(tmp_path / "fit.db-archive" / "metrics_2026_10.db", "metrics_2026_10") == 1
+
+    session = sessionmaker(bind=partitioned)()
+    try:
+        assert _created(session, "archived") == [datetime(2026, 11, 3)]
+        catalog = dict(session.execute(select(MetricPartition.name, MetricPartition.status)).all())
+        assert catalog == {"metrics_2026_10": "archived", "metrics_2026_11": "attached"}
+        session.commit()  # connections pick up layout changes on checkout
+
+        assert ensure_partitions(partitioned, now=december) == ["metrics_2026_12", "metrics_2027_01"]
+        _log(session, "archived", datetime(2026, 12, 16))
+        assert _stored(tmp_path / "fit.db-partitions" / "metrics_2026_12.db", "metrics_2026_12") == 1
+    finally:
+        session.close()
+
+
+def test_retention_drop_deletes_files_and_old_default_rows_in_batches(partitioned, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "DELETION_BATCH_SIZE", 2)
+    monkeypatch.setattr(settings, "DELETION_PAUSE_MS", 0)
+    session = sessionmaker(bind=partitioned)()
+    _log(session, "dropped", *[datetime(2025, month, 1) for month in range(1, 6)])
+    ensure_partitions(partitioned, now=OCTOBER)
+    _log(session, "dropped", datetime(2026, 10, 5), datetime(2026, 11, 3), datetime(2026, 12, 1))
+    rebuild_rollups(session, user_id="dropped")
+    session.close()
+
+    report = apply_retention(partitioned, now=datetime(2026, 12, 15), days=30, action="drop")
+    assert report["dropped"] == ["metrics_2026_10"]
+    assert report["default_rows"] == 5
+    assert not os.path.exists(tmp_path / "fit.db-partitions" / "metrics_2026_10.db")
+
+    session = sessionmaker(bind=partitioned)()
+    try:
+        assert _created(session, "dropped") == [datetime(2026, 11, 3), datetime(2026, 12, 1)]
+
+        # rollups are all that is left of the expired history, and survive a rebuild
+        rebuild_rollups(session, user_id="dropped")
+        months = session.execute(
+            select(MetricRollup.bucket_start, MetricRollup.count)
+            .where(MetricRollup.user_id == "dropped", MetricRollup.resolution == "month")
+            .order_by(MetricRollup.bucket_start)
+        ).all()
+        assert [start.month for start, _ in months[:5]] == [1, 2, 3, 4, 5]
+        assert [start for start, _ in months[5:]] == [datetime(2026, 10, 1), datetime(2026, 11, 1), datetime(2026, 12, 1)]
+        assert session.execute(select(func.count()).select_from(MetricRollup).where(
+            MetricRollup.user_id == "dropped", MetricRollup.resolution == "day"
+        )).scalar() == 8
+    finally:
+        session.close()
+
+
+def test_dashboard_snapshots_follow_retention(partitioned, monkeypatch):
+    monkeypatch.setattr(dashboard, "SNAPSHOTS", MemoryCache(10))
+    session = sessionmaker(bind=partitioned)()
+    try:
+        ensure_partitions(partitioned, now=OCTOBER)
+        session.add(User(
+            user_id="expiring", name="Expiring", age=30, weight_kg=80, height_cm=180,
+            fitness_level="beginner", goal="strength", equipment=[]
+        ))
+        _log(session, "expiring", datetime(2026, 10, 5), datetime(2026, 11, 3))
+        before = dashboard_stamp(session, "expiring")
+        stats = dashboard.get_dashboard(session, "expiring", before)["statistics"]
+        assert stats["total_metrics"] == 2
+        session.close()
+
+        apply_retention(partitioned, now=datetime(2026, 12, 15), days=30, action="drop")
+
+        after = dashboard_stamp(session, "expiring")
+        assert after[dashboard.FIRST_METRIC_AT] == datetime(2026, 11, 3)
+        assert dashboard.get_dashboard(session, "expiring", after)["statistics"]["total_metrics"] == 1
+    finally:
+        session.close()
+
+
+def test_rebuild_keeps_buckets_straddling_the_retention_cutoff(partitioned, monkeypatch):
+    monkeypatch.setattr(settings, "METRIC_PARTITION_PERIOD", "year")
+    session = sessionmaker(bind=partitioned)()
+    ensure_partitions(partitioned, now=datetime(2024, 6, 1))
+    # one week bucket (from Monday 2024-12-30) across the 2024/2025 partitions
+    _log(session, "straddling", datetime(2024, 12, 30), datetime(2025, 1, 2), datetime(2025, 1, 9))
+    rebuild_rollups(session, user_id="straddling")
+    session.close()
+
+    report = apply_retention(partitioned, now=datetime(2025, 6, 1), days=30, action="drop")
+    assert report["dropped"] == ["metrics_2024"]
+
+    session = sessionmaker(bind=partitioned)()
+    try:
+        rebuild_rollups(session, user_id="straddling")
+        weeks = session.execute(
+            select(MetricRollup.bucket_start, MetricRollup.count, MetricRollup.weight_kg_sum)
+            .where(MetricRollup.user_id == "straddling", MetricRollup.resolution == "week")
+            .order_by(MetricRollup.bucket_start)
+        ).all()
+        assert [tuple(week) for week in weeks] == [
+            (datetime(2024, 12, 30), 2, 160.0), (datetime(2025, 1, 6), 1, 80.0)
+        ]
+        january = session.execute(
+            select(MetricRollup.count)
+            .where(MetricRollup.user_id == "straddling", MetricRollup.resolution == "month")
+            .order_by(MetricRollup.bucket_start.desc())
+        ).scalars().first()
+        assert january == 2
+    finally:
+        session.close()
@@ -0,0 +1,85 @@
+# tests/test_plan_deltas.py
+import copy
+import json
+import random
+import uuid
+
+from agents.orchestrator import OrchestratorAgent
+from benchmarks.synthetic import make_history, make_profile
+from apps.config import settings
+import services.plan_service as plan_service
+from models.database import Plan
+from services import json_patch
+from services.blob_store import BlobStore
+from services.plan_service import PLANS, PLAN_ROW, load_plan, plan_patch, reconstruct, store_plan
+
+
+def _weeks(count, seed=5):
+    """One user's plans for weeks 1..count, as read back from JSON."""
+    rng = random.Random(seed)
+    orchestrator = OrchestratorAgent()
+    profile = make_profile(rng, 0, prefix="delta")
+    history = make_history(rng, 20 + 2 * count, goal=profile["goal"], start_weight=profile["weight_kg"])
+    return [
+        json.loads(json.dumps(orchestrator.synthesize_recommendation(profile, history[:20 + 2 * week], week)))
+        for week in range(1, count + 1)
+    ]
+
+
+def test_patch_round_trip():
+    source = {"a": 1, "b": [1, 2, 3], "c": {"x/y": True, "~": None}, "gone": "x"}
+    target = {"a": 1.0, "b": [1, 5], "c": {"x/y": 1, "~": None, "new": [4]}}
+    patch = json_patch.diff(source, target)
+    assert json_patch.apply(json.loads(json.dumps(source)), patch) == target
+    assert json_patch.diff(target, target) == []
+    assert json_patch.apply([1], [{"op": "replace", "path": "", "value": {}}]) == {}
+
+
+def test_weekly_plans_stored_as_delta_chains(db_session, monkeypatch):
+    monkeypatch.setattr(plan_service, "BLOBS", BlobStore(train_after=10 ** 9))
+    monkeypatch.setattr(settings, "PLAN_KEYFRAME_INTERVAL", 3)
+    prefix = uuid.uuid4().hex[:8]
+    weeks = _weeks(5)
+    for week, plan in enumerate(weeks, start=1):
+        store_plan(db_session, f"{prefix}_{week}", f"{prefix}_user", week, plan)
+        db_session.flush()
+
+    rows = db_session.execute(
+        PLAN_ROW.where(Plan.user_id == f"{prefix}_user").order_by(Plan.week)
+    ).all()
+    assert [row.delta is not None for row in rows] == [False, True, True, False, True]
+    assert rows[2].base_plan_id == rows[1].plan_id
+    assert rows[2].keyframe_plan_id == rows[0].plan_id
+    assert len(rows[1].delta) < len(rows[0].manifest)
+
+    # cold: rebuilt from the keyframe in one chain query
+    PLANS.clear()
+    assert [json.loads(reconstruct(db_session, row)) for row in rows] == weeks
+    PLANS.clear()
+    orm = db_session.query(Plan).filter(Plan.plan_id == f"{prefix}_3").one()
+    assert load_plan(db_session, orm) == weeks[2]
+
+    patch = json.loads(plan_patch(db_session, rows[2], rows[0]))
+    assert json_patch.apply(json.loads(json.dumps(weeks[0])), patch) == weeks[2]
+
+
+def test_diff_endpoint_returns_patch(client, register_user):
+    register_user(client, "delta_user")
+    first = client.post("/api/v1/plans/generate", json={"user_id": "delta_user", "week": 1}).json()
+    second = client.post("/api/v1/plans/generate", json={"user_id": "delta_user", "week": 2}).json()
+
+    response = client.get(f"/api/v1/plans/{second['plan_id']}/diff")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["against"] == first["plan_id"]
+    assert (body["week"], body["against_week"]) == (2, 1)
+    assert {"op": "replace", "path": "/workout_plan/week", "value": 2} in body["patch"]
+
+    old = client.get(f"/api/v1/plans/{first['plan_id']}").json()["plan"]
+    new = client.get(f"/api/v1/plans/{second['plan_id']}").json()["plan"]
+    assert json_patch.apply(copy.deepcopy(old), body["patch"]) == new
+
+    reverse = client.get(f"/api/v1/plans/{first['plan_id']}/diff", params={"against": second["plan_id"]})
+    assert json_patch.apply(new, reverse.json()["patch"]) == old
+    assert client.get(f"/api/v1/plans/{first['plan_id']}/diff").status_code == 404
+    assert client.get(f"/api/v1/plans/{first['plan_id']}/diff", params={"against": "nope"}).status_code == 404
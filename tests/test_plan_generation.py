@@ -0,0 +1,123 @@
+# tests/test_plan_generation.py
+import threading
+import time
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+
+from agents.orchestrator import OrchestratorAgent
+from models.database import Plan, User
+from models.schemas import PlanRequest
+from routes import plans
+from services.plan_service import PLANS, store_plan
+
+
+class SlowOrchestrator(OrchestratorAgent):
+    """Counts runs and holds each one long enough for callers to overlap."""
+
+    def __init__(self):
+        super().__init__()
+        self.runs = 0
+
+    def synthesize_recommendation(self, *args, **kwargs):
+        self.runs += 1
+        time.sleep(0.1)
+        return super().synthesize_recommendation(*args, **kwargs)
+
+
+def _add_user(engine, user_id):
+    session = sessionmaker(bind=engine)()
+    session.add(User(
+        user_id=user_id, name="Dedup", age=29, weight_kg=72, height_cm=176,
+        fitness_level="intermediate", goal="muscle_gain", equipment=["dumbbells"]
+    ))
+    session.commit()
+    session.close()
+
+
+def _plan_count(engine, user_id):
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(Plan).where(Plan.user_id == user_id)).scalar()
+
+
+def _concurrently(engine, count, call):
+    """Run call(session) from `count` threads, each with its own session."""
+    results = []
+
+    def run():
+        session = sessionmaker(bind=engine)()
+        try:
+            results.append(call(session))
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=run) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_retried_request_returns_the_stored_plan(client, register_user):
+    register_user(client, "dedup_retry")
+    first = client.post("/api/v1/plans/generate", json={"user_id": "dedup_retry", "week": 3}).json()
+    retry = client.post("/api/v1/plans/generate", json={"user_id": "dedup_retry", "week": 3}).json()
+    assert retry["plan_id"] == first["plan_id"]
+    assert retry["components"] == first["components"]
+    assert client.get("/api/v1/plans/history", params={"user_id": "dedup_retry"}).json()["count"] == 1
+
+    # new inputs, new plan
+    client.post("/api/v1/users/metrics/log", json={
+        "user_id": "dedup_retry", "weight_kg": 72.4, "strength_1rm": 110,
+        "sleep_hours": 8, "mood": 8, "energy": 7,
+    })
+    assert client.post("/api/v1/plans/generate", json={"user_id": "dedup_retry", "week": 3}).json()["plan_id"] != first["plan_id"]
+
+
+def test_concurrent_requests_in_a_worker_share_one_run(engine):
+    _add_user(engine, "dedup_threads")
+    orchestrator = SlowOrchestrator()
+    request = PlanRequest(user_id="dedup_threads", week=5)
+
+    results = _concurrently(engine, 6, lambda session: plans.generate_plan(request, session, orchestrator))
+    assert orchestrator.runs == 1
+    assert len({result["plan_id"] for result in results}) == 1
+    assert _plan_count(engine, "dedup_threads") == 1
+
+
+def test_concurrent_requests_across_workers_store_one_plan(engine):
+    # _generate_plan directly: no in-process coalescing, as in separate workers
+    _add_user(engine, "dedup_workers")
+    orchestrator = SlowOrchestrator()
+    request = PlanRequest(user_id="dedup_workers", week=7)
+
+    results = _concurrently(engine, 3, lambda session: plans._generate_plan(request, session, orchestrator))
+    assert orchestrator.runs == 3
+    assert len({result["plan_id"] for result in results}) == 1
+    assert len({repr(result["components"]) for result in results}) == 1
+    assert _plan_count(engine, "dedup_workers") == 1
+
+
+def test_sequential_retry_skips_the_orchestrator(engine):
+    _add_user(engine, "dedup_sequential")
+    orchestrator = SlowOrchestrator()
+    request = PlanRequest(user_id="dedup_sequential", week=9)
+
+    first, retry = _concurrently(engine, 1, lambda session: [
+        plans._generate_plan(request, session, orchestrator) for _ in range(2)
+    ])[0]
+    assert orchestrator.runs == 1
+    assert retry["plan_id"] == first["plan_id"]
+
+
+def test_rolled_back_plan_is_not_cached(db_session):
+    _add_user(db_session.get_bind(), "dedup_rollback")
+    store_plan(db_session, "plan_rolled_back", "dedup_rollback", 1, OrchestratorAgent().synthesize_recommendation(
+        {"user_id": "dedup_rollback", "name": "Dedup", "age": 29, "weight_kg": 72, "height_cm": 176,
+         "fitness_level": "intermediate", "goal": "muscle_gain", "equipment": ["dumbbells"]},
+        [], 1
+    ))
+    db_session.flush()
+    db_session.rollback()
+    assert PLANS.get("plan_rolled_back") is None
@@ -0,0 +1,131 @@
+# tests/test_plan_storage.py
+import json
+import random
+import uuid
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+
+from agents.orchestrator import OrchestratorAgent
+from benchmarks.synthetic import make_history, make_profile
+import services.plan_service as plan_service
+from models.database import CompressionDictionary, Plan, PlanBlob, save_plan
+from services.blob_store import BlobStore, compress, decompress, frame_dictionary, train_dictionary
+from services.plan_service import assemble, compact_plans, load_plan, plan_json, split_plan, store_plan
+
+
+def _plans(count, seed=3):
+    rng = random.Random(seed)
+    orchestrator = OrchestratorAgent()
+    plans = []
+    for index in range(count):
+        profile = make_profile(rng, index, prefix="storage")
+        history = make_history(rng, 20, goal=profile["goal"], start_weight=profile["weight_kg"])
+        plans.append(orchestrator.synthesize_recommendation(profile, history, index % 4 + 1))
+    return plans
+
+
+def test_split_and_assemble_round_trip():
+    plan = _plans(1)[0]
+    plan["summary"] = 'Quote {"$blob":"' + "0" * 32 + '"} stays text'
+    manifest, sections = split_plan(plan)
+    assert sections
+    assert len(manifest) < len(json.dumps(plan))
+    assert json.loads(assemble(manifest, sections)) == plan
+
+
+def test_frames_round_trip_with_and_without_dictionary():
+    samples = [json.dumps(p["nutrition_plan"]).encode() for p in _plans(8)]
+    zdict = train_dictionary(samples)
+    assert 0 < len(zdict) <= 32 * 1024
+
+    data = samples[0]
+    plain = compress(data)
+    trained = compress(data, (7, zdict))
+    assert len(trained) < len(plain)
+    assert decompress(plain) == data
+    assert decompress(trained, zdict) == data
+    assert decompress(compress(b"x")) == b"x"
+
+
+def test_store_plan_shares_sections_between_plans(db_session, monkeypatch):
+    store = BlobStore(train_after=10 ** 9)
+    monkeypatch.setattr(plan_service, "BLOBS", store)
+    prefix = uuid.uuid4().hex[:8]
+    plan = _plans(1)[0]
+
+    first = store_plan(db_session, f"{prefix}_1", f"{prefix}_sharer_1", 1, plan)
+    db_session.flush()
+    blobs_after_first = db_session.execute(select(func.count()).select_from(PlanBlob)).scalar()
+    second = store_plan(db_session, f"{prefix}_2", f"{prefix}_sharer_2", 1, plan)
+    db_session.flush()
+    assert db_session.execute(select(func.count()).select_from(PlanBlob)).scalar() == blobs_after_first
+
+    assert first.manifest is not None and first.plan_data is None
+    store.clear()  # read back from the database, not the cache
+    assert load_plan(db_session, second) == plan
+    assert json.loads(plan_json(db_session, second.manifest)) == plan
+
+
+def test_dictionary_trained_after_threshold_and_compact(db_session, monkeypatch):
+    store = BlobStore(train_after=3)
+    monkeypatch.setattr(plan_service, "BLOBS", store)
+    prefix = uuid.uuid4().hex[:8]
+    legacy = _plans(6, seed=11)
+    for index, plan in enumerate(legacy):
+        save_plan(db_session, f"{prefix}_legacy_{index}", "legacy", 1, plan)
+
+    assert compact_plans(db_session, batch_size=4) >= len(legacy)
+    assert store.active_dictionary(db_session) is not None
+
+    rows = db_session.execute(
+        select(Plan).where(Plan.plan_id.like(f"{prefix}_legacy_%")).order_by(Plan.plan_id)
+    ).scalars().all()
+    store.clear()
+    assert [load_plan(db_session, row) for row in rows] == legacy
+    assert all(row.manifest is not None for row in rows)
+
+
+def test_sharing_policy_inlines_fields_that_never_repeat():
+    policy = plan_service.SharingPolicy(warmup=5, min_reuse=0.5, probe_every=10)
+    for _ in range(5):
+        policy.observe("nutrition_plan.meals", reused=False)
+        policy.observe("workout_plan.days", reused=True)
+    assert policy.shares("workout_plan.days")
+    assert not policy.shares("nutrition_plan.meals")
+    for _ in range(5):
+        policy.observe("nutrition_plan.meals", reused=False)
+    assert policy.shares("nutrition_plan.meals")  # periodic probe
+
+
+def test_plan_endpoints_reassemble_blob_plans(client, register_user):
+    register_user(client, "blob_user")
+    generated = client.post("/api/v1/plans/generate", json={"user_id": "blob_user", "week": 5}).json()
+    current = client.get("/api/v1/plans/current", params={"user_id": "blob_user"}).json()
+    assert current["plan"]["workout_plan"] == generated["components"]["workout"]
+    assert current["plan"]["nutrition_plan"] == generated["components"]["nutrition"]
+    assert current["plan"]["summary"] == generated["summary"]
+
+
+def test_trained_dictionary_is_used_by_the_worker_only_once_committed(engine):
+    store = BlobStore(train_after=1)
+    writer, reader = sessionmaker(bind=engine)(), sessionmaker(bind=engine)()
+    samples = [json.dumps(plan).encode() for plan in _plans(3, seed=5)]
+    try:
+        dict_id, _ = store.train(writer, samples)
+        assert store.active_dictionary(writer)[0] == dict_id  # the training session writes with it
+        writer.rollback()
+
+        # the row is gone, and no later frame may reference it
+        assert writer.get(CompressionDictionary, dict_id) is None
+        assert frame_dictionary(store.encode(reader, samples[0])) != dict_id
+        reader.rollback()
+
+        dict_id, _ = store.train(writer, samples)
+        writer.commit()
+        frame = store.encode(reader, samples[0])
+        assert frame_dictionary(frame) == dict_id
+        assert BlobStore().decode(reader, frame) == samples[0]  # another worker can read it
+    finally:
+        writer.close()
+        reader.close()
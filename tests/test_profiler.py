@@ -0,0 +1,82 @@
+# tests/test_profiler.py
+import threading
+
+from apps.config import settings
+from services.profiler import ProfilerBusy, SamplingProfiler
+
+
+def _spin(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_profiler_samples_busy_thread():
+    stop = threading.Event()
+    worker = threading.Thread(target=_spin, args=(stop,), name="spinner")
+    worker.start()
+    try:
+        profiler = SamplingProfiler(interval=0.002).run(0.2)
+    finally:
+        stop.set()
+        worker.join()
+
+    assert profiler.sample_count > 0
+    collapsed = profiler.collapsed()
+    assert any(line.startswith("spinner;") and "_spin (test_profiler.py:" in line for line in collapsed.splitlines())
+
+    doc = profiler.speedscope()
+    spinner = next(p for p in doc["profiles"] if p["name"] == "spinner")
+    assert spinner["type"] == "sampled"
+    assert len(spinner["samples"]) == len(spinner["weights"])
+    names = {f["name"] for f in doc["shared"]["frames"]}
+    assert "_spin" in names
+
+
+def test_only_one_profile_per_worker():
+    first = SamplingProfiler()
+    first.start()
+    try:
+        try:
+            SamplingProfiler().start()
+        except ProfilerBusy:
+            pass
+        else:
+            raise AssertionError("expected ProfilerBusy")
+    finally:
+        first.stop()
+    # The slot is released again
+    SamplingProfiler().run(0.01)
+
+
+def test_profile_endpoint_requires_token(client, monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "")
+    assert client.get("/api/v1/admin/profile", params={"seconds": 0.01}).status_code == 404
+
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "s3cret")
+    response = client.get(
+        "/api/v1/admin/profile", params={"seconds": 0.01}, headers={"X-Admin-Token": "wrong"}
+    )
+    assert response.status_code == 403
+
+
+def test_profile_endpoint_formats(client, monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "s3cret")
+    headers = {"X-Admin-Token": "s3cret"}
+
+    response = client.get(
+        "/api/v1/admin/profile", params={"seconds": 0.05, "include_idle": True}, headers=headers
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert int(response.headers["x-profile-samples"]) > 0
+
+    response = client.get(
+        "/api/v1/admin/profile", params={"seconds": 0.05, "format": "speedscope"}, headers=headers
+    )
+    assert response.status_code == 200
+    assert response.json()["$schema"].endswith("file-format-schema.json")
+
+    response = client.get(
+        "/api/v1/admin/profile", params={"seconds": settings.PROFILE_MAX_SECONDS + 1}, headers=headers
+    )
+    assert response.status_code == 400
@@ -0,0 +1,70 @@
+# tests/test_querylog.py
+import logging
+import uuid
+
+import pytest
+from sqlalchemy import text
+
+from apps.config import settings
+from models import querylog
+from models.querylog import QueryBudgetExceeded, check_budget, normalize_sql, track
+
+
+def test_normalize_sql_strips_literals_and_in_lists():
+    sql = "SELECT *  FROM users\n WHERE id IN (1, 2, 3) AND name = 'o''brien' AND age > :age_1"
+    assert normalize_sql(sql) == "SELECT * FROM users WHERE id IN (?...) AND name = ? AND age > ?"
+
+
+def test_track_counts_statements(engine):
+    with track() as stats:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 2"))
+    assert stats.count == 2
+    assert stats.repeated() == {"SELECT ?": 2}
+    assert querylog.current() is None
+
+
+def test_check_budget_flags_count_and_repeats(engine):
+    with track() as stats:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 1"))
+
+    check_budget(stats, max_queries=5, allow_repeats=True)
+    with pytest.raises(QueryBudgetExceeded, match="budget 1"):
+        check_budget(stats, max_queries=1, allow_repeats=True)
+    with pytest.raises(QueryBudgetExceeded, match="repeated"):
+        check_budget(stats, max_queries=5)
+
+
+def test_slow_queries_are_logged(engine, monkeypatch, caplog):
+    monkeypatch.setattr(settings, "SLOW_QUERY_MS", 0)
+    with caplog.at_level(logging.WARNING, logger="fitflow.sql"):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 42"))
+    assert any("slow query" in r.message and "SELECT ?" in r.message for r in caplog.records)
+
+
+def test_responses_report_query_count(client):
+    r = client.get("/api/v1/auth/profile", params={"user_id": f"nobody_{uuid.uuid4().hex[:6]}"})
+    assert r.headers["x-db-query-count"] == "1"
+    assert float(r.headers["x-db-query-time-ms"]) >= 0
+
+
+def test_budget_fails_requests_that_repeat_queries(client):
+    from apps.api import app
+
+    @app.get("/_test/double_lookup")
+    def double_lookup():
+        from models.database import engine as app_engine
+        with app_engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 1"))
+        return {}
+
+    try:
+        with pytest.raises(QueryBudgetExceeded):
+            client.get("/_test/double_lookup")
+    finally:
+        app.router.routes.pop()
@@ -0,0 +1,66 @@
+# tests/test_read_routing.py
+import os
+import tempfile
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+
+import models.database as database
+from apps.api import app
+from apps.middleware import PIN_COOKIE
+from models.engine import build_engine
+
+
+@pytest.fixture
+def split_client(monkeypatch):
+    """App with writes on one SQLite file and reads on an (unreplicated) second one."""
+    paths, engines = [], []
+    for _ in range(2):
+        fd, path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        eng = build_engine(f"sqlite:///{path}")
+        database.Base.metadata.create_all(bind=eng)
+        paths.append(path)
+        engines.append(eng)
+
+    primary, replica = engines
+    monkeypatch.setattr(database, "SessionLocal", sessionmaker(autoflush=False, bind=primary))
+    monkeypatch.setattr(database, "ReadSessionLocal", sessionmaker(autoflush=False, bind=replica))
+
+    with TestClient(app) as c:
+        yield c
+
+    for eng, path in zip(engines, paths):
+        eng.dispose()
+        os.remove(path)
+
+
+def test_write_sets_primary_pin_cookie(split_client, register_user):
+    response = register_user(split_client, "rw_cookie_user")
+    assert response.status_code == 200
+    assert PIN_COOKIE in response.cookies
+
+
+def test_reads_go_to_replica_without_pin(split_client, register_user):
+    register_user(split_client, "rw_replica_user")
+    split_client.cookies.clear()
+
+    # The replica never received the user
+    response = split_client.get("/api/v1/chat/history", params={"user_id": "rw_replica_user"})
+    assert response.status_code == 404
+    assert "User" in response.json()["detail"]
+
+
+def test_reads_after_write_are_pinned_to_primary(split_client, register_user):
+    register_user(split_client, "rw_pinned_user")
+
+    # Cookie from the write routes this read to the primary, which has the user
+    response = split_client.get("/api/v1/chat/history", params={"user_id": "rw_pinned_user"})
+    assert response.status_code == 404
+    assert "No chat messages" in response.json()["detail"]
+
+
+def test_reads_without_writes_do_not_set_pin(split_client):
+    response = split_client.get("/api/v1/chat/history", params={"user_id": "nobody"})
+    assert PIN_COOKIE not in response.cookies
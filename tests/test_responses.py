@@ -0,0 +1,42 @@
+# tests/test_responses.py
+import json
+
+from fastapi.responses import JSONResponse
+
+from apps.responses import FastJSONResponse, dumps, embed_raw
+
+
+def test_embed_raw_copies_stored_json():
+    stored = json.dumps({"workout_plan": {"days": [1, 2]}, "summary": "Ünïcode"})
+    body = embed_raw({"status": "success", "week": 3}, "plan", stored)
+    assert json.loads(body) == {
+        "status": "success",
+        "week": 3,
+        "plan": {"workout_plan": {"days": [1, 2]}, "summary": "Ünïcode"},
+    }
+    assert json.loads(embed_raw({}, "plan", b"[1,2]")) == {"plan": [1, 2]}
+
+
+def test_fast_response_matches_stdlib_response():
+    content = {"a": [1, 2.5, None, True], "b": {"c": "é"}}
+    assert json.loads(FastJSONResponse(content).body) == json.loads(JSONResponse(content).body)
+    assert json.loads(dumps(content)) == content
+
+
+def test_plan_endpoints_return_stored_plan(client, register_user):
+    register_user(client, "raw_plan_user")
+    generated = client.post("/api/v1/plans/generate", json={"user_id": "raw_plan_user", "week": 2}).json()
+
+    current = client.get("/api/v1/plans/current", params={"user_id": "raw_plan_user"})
+    assert current.status_code == 200
+    assert current.headers["content-type"] == "application/json"
+    body = current.json()
+    assert body["plan_id"] == generated["plan_id"]
+    assert body["user_id"] == "raw_plan_user"
+    assert body["plan"]["workout_plan"] == generated["components"]["workout"]
+    assert body["plan"]["summary"] == generated["summary"]
+
+    by_id = client.get(f"/api/v1/plans/{generated['plan_id']}").json()
+    assert by_id == body
+
+    assert client.get("/api/v1/plans/plan_missing").status_code == 404
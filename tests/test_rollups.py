@@ -0,0 +1,117 @@
+# tests/test_rollups.py
+from datetime import datetime, timedelta
+
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import sessionmaker
+
+from models.database import Metric, MetricRollup
+from services.rollups import (
+    UPSERTS,
+    _merge_columns,
+    apply_metric,
+    bucket_start,
+    choose_resolution,
+    read_rollups,
+    rebuild_rollups,
+)
+
+
+def _log(db_session, user_id, created_at, weight, commit=True):
+    metric = Metric(
+        user_id=user_id,
+        weight_kg=weight,
+        strength_1rm=100.0 + weight,
+        sleep_hours=7.0,
+        mood=7,
+        energy=8,
+        created_at=created_at,
+    )
+    db_session.add(metric)
+    apply_metric(db_session, metric)
+    if commit:
+        db_session.commit()
+
+
+def _snapshot(db_session, user_id):
+    rows = db_session.query(MetricRollup).filter(
+        MetricRollup.user_id == user_id
+    ).order_by(MetricRollup.resolution, MetricRollup.bucket_start).all()
+    return [
+        (r.resolution, r.bucket_start, r.count, r.weight_kg_min, r.weight_kg_max,
+         r.weight_kg_sum, r.weight_kg_first, r.weight_kg_last)
+        for r in rows
+    ]
+
+
+def test_bucket_boundaries():
+    moment = datetime(2026, 1, 8, 15, 30)  # Thursday
+
+    assert bucket_start(moment, "day") == datetime(2026, 1, 8)
+    assert bucket_start(moment, "week") == datetime(2026, 1, 5)
+    assert bucket_start(moment, "month") == datetime(2026, 1, 1)
+
+
+def test_choose_resolution_prefers_coarsest_that_fits():
+    assert choose_resolution(30) == "day"
+    assert choose_resolution(365) == "week"
+    assert choose_resolution(3 * 365) == "month"
+
+
+def test_incremental_matches_backfill(db_session):
+    start = datetime(2026, 1, 1, 9, 0)
+    for i in range(40):
+        _log(db_session, "rollup_user", start + timedelta(days=i), 70.0 + (i % 5))
+    # A late, out-of-order entry must not become the bucket's "last"
+    _log(db_session, "rollup_user", start + timedelta(days=3, hours=-1), 60.0)
+
+    incremental = _snapshot(db_session, "rollup_user")
+    rebuild_rollups(db_session, user_id="rollup_user")
+
+    assert _snapshot(db_session, "rollup_user") == incremental
+    month = [r for r in incremental if r[0] == "month"][0]
+    assert month[2] == 32
+    assert month[3] == 60.0
+
+
+def test_year_window_reads_weekly_buckets(db_session):
+    now = datetime(2026, 12, 31, 12, 0)
+    for i in range(365):
+        _log(db_session, "rollup_year", now - timedelta(days=i), 80.0, commit=False)
+    db_session.commit()
+
+    resolution, buckets = read_rollups(db_session, "rollup_year", days=365, now=now)
+
+    assert resolution == "week"
+    assert 52 <= len(buckets) <= 54
+    assert sum(b.count for b in buckets) == 365
+
+
+def test_concurrent_logs_merge_into_one_bucket(engine):
+    # Each session folds into a bucket it never read: the database merges them
+    first, second = sessionmaker(bind=engine)(), sessionmaker(bind=engine)()
+    try:
+        moment = datetime(2026, 3, 2, 8, 0)
+        _log(first, "rollup_race", moment, 70.0, commit=False)
+        first.commit()
+        _log(second, "rollup_race", moment + timedelta(hours=1), 72.0)
+        _log(first, "rollup_race", moment - timedelta(hours=1), 69.0)
+
+        assert [row[2:] for row in _snapshot(second, "rollup_race") if row[0] == "day"] == [
+            (3, 69.0, 72.0, 211.0, 69.0, 72.0)
+        ]
+    finally:
+        first.close()
+        second.close()
+
+
+def test_upsert_uses_native_conflict_handling_on_postgresql():
+    stmt = UPSERTS["postgresql"](MetricRollup).values(user_id="u", resolution="day", bucket_start=datetime(2026, 1, 1))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id", "resolution", "bucket_start"],
+        set_=_merge_columns(stmt, "postgresql")
+    )
+    sql = str(stmt.compile(dialect=postgresql.dialect()))
+
+    assert "ON CONFLICT (user_id, resolution, bucket_start) DO UPDATE" in sql
+    assert "least(metric_rollups.weight_kg_min, excluded.weight_kg_min)" in sql
+    assert "count = (metric_rollups.count + excluded.count)" in sql
@@ -9,6 +9,12 @@ def test_health_endpoint(client):
     assert data["status"] == "healthy"
 
 
+def test_app_factory_builds_orchestrator_on_startup(client):
+    from agents.orchestrator import OrchestratorAgent
+
+    assert isinstance(client.app.state.orchestrator, OrchestratorAgent)
+
+
 def test_register_and_get_profile(client):
     user_payload = {
         "user_id": "alice",
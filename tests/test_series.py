@@ -0,0 +1,82 @@
+# tests/test_series.py
+from datetime import datetime, timedelta
+
+from agents.orchestrator import OrchestratorAgent
+from agents.progress_agent import ProgressAgent
+from models.series import MetricSeries
+
+
+def _rows(count=6):
+    start = datetime(2026, 1, 1, 8, 0, 0)
+    return [
+        (start + timedelta(days=i), 65.0 + i * 0.2, 180.0 + i * 2.5, 7.5, 8, 7)
+        for i in range(count)
+    ]
+
+
+def _profile():
+    return {
+        "user_id": "alice",
+        "age": 28,
+        "weight_kg": 65,
+        "height_cm": 165,
+        "fitness_level": "intermediate",
+        "goal": "muscle_gain",
+        "equipment": ["dumbbells", "barbell"],
+    }
+
+
+def test_from_rows_builds_columns():
+    series = MetricSeries.from_rows(_rows(3))
+
+    assert len(series) == 3
+    assert series.column("strength_1rm").tolist() == [180.0, 182.5, 185.0]
+    assert series.column("mood").typecode == "h"
+    assert series.timestamps[1] - series.timestamps[0] == 86400.0
+    assert series[-1].get("weight_kg") == 65.4
+    assert series[-1]["energy"] == 7
+
+
+def test_slicing_returns_series():
+    series = MetricSeries.from_rows(_rows(6))
+
+    tail = series[-2:]
+    assert isinstance(tail, MetricSeries)
+    assert len(tail) == 2
+    assert tail.last("strength_1rm") == series.last("strength_1rm")
+
+
+def test_numpy_view_shares_buffer():
+    series = MetricSeries.from_rows(_rows(4))
+
+    weights = series.to_numpy("weight_kg")
+    assert weights.shape == (4,)
+    assert weights[-1] == series.last("weight_kg")
+
+
+def test_dicts_round_trip():
+    series = MetricSeries.from_rows(_rows(2))
+
+    restored = MetricSeries.from_dicts(series.to_dicts())
+    assert restored.timestamps == series.timestamps
+    assert restored.column("sleep_hours") == series.column("sleep_hours")
+
+
+def test_agents_accept_series_and_dicts_equally():
+    series = MetricSeries.from_rows(_rows(6))
+    agent = ProgressAgent()
+
+    from_series = agent.analyze_progress(_profile(), series, week=2)
+    from_dicts = agent.analyze_progress(_profile(), series.to_dicts(), week=2)
+
+    assert from_series == from_dicts
+    assert from_series["predictions_4week"]["strength_trend_per_week"] == 2.5
+
+
+def test_orchestrator_accepts_series():
+    plan = OrchestratorAgent().synthesize_recommendation(
+        _profile(), MetricSeries.from_rows(_rows(3)), week=2
+    )
+
+    assert plan["progress_analysis"]["trend"] == "increasing"
+    assert plan["nutrition_plan"]["adjustment"] == "Continue current intake"